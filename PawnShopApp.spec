@@ -14,6 +14,7 @@ a = Analysis(
         ('THSarabun.ttf', '.'),
         ('THSarabun Bold.ttf', '.'),
         ('config.json', '.'),
+        ('thai_address.tsv', '.'),
         ('pawnshop.db', '.'),
         ('product_images', 'product_images'),
         ('pdf.py', '.'),
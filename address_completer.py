@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+เติมคำอัตโนมัติของช่องตำบล/อำเภอ/จังหวัดจาก gazetteer (thai_address)
+
+- รายการอำเภอจำกัดตามจังหวัดที่กรอก รายการตำบลจำกัดตามอำเภอ/จังหวัดที่กรอก
+- พิมพ์ส่วนใดของชื่อก็ได้ (ไม่ต้องพิมพ์คำว่า ตำบล/อำเภอ) รายการแสดงชื่อพร้อมคำนำหน้าแบบที่บันทึก
+- เลือกตำบลที่ชื่อไม่ซ้ำแล้วเติมอำเภอและจังหวัดให้ เลือกอำเภอแล้วเติมจังหวัดให้
+"""
+from PySide6.QtCore import QObject, QStringListModel, Qt
+from PySide6.QtWidgets import QCompleter, QLineEdit
+
+from thai_address import district_label, get_gazetteer
+
+
+class AddressCompleter(QObject):
+    """ผูก QCompleter กับช่องตำบล อำเภอ และจังหวัดของฟอร์มลูกค้าหนึ่งฟอร์ม"""
+
+    def __init__(self, subdistrict_edit: QLineEdit, district_edit: QLineEdit, province_edit: QLineEdit,
+                 parent=None):
+        super().__init__(parent)
+        self.gazetteer = get_gazetteer()
+        self.subdistrict_edit = subdistrict_edit
+        self.district_edit = district_edit
+        self.province_edit = province_edit
+
+        self.province_model = QStringListModel(self.gazetteer.provinces(), self)
+        self.district_model = QStringListModel(self)
+        self.subdistrict_model = QStringListModel(self)
+        self._attach(province_edit, self.province_model)
+        self._attach(district_edit, self.district_model).activated.connect(self.fill_from_district)
+        self._attach(subdistrict_edit, self.subdistrict_model).activated.connect(self.fill_from_subdistrict)
+
+        province_edit.textChanged.connect(self.update_lists)
+        district_edit.textChanged.connect(self.update_subdistricts)
+        self.update_lists()
+
+    def _attach(self, edit: QLineEdit, model: QStringListModel) -> QCompleter:
+        completer = QCompleter(model, self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)
+        edit.setCompleter(completer)
+        return completer
+
+    def update_lists(self):
+        """ปรับรายการอำเภอและตำบลตามจังหวัดที่กรอก"""
+        self.district_model.setStringList(self.gazetteer.district_labels(self.province_edit.text()))
+        self.update_subdistricts()
+
+    def update_subdistricts(self):
+        """ปรับรายการตำบลตามอำเภอ/จังหวัดที่กรอก"""
+        self.subdistrict_model.setStringList(
+            self.gazetteer.subdistrict_labels(self.province_edit.text(), self.district_edit.text()))
+
+    def fill_from_district(self, label: str):
+        """เลือกอำเภอแล้วเติมจังหวัด (เมื่อชื่ออำเภอไม่ซ้ำ)"""
+        province = self.gazetteer.find_province(self.province_edit.text())
+        found = self.gazetteer.find_district(label, province)
+        if found and not province:
+            self.province_edit.setText(found[0])
+
+    def fill_from_subdistrict(self, label: str):
+        """เลือกตำบลแล้วเติมอำเภอและจังหวัด (เมื่อชื่อตำบลไม่ซ้ำในขอบเขตที่กรอก)"""
+        province = self.gazetteer.find_province(self.province_edit.text())
+        found = self.gazetteer.find_district(self.district_edit.text(), province)
+        matches = self.gazetteer.find_subdistrict(label, found[1] if found else None, province)
+        if len(matches) != 1:
+            return
+        province, district, _, _ = matches[0]
+        # ตั้งอำเภอก่อนจังหวัด: การเปลี่ยนจังหวัดจะปรับรายการตามอำเภอที่ตั้งแล้ว
+        self.district_edit.setText(district_label(district, province))
+        self.province_edit.setText(province)
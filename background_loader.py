@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+โหลดข้อมูลของหน้าจอในเธรดแยก และแจ้งเมื่อข้อมูลในฐานข้อมูลเปลี่ยน
+
+- TabLoader โหลดข้อมูลของแท็บหนึ่งในเธรดแยกทีละงาน คำขอที่เข้ามาระหว่างโหลด (เช่นพิมพ์ค้นหาต่อเนื่อง)
+  จะรวมเป็นการโหลดครั้งเดียวหลังงานปัจจุบันเสร็จ
+- SearchController ค้นหาขณะพิมพ์: รอให้หยุดพิมพ์ก่อนค้น และทิ้งผลของคำค้นที่ถูกแทนที่แล้ว
+- DatabaseChangeWatcher ตรวจ PRAGMA data_version เป็นระยะ (ไม่คิวรีตารางถ้าไม่มีใครเขียน)
+  เมื่อเปลี่ยนจึงอ่านชื่อตารางที่เปลี่ยนจาก change_log แล้วส่งสัญญาณ tables_changed
+"""
+import sqlite3
+from typing import Callable, Iterable, Optional
+
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
+
+# ระยะเวลาระหว่างการตรวจการเปลี่ยนแปลง (มิลลิวินาที)
+WATCH_INTERVAL_MS = 2000
+
+# เวลารอหลังพิมพ์ตัวสุดท้ายก่อนค้นหา (มิลลิวินาที)
+SEARCH_DEBOUNCE_MS = 250
+
+
+class QueryThread(QThread):
+    """รันฟังก์ชันหนึ่งครั้งในเธรดแยก แล้วส่งผลลัพธ์หรือข้อความผิดพลาดกลับ"""
+    result_ready = Signal(object)
+    error_occurred = Signal(str)
+
+    def __init__(self, query: Callable[[], object]):
+        super().__init__()
+        self.query = query
+
+    def run(self):
+        try:
+            self.result_ready.emit(self.query())
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class TabLoader(QObject):
+    """ตัวโหลดข้อมูลของแท็บหนึ่ง
+
+    prepare()  เรียกในเธรดหลัก อ่านค่าตัวกรองจากหน้าจอแล้วคืนฟังก์ชันที่จะรันในเธรดแยก
+    apply(ผลลัพธ์)  เรียกในเธรดหลักเมื่อโหลดเสร็จ
+    tables  ชื่อตารางที่ข้อมูลของแท็บนี้ขึ้นอยู่ด้วย (ใช้กับ DatabaseChangeWatcher)
+    """
+
+    def __init__(self, prepare: Callable[[], Callable[[], object]], apply: Callable[[object], None],
+                 on_error: Callable[[str], None], tables: Iterable[str] = (), parent=None):
+        super().__init__(parent)
+        self.prepare = prepare
+        self.apply = apply
+        self.on_error = on_error
+        self.tables = set(tables)
+        self.stale = True
+        self._pending = False
+        self._cancelled = False
+        self._thread: Optional[QueryThread] = None
+
+    @property
+    def loading(self) -> bool:
+        return self._thread is not None
+
+    def request(self):
+        """โหลดใหม่ (ถ้ากำลังโหลดอยู่ จะโหลดอีกครั้งหลังเสร็จ)"""
+        if self._thread is not None:
+            self._pending = True
+            return
+        self.stale = False
+        self._pending = False
+        self._cancelled = False
+        try:
+            query = self.prepare()
+        except Exception as e:
+            self.on_error(str(e))
+            return
+        self._thread = QueryThread(query)
+        self._thread.result_ready.connect(self._on_result)
+        self._thread.error_occurred.connect(self.on_error)
+        self._thread.finished.connect(self._on_finished)
+        self._thread.start()
+
+    def cancel(self):
+        """ทิ้งผลลัพธ์ของงานที่กำลังทำอยู่และคำขอที่ค้างไว้"""
+        self._pending = False
+        self._cancelled = True
+
+    def _on_result(self, result):
+        # ผลลัพธ์เก่าที่ตัวกรองเปลี่ยนไปแล้วไม่ต้องแสดง
+        if not self._pending and not self._cancelled:
+            self.apply(result)
+
+    def _on_finished(self):
+        thread, self._thread = self._thread, None
+        thread.wait()  # finished ถูกส่งก่อน run() จบจริงเล็กน้อย รอก่อนปล่อย object
+        if self._pending:
+            self.request()
+
+    def wait(self):
+        """รอให้งานที่ค้างอยู่เสร็จ (เรียกก่อนปิดหน้าต่าง)"""
+        self._pending = False
+        if self._thread is not None:
+            self._thread.wait()
+
+
+class SearchController(QObject):
+    """ค้นหาขณะพิมพ์ด้วย TabLoader
+
+    schedule() เรียกทุกครั้งที่ข้อความเปลี่ยน: ยกเลิกผลของการค้นหาที่ค้างอยู่ แล้วค้นใหม่เมื่อหยุดพิมพ์ครบ debounce_ms
+    """
+
+    def __init__(self, loader: TabLoader, debounce_ms: int = SEARCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self.loader.request)
+
+    def schedule(self, *_args):
+        self.loader.cancel()
+        self._timer.start()
+
+    def search_now(self):
+        """ค้นหาทันที (เช่นกด Enter หรือปุ่มค้นหา)"""
+        self._timer.stop()
+        self.loader.request()
+
+    def cancel(self):
+        """ยกเลิกการค้นหาที่รออยู่และทิ้งผลของการค้นหาที่กำลังทำ"""
+        self._timer.stop()
+        self.loader.cancel()
+
+    def wait(self):
+        self._timer.stop()
+        self.loader.wait()
+
+
+class DatabaseChangeWatcher(QObject):
+    """ส่ง tables_changed(list ของชื่อตาราง) เมื่อมีการเขียนลงตารางที่บันทึกใน change_log"""
+    tables_changed = Signal(list)
+
+    def __init__(self, db, interval_ms: int = WATCH_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._seq = db.get_last_change_seq()
+        self._data_version = None
+
+        # connection ค้างไว้สำหรับ PRAGMA data_version (ฐานข้อมูลระยะไกลจะถาม change_log ทุกรอบ)
+        self._version_conn = None
+        if getattr(db, 'db_path', None):
+            self._version_conn = sqlite3.connect(db.db_path, check_same_thread=False)
+            self._data_version = self._current_data_version()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.check)
+        self._timer.start()
+
+    def _current_data_version(self):
+        return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def check(self):
+        """ตรวจการเปลี่ยนแปลงตอนนี้"""
+        try:
+            if self._version_conn is not None:
+                version = self._current_data_version()
+                if version == self._data_version:
+                    return
+                self._data_version = version
+            changed = self.db.get_changed_tables(self._seq)
+        except Exception as e:
+            print(f"Error checking database changes: {e}")
+            return
+        self._seq = changed['to_seq']
+        if changed['tables']:
+            self.tables_changed.emit(changed['tables'])
+
+    def stop(self):
+        self._timer.stop()
+        if self._version_conn is not None:
+            self._version_conn.close()
+            self._version_conn = None
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+อ่านรหัสจากเครื่องสแกนบาร์โค้ดแบบ USB (keyboard wedge) และตรวจเลข IMEI
+
+เครื่องสแกนพิมพ์ตัวอักษรเข้าช่องข้อความเหมือนคีย์บอร์ด แต่เร็วกว่าคนพิมพ์มาก แล้วปิดท้ายด้วย Enter
+ScanBurstDetector แยกการสแกนจากการพิมพ์ด้วยระยะห่างระหว่างตัวอักษร
+
+ฟังก์ชันในโมดูลนี้ไม่ใช้ Qt และไม่แตะฐานข้อมูล
+
+ตัวอย่าง:
+    python barcode_scan.py 490154203237518
+"""
+import argparse
+import re
+from typing import List, Optional
+
+# ระยะห่างเฉลี่ยระหว่างตัวอักษรที่ถือว่าเป็นการสแกน (วินาที) คนพิมพ์เร็วสุดราว 0.08 วินาทีต่อตัว
+SCAN_MAX_INTERVAL = 0.035
+
+# ความยาวขั้นต่ำของรหัสที่สแกน
+SCAN_MIN_LENGTH = 6
+
+# คำนำหน้าที่พิมพ์ไว้บนฉลาก/กล่อง เช่น "IMEI: 35...", "IMEI1 35...", "S/N: F2L..."
+_LABEL_PREFIX = re.compile(r'^(?:IMEI\s*[12]?|MEID|S/?N|SERIAL(?:\s*NO\.?)?)\s*[:#=]?\s*', re.IGNORECASE)
+_SEPARATORS = re.compile(r'[\-/.]')
+
+# ชนิดของรหัส
+CODE_IMEI = 'imei'
+CODE_INVALID_IMEI = 'invalid_imei'
+CODE_SERIAL = 'serial'
+
+
+def normalize_scan(text: str) -> str:
+    """ตัดคำนำหน้าและช่องว่างออก เลขล้วนที่มีขีดคั่น (เช่น IMEI 35-209900-176148-1) ตัดขีดออกด้วย"""
+    code = _LABEL_PREFIX.sub('', (text or '').strip())
+    code = ''.join(code.split())
+    digits = _SEPARATORS.sub('', code)
+    return digits if digits.isdigit() else code
+
+
+def luhn_valid(digits: str) -> bool:
+    """ตรวจ check digit แบบ Luhn"""
+    if not digits or not digits.isdigit():
+        return False
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        n = int(ch)
+        if i % 2 == 1:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return total % 10 == 0
+
+
+def is_valid_imei(code: str) -> bool:
+    """IMEI 15 หลักที่ check digit ถูกต้อง"""
+    return len(code) == 15 and luhn_valid(code)
+
+
+def classify_code(code: str) -> str:
+    """ชนิดของรหัสที่ normalize แล้ว: CODE_IMEI, CODE_INVALID_IMEI (15 หลักแต่ Luhn ไม่ผ่าน) หรือ CODE_SERIAL"""
+    if len(code) == 15 and code.isdigit():
+        return CODE_IMEI if luhn_valid(code) else CODE_INVALID_IMEI
+    return CODE_SERIAL
+
+
+class ScanBurstDetector:
+    """แยกการสแกนบาร์โค้ดออกจากการพิมพ์
+
+    เรียก key(เวลา) ทุกครั้งที่มีการกดตัวอักษร และ finish(ข้อความ, เวลา) เมื่อกด Enter
+    finish คืนรหัสที่ normalize แล้วถ้าเป็นการสแกน ไม่เช่นนั้นคืน None
+    """
+
+    def __init__(self, max_interval: float = SCAN_MAX_INTERVAL, min_length: int = SCAN_MIN_LENGTH):
+        self.max_interval = max_interval
+        self.min_length = min_length
+        self._times: List[float] = []
+
+    def reset(self):
+        self._times = []
+
+    def key(self, timestamp: float):
+        # เว้นช่วงนานเกินไปถือว่าเริ่มชุดใหม่ (ข้อความที่พิมพ์ไว้ก่อนหน้าไม่นับ)
+        if self._times and timestamp - self._times[-1] > self.max_interval * 4:
+            self._times = []
+        self._times.append(timestamp)
+
+    def is_burst(self, timestamp: Optional[float] = None) -> bool:
+        """ตัวอักษรที่กดล่าสุดมาเป็นชุดเร็วแบบเครื่องสแกนหรือไม่"""
+        times = self._times
+        if len(times) < self.min_length:
+            return False
+        if timestamp is not None and timestamp - times[-1] > self.max_interval * 4:
+            return False
+        return (times[-1] - times[0]) / (len(times) - 1) <= self.max_interval
+
+    def finish(self, text: str, timestamp: Optional[float] = None) -> Optional[str]:
+        """text คือข้อความทั้งช่อง ใช้เฉพาะตัวอักษรท้ายข้อความที่มาในชุดเดียวกัน"""
+        burst = self.is_burst(timestamp)
+        count = len(self._times)
+        self.reset()
+        if not burst:
+            return None
+        code = normalize_scan(text[-count:])
+        return code if len(code) >= self.min_length else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ตรวจรหัสที่สแกน (IMEI/ซีเรียล)")
+    parser.add_argument('codes', nargs='+', help="รหัสที่ต้องการตรวจ")
+    args = parser.parse_args()
+
+    for text in args.codes:
+        code = normalize_scan(text)
+        print("{} -> {} ({})".format(text, code, classify_code(code)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+รายงานรวมหลายสาขา
+
+อ่านไฟล์ฐานข้อมูลของแต่ละสาขา (pawnshop.db หรือสำเนาจาก branch_sync.py) ในโฟลเดอร์เดียว
+คำนวณสรุปรายวัน สรุปรายเดือน ยอดเงินต้นคงค้าง และอายุหนี้เกินกำหนดของแต่ละสาขา
+แบบขนานด้วย process แยกกัน แล้วรวมเป็นยอดรวมทุกสาขา
+
+วิธีรัน:
+    python branch_report.py branches --date 2026-10-19
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import PawnShopDatabase
+from utils import PawnShopUtils
+
+
+class BranchSnapshotDatabase(PawnShopDatabase):
+    """เปิดฐานข้อมูลสาขาแบบอ่านอย่างเดียว (ไม่รัน migration และไม่แก้ไขไฟล์สาขา)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @contextmanager
+    def get_connection(self):
+        uri = "file:{}?mode=ro".format(os.path.abspath(self.db_path).replace('\\', '/'))
+        conn = sqlite3.connect(uri, uri=True, timeout=20.0)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def summarize_branch(db_path: str, date: str, year: int, month: int) -> Dict:
+    """สรุปตัวเลขของสาขาเดียว (รันใน worker process)"""
+    db = BranchSnapshotDatabase(db_path)
+    branch = os.path.splitext(os.path.basename(db_path))[0]
+
+    result = {'branch': branch, 'db_path': db_path}
+    result['daily'] = db.get_daily_summary(date)
+    with db.get_connection() as conn:
+        result['monthly'] = PawnShopUtils.calculate_monthly_summary(year, month, conn)
+    result.update(db.get_outstanding_summary(date))
+    return result
+
+
+def _add_totals(total: Dict, values: Dict):
+    """รวมค่าตัวเลขใน values เข้ากับ total (รวมถึง dict ซ้อน)"""
+    for key, value in values.items():
+        if isinstance(value, dict):
+            _add_totals(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and key not in ('year', 'month'):
+            total[key] = total.get(key, 0) + value
+
+
+def merge_branch_results(results: List[Dict]) -> Dict:
+    """รวมผลของทุกสาขาเป็นยอดรวม"""
+    total: Dict = {}
+    for result in results:
+        _add_totals(total, {
+            'daily': result['daily'],
+            'monthly': result['monthly'],
+            'outstanding_count': result['outstanding_count'],
+            'outstanding_principal': result['outstanding_principal'],
+            'overdue_aging': result['overdue_aging'],
+        })
+    return total
+
+
+def find_branch_databases(directory: str) -> List[str]:
+    """ไฟล์ฐานข้อมูลสาขาทั้งหมดในโฟลเดอร์"""
+    paths = []
+    for pattern in ("*.db", "*.sqlite", "*.sqlite3"):
+        paths.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(paths)
+
+
+def consolidated_report(directory: str, date: Optional[str] = None,
+                        max_workers: Optional[int] = None) -> Dict:
+    """รายงานรวมทุกสาขาในโฟลเดอร์ (คำนวณแต่ละสาขาขนานกันใน process แยก)
+
+    date เป็น YYYY-MM-DD (ค่าเริ่มต้น: วันนี้) ใช้กับสรุปรายวัน อายุหนี้ และเดือนของสรุปรายเดือน
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    PawnShopDatabase._validate_date(date, 'date')
+    year, month = int(date[:4]), int(date[5:7])
+
+    paths = find_branch_databases(directory)
+    branches, errors = [], []
+
+    if paths:
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(paths), os.cpu_count() or 1)) as executor:
+            futures = {executor.submit(summarize_branch, path, date, year, month): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    branches.append(future.result())
+                except Exception as e:
+                    errors.append({'db_path': futures[future], 'error': str(e)})
+                    print(f"Error reporting {futures[future]}: {e}")
+
+    branches.sort(key=lambda result: result['branch'])
+    return {
+        'date': date,
+        'year': year,
+        'month': month,
+        'branches': branches,
+        'total': merge_branch_results(branches),
+        'errors': errors,
+    }
+
+
+def print_report(report: Dict):
+    """พิมพ์รายงานแบบตาราง"""
+    print(f"Consolidated report {report['date']} ({len(report['branches'])} branches)")
+    header = f"{'branch':<16}{'new today':>12}{'redeemed today':>16}{'new month':>14}{'outstanding':>14}{'overdue >90':>14}"
+    print(header)
+    print('-' * len(header))
+
+    rows = [(result['branch'], result['daily'], result['monthly'],
+             result['outstanding_principal'], result['overdue_aging']) for result in report['branches']]
+    total = report['total']
+    if rows:
+        rows.append(('TOTAL', total['daily'], total['monthly'],
+                     total['outstanding_principal'], total['overdue_aging']))
+
+    for branch, daily, monthly, outstanding, aging in rows:
+        print(f"{branch:<16}{daily['new_contracts_amount']:>12,.2f}{daily['redemptions_amount']:>16,.2f}"
+              f"{monthly['new_contracts_amount']:>14,.2f}{outstanding:>14,.2f}"
+              f"{aging['over_90']['amount']:>14,.2f}")
+
+    for error in report['errors']:
+        print(f"FAILED {error['db_path']}: {error['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop multi-branch consolidated report")
+    parser.add_argument('directory', help="directory containing branch database files")
+    parser.add_argument('--date', default=None, help="report date YYYY-MM-DD (default: today)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', dest='json_path', default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = consolidated_report(args.directory, args.date, args.workers)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
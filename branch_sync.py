@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+ซิงก์ข้อมูลสาขา -> สำนักงานใหญ่ ด้วยไฟล์ delta จาก change_log
+
+ฝั่งสาขา: export_delta() เขียนการเปลี่ยนแปลงตั้งแต่ครั้งก่อนลงไฟล์ .json.gz ขนาดเล็ก
+ฝั่งสำนักงานใหญ่: import_delta() นำไฟล์ไปใช้กับสำเนาฐานข้อมูลของสาขานั้น
+(<hq_dir>/<branch_id>.db) โดยนำเข้าซ้ำได้ผลเหมือนเดิม
+
+ไฟล์ส่งผ่าน USB หรือโฟลเดอร์แชร์ได้ ขนาดไฟล์ขึ้นกับจำนวนการเปลี่ยนแปลง ไม่ใช่ขนาดฐานข้อมูล
+
+วิธีรัน:
+    python branch_sync.py export --db pawnshop.db --out E:\\sync
+    python branch_sync.py import --inbox E:\\sync --hq-dir branches
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import PawnShopDatabase
+
+DELTA_FORMAT_VERSION = 1
+
+
+def get_branch_id(db: PawnShopDatabase) -> str:
+    """รหัสสาขาสำหรับไฟล์ delta (สร้างใหม่และบันทึกไว้ถ้ายังไม่มี)"""
+    branch_id = db.get_setting('branch_id')
+    if not branch_id:
+        branch_id = uuid.uuid4().hex[:8]
+        db.update_setting('branch_id', branch_id)
+    return branch_id
+
+
+def export_delta(db: PawnShopDatabase, out_dir: str, since_seq: Optional[int] = None) -> Optional[str]:
+    """เขียนไฟล์ delta ของการเปลี่ยนแปลงหลัง since_seq (ค่าเริ่มต้น: ต่อจากการส่งออกครั้งก่อน)
+
+    คืน path ของไฟล์ หรือ None ถ้าไม่มีการเปลี่ยนแปลง
+    """
+    branch_id = get_branch_id(db)
+    if since_seq is None:
+        since_seq = int(db.get_setting('sync_exported_seq') or 0)
+
+    delta = db.get_changes_since(since_seq)
+    if not delta['changes']:
+        print(f"No changes to export since seq {since_seq}")
+        return None
+
+    delta.update({
+        'version': DELTA_FORMAT_VERSION,
+        'branch_id': branch_id,
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+    os.makedirs(out_dir, exist_ok=True)
+    file_name = f"{branch_id}_{delta['from_seq']:010d}_{delta['to_seq']:010d}.json.gz"
+    path = os.path.join(out_dir, file_name)
+
+    # เขียนไฟล์ชั่วคราวก่อนแล้วเปลี่ยนชื่อ กันไฟล์ครึ่งๆ กลางๆ บน USB
+    temp_path = path + ".tmp"
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+    db.update_setting('sync_exported_seq', str(delta['to_seq']))
+    print(f"Exported {len(delta['changes'])} changes (seq {delta['from_seq']} -> {delta['to_seq']}) to {path}")
+    return path
+
+
+def read_delta(path: str) -> Dict:
+    """อ่านไฟล์ delta"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        delta = json.load(f)
+    if delta.get('version') != DELTA_FORMAT_VERSION:
+        raise ValueError(f"ไฟล์ {os.path.basename(path)} เป็นรูปแบบที่ไม่รองรับ")
+    return delta
+
+
+def import_delta(path: str, hq_dir: str) -> int:
+    """นำไฟล์ delta ไปใช้กับสำเนาฐานข้อมูลของสาขาใน hq_dir
+
+    ไฟล์ที่เคยนำเข้าแล้วจะถูกข้าม; ถ้ามีไฟล์ก่อนหน้าขาดหายจะแจ้งข้อผิดพลาด
+    คืนจำนวนรายการที่นำเข้า
+    """
+    delta = read_delta(path)
+    branch_id = delta['branch_id']
+
+    os.makedirs(hq_dir, exist_ok=True)
+    replica = PawnShopDatabase(os.path.join(hq_dir, f"{branch_id}.db"))
+
+    replica_branch = replica.get_setting('sync_branch_id')
+    if replica_branch and replica_branch != branch_id:
+        raise ValueError(f"ฐานข้อมูลนี้เป็นของสาขา {replica_branch} ไม่ใช่ {branch_id}")
+
+    last_seq = int(replica.get_setting('sync_last_seq') or 0)
+    if delta['to_seq'] <= last_seq:
+        print(f"Skipped {os.path.basename(path)}: already imported")
+        return 0
+    if delta['from_seq'] > last_seq:
+        raise ValueError(
+            f"ขาดไฟล์ข้อมูลของสาขา {branch_id} ช่วงลำดับ {last_seq} - {delta['from_seq']}"
+        )
+
+    applied = replica.apply_changes(delta['changes'])
+    # ถ้าหยุดกลางทางก่อนบันทึก sync_last_seq การนำเข้าซ้ำก็ให้ผลเหมือนเดิม
+    replica.update_setting('sync_branch_id', branch_id)
+    replica.update_setting('sync_last_seq', str(delta['to_seq']))
+    print(f"Imported {applied} changes from {os.path.basename(path)} into {branch_id}.db")
+    return applied
+
+
+def import_directory(inbox: str, hq_dir: str) -> Dict[str, int]:
+    """นำเข้าไฟล์ delta ทั้งหมดในโฟลเดอร์ เรียงตามสาขาและลำดับ"""
+    results: Dict[str, int] = {}
+    paths: List[str] = sorted(glob.glob(os.path.join(inbox, "*.json.gz")))
+    for path in paths:
+        try:
+            branch_id = os.path.basename(path).split('_')[0]
+            results[branch_id] = results.get(branch_id, 0) + import_delta(path, hq_dir)
+        except Exception as e:
+            print(f"Error importing {os.path.basename(path)}: {e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop branch synchronization")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="export changes from a branch database")
+    export_parser.add_argument('--db', default='pawnshop.db')
+    export_parser.add_argument('--out', required=True)
+    export_parser.add_argument('--since', type=int, default=None)
+
+    import_parser = subparsers.add_parser('import', help="import delta files at HQ")
+    import_parser.add_argument('--inbox', required=True)
+    import_parser.add_argument('--hq-dir', default='branches')
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_delta(PawnShopDatabase(args.db), args.out, args.since)
+    else:
+        import_directory(args.inbox, args.hq_dir)
+
+
+if __name__ == "__main__":
+    main()
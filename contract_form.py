@@ -17,6 +17,7 @@ from utils import PawnShopUtils
 from dialogs import CustomerDialog, ProductDialog
 from customer_search import CustomerSearchDialog
 from product_search import ProductSearchDialog
+from quotation import quote
 
 class NewContractDialog(QDialog):
     def __init__(self, parent=None):
@@ -551,8 +552,9 @@ class NewContractDialog(QDialog):
         # ยอดจ่าย
         total_paid = pawn_amount
         
-        # ยอดไถ่คืน
-        total_redemption = pawn_amount
+        # ยอดไถ่คืน (สูตรเดียวกับหน้าจออื่น: ขายฝากไถ่คืนเท่าเงินต้น)
+        total_redemption = quote(pawn_amount, self.days_spin.value(),
+                                 total_redemption=pawn_amount)['total_redemption']
         
         # แสดงผล
         self.total_paid_label.setText(f"{total_paid:,.2f} บาท")
@@ -643,7 +645,7 @@ class NewContractDialog(QDialog):
             'total_paid': float(self.total_paid_label.text().replace(' บาท', '').replace(',', '')),
             'total_redemption': float(self.total_redemption_label.text().replace(' บาท', '').replace(',', '')),
             'start_date': self.start_date_edit.date().toString("yyyy-MM-dd"),
-            'end_date': self.end_date_edit.text(),
+            'end_date': self.start_date_edit.date().addDays(self.days_spin.value()).toString("yyyy-MM-dd"),
             'days_count': self.days_spin.value()
         }
         
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+สำเนาสัญญา + ลูกค้า + สินค้าในหน่วยความจำแบบคอลัมน์ (NumPy) สำหรับกรอง/เรียงบนหน้าจอ
+
+- โหลดครั้งแรกทั้งหมด ต่อจากนั้นอัปเดตเฉพาะแถวที่เปลี่ยน (จาก change_log)
+- ใช้ PRAGMA data_version ของ connection ที่เปิดค้างไว้ตรวจว่าฐานข้อมูลเปลี่ยนหรือยัง
+  ถ้าไม่เปลี่ยนจะไม่ต้องคิวรีอะไรเลย
+- เงื่อนไขกรองคำนวณเป็น boolean mask ทั้งคอลัมน์ในครั้งเดียว
+- select() รวม refresh + filter + sort แล้วคืนฟังก์ชันดึงทีละหน้าสำหรับ PagedTableModel (หน้า Data Viewer)
+"""
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# คอลัมน์ข้อความที่ใช้ค้นหาด้วยคำค้นอิสระ
+TEXT_COLUMNS = [
+    'contract_number', 'first_name', 'last_name', 'id_card', 'phone',
+    'product_name', 'brand', 'imei1', 'imei2',
+]
+STRING_COLUMNS = TEXT_COLUMNS + ['created_at', 'forfeited_at']
+DATE_COLUMNS = ['start_date', 'end_date', 'forfeited_date']
+
+
+class ContractSnapshot:
+    """snapshot ของสัญญาทั้งหมดแบบคอลัมน์
+
+    snapshot = ContractSnapshot(db)
+    snapshot.refresh()
+    indices = snapshot.filter({'status': 'forfeited', 'text': 'iphone'})
+    indices = snapshot.sort(indices, 'pawn_amount', descending=True)
+    rows = snapshot.rows(indices)
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.columns: Dict[str, np.ndarray] = {}
+        self.statuses: List[str] = []
+        self._seq = None
+        self._data_version = None
+        self._text_index = None
+        # แท็บสัญญาและแท็บรายการหลุดใช้ snapshot เดียวกันจากคนละเธรด
+        self._lock = threading.RLock()
+
+        # connection ค้างไว้สำหรับ PRAGMA data_version (ค่าเปลี่ยนเมื่อ connection อื่น commit)
+        self._version_conn = None
+        if getattr(db, 'db_path', None):
+            self._version_conn = sqlite3.connect(db.db_path, check_same_thread=False)
+
+    def __len__(self):
+        return len(self.columns.get('id', ()))
+
+    def close(self):
+        if self._version_conn is not None:
+            self._version_conn.close()
+            self._version_conn = None
+
+    # ---------- การโหลดและอัปเดต ----------
+
+    def _database_changed(self) -> bool:
+        if self._version_conn is None:
+            return True
+        version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def refresh(self, full: bool = False) -> int:
+        """อัปเดต snapshot คืนจำนวนแถวที่โหลดใหม่ (0 = ไม่มีการเปลี่ยนแปลง)"""
+        with self._lock:
+            return self._refresh(full)
+
+    def _refresh(self, full: bool) -> int:
+        if not self._database_changed() and self._seq is not None and not full:
+            return 0
+
+        if full or self._seq is None:
+            to_seq = self.db.get_last_change_seq()
+            self._load(self.db.get_contract_snapshot_rows())
+            self._seq = to_seq
+            return len(self)
+
+        changed = self.db.get_changed_contract_ids(self._seq)
+        self._seq = changed['to_seq']
+        if not changed['contract_ids']:
+            return 0
+
+        changed_ids = np.asarray(changed['contract_ids'], dtype=np.int64)
+        fresh = self._to_arrays(self.db.get_contract_snapshot_rows(changed['contract_ids']))
+
+        # ตัดแถวเดิมของสัญญาที่เปลี่ยน/ถูกลบออก แล้วต่อท้ายด้วยข้อมูลใหม่ เรียงตาม id
+        keep = ~np.isin(self.columns['id'], changed_ids)
+        columns = {name: np.concatenate([values[keep], fresh[name]]) for name, values in self.columns.items()}
+        order = np.argsort(columns['id'], kind='stable')
+        if not np.array_equal(order, np.arange(order.size)):
+            columns = {name: values[order] for name, values in columns.items()}
+        self.columns = columns
+        self._text_index = None
+        return int(fresh['id'].size)
+
+    def _load(self, raw: Dict[str, list]):
+        self.statuses = []
+        self.columns = self._to_arrays(raw)
+        self._text_index = None
+
+    def _status_codes(self, values: list) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int8)
+        for i, status in enumerate(values):
+            status = status or 'active'
+            if status not in self.statuses:
+                self.statuses.append(status)
+            codes[i] = self.statuses.index(status)
+        return codes
+
+    def _to_arrays(self, raw: Dict[str, list]) -> Dict[str, np.ndarray]:
+        columns = {
+            'id': np.asarray(raw['id'], dtype=np.int64),
+            'customer_id': np.asarray(raw['customer_id'], dtype=np.int64),
+            'status': self._status_codes(raw['status']),
+            'pawn_amount': np.asarray([v or 0 for v in raw['pawn_amount']], dtype=np.float64),
+            'total_redemption': np.asarray([v or 0 for v in raw['total_redemption']], dtype=np.float64),
+            'start_date': np.asarray([v or 'NaT' for v in raw['start_date']], dtype='datetime64[D]'),
+            'end_date': np.asarray([v or 'NaT' for v in raw['end_date']], dtype='datetime64[D]'),
+        }
+        # วันที่หลุด = วันที่ระบบทำเครื่องหมาย ถ้าไม่มีใช้วันครบกำหนด
+        columns['forfeited_date'] = np.asarray(
+            [(f or e)[:10] if (f or e) else 'NaT' for f, e in zip(raw['forfeited_at'], raw['end_date'])],
+            dtype='datetime64[D]'
+        )
+        for name in STRING_COLUMNS:
+            # intern ข้อความที่ซ้ำกันบ่อย (ยี่ห้อ, ชื่อ) ให้ใช้ object เดียวกัน
+            columns[name] = np.asarray([sys.intern(v) if v else '' for v in raw[name]], dtype=object)
+        return columns
+
+    # ---------- การกรองและเรียงลำดับ ----------
+
+    def _build_text_index(self):
+        """เข้ารหัสคอลัมน์ข้อความแบบ dictionary: ค่าไม่ซ้ำ (ตัวพิมพ์เล็ก) + รหัสของแต่ละแถว
+
+        คอลัมน์ที่ค่าซ้ำกันมาก (ยี่ห้อ, ชื่อ) จะค้นหาเฉพาะค่าไม่ซ้ำซึ่งมีจำนวนน้อย
+        """
+        self._text_index = []
+        for name in TEXT_COLUMNS:
+            lookup: Dict[str, int] = {}
+            codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in self.columns[name]),
+                                dtype=np.int32, count=len(self))
+            values = np.asarray([v.lower() for v in lookup], dtype=str)
+            # คอลัมน์ตัวเลขล้วน (เลขบัตร, เบอร์โทร, IMEI) ไม่ต้องค้นคำที่มีตัวอักษร
+            digits_only = bool(np.all(np.char.isdigit(values) | (values == '')))
+            self._text_index.append((values, codes, digits_only))
+
+    def _text_mask(self, word: str) -> np.ndarray:
+        """แถวที่มี word อยู่ในคอลัมน์ข้อความใดก็ได้"""
+        if self._text_index is None:
+            self._build_text_index()
+        mask = np.zeros(len(self), dtype=bool)
+        word = word.lower()
+        is_number = word.isdigit()
+        for values, codes, digits_only in self._text_index:
+            if values.size == 0 or (digits_only and not is_number):
+                continue
+            hit = np.char.find(values, word) >= 0
+            if hit.any():
+                mask |= hit[codes]
+        return mask
+
+    def filter(self, criteria: Dict) -> np.ndarray:
+        """คืน index ของแถวที่ตรงทุกเงื่อนไข
+
+        criteria: text (แยกคำด้วยช่องว่าง), status (str หรือ list), customer_id,
+                  start_date_from/to, end_date_from/to, forfeited_from/to (YYYY-MM-DD),
+                  min_amount, max_amount
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in criteria.items():
+            if value is None or value == '' or value == 'all':
+                continue
+            if key == 'text':
+                for word in str(value).split():
+                    mask &= self._text_mask(word)
+            elif key == 'status':
+                wanted = [value] if isinstance(value, str) else list(value)
+                codes = [self.statuses.index(s) for s in wanted if s in self.statuses]
+                mask &= np.isin(self.columns['status'], codes)
+            elif key == 'customer_id':
+                mask &= self.columns['customer_id'] == value
+            elif key in ('min_amount', 'max_amount'):
+                amounts = self.columns['pawn_amount']
+                mask &= amounts >= value if key == 'min_amount' else amounts <= value
+            elif key.endswith('_from') or key.endswith('_to'):
+                column = key.rsplit('_', 1)[0]
+                column = 'forfeited_date' if column == 'forfeited' else column
+                if column not in DATE_COLUMNS:
+                    raise ValueError(f"ไม่รู้จักเงื่อนไข: {key}")
+                dates = self.columns[column]
+                day = np.datetime64(value, 'D')
+                mask &= dates >= day if key.endswith('_from') else dates <= day
+            else:
+                raise ValueError(f"ไม่รู้จักเงื่อนไข: {key}")
+        return np.flatnonzero(mask)
+
+    def sort(self, indices: np.ndarray, column: str, descending: bool = False) -> np.ndarray:
+        """เรียง index ตามคอลัมน์ (stable; descending กลับลำดับทั้งหมด แถวที่ค่าเท่ากันจึงเรียง id มากก่อน)"""
+        values = self.columns[column][indices]
+        if column == 'status':
+            # รหัสสถานะเรียงตามลำดับที่พบ ให้เรียงตามชื่อสถานะแทน
+            rank = np.argsort(np.argsort(np.asarray(self.statuses, dtype=object)))
+            values = rank[values]
+        order = np.argsort(values, kind='stable')
+        if descending:
+            order = order[::-1]
+        return indices[order]
+
+    def select(self, criteria: Dict, order: str = 'created_at', descending: bool = True):
+        """refresh แล้วกรองและเรียง คืน (จำนวนแถว, ฟังก์ชัน (offset, limit) -> rows)"""
+        with self._lock:
+            self._refresh(False)
+            indices = self.sort(self.filter(criteria), order, descending)
+            return int(indices.size), self.page_fetcher(indices)
+
+    def rows(self, indices: np.ndarray, limit: Optional[int] = None) -> List[Dict]:
+        """แปลง index เป็น list ของ dict (ชื่อคีย์เหมือนผลลัพธ์จากฐานข้อมูล)"""
+        if limit is not None:
+            indices = indices[:limit]
+        return self._rows(self.columns, indices)
+
+    def page_fetcher(self, indices: np.ndarray):
+        """ฟังก์ชัน (offset, limit) -> rows สำหรับ PagedTableModel
+
+        ผูกกับคอลัมน์ชุดปัจจุบัน refresh() สร้าง array ชุดใหม่เสมอ index เดิมจึงยังอ่านได้ถูกต้อง
+        """
+        columns = self.columns
+        return lambda offset, limit: self._rows(columns, indices[offset:offset + limit])
+
+    def _rows(self, columns: Dict[str, np.ndarray], indices: np.ndarray) -> List[Dict]:
+        result = []
+        for i in indices:
+            row = {name: values[i] for name, values in columns.items()}
+            row['status'] = self.statuses[row['status']]
+            row['pawn_amount'] = float(row['pawn_amount'])
+            row['total_redemption'] = float(row['total_redemption'])
+            for name in DATE_COLUMNS:
+                row[name] = '' if np.isnat(row[name]) else str(row[name])
+            row['id'] = int(row['id'])
+            row['customer_id'] = int(row['customer_id'])
+            result.append(row)
+        return result
+
+
+def benchmark(count: int = 500000):
+    """วัดเวลากรอง/เรียงบน snapshot จำลองขนาด count สัญญา"""
+    import time
+    rng = np.random.default_rng(0)
+    brands = ['Apple', 'Samsung', 'Oppo', 'Vivo', 'ทอง']
+    start = np.datetime64('2024-01-01') + rng.integers(0, 900, count)
+    raw = {
+        'id': list(range(1, count + 1)),
+        'customer_id': rng.integers(1, count // 5 + 2, count).tolist(),
+        'contract_number': [f"53-10-4-{i:06d}" for i in range(count)],
+        'first_name': [f"ลูกค้า{i % 20000}" for i in range(count)],
+        'last_name': [f"สกุล{i % 5000}" for i in range(count)],
+        'id_card': [f"{1100000000000 + i}" for i in range(count)],
+        'phone': [f"08{i:08d}" for i in range(count)],
+        'product_name': ['โทรศัพท์'] * count,
+        'brand': [brands[i % len(brands)] for i in range(count)],
+        'imei1': [f"35{i:013d}" for i in range(count)],
+        'imei2': [''] * count,
+        'status': [('active', 'redeemed', 'forfeited')[i % 3] for i in range(count)],
+        'pawn_amount': (rng.integers(5, 500, count) * 100.0).tolist(),
+        'total_redemption': [0.0] * count,
+        'start_date': start.astype(str).tolist(),
+        'end_date': (start + 30).astype(str).tolist(),
+        'forfeited_at': [None] * count,
+        'created_at': [''] * count,
+    }
+    snapshot = ContractSnapshot(None)
+    snapshot._load(raw)
+    snapshot._build_text_index()
+
+    for criteria in ({'status': 'forfeited', 'start_date_from': '2025-01-01', 'min_amount': 10000},
+                     {'text': 'samsung สกุล12'}):
+        started = time.perf_counter()
+        indices = snapshot.sort(snapshot.filter(criteria), 'pawn_amount', descending=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{criteria}: {indices.size:,} rows in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
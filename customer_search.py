@@ -1,18 +1,42 @@
 # -*- coding: utf-8 -*-
 """
 หน้าต่างค้นหาลูกค้า
+
+ค้นหาขณะพิมพ์: รอให้หยุดพิมพ์ SEARCH_DEBOUNCE_MS ก่อนค้นในเธรดแยก ผลของคำค้นที่ถูกแทนที่จะถูกทิ้ง
+ตารางเก็บข้อมูลทั้งแถว (รวม id) การเลือกลูกค้าจึงอ่านด้วย primary key ไม่ต้องค้นจากชื่อซ้ำ
+เปิด "ชื่อใกล้เคียง" เพื่อค้นชื่อ/นามสกุลที่สะกดไม่ตรง (วรรณยุกต์ สระสั้น-ยาว พิมพ์ผิดเล็กน้อย)
 """
 
-# -*- coding: utf-8 -*-
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QLineEdit,
-    QPushButton, QComboBox, QTextEdit, QMessageBox, QTableWidget,
-    QTableWidgetItem, QHeaderView
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QCheckBox,
+    QPushButton, QMessageBox, QTableView, QHeaderView, QAbstractItemView
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QIcon
-from typing import Dict, Optional, List
+from typing import Dict, Optional
+from background_loader import SearchController, TabLoader
 from database import PawnShopDatabase
+from paged_table import PAGE_SIZE, PagedTableModel
+
+
+def customer_address(customer: Dict) -> str:
+    address_parts = [
+        customer.get('house_number', ''),
+        customer.get('street', ''),
+        customer.get('subdistrict', ''),
+        customer.get('district', ''),
+        customer.get('province', '')
+    ]
+    return ' '.join(filter(None, address_parts))
+
+
+SEARCH_COLUMNS = [
+    ("รหัสลูกค้า", 'customer_code'),
+    ("ชื่อ", 'first_name'),
+    ("นามสกุล", 'last_name'),
+    ("เลขบัตรประชาชน", 'id_card'),
+    ("เบอร์โทรศัพท์", 'phone'),
+    ("ที่อยู่", customer_address),
+]
+
 
 class CustomerSearchDialog(QDialog):
     def __init__(self, parent=None):
@@ -24,40 +48,52 @@ class CustomerSearchDialog(QDialog):
             self.db = PawnShopDatabase()
         self.selected_customer = None
         self.setup_ui()
+        self.finished.connect(self.search_controller.wait)
         self.load_customers()
-    
+
     def setup_ui(self):
         self.setWindowTitle("ค้นหาลูกค้า")
         self.setModal(True)
         self.resize(800, 600)
-        
+
         layout = QVBoxLayout(self)
-        
+
         # ตัวกรอง
         filter_layout = QHBoxLayout()
         filter_layout.addWidget(QLabel("ค้นหา:"))
         self.search_edit = QLineEdit()
         self.search_edit.setPlaceholderText("ชื่อลูกค้า, นามสกุล, เลขบัตร, รหัสลูกค้า")
-        self.search_edit.textChanged.connect(self.filter_customers)
         filter_layout.addWidget(self.search_edit)
-        
+
+        self.fuzzy_check = QCheckBox("ชื่อใกล้เคียง")
+        self.fuzzy_check.setToolTip("ค้นชื่อ/นามสกุลที่สะกดไม่ตรง เรียงจากใกล้เคียงที่สุด")
+        filter_layout.addWidget(self.fuzzy_check)
+
         self.search_button = QPushButton("ค้นหา")
         self.search_button.clicked.connect(self.search_customers)
+        self.search_button.setDefault(True)  # Enter ในช่องค้นหา = ค้นหาทันที
         filter_layout.addWidget(self.search_button)
-        
+
         layout.addLayout(filter_layout)
-        
+
+        self.search_loader = TabLoader(self.prepare_search, self.display_customers,
+                                       self.show_search_error, parent=self)
+        self.search_controller = SearchController(self.search_loader, parent=self)
+        self.search_edit.textChanged.connect(self.filter_customers)
+        self.fuzzy_check.toggled.connect(lambda _checked: self.search_customers())
+
         # ตารางลูกค้า
-        self.customer_table = QTableWidget()
-        self.customer_table.setColumnCount(6)
-        self.customer_table.setHorizontalHeaderLabels([
-            "รหัสลูกค้า", "ชื่อ", "นามสกุล", "เลขบัตรประชาชน", 
-            "เบอร์โทรศัพท์", "ที่อยู่"
-        ])
+        self.customer_model = PagedTableModel(SEARCH_COLUMNS, parent=self)
+        self.customer_table = QTableView()
+        self.customer_table.setModel(self.customer_model)
+        self.customer_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.customer_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.customer_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.customer_table.verticalHeader().setVisible(False)
         self.customer_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.customer_table.itemDoubleClicked.connect(self.select_customer)
+        self.customer_table.doubleClicked.connect(self.select_customer)
         layout.addWidget(self.customer_table)
-        
+
         # ปุ่ม
         button_layout = QHBoxLayout()
         self.add_new_button = QPushButton("เพิ่มลูกค้าใหม่")
@@ -66,98 +102,79 @@ class CustomerSearchDialog(QDialog):
         self.select_button.clicked.connect(self.select_customer)
         self.cancel_button = QPushButton("ยกเลิก")
         self.cancel_button.clicked.connect(self.reject)
-        
+
         button_layout.addWidget(self.add_new_button)
         button_layout.addWidget(self.select_button)
         button_layout.addWidget(self.cancel_button)
         layout.addLayout(button_layout)
-    
+
     def load_customers(self):
-        """โหลดข้อมูลลูกค้าทั้งหมด"""
-        try:
-            customers = self.db.search_customers("")  # ดึงทั้งหมด
-            self.display_customers(customers)
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", f"ไม่สามารถโหลดข้อมูลลูกค้า: {str(e)}")
-    
+        """โหลดข้อมูลลูกค้า (ตามคำค้นปัจจุบัน ถ้าว่างคือทั้งหมด)"""
+        self.search_controller.search_now()
+
     def search_customers(self):
-        """ค้นหาลูกค้า"""
-        search_term = self.search_edit.text().strip()
-        if not search_term:
-            self.load_customers()
-            return
-        
-        try:
-            customers = self.db.search_customers(search_term)
-            self.display_customers(customers)
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", f"ไม่สามารถค้นหาลูกค้า: {str(e)}")
-    
+        """ค้นหาลูกค้าทันที (ปุ่มค้นหา / Enter)"""
+        self.search_controller.search_now()
+
     def filter_customers(self):
-        """กรองข้อมูลลูกค้า"""
+        """กรองข้อมูลลูกค้าขณะพิมพ์ (ค้นเมื่อหยุดพิมพ์)"""
+        self.search_controller.schedule()
+
+    def prepare_search(self):
+        """อ่านคำค้นในเธรดหลัก คืนฟังก์ชันดึงหน้าแรกที่จะรันในเธรดแยก"""
         search_term = self.search_edit.text().strip()
-        if search_term:
-            self.search_customers()
-    
-    def display_customers(self, customers):
-        """แสดงข้อมูลลูกค้าในตาราง"""
-        self.customer_table.setRowCount(len(customers))
-        
-        for row, customer in enumerate(customers):
-            self.customer_table.setItem(row, 0, QTableWidgetItem(customer.get('customer_code', '')))
-            self.customer_table.setItem(row, 1, QTableWidgetItem(customer.get('first_name', '')))
-            self.customer_table.setItem(row, 2, QTableWidgetItem(customer.get('last_name', '')))
-            self.customer_table.setItem(row, 3, QTableWidgetItem(customer.get('id_card', '')))
-            self.customer_table.setItem(row, 4, QTableWidgetItem(customer.get('phone', '')))
-            
-            # ที่อยู่
-            address_parts = [
-                customer.get('house_number', ''),
-                customer.get('street', ''),
-                customer.get('subdistrict', ''),
-                customer.get('district', ''),
-                customer.get('province', '')
-            ]
-            address = ' '.join(filter(None, address_parts))
-            self.customer_table.setItem(row, 5, QTableWidgetItem(address))
-    
+        fuzzy = self.fuzzy_check.isChecked()
+        db = self.db
+
+        def fetch_page(offset, limit):
+            return db.search_customers(search_term, limit=limit, offset=offset, fuzzy=fuzzy)
+
+        return lambda: (fetch_page, fetch_page(0, PAGE_SIZE))
+
+    def show_search_error(self, message: str):
+        QMessageBox.warning(self, "แจ้งเตือน", f"ไม่สามารถค้นหาลูกค้า: {message}")
+
+    def display_customers(self, result):
+        """แสดงข้อมูลลูกค้าในตาราง (หน้าถัดไปดึงเมื่อเลื่อนถึงท้ายตาราง)"""
+        fetch_page, first_page = result
+        self.customer_model.set_source(fetch_page, first_page)
+
+    def current_customer(self) -> Optional[Dict]:
+        """ข้อมูลของแถวที่เลือกอยู่"""
+        index = self.customer_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.customer_model.row_data(index.row())
+
     def select_customer(self):
         """เลือกลูกค้า"""
-        current_row = self.customer_table.currentRow()
-        if current_row >= 0:
-            # ดึงข้อมูลลูกค้าที่เลือกโดยใช้ชื่อและนามสกุล
-            first_name = self.customer_table.item(current_row, 1).text()
-            last_name = self.customer_table.item(current_row, 2).text()
-            customer_name = f"{first_name} {last_name}".strip()
-            
-            # ค้นหาลูกค้าด้วยชื่อ
-            customers = self.db.search_customers(customer_name)
-            
-            if customers:
-                # หาลูกค้าที่ตรงกับชื่อและนามสกุลที่เลือก
-                for customer in customers:
-                    if (customer.get('first_name', '') == first_name and 
-                        customer.get('last_name', '') == last_name):
-                        self.selected_customer = customer
-                        self.accept()
-                        return
-                
-                # ถ้าไม่เจอที่ตรงกัน ให้ใช้ลูกค้าคนแรกที่เจอ
-                self.selected_customer = customers[0]
-                self.accept()
-            else:
-                QMessageBox.warning(self, "แจ้งเตือน", "ไม่พบข้อมูลลูกค้า")
-        else:
+        customer = self.current_customer()
+        if customer is None:
             QMessageBox.warning(self, "แจ้งเตือน", "กรุณาเลือกลูกค้า")
-    
+            return
+
+        # อ่านข้อมูลล่าสุดด้วย id (ชื่อซ้ำกันได้ จึงไม่ค้นจากชื่อ)
+        try:
+            customer = self.db.get_customer_by_id(customer['id'])
+        except Exception as e:
+            QMessageBox.warning(self, "แจ้งเตือน", f"ไม่สามารถโหลดข้อมูลลูกค้า: {str(e)}")
+            return
+        if not customer:
+            QMessageBox.warning(self, "แจ้งเตือน", "ไม่พบข้อมูลลูกค้า")
+            self.load_customers()
+            return
+        self.selected_customer = customer
+        self.accept()
+
     def add_new_customer(self):
         """เพิ่มลูกค้าใหม่"""
         from dialogs import CustomerDialog
         dialog = CustomerDialog(self)
         if dialog.exec():
-            # โหลดข้อมูลลูกค้าใหม่
-            self.load_customers()
             # เลือกลูกค้าที่เพิ่งเพิ่ม
             if dialog.customer_data:
                 self.selected_customer = dialog.customer_data
                 self.accept()
+            else:
+                # โหลดข้อมูลลูกค้าใหม่
+                self.load_customers()
@@ -8,15 +8,108 @@ from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QLineEdit,
     QPushButton, QComboBox, QTextEdit, QMessageBox, QDateEdit, QSpinBox,
     QDoubleSpinBox, QGroupBox, QTabWidget, QWidget, QScrollArea, QTableWidget,
-    QTableWidgetItem, QHeaderView, QSplitter, QInputDialog
+    QTableWidgetItem, QHeaderView, QSplitter, QInputDialog, QCheckBox, QTableView
 )
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QIcon
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
-from database import PawnShopDatabase
+from database import PawnShopDatabase, PRODUCT_TYPES
+from background_loader import DatabaseChangeWatcher, TabLoader
+from contract_snapshot import ContractSnapshot
+from paged_table import PagedTableModel, RowActionDelegate
 from utils import PawnShopUtils
 
+
+def format_date(value) -> str:
+    """YYYY-MM-DD (หรือ ISO datetime) -> dd/mm/YYYY ถ้าแปลงไม่ได้คืนค่าเดิม"""
+    if not value:
+        return ''
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).strftime('%d/%m/%Y')
+    except ValueError:
+        return str(value)
+
+
+def format_money(value) -> str:
+    return "{:,.2f}".format(value or 0)
+
+
+def customer_name(row: Dict) -> str:
+    return "{} {}".format(row.get('first_name') or '', row.get('last_name') or '')
+
+
+def customer_address(row: Dict) -> str:
+    parts = [row.get(key) for key in ('house_number', 'street', 'subdistrict', 'district', 'province')]
+    return ' '.join(filter(None, parts))
+
+
+def status_text(row: Dict) -> str:
+    status = row.get('status') or ''
+    return {'active': "เปิด", 'redeemed': "ไถ่คืน", 'forfeited': "หลุด"}.get(status, status)
+
+
+# คอลัมน์ของแต่ละตาราง (หัวคอลัมน์, คีย์หรือฟังก์ชัน, None = ปุ่ม)
+CUSTOMER_COLUMNS = [
+    ("รหัสลูกค้า", 'customer_code'),
+    ("ชื่อ", 'first_name'),
+    ("นามสกุล", 'last_name'),
+    ("เลขบัตรประชาชน", 'id_card'),
+    ("เบอร์โทรศัพท์", 'phone'),
+    ("ที่อยู่", customer_address),
+    ("รายละเอียด", 'other_details'),
+    ("แก้ไข", None),
+    ("ลบ", None),
+]
+
+PRODUCT_COLUMNS = [
+    ("ชื่อสินค้า", 'name'),
+    ("ยี่ห้อ", 'brand'),
+    ("IMEI 1", 'imei1'),
+    ("IMEI 2", 'imei2'),
+    ("Serial Number", 'serial_number'),
+    ("สภาพเครื่อง", 'condition'),
+    ("อุปกรณ์ที่มาพร้อม", 'accessories'),
+    ("วันที่สร้าง", lambda row: format_date(row.get('created_at'))),
+    ("การดำเนินการ", None),
+]
+
+CONTRACT_COLUMNS = [
+    ("เลขที่สัญญา", 'contract_number'),
+    ("ชื่อลูกค้า", customer_name),
+    ("ชื่อสินค้า", 'product_name'),
+    ("ยอดฝาก", lambda row: format_money(row.get('pawn_amount'))),
+    ("วันที่เริ่มต้น", lambda row: format_date(row.get('start_date'))),
+    ("วันที่สิ้นสุด", lambda row: format_date(row.get('end_date'))),
+    ("สถานะ", status_text),
+    ("ยอดไถ่คืน", lambda row: format_money(row.get('total_redemption'))),
+    ("วันที่สร้าง", lambda row: format_date(row.get('created_at'))),
+    ("การดำเนินการ", None),
+]
+
+FORFEITED_COLUMNS = [
+    ("เลขที่สัญญา", 'contract_number'),
+    ("ชื่อลูกค้า", customer_name),
+    ("เบอร์โทรศัพท์", 'phone'),
+    ("ชื่อสินค้า", 'product_name'),
+    ("ยี่ห้อ", 'brand'),
+    ("ยอดฝาก", lambda row: format_money(row.get('pawn_amount'))),
+    ("วันที่ครบกำหนด", lambda row: format_date(row.get('end_date'))),
+    # วันที่ระบบทำเครื่องหมาย ถ้าไม่มีใช้วันที่ครบกำหนด
+    ("วันที่หลุด", lambda row: format_date(row.get('forfeited_at') or row.get('end_date'))),
+    ("การดำเนินการ", None),
+]
+
+# คอลัมน์ที่คลิกหัวตารางเพื่อเรียงได้ -> คอลัมน์ของ ContractSnapshot
+CONTRACT_SORT_KEYS = {
+    0: 'contract_number', 1: 'first_name', 2: 'product_name', 3: 'pawn_amount', 4: 'start_date',
+    5: 'end_date', 6: 'status', 7: 'total_redemption', 8: 'created_at',
+}
+FORFEITED_SORT_KEYS = {
+    0: 'contract_number', 1: 'first_name', 2: 'phone', 3: 'product_name', 4: 'brand',
+    5: 'pawn_amount', 6: 'end_date', 7: 'forfeited_date',
+}
+
 class DataViewerDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -25,9 +118,67 @@ class DataViewerDialog(QDialog):
             self.db = parent.db
         else:
             self.db = PawnShopDatabase()
+        # งานที่ทำเฉพาะเมื่อจำเป็น (ทำในเธรดของแท็บนั้นตอนโหลดครั้งถัดไป)
+        self.forfeited_sweep_due = True
+        self.forfeited_filtered = False
+        self.cube_refresh_due = True
+        # แท็บสัญญาและรายการหลุดกรอง/เรียงบนสำเนาในหน่วยความจำ (โหลดใหม่เฉพาะสัญญาที่เปลี่ยน)
+        self.contract_snapshot = ContractSnapshot(self.db)
+        self.contract_sort = ('created_at', True)
+        self.forfeited_sort = ('end_date', True)
+        
         self.setup_ui()
+        self.create_tab_loaders()
+        
+        # โหลดแท็บใหม่เมื่อข้อมูลที่แท็บใช้ถูกแก้ไข (จากหน้าจอนี้ หน้าจออื่น หรือเครื่องอื่น)
+        self.change_watcher = DatabaseChangeWatcher(self.db, parent=self)
+        self.change_watcher.tables_changed.connect(self.on_tables_changed)
+        self.finished.connect(self.stop_loading)
+        
         self.load_data()
     
+    def create_table_view(self, model: PagedTableModel, actions: Dict[int, tuple]) -> QTableView:
+        """สร้างตารางของ model พร้อมปุ่มที่วาดด้วย delegate
+
+        actions: {คอลัมน์: (ข้อความปุ่ม, สี, ฟังก์ชันที่รับเลขแถว, ความกว้าง)}
+        """
+        view = QTableView()
+        view.setModel(model)
+        view.setMouseTracking(True)  # ให้ปุ่มเปลี่ยนสีเมื่อเมาส์ชี้
+        view.setSelectionBehavior(QTableView.SelectRows)
+        header = view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Stretch)
+        for column, (text, color, handler, width) in actions.items():
+            delegate = RowActionDelegate(text, color, view)
+            delegate.clicked.connect(handler)
+            view.setItemDelegateForColumn(column, delegate)
+            header.setSectionResizeMode(column, QHeaderView.Fixed)
+            view.setColumnWidth(column, width)
+        return view
+    
+    def enable_header_sort(self, view: QTableView, sort_keys: Dict[int, str], sort_attr: str, reload):
+        """คลิกหัวคอลัมน์เพื่อเรียง (คลิกซ้ำสลับมาก-น้อย) ลำดับปัจจุบันเก็บใน self.<sort_attr>"""
+        header = view.horizontalHeader()
+        header.setSortIndicatorShown(True)
+        
+        def show_indicator():
+            column, descending = getattr(self, sort_attr)
+            for section, key in sort_keys.items():
+                if key == column:
+                    header.setSortIndicator(section, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+        
+        def on_clicked(section):
+            key = sort_keys.get(section)
+            if key is not None:
+                column, descending = getattr(self, sort_attr)
+                setattr(self, sort_attr, (key, not descending if key == column else False))
+                reload()
+            # คอลัมน์ปุ่มเรียงไม่ได้: คงลูกศรไว้ที่คอลัมน์เดิม
+            show_indicator()
+        
+        show_indicator()
+        header.sectionClicked.connect(on_clicked)
+    
     def verify_delete_password(self):
         """ขอรหัสผ่านก่อนอนุญาตให้ลบข้อมูล"""
         password, ok = QInputDialog.getText(
@@ -88,6 +239,13 @@ class DataViewerDialog(QDialog):
         summary_tab = self.create_summary_tab()
         tab_widget.addTab(summary_tab, "รายงานสรุป")
         
+        # Tab 6: วิเคราะห์
+        analytics_tab = self.create_analytics_tab()
+        tab_widget.addTab(analytics_tab, "วิเคราะห์")
+        
+        # โหลดข้อมูลของแท็บเมื่อเปิดดูครั้งแรก
+        self.tab_widget = tab_widget
+        tab_widget.currentChanged.connect(self.load_current_tab)
         layout.addWidget(tab_widget)
         
         # ปุ่ม
@@ -116,17 +274,11 @@ class DataViewerDialog(QDialog):
         layout.addLayout(filter_layout)
         
         # ตารางลูกค้า
-        self.customer_table = QTableWidget()
-        self.customer_table.setColumnCount(9)  # เพิ่มคอลัมน์สำหรับปุ่มแก้ไขและลบ
-        self.customer_table.setHorizontalHeaderLabels([
-            "รหัสลูกค้า", "ชื่อ", "นามสกุล", "เลขบัตรประชาชน", 
-            "เบอร์โทรศัพท์", "ที่อยู่", "รายละเอียด", "แก้ไข", "ลบ"
-        ])
-        self.customer_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.customer_table.horizontalHeader().setSectionResizeMode(7, QHeaderView.Fixed)
-        self.customer_table.horizontalHeader().setSectionResizeMode(8, QHeaderView.Fixed)
-        self.customer_table.setColumnWidth(7, 80)
-        self.customer_table.setColumnWidth(8, 80)
+        self.customer_model = PagedTableModel(CUSTOMER_COLUMNS, parent=self)
+        self.customer_table = self.create_table_view(self.customer_model, {
+            7: ("แก้ไข", "#28a745", self.edit_customer, 80),
+            8: ("ลบ", "#ff6b6b", self.delete_customer, 80),
+        })
         layout.addWidget(self.customer_table)
         
         return widget
@@ -146,15 +298,10 @@ class DataViewerDialog(QDialog):
         layout.addLayout(filter_layout)
         
         # ตารางสินค้า
-        self.product_table = QTableWidget()
-        self.product_table.setColumnCount(9)  # เพิ่มคอลัมน์สำหรับปุ่มลบ
-        self.product_table.setHorizontalHeaderLabels([
-            "ชื่อสินค้า", "ยี่ห้อ", "IMEI 1", "IMEI 2", "Serial Number", 
-            "สภาพเครื่อง", "อุปกรณ์ที่มาพร้อม", "วันที่สร้าง", "การดำเนินการ"
-        ])
-        self.product_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.product_table.horizontalHeader().setSectionResizeMode(7, QHeaderView.Fixed)
-        self.product_table.setColumnWidth(7, 100)
+        self.product_model = PagedTableModel(PRODUCT_COLUMNS, parent=self)
+        self.product_table = self.create_table_view(self.product_model, {
+            8: ("ลบ", "#ff6b6b", self.delete_product, 100),
+        })
         layout.addWidget(self.product_table)
         
         return widget
@@ -168,28 +315,60 @@ class DataViewerDialog(QDialog):
         filter_layout = QHBoxLayout()
         filter_layout.addWidget(QLabel("ค้นหา:"))
         self.contract_search_edit = QLineEdit()
-        self.contract_search_edit.setPlaceholderText("เลขที่สัญญา, ชื่อลูกค้า")
+        self.contract_search_edit.setPlaceholderText("เลขที่สัญญา, ชื่อลูกค้า, เลขบัตร, โทรศัพท์, ชื่อสินค้า, IMEI")
         self.contract_search_edit.textChanged.connect(self.filter_contracts)
+        filter_layout.addWidget(self.contract_search_edit)
         
         filter_layout.addWidget(QLabel("สถานะ:"))
         self.status_combo = QComboBox()
-        self.status_combo.addItems(["ทั้งหมด", "active", "redeemed"])
+        self.status_combo.addItems(["ทั้งหมด", "active", "redeemed", "forfeited"])
         self.status_combo.currentTextChanged.connect(self.filter_contracts)
         filter_layout.addWidget(self.status_combo)
         
         layout.addLayout(filter_layout)
         
+        # ตัวกรองช่วงวันที่และยอดฝาก
+        range_layout = QHBoxLayout()
+        self.contract_date_filter_check = QCheckBox("วันที่เริ่มต้น:")
+        self.contract_date_filter_check.toggled.connect(self.filter_contracts)
+        range_layout.addWidget(self.contract_date_filter_check)
+        
+        self.contract_date_from = QDateEdit()
+        self.contract_date_from.setDate(QDate.currentDate().addDays(-30))
+        self.contract_date_from.setCalendarPopup(True)
+        self.contract_date_from.dateChanged.connect(self.filter_contracts)
+        range_layout.addWidget(self.contract_date_from)
+        
+        range_layout.addWidget(QLabel("ถึง:"))
+        self.contract_date_to = QDateEdit()
+        self.contract_date_to.setDate(QDate.currentDate())
+        self.contract_date_to.setCalendarPopup(True)
+        self.contract_date_to.dateChanged.connect(self.filter_contracts)
+        range_layout.addWidget(self.contract_date_to)
+        
+        range_layout.addWidget(QLabel("ยอดฝาก:"))
+        self.contract_min_amount = QDoubleSpinBox()
+        self.contract_min_amount.setRange(0, 10000000)
+        self.contract_min_amount.setSpecialValueText("ไม่จำกัด")
+        self.contract_min_amount.valueChanged.connect(self.filter_contracts)
+        range_layout.addWidget(self.contract_min_amount)
+        
+        range_layout.addWidget(QLabel("ถึง:"))
+        self.contract_max_amount = QDoubleSpinBox()
+        self.contract_max_amount.setRange(0, 10000000)
+        self.contract_max_amount.setSpecialValueText("ไม่จำกัด")
+        self.contract_max_amount.valueChanged.connect(self.filter_contracts)
+        range_layout.addWidget(self.contract_max_amount)
+        range_layout.addStretch()
+        
+        layout.addLayout(range_layout)
+        
         # ตารางสัญญา
-        self.contract_table = QTableWidget()
-        self.contract_table.setColumnCount(10)  # เพิ่มคอลัมน์สำหรับปุ่มลบ
-        self.contract_table.setHorizontalHeaderLabels([
-            "เลขที่สัญญา", "ชื่อลูกค้า", "ชื่อสินค้า", "ยอดฝาก", 
-            "วันที่เริ่มต้น", "วันที่สิ้นสุด", 
-            "สถานะ", "ยอดไถ่คืน", "วันที่สร้าง", "การดำเนินการ"
-        ])
-        self.contract_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.contract_table.horizontalHeader().setSectionResizeMode(9, QHeaderView.Fixed)
-        self.contract_table.setColumnWidth(9, 100)
+        self.contract_model = PagedTableModel(CONTRACT_COLUMNS, parent=self)
+        self.contract_table = self.create_table_view(self.contract_model, {
+            9: ("ลบ", "#ff6b6b", self.delete_contract, 100),
+        })
+        self.enable_header_sort(self.contract_table, CONTRACT_SORT_KEYS, 'contract_sort', self.filter_contracts)
         layout.addWidget(self.contract_table)
         
         return widget
@@ -225,15 +404,12 @@ class DataViewerDialog(QDialog):
         layout.addLayout(filter_layout)
         
         # ตารางรายการหลุด
-        self.forfeited_table = QTableWidget()
-        self.forfeited_table.setColumnCount(9)
-        self.forfeited_table.setHorizontalHeaderLabels([
-            "เลขที่สัญญา", "ชื่อลูกค้า", "เบอร์โทรศัพท์", "ชื่อสินค้า", "ยี่ห้อ", 
-            "ยอดฝาก", "วันที่ครบกำหนด", "วันที่หลุด", "การดำเนินการ"
-        ])
-        self.forfeited_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.forfeited_table.horizontalHeader().setSectionResizeMode(8, QHeaderView.Fixed)
-        self.forfeited_table.setColumnWidth(8, 100)
+        self.forfeited_model = PagedTableModel(FORFEITED_COLUMNS, parent=self)
+        self.forfeited_table = self.create_table_view(self.forfeited_model, {
+            8: ("ดูรายละเอียด", "#007bff", self.view_forfeited_details, 100),
+        })
+        self.enable_header_sort(self.forfeited_table, FORFEITED_SORT_KEYS, 'forfeited_sort',
+                                self.forfeited_loader_request)
         layout.addWidget(self.forfeited_table)
         
         return widget
@@ -288,20 +464,21 @@ class DataViewerDialog(QDialog):
         daily_group = QGroupBox("รายงานประจำวัน")
         daily_layout = QGridLayout(daily_group)
         
-        today = datetime.now().strftime('%Y-%m-%d')
-        daily_summary = self.db.get_daily_summary(today)
-        
         daily_layout.addWidget(QLabel("วันที่:"), 0, 0)
-        daily_layout.addWidget(QLabel(today), 0, 1)
+        self.daily_date_label = QLabel("-")
+        daily_layout.addWidget(self.daily_date_label, 0, 1)
         
         daily_layout.addWidget(QLabel("สัญญาใหม่:"), 1, 0)
-        daily_layout.addWidget(QLabel("{} สัญญา".format(daily_summary['new_contracts_count'])), 1, 1)
+        self.daily_new_contracts_label = QLabel("-")
+        daily_layout.addWidget(self.daily_new_contracts_label, 1, 1)
         
         daily_layout.addWidget(QLabel("การไถ่คืน:"), 2, 0)
-        daily_layout.addWidget(QLabel("{} สัญญา".format(daily_summary['redemptions_count'])), 2, 1)
+        self.daily_redemptions_label = QLabel("-")
+        daily_layout.addWidget(self.daily_redemptions_label, 2, 1)
         
         daily_layout.addWidget(QLabel("การชำระดอกเบี้ย:"), 3, 0)
-        daily_layout.addWidget(QLabel("{} ครั้ง".format(daily_summary['interest_payments_count'])), 3, 1)
+        self.daily_interest_payments_label = QLabel("-")
+        daily_layout.addWidget(self.daily_interest_payments_label, 3, 1)
         
         layout.addWidget(daily_group)
         
@@ -321,321 +498,237 @@ class DataViewerDialog(QDialog):
         
         return widget
     
+    # มิติของ contract_cube: ชื่อที่แสดง -> ชื่อคอลัมน์
+    ANALYTICS_DIMENSIONS = [
+        ("เดือน", 'month'),
+        ("สถานะ", 'status'),
+        ("ยี่ห้อ", 'brand'),
+        ("ประเภทสินค้า", 'product_type'),
+    ]
+    
+    def create_analytics_tab(self):
+        """สร้าง Tab วิเคราะห์ (ตัดมุมมองจาก contract_cube)"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        # มิติที่ใช้จัดกลุ่ม
+        group_layout = QHBoxLayout()
+        group_layout.addWidget(QLabel("จัดกลุ่มตาม:"))
+        self.analytics_group_combo = QComboBox()
+        for text, key in self.ANALYTICS_DIMENSIONS:
+            self.analytics_group_combo.addItem(text, key)
+        self.analytics_group_combo.currentIndexChanged.connect(self.filter_analytics)
+        group_layout.addWidget(self.analytics_group_combo)
+        
+        group_layout.addWidget(QLabel("และ:"))
+        self.analytics_group2_combo = QComboBox()
+        self.analytics_group2_combo.addItem("-", None)
+        for text, key in self.ANALYTICS_DIMENSIONS:
+            self.analytics_group2_combo.addItem(text, key)
+        self.analytics_group2_combo.currentIndexChanged.connect(self.filter_analytics)
+        group_layout.addWidget(self.analytics_group2_combo)
+        group_layout.addStretch()
+        layout.addLayout(group_layout)
+        
+        # ตัวกรอง
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("ตั้งแต่เดือน:"))
+        self.analytics_month_from = QDateEdit()
+        self.analytics_month_from.setDisplayFormat("MM/yyyy")
+        self.analytics_month_from.setDate(QDate.currentDate().addMonths(-11))
+        self.analytics_month_from.dateChanged.connect(self.filter_analytics)
+        filter_layout.addWidget(self.analytics_month_from)
+        
+        filter_layout.addWidget(QLabel("ถึง:"))
+        self.analytics_month_to = QDateEdit()
+        self.analytics_month_to.setDisplayFormat("MM/yyyy")
+        self.analytics_month_to.setDate(QDate.currentDate())
+        self.analytics_month_to.dateChanged.connect(self.filter_analytics)
+        filter_layout.addWidget(self.analytics_month_to)
+        
+        filter_layout.addWidget(QLabel("สถานะ:"))
+        self.analytics_status_combo = QComboBox()
+        self.analytics_status_combo.addItems(["ทั้งหมด", "active", "redeemed", "forfeited"])
+        self.analytics_status_combo.currentIndexChanged.connect(self.filter_analytics)
+        filter_layout.addWidget(self.analytics_status_combo)
+        
+        filter_layout.addWidget(QLabel("ประเภทสินค้า:"))
+        self.analytics_type_combo = QComboBox()
+        self.analytics_type_combo.addItems(["ทั้งหมด"] + PRODUCT_TYPES)
+        self.analytics_type_combo.currentIndexChanged.connect(self.filter_analytics)
+        filter_layout.addWidget(self.analytics_type_combo)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+        
+        # ตารางผลลัพธ์
+        self.analytics_table = QTableWidget()
+        self.analytics_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.analytics_table.setSortingEnabled(True)
+        layout.addWidget(self.analytics_table)
+        
+        return widget
+    
+    # ---------- การโหลดข้อมูลแต่ละแท็บ ----------
+    
+    def create_tab_loaders(self):
+        """ตัวโหลดของแต่ละแท็บ (ลำดับเดียวกับแท็บ) พร้อมตารางที่ข้อมูลของแท็บขึ้นอยู่ด้วย"""
+        contract_tables = ('contracts', 'customers', 'products')
+        self.customer_loader = self.create_tab_loader(
+            self.prepare_customers, self.customer_model, "ไม่สามารถโหลดข้อมูลลูกค้า", ('customers',))
+        self.product_loader = self.create_tab_loader(
+            self.prepare_products, self.product_model, "ไม่สามารถโหลดข้อมูลสินค้า", ('products',))
+        self.contract_loader = self.create_tab_loader(
+            self.prepare_contracts, self.contract_model, "ไม่สามารถโหลดข้อมูลสัญญา", contract_tables)
+        self.forfeited_loader = self.create_tab_loader(
+            self.prepare_forfeited, self.forfeited_model, "ไม่สามารถโหลดข้อมูลรายการหลุด", contract_tables)
+        self.summary_loader = self.create_tab_loader(
+            self.prepare_summary, self.show_summary, "ไม่สามารถโหลดข้อมูลสรุป",
+            contract_tables + ('renewals', 'redemptions'))
+        self.analytics_loader = self.create_tab_loader(
+            self.prepare_analytics, self.show_analytics, "ไม่สามารถโหลดข้อมูลวิเคราะห์",
+            ('contracts', 'products', 'redemptions'))
+        self.tab_loaders = [
+            self.customer_loader, self.product_loader, self.contract_loader,
+            self.forfeited_loader, self.summary_loader, self.analytics_loader,
+        ]
+    
+    def create_tab_loader(self, prepare, apply, error_text: str, tables) -> TabLoader:
+        """apply เป็นฟังก์ชันแสดงผล หรือ PagedTableModel (ผลลัพธ์คือ (fetch_page, หน้าแรก))"""
+        if isinstance(apply, PagedTableModel):
+            model = apply
+            apply = lambda result: model.set_source(*result)
+        on_error = lambda message: QMessageBox.warning(self, "แจ้งเตือน", "{}: {}".format(error_text, message))
+        return TabLoader(prepare, apply, on_error, tables, self)
+    
     def load_data(self):
-        """โหลดข้อมูลทั้งหมด"""
-        self.load_customers()
-        self.load_products()
-        self.load_contracts()
-        self.load_forfeited_contracts()
-        self.load_summary()
-        self.load_expiring_contracts()
+        """ให้ทุกแท็บโหลดใหม่ โหลดทันทีเฉพาะแท็บที่เปิดอยู่ แท็บอื่นโหลดเมื่อเปิดดู"""
+        self.forfeited_sweep_due = True
+        self.cube_refresh_due = True
+        for loader in self.tab_loaders:
+            loader.stale = True
+        self.load_current_tab()
     
-    def load_customers(self):
-        """โหลดข้อมูลลูกค้า"""
-        try:
-            customers = self.db.search_customers("")  # ดึงทั้งหมด
-            self.customer_table.setRowCount(len(customers))
-            
-            for row, customer in enumerate(customers):
-                self.customer_table.setItem(row, 0, QTableWidgetItem(customer.get('customer_code', '')))
-                self.customer_table.setItem(row, 1, QTableWidgetItem(customer.get('first_name', '')))
-                self.customer_table.setItem(row, 2, QTableWidgetItem(customer.get('last_name', '')))
-                self.customer_table.setItem(row, 3, QTableWidgetItem(customer.get('id_card', '')))
-                self.customer_table.setItem(row, 4, QTableWidgetItem(customer.get('phone', '')))
-                
-                # ที่อยู่
-                address_parts = [
-                    customer.get('house_number', ''),
-                    customer.get('street', ''),
-                    customer.get('subdistrict', ''),
-                    customer.get('district', ''),
-                    customer.get('province', '')
-                ]
-                address = ' '.join(filter(None, address_parts))
-                self.customer_table.setItem(row, 5, QTableWidgetItem(address))
-                
-                self.customer_table.setItem(row, 6, QTableWidgetItem(customer.get('other_details', '')))
-                
-                # เพิ่มปุ่มแก้ไข
-                edit_button = QPushButton("แก้ไข")
-                edit_button.setStyleSheet("QPushButton { background-color: #28a745; color: white; border: none; padding: 5px; }")
-                edit_button.clicked.connect(lambda checked, row=row: self.edit_customer(row))
-                self.customer_table.setCellWidget(row, 7, edit_button)
-                
-                # เพิ่มปุ่มลบ
-                delete_button = QPushButton("ลบ")
-                delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                delete_button.clicked.connect(lambda checked, row=row: self.delete_customer(row))
-                self.customer_table.setCellWidget(row, 8, delete_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลลูกค้า: {}".format(str(e)))
+    def load_current_tab(self, *_args):
+        """โหลดแท็บที่เปิดอยู่ในเธรดแยก ถ้ายังไม่เคยโหลดหรือข้อมูลเปลี่ยน"""
+        loader = self.tab_loaders[self.tab_widget.currentIndex()]
+        if loader.stale:
+            loader.request()
     
-    def load_products(self):
-        """โหลดข้อมูลสินค้า"""
-        try:
-            # ดึงข้อมูลสินค้าทั้งหมด
-            conn = self.db.db_path
-            import sqlite3
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM products ORDER BY created_at DESC')
-            products = cursor.fetchall()
-            conn.close()
-            
-            if products:
-                columns = [description[0] for description in cursor.description]
-                self.product_table.setRowCount(len(products))
-                
-                for row, product_data in enumerate(products):
-                    product = dict(zip(columns, product_data))
-                    self.product_table.setItem(row, 0, QTableWidgetItem(product.get('name', '')))
-                    self.product_table.setItem(row, 1, QTableWidgetItem(product.get('brand', '')))
-                    self.product_table.setItem(row, 2, QTableWidgetItem(product.get('imei1', '')))
-                    self.product_table.setItem(row, 3, QTableWidgetItem(product.get('imei2', '')))
-                    self.product_table.setItem(row, 4, QTableWidgetItem(product.get('serial_number', '')))
-                    self.product_table.setItem(row, 5, QTableWidgetItem(product.get('condition', '')))
-                    
-                    # วันที่สร้าง
-                    created_at = product.get('created_at', '')
-                    if created_at:
-                        try:
-                            date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            date_str = date_obj.strftime('%d/%m/%Y')
-                        except:
-                            date_str = created_at
-                    else:
-                        date_str = ''
-                    self.product_table.setItem(row, 6, QTableWidgetItem(product.get('accessories', '')))
-                    self.product_table.setItem(row, 7, QTableWidgetItem(date_str))
-                    
-                    # เพิ่มปุ่มลบ
-                    delete_button = QPushButton("ลบ")
-                    delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                    delete_button.clicked.connect(lambda checked, row=row: self.delete_product(row))
-                    self.product_table.setCellWidget(row, 8, delete_button)
-                    
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลสินค้า: {}".format(str(e)))
+    def on_tables_changed(self, tables: List[str]):
+        """ฐานข้อมูลเปลี่ยน: แท็บที่ใช้ตารางเหล่านี้ต้องโหลดใหม่ (แท็บที่เปิดอยู่โหลดทันที)"""
+        changed = set(tables)
+        for loader in self.tab_loaders:
+            if loader.tables & changed:
+                loader.stale = True
+        if self.analytics_loader.tables & changed:
+            self.cube_refresh_due = True
+        self.load_current_tab()
     
-    def load_contracts(self):
-        """โหลดข้อมูลสัญญา"""
-        try:
-            contracts = self.db.search_contracts("", "all")
-            self.contract_table.setRowCount(len(contracts))
-            
-            for row, contract in enumerate(contracts):
-                self.contract_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
-                
-                customer_name = "{} {}".format(contract.get('first_name', ''), contract.get('last_name', ''))
-                self.contract_table.setItem(row, 1, QTableWidgetItem(customer_name))
-                
-                self.contract_table.setItem(row, 2, QTableWidgetItem(contract.get('product_name', '')))
-                self.contract_table.setItem(row, 3, QTableWidgetItem("{:,.2f}".format(contract.get('pawn_amount', 0))))
-                
-                # วันที่เริ่มต้น
-                start_date = contract.get('start_date', '')
-                if start_date:
-                    try:
-                        date_obj = datetime.fromisoformat(start_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = start_date
-                else:
-                    date_str = ''
-                self.contract_table.setItem(row, 4, QTableWidgetItem(date_str))
-                
-                # วันที่สิ้นสุด
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        date_obj = datetime.fromisoformat(end_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = end_date
-                else:
-                    date_str = ''
-                self.contract_table.setItem(row, 5, QTableWidgetItem(date_str))
-                
-                # สถานะ
-                status = contract.get('status', '')
-                status_text = "เปิด" if status == 'active' else "ไถ่คืน" if status == 'redeemed' else status
-                self.contract_table.setItem(row, 6, QTableWidgetItem(status_text))
-                
-                self.contract_table.setItem(row, 7, QTableWidgetItem("{:,.2f}".format(contract.get('total_redemption', 0))))
-                
-                # วันที่สร้าง
-                created_at = contract.get('created_at', '')
-                if created_at:
-                    try:
-                        date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = created_at
-                else:
-                    date_str = ''
-                self.contract_table.setItem(row, 8, QTableWidgetItem(date_str))
-                
-                # เพิ่มปุ่มลบ
-                delete_button = QPushButton("ลบ")
-                delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                delete_button.clicked.connect(lambda checked, row=row: self.delete_contract(row))
-                self.contract_table.setCellWidget(row, 9, delete_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลสัญญา: {}".format(str(e)))
+    def stop_loading(self):
+        """หยุดเฝ้าดูฐานข้อมูลและรองานที่ค้างอยู่ (เมื่อปิดหน้าต่าง)"""
+        self.change_watcher.stop()
+        for loader in self.tab_loaders:
+            loader.wait()
+        self.contract_snapshot.close()
     
-    def load_forfeited_contracts(self):
-        """โหลดข้อมูลสินค้าที่หลุดจำนำ"""
-        try:
-            forfeited_contracts = self.db.get_forfeited_contracts()
-            self.forfeited_table.setRowCount(len(forfeited_contracts))
-            
-            for row, contract in enumerate(forfeited_contracts):
-                self.forfeited_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
-                
-                customer_name = "{} {}".format(contract.get('first_name', ''), contract.get('last_name', ''))
-                self.forfeited_table.setItem(row, 1, QTableWidgetItem(customer_name))
-                
-                self.forfeited_table.setItem(row, 2, QTableWidgetItem(contract.get('phone', '')))
-                self.forfeited_table.setItem(row, 3, QTableWidgetItem(contract.get('product_name', '')))
-                self.forfeited_table.setItem(row, 4, QTableWidgetItem(contract.get('product_brand', '')))
-                self.forfeited_table.setItem(row, 5, QTableWidgetItem("{:,.2f}".format(contract.get('pawn_amount', 0))))
-                
-                # วันที่ครบกำหนด
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        date_obj = datetime.fromisoformat(end_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = end_date
-                else:
-                    date_str = ''
-                self.forfeited_table.setItem(row, 6, QTableWidgetItem(date_str))
-                
-                # วันที่หลุด (วันที่ครบกำหนด)
-                forfeited_date = end_date
-                if forfeited_date:
-                    try:
-                        date_obj = datetime.fromisoformat(forfeited_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = forfeited_date
-                else:
-                    date_str = ''
-                self.forfeited_table.setItem(row, 7, QTableWidgetItem(date_str))
-                
-                # เพิ่มปุ่มดูรายละเอียด
-                view_button = QPushButton("ดูรายละเอียด")
-                view_button.setStyleSheet("QPushButton { background-color: #007bff; color: white; border: none; padding: 5px; }")
-                view_button.clicked.connect(lambda checked, row=row: self.view_forfeited_details(row))
-                self.forfeited_table.setCellWidget(row, 8, view_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลรายการหลุด: {}".format(str(e)))
+    @staticmethod
+    def page_source(model: PagedTableModel, fetch_page):
+        """งานเบื้องหลังของตารางแบบแบ่งหน้า: ดึงหน้าแรก คืน (fetch_page, หน้าแรก)"""
+        page_size = model.page_size
+        return lambda: (fetch_page, fetch_page(0, page_size))
+    
+    def prepare_customers(self):
+        search_term = self.customer_search_edit.text().strip()
+        return self.page_source(
+            self.customer_model, lambda offset, limit: self.db.search_customers(search_term, limit, offset))
+    
+    def prepare_products(self):
+        search_term = self.product_search_edit.text().strip()
+        return self.page_source(
+            self.product_model, lambda offset, limit: self.db.search_products(search_term, limit, offset))
+    
+    def prepare_contracts(self):
+        criteria = self.get_contract_filter_criteria()
+        order, descending = self.contract_sort
+        page_size = self.contract_model.page_size
+        
+        def query():
+            _, fetch_page = self.contract_snapshot.select(criteria, order, descending)
+            return fetch_page, fetch_page(0, page_size)
+        return query
+    
+    def prepare_forfeited(self):
+        """รายการหลุดทั้งหมด หรือตามตัวกรองเมื่อผู้ใช้เริ่มกรอง (เริ่มต้น: ครบกำหนดล่าสุดก่อน)"""
+        criteria = {'status': 'forfeited'}
+        if self.forfeited_filtered:
+            criteria.update({
+                'text': self.forfeited_search_edit.text().strip(),
+                'end_date_from': self.forfeited_date_from.date().toString('yyyy-MM-dd'),
+                'end_date_to': self.forfeited_date_to.date().toString('yyyy-MM-dd'),
+            })
+        sweep, self.forfeited_sweep_due = self.forfeited_sweep_due, False
+        order, descending = self.forfeited_sort
+        page_size = self.forfeited_model.page_size
+        
+        def query():
+            # ทำเครื่องหมายสัญญาที่เพิ่งเลยกำหนดก่อน (snapshot เห็นสถานะใหม่จาก change_log)
+            if sweep:
+                self.db.sweep_forfeited_contracts()
+            _, fetch_page = self.contract_snapshot.select(criteria, order, descending)
+            return fetch_page, fetch_page(0, page_size)
+        return query
+    
+    def filter_customers(self):
+        """กรองข้อมูลลูกค้า"""
+        self.customer_loader.request()
+    
+    def filter_products(self):
+        """กรองข้อมูลสินค้า"""
+        self.product_loader.request()
+    
+    def filter_contracts(self, *_args):
+        """กรองข้อมูลสัญญา"""
+        self.contract_loader.request()
     
     def filter_forfeited_contracts(self):
         """กรองข้อมูลรายการหลุด"""
-        search_term = self.forfeited_search_edit.text().strip()
-        date_from = self.forfeited_date_from.date().toString('yyyy-MM-dd')
-        date_to = self.forfeited_date_to.date().toString('yyyy-MM-dd')
-        
-        try:
-            # ดึงข้อมูลรายการหลุดทั้งหมดก่อน
-            forfeited_contracts = self.db.get_forfeited_contracts()
-            filtered_contracts = []
-            
-            for contract in forfeited_contracts:
-                # กรองตามคำค้นหา
-                if search_term:
-                    search_fields = [
-                        contract.get('contract_number', ''),
-                        contract.get('first_name', ''),
-                        contract.get('last_name', ''),
-                        contract.get('product_name', ''),
-                        contract.get('product_brand', '')
-                    ]
-                    if not any(search_term.lower() in field.lower() for field in search_fields):
-                        continue
-                
-                # กรองตามวันที่
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        contract_date = datetime.fromisoformat(end_date).strftime('%Y-%m-%d')
-                        if contract_date < date_from or contract_date > date_to:
-                            continue
-                    except:
-                        continue
-                
-                filtered_contracts.append(contract)
-            
-            # แสดงผลในตาราง
-            self.forfeited_table.setRowCount(len(filtered_contracts))
-            
-            for row, contract in enumerate(filtered_contracts):
-                self.forfeited_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
-                
-                customer_name = "{} {}".format(contract.get('first_name', ''), contract.get('last_name', ''))
-                self.forfeited_table.setItem(row, 1, QTableWidgetItem(customer_name))
-                
-                self.forfeited_table.setItem(row, 2, QTableWidgetItem(contract.get('phone', '')))
-                self.forfeited_table.setItem(row, 3, QTableWidgetItem(contract.get('product_name', '')))
-                self.forfeited_table.setItem(row, 4, QTableWidgetItem(contract.get('product_brand', '')))
-                self.forfeited_table.setItem(row, 5, QTableWidgetItem("{:,.2f}".format(contract.get('pawn_amount', 0))))
-                
-                # วันที่ครบกำหนด
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        date_obj = datetime.fromisoformat(end_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = end_date
-                else:
-                    date_str = ''
-                self.forfeited_table.setItem(row, 6, QTableWidgetItem(date_str))
-                
-                # วันที่หลุด (วันที่ครบกำหนด)
-                forfeited_date = end_date
-                if forfeited_date:
-                    try:
-                        date_obj = datetime.fromisoformat(forfeited_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = forfeited_date
-                else:
-                    date_str = ''
-                self.forfeited_table.setItem(row, 7, QTableWidgetItem(date_str))
-                
-                # เพิ่มปุ่มดูรายละเอียด
-                view_button = QPushButton("ดูรายละเอียด")
-                view_button.setStyleSheet("QPushButton { background-color: #007bff; color: white; border: none; padding: 5px; }")
-                view_button.clicked.connect(lambda checked, row=row: self.view_forfeited_details(row))
-                self.forfeited_table.setCellWidget(row, 8, view_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถกรองข้อมูลรายการหลุด: {}".format(str(e)))
+        self.forfeited_filtered = True
+        self.forfeited_loader.request()
+    
+    def forfeited_loader_request(self):
+        """โหลดรายการหลุดใหม่ (เช่นเมื่อเปลี่ยนการเรียง) โดยไม่เปิดตัวกรอง"""
+        self.forfeited_loader.request()
+    
+    def get_contract_filter_criteria(self) -> Dict:
+        """เงื่อนไขค้นหาสัญญาจากตัวกรองบนหน้าจอ"""
+        status = self.status_combo.currentText()
+        criteria = {
+            'text': self.contract_search_edit.text().strip(),
+            'status': 'all' if status == "ทั้งหมด" else status,
+        }
+        if self.contract_date_filter_check.isChecked():
+            criteria['start_date_from'] = self.contract_date_from.date().toString("yyyy-MM-dd")
+            criteria['start_date_to'] = self.contract_date_to.date().toString("yyyy-MM-dd")
+        if self.contract_min_amount.value() > 0:
+            criteria['min_amount'] = self.contract_min_amount.value()
+        if self.contract_max_amount.value() > 0:
+            criteria['max_amount'] = self.contract_max_amount.value()
+        return criteria
     
     def view_forfeited_details(self, row: int):
         """ดูรายละเอียดสินค้าที่หลุดจำนำ"""
         try:
-            contract_number = self.forfeited_table.item(row, 0).text()
-            customer_name = self.forfeited_table.item(row, 1).text()
-            product_name = self.forfeited_table.item(row, 3).text()
-            pawn_amount = self.forfeited_table.item(row, 5).text()
-            end_date = self.forfeited_table.item(row, 6).text()
+            contract = self.forfeited_model.row_data(row)
             
             # สร้างข้อความรายละเอียด
             details = f"""
 รายละเอียดสินค้าหลุดจำนำ
 
-เลขที่สัญญา: {contract_number}
-ชื่อลูกค้า: {customer_name}
-ชื่อสินค้า: {product_name}
-ยอดฝาก: {pawn_amount} บาท
-วันที่ครบกำหนด: {end_date}
+เลขที่สัญญา: {contract.get('contract_number', '')}
+ชื่อลูกค้า: {customer_name(contract)}
+ชื่อสินค้า: {contract.get('product_name', '')}
+ยอดฝาก: {format_money(contract.get('pawn_amount'))} บาท
+วันที่ครบกำหนด: {format_date(contract.get('end_date'))}
 
 หมายเหตุ: สินค้านี้หลุดจำนำเนื่องจากครบกำหนดแล้วแต่ยังไม่ได้ไถ่คืน
             """
@@ -645,252 +738,100 @@ class DataViewerDialog(QDialog):
         except Exception as e:
             QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถดูรายละเอียดได้: {}".format(str(e)))
     
-    def load_summary(self):
-        """โหลดข้อมูลสรุป"""
-        try:
-            # นับจำนวนลูกค้า
-            customers = self.db.search_customers("")
-            self.customer_count_label.setText(str(len(customers)))
-            
-            # นับจำนวนสินค้า
-            import sqlite3
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM products')
-            product_count = cursor.fetchone()[0]
-            self.product_count_label.setText(str(product_count))
-            
-            # นับจำนวนสัญญา
-            contracts = self.db.search_contracts("", "all")
-            self.contract_count_label.setText(str(len(contracts)))
-            
-            # นับสัญญาที่เปิด
-            active_contracts = self.db.search_contracts("", "active")
-            self.active_contract_label.setText(str(len(active_contracts)))
-            
-            # นับสัญญาที่ไถ่คืน
-            redeemed_contracts = self.db.search_contracts("", "redeemed")
-            self.redeemed_contract_label.setText(str(len(redeemed_contracts)))
-            
-            # คำนวณยอดฝากรวม
-            cursor.execute('SELECT SUM(pawn_amount) FROM contracts')
-            total_pawn = cursor.fetchone()[0] or 0
-            self.total_pawn_label.setText("{:,.2f} บาท".format(total_pawn))
-            
-            # คำนวณยอดไถ่คืนรวม
-            cursor.execute('SELECT SUM(total_redemption) FROM contracts')
-            total_redemption = cursor.fetchone()[0] or 0
-            self.total_redemption_label.setText("{:,.2f} บาท".format(total_redemption))
-            
-            conn.close()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลสรุป: {}".format(str(e)))
+    def prepare_summary(self):
+        db = self.db
+        
+        def query():
+            summary = db.get_data_summary()
+            summary['today'] = datetime.now().strftime('%Y-%m-%d')
+            summary['daily'] = db.get_daily_summary(summary['today'])
+            summary['expiring'] = db.get_expiring_contracts(7)
+            return summary
+        return query
     
-    def load_expiring_contracts(self):
-        """โหลดสัญญาที่ใกล้ครบกำหนด"""
-        try:
-            expiring_contracts = self.db.get_expiring_contracts(7)
-            self.expiring_table.setRowCount(len(expiring_contracts))
-            
-            for row, contract in enumerate(expiring_contracts):
-                self.expiring_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
-                
-                customer_name = "{} {}".format(contract.get('first_name', ''), contract.get('last_name', ''))
-                self.expiring_table.setItem(row, 1, QTableWidgetItem(customer_name))
-                
-                self.expiring_table.setItem(row, 2, QTableWidgetItem(contract.get('phone', '')))
-                
-                # วันที่ครบกำหนด
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        date_obj = datetime.fromisoformat(end_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = end_date
-                else:
-                    date_str = ''
-                self.expiring_table.setItem(row, 3, QTableWidgetItem(date_str))
-                
-                self.expiring_table.setItem(row, 4, QTableWidgetItem("{:,.2f}".format(contract.get('total_redemption', 0))))
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดสัญญาที่ใกล้ครบกำหนด: {}".format(str(e)))
+    def show_summary(self, summary: Dict):
+        """แสดงข้อมูลสรุป รายงานประจำวัน และสัญญาที่ใกล้ครบกำหนด"""
+        self.customer_count_label.setText(str(summary['customer_count']))
+        self.product_count_label.setText(str(summary['product_count']))
+        self.contract_count_label.setText(str(summary['contract_count']))
+        self.active_contract_label.setText("{} (หลุดจำนำ {})".format(summary['active_count'], summary['forfeited_count']))
+        self.redeemed_contract_label.setText(str(summary['redeemed_count']))
+        self.total_pawn_label.setText("{:,.2f} บาท".format(summary['total_pawn']))
+        self.total_redemption_label.setText("{:,.2f} บาท".format(summary['total_redemption']))
+        
+        daily = summary['daily']
+        self.daily_date_label.setText(summary['today'])
+        self.daily_new_contracts_label.setText("{} สัญญา".format(daily['new_contracts_count']))
+        self.daily_redemptions_label.setText("{} สัญญา".format(daily['redemptions_count']))
+        self.daily_interest_payments_label.setText("{} ครั้ง".format(daily['interest_payments_count']))
+        
+        expiring_contracts = summary['expiring']
+        self.expiring_table.setRowCount(len(expiring_contracts))
+        for row, contract in enumerate(expiring_contracts):
+            self.expiring_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
+            self.expiring_table.setItem(row, 1, QTableWidgetItem(customer_name(contract)))
+            self.expiring_table.setItem(row, 2, QTableWidgetItem(contract.get('phone', '')))
+            self.expiring_table.setItem(row, 3, QTableWidgetItem(format_date(contract.get('end_date'))))
+            self.expiring_table.setItem(row, 4, QTableWidgetItem(format_money(contract.get('total_redemption'))))
     
-    def filter_customers(self):
-        """กรองข้อมูลลูกค้า"""
-        search_term = self.customer_search_edit.text().strip()
-        try:
-            customers = self.db.search_customers(search_term)
-            self.customer_table.setRowCount(len(customers))
-            
-            for row, customer in enumerate(customers):
-                self.customer_table.setItem(row, 0, QTableWidgetItem(customer.get('customer_code', '')))
-                self.customer_table.setItem(row, 1, QTableWidgetItem(customer.get('first_name', '')))
-                self.customer_table.setItem(row, 2, QTableWidgetItem(customer.get('last_name', '')))
-                self.customer_table.setItem(row, 3, QTableWidgetItem(customer.get('id_card', '')))
-                self.customer_table.setItem(row, 4, QTableWidgetItem(customer.get('phone', '')))
-                
-                # ที่อยู่
-                address_parts = [
-                    customer.get('house_number', ''),
-                    customer.get('street', ''),
-                    customer.get('subdistrict', ''),
-                    customer.get('district', ''),
-                    customer.get('province', '')
-                ]
-                address = ' '.join(filter(None, address_parts))
-                self.customer_table.setItem(row, 5, QTableWidgetItem(address))
-                
-                self.customer_table.setItem(row, 6, QTableWidgetItem(customer.get('other_details', '')))
-                
-                # เพิ่มปุ่มแก้ไข
-                edit_button = QPushButton("แก้ไข")
-                edit_button.setStyleSheet("QPushButton { background-color: #28a745; color: white; border: none; padding: 5px; }")
-                edit_button.clicked.connect(lambda checked, row=row: self.edit_customer(row))
-                self.customer_table.setCellWidget(row, 7, edit_button)
-                
-                # เพิ่มปุ่มลบ
-                delete_button = QPushButton("ลบ")
-                delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                delete_button.clicked.connect(lambda checked, row=row: self.delete_customer(row))
-                self.customer_table.setCellWidget(row, 8, delete_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถกรองข้อมูลลูกค้า: {}".format(str(e)))
+    def filter_analytics(self, *_args):
+        """ตัดมุมมอง contract_cube ตามมิติและตัวกรองที่เลือก"""
+        self.analytics_loader.request()
     
-    def filter_products(self):
-        """กรองข้อมูลสินค้า"""
-        search_term = self.product_search_edit.text().strip()
-        try:
-            import sqlite3
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            if search_term:
-                cursor.execute('''
-                    SELECT * FROM products 
-                    WHERE name LIKE ? OR brand LIKE ? OR serial_number LIKE ?
-                    ORDER BY created_at DESC
-                ''', (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            else:
-                cursor.execute('SELECT * FROM products ORDER BY created_at DESC')
-            
-            products = cursor.fetchall()
-            conn.close()
-            
-            if products:
-                columns = [description[0] for description in cursor.description]
-                self.product_table.setRowCount(len(products))
-                
-                for row, product_data in enumerate(products):
-                    product = dict(zip(columns, product_data))
-                    self.product_table.setItem(row, 0, QTableWidgetItem(product.get('name', '')))
-                    self.product_table.setItem(row, 1, QTableWidgetItem(product.get('brand', '')))
-                    self.product_table.setItem(row, 2, QTableWidgetItem(product.get('imei1', '')))
-                    self.product_table.setItem(row, 3, QTableWidgetItem(product.get('imei2', '')))
-                    self.product_table.setItem(row, 4, QTableWidgetItem(product.get('serial_number', '')))
-                    self.product_table.setItem(row, 5, QTableWidgetItem(product.get('condition', '')))
-                    
-                    # วันที่สร้าง
-                    created_at = product.get('created_at', '')
-                    if created_at:
-                        try:
-                            date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            date_str = date_obj.strftime('%d/%m/%Y')
-                        except:
-                            date_str = created_at
-                    else:
-                        date_str = ''
-                    self.product_table.setItem(row, 6, QTableWidgetItem(product.get('accessories', '')))
-                    self.product_table.setItem(row, 7, QTableWidgetItem(date_str))
-                    
-                    # เพิ่มปุ่มลบ
-                    delete_button = QPushButton("ลบ")
-                    delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                    delete_button.clicked.connect(lambda checked, row=row: self.delete_product(row))
-                    self.product_table.setCellWidget(row, 8, delete_button)
-                    
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถกรองข้อมูลสินค้า: {}".format(str(e)))
+    def prepare_analytics(self):
+        """อัปเดต contract_cube จากการเปลี่ยนแปลงล่าสุด (ถ้ามี) แล้วดึงมุมมองตามตัวกรอง"""
+        group_by = [self.analytics_group_combo.currentData()]
+        second = self.analytics_group2_combo.currentData()
+        if second and second not in group_by:
+            group_by.append(second)
+        
+        status = self.analytics_status_combo.currentText()
+        product_type = self.analytics_type_combo.currentText()
+        filters = {
+            'month_from': self.analytics_month_from.date().toString("yyyy-MM"),
+            'month_to': self.analytics_month_to.date().toString("yyyy-MM"),
+            'status': 'all' if status == "ทั้งหมด" else status,
+            'product_type': 'all' if product_type == "ทั้งหมด" else product_type,
+        }
+        refresh, self.cube_refresh_due = self.cube_refresh_due, False
+        
+        def query():
+            if refresh:
+                self.db.refresh_contract_cube()
+            return group_by, self.db.get_contract_cube(group_by, filters)
+        return query
     
-    def filter_contracts(self):
-        """กรองข้อมูลสัญญา"""
-        search_term = self.contract_search_edit.text().strip()
-        status = self.status_combo.currentText()
-        
-        if status == "ทั้งหมด":
-            status = "all"
-        elif status == "active":
-            status = "active"
-        elif status == "redeemed":
-            status = "redeemed"
-        
-        try:
-            contracts = self.db.search_contracts(search_term, status)
-            self.contract_table.setRowCount(len(contracts))
-            
-            for row, contract in enumerate(contracts):
-                self.contract_table.setItem(row, 0, QTableWidgetItem(contract.get('contract_number', '')))
-                
-                customer_name = "{} {}".format(contract.get('first_name', ''), contract.get('last_name', ''))
-                self.contract_table.setItem(row, 1, QTableWidgetItem(customer_name))
-                
-                self.contract_table.setItem(row, 2, QTableWidgetItem(contract.get('product_name', '')))
-                self.contract_table.setItem(row, 3, QTableWidgetItem("{:,.2f}".format(contract.get('pawn_amount', 0))))
-                
-                # วันที่เริ่มต้น
-                start_date = contract.get('start_date', '')
-                if start_date:
-                    try:
-                        date_obj = datetime.fromisoformat(start_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = start_date
+    def show_analytics(self, result):
+        group_by, rows = result
+        dimension_names = dict((key, text) for text, key in self.ANALYTICS_DIMENSIONS)
+        headers = [dimension_names[key] for key in group_by] + [
+            "จำนวนสัญญา", "ยอดฝากรวม", "ยอดฝากเฉลี่ย", "ยอดไถ่คืนรวม", "อัตราไถ่คืน (%)", "วันถือครองเฉลี่ย"
+        ]
+        
+        self.analytics_table.setSortingEnabled(False)
+        self.analytics_table.clear()
+        self.analytics_table.setColumnCount(len(headers))
+        self.analytics_table.setHorizontalHeaderLabels(headers)
+        self.analytics_table.setRowCount(len(rows))
+        
+        for row, item in enumerate(rows):
+            values = [str(item[key]) for key in group_by] + [
+                item['contract_count'],
+                "{:,.2f}".format(item['pawn_sum']),
+                "{:,.2f}".format(item['avg_pawn']),
+                "{:,.2f}".format(item['redemption_sum']),
+                "{:.1f}".format(item['redemption_rate']),
+                "{:.1f}".format(item['avg_days_held']) if item['avg_days_held'] is not None else "-",
+            ]
+            for column, value in enumerate(values):
+                table_item = QTableWidgetItem()
+                if isinstance(value, int):
+                    table_item.setData(Qt.DisplayRole, value)
                 else:
-                    date_str = ''
-                self.contract_table.setItem(row, 4, QTableWidgetItem(date_str))
-                
-                # วันที่สิ้นสุด
-                end_date = contract.get('end_date', '')
-                if end_date:
-                    try:
-                        date_obj = datetime.fromisoformat(end_date)
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = end_date
-                else:
-                    date_str = ''
-                self.contract_table.setItem(row, 5, QTableWidgetItem(date_str))
-                
-                # สถานะ
-                status = contract.get('status', '')
-                status_text = "เปิด" if status == 'active' else "ไถ่คืน" if status == 'redeemed' else status
-                self.contract_table.setItem(row, 6, QTableWidgetItem(status_text))
-                
-                self.contract_table.setItem(row, 7, QTableWidgetItem("{:,.2f}".format(contract.get('total_redemption', 0))))
-                
-                # วันที่สร้าง
-                created_at = contract.get('created_at', '')
-                if created_at:
-                    try:
-                        date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        date_str = date_obj.strftime('%d/%m/%Y')
-                    except:
-                        date_str = created_at
-                else:
-                    date_str = ''
-                self.contract_table.setItem(row, 8, QTableWidgetItem(date_str))
-                
-                # เพิ่มปุ่มลบ
-                delete_button = QPushButton("ลบ")
-                delete_button.setStyleSheet("QPushButton { background-color: #ff6b6b; color: white; border: none; padding: 5px; }")
-                delete_button.clicked.connect(lambda checked, row=row: self.delete_contract(row))
-                self.contract_table.setCellWidget(row, 9, delete_button)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถกรองข้อมูลสัญญา: {}".format(str(e)))
+                    table_item.setText(value)
+                self.analytics_table.setItem(row, column, table_item)
+        
+        self.analytics_table.setSortingEnabled(True)
     
     def delete_customer(self, row: int):
         """ลบข้อมูลลูกค้า"""
@@ -899,25 +840,24 @@ class DataViewerDialog(QDialog):
             if not self.verify_delete_password():
                 return
 
-            customer_code = self.customer_table.item(row, 0).text()
-            customer_name = "{} {}".format(self.customer_table.item(row, 1).text(), self.customer_table.item(row, 2).text())
+            customer = self.customer_model.row_data(row)
+            name = customer_name(customer)
             
             # ยืนยันการลบ
             reply = QMessageBox.question(
                 self, 
                 "ยืนยันการลบ", 
-                "คุณต้องการลบข้อมูลลูกค้า {} (รหัส: {}) หรือไม่?\n\nการลบนี้จะลบข้อมูลลูกค้าออกจากระบบอย่างถาวร".format(customer_name, customer_code),
+                "คุณต้องการลบข้อมูลลูกค้า {} (รหัส: {}) หรือไม่?\n\nการลบนี้จะลบข้อมูลลูกค้าออกจากระบบอย่างถาวร".format(name, customer.get('customer_code', '')),
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # ดึง ID ของลูกค้า
-                customer_id = self.db.get_customer_id_by_code(customer_code)
+                customer_id = customer.get('id')
                 if customer_id:
                     # ลบข้อมูลลูกค้า
                     if self.db.delete_customer(customer_id):
-                        QMessageBox.information(self, "สำเร็จ", "ลบข้อมูลลูกค้า {customer_name} เรียบร้อยแล้ว")
+                        QMessageBox.information(self, "สำเร็จ", f"ลบข้อมูลลูกค้า {name} เรียบร้อยแล้ว")
                         self.load_data()  # รีเฟรชข้อมูล
                     else:
                         QMessageBox.warning(self, "ไม่สามารถลบได้", 
@@ -935,25 +875,25 @@ class DataViewerDialog(QDialog):
             if not self.verify_delete_password():
                 return
 
-            product_name = self.product_table.item(row, 0).text()
-            serial_number = self.product_table.item(row, 4).text()
+            product = self.product_model.row_data(row)
+            product_name = product.get('name', '')
+            serial_number = product.get('serial_number', '')
             
             # ยืนยันการลบ
             reply = QMessageBox.question(
                 self, 
                 "ยืนยันการลบ", 
-                "คุณต้องการลบข้อมูลสินค้า {product_name} (ซีเรียล: {serial_number}) หรือไม่?\n\nการลบนี้จะลบข้อมูลสินค้าออกจากระบบอย่างถาวร",
+                f"คุณต้องการลบข้อมูลสินค้า {product_name} (ซีเรียล: {serial_number}) หรือไม่?\n\nการลบนี้จะลบข้อมูลสินค้าออกจากระบบอย่างถาวร",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # ดึง ID ของสินค้า
-                product_id = self.db.get_product_id_by_serial(serial_number)
+                product_id = product.get('id')
                 if product_id:
                     # ลบข้อมูลสินค้า
                     if self.db.delete_product(product_id):
-                        QMessageBox.information(self, "สำเร็จ", "ลบข้อมูลสินค้า {product_name} เรียบร้อยแล้ว")
+                        QMessageBox.information(self, "สำเร็จ", f"ลบข้อมูลสินค้า {product_name} เรียบร้อยแล้ว")
                         self.load_data()  # รีเฟรชข้อมูล
                     else:
                         QMessageBox.warning(self, "ไม่สามารถลบได้", 
@@ -971,25 +911,24 @@ class DataViewerDialog(QDialog):
             if not self.verify_delete_password():
                 return
 
-            contract_number = self.contract_table.item(row, 0).text()
-            customer_name = self.contract_table.item(row, 1).text()
+            contract = self.contract_model.row_data(row)
+            contract_number = contract.get('contract_number', '')
             
             # ยืนยันการลบ
             reply = QMessageBox.question(
                 self, 
                 "ยืนยันการลบ", 
-                "คุณต้องการลบข้อมูลสัญญา {contract_number} ของ {customer_name} หรือไม่?\n\nการลบนี้จะลบข้อมูลสัญญาออกจากระบบอย่างถาวร",
+                f"คุณต้องการลบข้อมูลสัญญา {contract_number} ของ {customer_name(contract)} หรือไม่?\n\nการลบนี้จะลบข้อมูลสัญญาออกจากระบบอย่างถาวร",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # ดึง ID ของสัญญา
-                contract_id = self.db.get_contract_by_number(contract_number).get('id')
+                contract_id = contract.get('id')
                 if contract_id:
                     # ลบข้อมูลสัญญา
                     if self.db.delete_contract(contract_id):
-                        QMessageBox.information(self, "สำเร็จ", "ลบข้อมูลสัญญา {contract_number} เรียบร้อยแล้ว")
+                        QMessageBox.information(self, "สำเร็จ", f"ลบข้อมูลสัญญา {contract_number} เรียบร้อยแล้ว")
                         self.load_data()  # รีเฟรชข้อมูล
                     else:
                         QMessageBox.warning(self, "ไม่สามารถลบได้", "ไม่สามารถลบข้อมูลสัญญาได้")
@@ -1006,11 +945,11 @@ class DataViewerDialog(QDialog):
             if not self.verify_edit_password():
                 return
 
-            customer_code = self.customer_table.item(row, 0).text()
-            customer_name = "{} {}".format(self.customer_table.item(row, 1).text(), self.customer_table.item(row, 2).text())
+            customer = self.customer_model.row_data(row)
+            name = customer_name(customer)
             
-            # ดึงข้อมูลลูกค้าจากฐานข้อมูล
-            customer_data = self.db.get_customer_by_code(customer_code)
+            # ดึงข้อมูลลูกค้าล่าสุดจากฐานข้อมูล
+            customer_data = self.db.get_customer_by_id(customer.get('id'))
             if not customer_data:
                 QMessageBox.warning(self, "ไม่พบข้อมูล", "ไม่พบข้อมูลลูกค้าที่ต้องการแก้ไข")
                 return
@@ -1021,7 +960,7 @@ class DataViewerDialog(QDialog):
             if dialog.exec():
                 # รีเฟรชข้อมูลหลังจากแก้ไข
                 self.load_data()
-                QMessageBox.information(self, "สำเร็จ", "แก้ไขข้อมูลลูกค้า {} เรียบร้อยแล้ว".format(customer_name))
+                QMessageBox.information(self, "สำเร็จ", "แก้ไขข้อมูลลูกค้า {} เรียบร้อยแล้ว".format(name))
                     
         except Exception as e:
             QMessageBox.critical(self, "ข้อผิดพลาด", "เกิดข้อผิดพลาดในการแก้ไขข้อมูล: {}".format(str(e)))
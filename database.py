@@ -1,13 +1,113 @@
 # -*- coding: utf-8 -*-
 import sqlite3
 import os
+import re
+import time
+import random
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
 
+from omnibox import QUERY_CONTRACT, QUERY_ID_CARD, QUERY_IMEI, QUERY_PHONE, QUERY_TEXT, classify_query
+from thai_fuzzy import FuzzyNameIndex
+
+# คอลัมน์วันที่ทั้งหมดที่ต้องเก็บเป็น ISO-8601 (YYYY-MM-DD)
+DATE_COLUMNS = {
+    'contracts': ['start_date', 'end_date'],
+    'interest_payments': ['payment_date'],
+    'renewals': ['renewal_date', 'current_due_date', 'new_due_date'],
+    'redemptions': ['redemption_date', 'deposit_date', 'due_date'],
+}
+
+ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# ตารางที่บันทึกการเปลี่ยนแปลงลง change_log (สำหรับซิงก์สาขา -> สำนักงานใหญ่)
+CHANGE_LOG_TABLES = ['customers', 'products', 'contracts', 'renewals', 'redemptions']
+
+# สถานะของสัญญาที่ยังไม่ปิด (หลุดจำนำแล้วแต่ยังไม่ไถ่/ขาย ยังนับเป็นสัญญาเปิด)
+OPEN_STATUSES = ['active', 'forfeited']
+
+# ยอดสะสมของลูกค้าที่ trigger ดูแล (ตาราง customers)
+CUSTOMER_AGGREGATE_COLUMNS = ['active_contract_count', 'outstanding_principal', 'lifetime_redeemed', 'last_visit']
+
+# ดัชนีค้นหาข้อความ (FTS5 tokenizer trigram ค้นหาส่วนใดของข้อความก็ได้ รวมภาษาไทยที่ไม่เว้นวรรค)
+# ตาราง -> คอลัมน์ที่ทำดัชนี
+SEARCH_INDEX_COLUMNS = {
+    'customers': ['customer_code', 'first_name', 'last_name', 'id_card', 'phone'],
+    'products': ['name', 'brand', 'serial_number', 'imei1', 'imei2'],
+    'contracts': ['contract_number'],
+}
+# trigram ค้นหาได้เมื่อคำค้นยาวอย่างน้อย 3 ตัวอักษร คำที่สั้นกว่าใช้ LIKE
+SEARCH_INDEX_MIN_LENGTH = 3
+
+# จำนวนผลลัพธ์สูงสุดของ quick_search ต่อการตีความคำค้นแต่ละแบบ
+QUICK_SEARCH_LIMIT = 30
+
+# จำนวนลูกค้าที่ชื่อใกล้เคียงที่สุดที่ใช้กรองสัญญา (เงื่อนไข name_fuzzy)
+FUZZY_NAME_CUSTOMER_LIMIT = 500
+
+# มิติของ contract_cube
+CUBE_DIMENSIONS = ['month', 'status', 'brand', 'product_type']
+
+# ประเภทสินค้า (ตาราง products ไม่มีคอลัมน์ประเภท จึงจัดกลุ่มจากข้อมูลที่มี)
+PRODUCT_TYPES = ['มือถือ/แท็บเล็ต', 'ทอง/เครื่องประดับ', 'อื่นๆ']
+PRODUCT_TYPE_SQL = f'''
+    CASE
+        WHEN COALESCE(p.imei1, '') != '' OR COALESCE(p.imei2, '') != '' THEN '{PRODUCT_TYPES[0]}'
+        WHEN COALESCE(p.weight, 0) > 0 THEN '{PRODUCT_TYPES[1]}'
+        ELSE '{PRODUCT_TYPES[2]}'
+    END
+'''
+
+
+def to_iso_date(value) -> Optional[str]:
+    """แปลงวันที่รูปแบบที่พบในฐานข้อมูลเดิมเป็น YYYY-MM-DD (คืน None ถ้าแปลงไม่ได้)"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    
+    # ตัดส่วนเวลาออก (คอลัมน์เหล่านี้เป็น DATE)
+    text = re.split(r'[ T]', text)[0]
+    
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        # ปี พ.ศ. -> ค.ศ.
+        if parsed.year > 2400:
+            parsed = parsed.replace(year=parsed.year - 543)
+        return parsed.strftime("%Y-%m-%d")
+    return None
+
+
 class PawnShopDatabase:
+    # ค่าสำหรับการรอ write lock เมื่อหลายเครื่องเขียนพร้อมกัน
+    WRITE_BUSY_TIMEOUT_MS = 250
+    WRITE_MAX_ATTEMPTS = 8
+    WRITE_BACKOFF_BASE = 0.05
+    WRITE_BACKOFF_MAX = 1.0
+    
+    # True เมื่อสร้างดัชนี FTS ได้ (SQLite ที่ไม่มี FTS5/trigram จะค้นหาด้วย LIKE)
+    search_index_enabled = False
+    
     def __init__(self, db_path: str = "pawnshop.db"):
         self.db_path = db_path
+        self.lock_metrics = {
+            'transactions': 0, 'contended': 0, 'retries': 0,
+            'failures': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+        }
+        # write_transaction ถูกเรียกจากหลายเธรด (TabLoader, db_server) สถิติจึงต้องแก้ภายใต้ lock
+        self._lock_metrics_lock = threading.Lock()
+        # ดัชนีชื่อลูกค้าแบบใกล้เคียง (สร้างเมื่อใช้ครั้งแรก อัปเดตตาม change_log)
+        self._fuzzy_names = None
+        self._fuzzy_names_seq = 0
+        self._fuzzy_names_lock = threading.Lock()
         self.init_database()
     
     @contextmanager
@@ -32,11 +132,75 @@ class PawnShopDatabase:
                 except:
                     pass
     
+    @contextmanager
+    def write_transaction(self):
+        """Context manager สำหรับการเขียนข้อมูล: เริ่มด้วย BEGIN IMMEDIATE
+        
+        ถ้าเครื่องอื่นถือ write lock อยู่ (SQLITE_BUSY) จะลองใหม่แบบ backoff พร้อม jitter
+        และบันทึกเวลาที่รอ lock ไว้ใน lock_metrics; commit เมื่อสำเร็จ rollback เมื่อผิดพลาด
+        """
+        with self.get_connection() as conn:
+            conn.execute(f"PRAGMA busy_timeout = {self.WRITE_BUSY_TIMEOUT_MS}")
+            
+            started = time.monotonic()
+            for attempt in range(1, self.WRITE_MAX_ATTEMPTS + 1):
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    break
+                except sqlite3.OperationalError as e:
+                    message = str(e).lower()
+                    if 'locked' not in message and 'busy' not in message:
+                        raise
+                    if attempt == self.WRITE_MAX_ATTEMPTS:
+                        self._record_lock_wait(time.monotonic() - started, attempt - 1, failed=True)
+                        raise sqlite3.OperationalError(
+                            "ฐานข้อมูลกำลังถูกใช้งานโดยเครื่องอื่น กรุณาลองใหม่อีกครั้ง"
+                        ) from e
+                    # exponential backoff แบบ full jitter
+                    delay = min(self.WRITE_BACKOFF_MAX, self.WRITE_BACKOFF_BASE * (2 ** (attempt - 1)))
+                    time.sleep(random.uniform(0, delay))
+            
+            self._record_lock_wait(time.monotonic() - started, attempt - 1)
+            
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    def _record_lock_wait(self, waited: float, retries: int, failed: bool = False):
+        """บันทึกสถิติการรอ write lock"""
+        with self._lock_metrics_lock:
+            metrics = self.lock_metrics
+            metrics['transactions'] += 1
+            metrics['retries'] += retries
+            metrics['total_wait'] += waited
+            metrics['max_wait'] = max(metrics['max_wait'], waited)
+            if retries:
+                metrics['contended'] += 1
+            if failed:
+                metrics['failures'] += 1
+    
+    def get_lock_metrics(self) -> Dict:
+        """สถิติการรอ write lock (จำนวนธุรกรรม, ครั้งที่ต้องรอ, เวลารอรวม/สูงสุด)"""
+        with self._lock_metrics_lock:
+            metrics = dict(self.lock_metrics)
+        metrics['avg_wait'] = metrics['total_wait'] / metrics['transactions'] if metrics['transactions'] else 0.0
+        return metrics
+    
     def init_database(self):
         """สร้างตารางฐานข้อมูล"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # ไฟล์ใหม่: เปิด auto_vacuum แบบ INCREMENTAL ก่อนสร้างตาราง (ไฟล์เดิมแปลงด้วย enable_incremental_vacuum)
+            # VACUUM บนไฟล์ที่ยังไม่มีตารางเสร็จทันที (journal_mode=WAL เขียน header ไปแล้ว จึงต้องใช้ VACUUM ให้ค่ามีผล)
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+            if cursor.fetchone()[0] == 0:
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                cursor.execute("VACUUM")
+            
             # ตารางลูกค้า
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS customers (
@@ -53,6 +217,10 @@ class PawnShopDatabase:
                     province TEXT,
                     phone TEXT,
                     other_details TEXT,
+                    active_contract_count INTEGER DEFAULT 0,
+                    outstanding_principal REAL DEFAULT 0,
+                    lifetime_redeemed REAL DEFAULT 0,
+                    last_visit DATE,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
@@ -93,6 +261,7 @@ class PawnShopDatabase:
                     end_date DATE NOT NULL,
                     days_count INTEGER NOT NULL,
                     status TEXT DEFAULT 'active',
+                    forfeited_at TIMESTAMP,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (customer_id) REFERENCES customers (id),
                     FOREIGN KEY (product_id) REFERENCES products (id)
@@ -183,9 +352,70 @@ class PawnShopDatabase:
                 )
             ''')
             
+            # บันทึกการเปลี่ยนแปลงแบบเพิ่มต่อท้ายเท่านั้น (change data capture)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'")
+            change_log_created = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    operation TEXT NOT NULL,
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            if change_log_created:
+                self._seed_change_log(cursor)
+            
+            # ตารางสรุปสัญญาแบบ cube (เดือน x สถานะ x ยี่ห้อ x ประเภทสินค้า)
+            # contract_cube_facts เก็บค่าที่แต่ละสัญญานับเข้า cube เพื่ออัปเดตแบบเพิ่มหน่วย
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS contract_cube_facts (
+                    contract_id INTEGER PRIMARY KEY,
+                    month TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    brand TEXT NOT NULL,
+                    product_type TEXT NOT NULL,
+                    pawn_amount REAL NOT NULL,
+                    redemption_amount REAL NOT NULL,
+                    redeemed INTEGER NOT NULL,
+                    days_held INTEGER
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS contract_cube (
+                    month TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    brand TEXT NOT NULL,
+                    product_type TEXT NOT NULL,
+                    contract_count INTEGER NOT NULL,
+                    pawn_sum REAL NOT NULL,
+                    redemption_sum REAL NOT NULL,
+                    redeemed_count INTEGER NOT NULL,
+                    days_held_sum REAL NOT NULL,
+                    days_held_count INTEGER NOT NULL,
+                    PRIMARY KEY (month, status, brand, product_type)
+                ) WITHOUT ROWID
+            ''')
+            
             # อัปเกรดฐานข้อมูลเพื่อเพิ่มคอลัมน์ที่ขาดหายไป
             self.upgrade_database(cursor)
             
+            # สร้างดัชนีสำหรับคิวรีที่ใช้บ่อย
+            self._create_indexes(cursor)
+            
+            # trigger สำหรับบันทึกการเปลี่ยนแปลงลง change_log
+            self._create_change_log_triggers(cursor)
+            
+            # trigger สำหรับยอดสะสมของลูกค้า
+            self._create_customer_aggregate_triggers(cursor)
+            
+            # trigger นับเวอร์ชันตารางค่าธรรมเนียม (ให้ตารางอัตราในหน่วยความจำรู้ว่าต้องโหลดใหม่)
+            self._create_fee_rate_triggers(cursor)
+            
+            # ดัชนีค้นหาข้อความ
+            self._create_search_index(cursor)
+            
             # เพิ่มข้อมูลเริ่มต้น
             self._insert_default_settings(cursor)
             
@@ -195,6 +425,81 @@ class PawnShopDatabase:
             
             # Migration: Remove withholding tax columns
             self._migrate_remove_withholding_tax(conn)
+            
+            # Migration: แปลงวันที่ทุกคอลัมน์เป็น ISO-8601
+            self._migrate_normalize_dates(conn)
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """เปิด auto_vacuum=INCREMENTAL ให้ไฟล์ที่สร้างก่อนรองรับ (ต้อง VACUUM เต็มหนึ่งครั้ง)
+        
+        VACUUM ใช้เวลาตามขนาดไฟล์และล็อกฐานข้อมูลตลอด จึงไม่เรียกจาก run_maintenance หรือโปรแกรมหลัก
+        ให้ผู้ดูแลรันเองขณะไม่มีเครื่องใดใช้งาน: python db_maintenance.py enable-incremental-vacuum
+        คืน True เมื่อแปลงสำเร็จในครั้งนี้ (False ถ้าเปิดอยู่แล้ว)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA auto_vacuum")
+            if cursor.fetchone()[0] == 2:
+                return False
+            
+            print("Migrating: Enabling incremental auto_vacuum...")
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # VACUUM ต้องรันนอก transaction
+            cursor.execute("VACUUM")
+            print("Migration completed: auto_vacuum=INCREMENTAL")
+            return True
+    
+    def _migrate_normalize_dates(self, conn):
+        """Migration: Rewrite every date column to canonical ISO-8601 (YYYY-MM-DD)"""
+        try:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT value FROM settings WHERE key = ?', ('iso_dates_migrated',))
+            if cursor.fetchone():
+                return
+            
+            conn.create_function('to_iso_date', 1, to_iso_date, deterministic=True)
+            
+            converted = 0
+            for table, columns in DATE_COLUMNS.items():
+                for column in columns:
+                    cursor.execute(f'''
+                        UPDATE {table}
+                        SET {column} = COALESCE(to_iso_date({column}), {column})
+                        WHERE {column} IS NOT NULL AND {column} != ''
+                        AND {column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+                    ''')
+                    converted += cursor.rowcount
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO settings (key, value, updated_at)
+                VALUES ('iso_dates_migrated', '1', CURRENT_TIMESTAMP)
+            ''')
+            
+            conn.commit()
+            if converted:
+                print(f"Migration completed: {converted} date values normalized to ISO-8601")
+                
+        except Exception as e:
+            print(f"Migration error: {e}")
+            conn.rollback()
+    
+    @staticmethod
+    def _validate_date(value, field_name: str, required: bool = True) -> Optional[str]:
+        """ตรวจสอบว่าวันที่อยู่ในรูปแบบ YYYY-MM-DD (ปฏิเสธรูปแบบอื่น)"""
+        if value is None or value == '':
+            if required:
+                raise ValueError(f"ต้องระบุ {field_name}")
+            return None
+        
+        if not isinstance(value, str) or not ISO_DATE_PATTERN.match(value):
+            raise ValueError(f"{field_name} ต้องอยู่ในรูปแบบ YYYY-MM-DD: {value}")
+        
+        try:
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"{field_name} ไม่ใช่วันที่ที่ถูกต้อง: {value}")
+        return value
     
     def _migrate_remove_withholding_tax(self, conn):
         """Migration: Remove withholding tax columns from contracts table"""
@@ -247,6 +552,13 @@ class PawnShopDatabase:
                 cursor.execute('DROP TABLE contracts')
                 cursor.execute('ALTER TABLE contracts_new RENAME TO contracts')
                 
+                # ตารางใหม่ไม่มีคอลัมน์และดัชนีที่เพิ่มภายหลัง ให้สร้างกลับมา
+                self.upgrade_database(cursor)
+                self._create_indexes(cursor)
+                self._create_change_log_triggers(cursor)
+                self._create_customer_aggregate_triggers(cursor)
+                self._create_search_index(cursor)
+                
                 conn.commit()
                 print("Migration completed: Withholding tax columns removed")
                 
@@ -301,10 +613,292 @@ class PawnShopDatabase:
                 if col_name not in redemption_columns:
                     cursor.execute(f'ALTER TABLE redemptions ADD COLUMN {col_name} {col_type}')
                     print(f"Added {col_name} column to redemptions table")
+            
+            # ตรวจสอบและเพิ่มคอลัมน์ forfeited_at ในตาราง contracts
+            cursor.execute("PRAGMA table_info(contracts)")
+            contract_columns = [column[1] for column in cursor.fetchall()]
+            
+            if 'forfeited_at' not in contract_columns:
+                cursor.execute('ALTER TABLE contracts ADD COLUMN forfeited_at TIMESTAMP')
+                print("Added forfeited_at column to contracts table")
+            
+            # ตรวจสอบและเพิ่มคอลัมน์ยอดสะสมในตาราง customers
+            cursor.execute("PRAGMA table_info(customers)")
+            customer_columns = [column[1] for column in cursor.fetchall()]
+            
+            new_customer_columns = [
+                ('active_contract_count', 'INTEGER DEFAULT 0'),
+                ('outstanding_principal', 'REAL DEFAULT 0'),
+                ('lifetime_redeemed', 'REAL DEFAULT 0'),
+                ('last_visit', 'DATE'),
+            ]
+            
+            added_aggregates = False
+            for col_name, col_type in new_customer_columns:
+                if col_name not in customer_columns:
+                    cursor.execute(f'ALTER TABLE customers ADD COLUMN {col_name} {col_type}')
+                    print(f"Added {col_name} column to customers table")
+                    added_aggregates = True
+            
+            # คำนวณยอดสะสมจากข้อมูลเดิมครั้งแรก
+            if added_aggregates:
+                self._rebuild_customer_aggregates(cursor)
                 
         except Exception as e:
             print(f"Error upgrading database: {e}")
     
+    def _create_indexes(self, cursor):
+        """สร้างดัชนีของตาราง"""
+        indexes = [
+            ('idx_contracts_status_end_date', 'contracts (status, end_date)'),
+            ('idx_contracts_start_date', 'contracts (start_date)'),
+            ('idx_contracts_customer_id', 'contracts (customer_id)'),
+            # เบอร์โทรแบบตัวเลขล้วน (ค้นตรงตัวได้ไม่ว่าจะบันทึกแบบมีขีดหรือไม่)
+            ('idx_customers_phone_digits', "customers (REPLACE(REPLACE(phone, '-', ''), ' ', ''))"),
+            ('idx_renewals_contract_id', 'renewals (contract_id)'),
+            ('idx_redemptions_contract_id', 'redemptions (contract_id)'),
+            ('idx_renewals_renewal_date', 'renewals (renewal_date)'),
+            ('idx_redemptions_redemption_date', 'redemptions (redemption_date)'),
+            ('idx_interest_payments_payment_date', 'interest_payments (payment_date)'),
+            ('idx_contracts_product_id', 'contracts (product_id)'),
+            ('idx_products_imei1', 'products (imei1)'),
+            ('idx_products_imei2', 'products (imei2)'),
+            # ค้นสินค้าจากซีเรียลที่สแกน (ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+            ('idx_products_serial_number', 'products (serial_number COLLATE NOCASE)'),
+            # ลำดับเริ่มต้นของรายการสัญญา/สินค้า (ดึงทีละหน้าได้โดยไม่ต้องเรียงทั้งตาราง)
+            ('idx_contracts_created_at', 'contracts (created_at)'),
+            ('idx_products_created_at', 'products (created_at)'),
+        ]
+        
+        for index_name, index_target in indexes:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {index_target}')
+    
+    def _seed_change_log(self, cursor):
+        """บันทึกแถวที่มีอยู่แล้วเป็น 'I' ตอนสร้าง change_log ครั้งแรก (ฐานข้อมูลที่อัปเกรดมาจากรุ่นก่อน)
+        
+        การส่งออกครั้งแรกของสาขา (since_seq 0) จึงมีข้อมูลเดิมทั้งหมด ไม่ใช่เฉพาะที่แก้ไขหลังอัปเกรด
+        """
+        seeded = 0
+        for table in CHANGE_LOG_TABLES:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            if cursor.fetchone() is None:
+                continue
+            cursor.execute(f'''
+                INSERT INTO change_log (table_name, row_id, operation)
+                SELECT '{table}', id, 'I' FROM {table} ORDER BY id
+            ''')
+            seeded += cursor.rowcount
+        if seeded:
+            print(f"Migration completed: {seeded} existing rows recorded in change_log")
+    
+    def _create_change_log_triggers(self, cursor):
+        """สร้าง trigger ที่บันทึก INSERT/UPDATE/DELETE ของตารางหลักลง change_log"""
+        for table in CHANGE_LOG_TABLES:
+            for event, operation, row in (('INSERT', 'I', 'NEW'), ('UPDATE', 'U', 'NEW'), ('DELETE', 'D', 'OLD')):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, operation)
+                        VALUES ('{table}', {row}.id, '{operation}');
+                    END
+                ''')
+    
+    def _create_search_index(self, cursor):
+        """สร้างตาราง FTS5 แบบ external content ของตารางใน SEARCH_INDEX_COLUMNS และ trigger ที่ทำให้ดัชนีตรงกับข้อมูล
+        
+        ดัชนีที่สร้างใหม่จะถูก rebuild จากข้อมูลเดิม ถ้า SQLite ไม่รองรับจะข้ามและค้นหาด้วย LIKE
+        """
+        for table, columns in SEARCH_INDEX_COLUMNS.items():
+            fts = f'{table}_fts'
+            column_list = ', '.join(columns)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+            created = cursor.fetchone() is None
+            if created:
+                try:
+                    cursor.execute(f'''
+                        CREATE VIRTUAL TABLE {fts} USING fts5(
+                            {column_list}, content='{table}', content_rowid='id', tokenize='trigram'
+                        )
+                    ''')
+                except sqlite3.OperationalError as e:
+                    print(f"Full-text search index unavailable, using LIKE: {e}")
+                    return
+            
+            new_values = ', '.join(f'NEW.{column}' for column in columns)
+            old_values = ', '.join(f'OLD.{column}' for column in columns)
+            insert_new = f"INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});"
+            delete_old = (f"INSERT INTO {fts} ({fts}, rowid, {column_list}) "
+                          f"VALUES ('delete', OLD.id, {old_values});")
+            for event, body in (('INSERT', insert_new), ('DELETE', delete_old),
+                                (f'UPDATE OF {column_list}', delete_old + insert_new)):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_{event.split()[0].lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        {body}
+                    END
+                ''')
+            
+            if created:
+                cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+                print(f"Built search index {fts}")
+        self.search_index_enabled = True
+    
+    def _search_index_delete(self, cursor, table: str, row_id: int):
+        """ลบข้อมูลเดิมของแถวออกจากดัชนีค้นหา (ใช้ก่อน INSERT OR REPLACE ซึ่งไม่เรียก trigger DELETE)"""
+        columns = SEARCH_INDEX_COLUMNS.get(table)
+        if not columns or not self.search_index_enabled:
+            return
+        column_list = ', '.join(columns)
+        cursor.execute(f'''
+            INSERT INTO {table}_fts ({table}_fts, rowid, {column_list})
+            SELECT 'delete', id, {column_list} FROM {table} WHERE id = ?
+        ''', (row_id,))
+    
+    def _use_search_index(self, term: str) -> bool:
+        return self.search_index_enabled and len(term) >= SEARCH_INDEX_MIN_LENGTH
+    
+    @staticmethod
+    def _search_index_match(columns: str, term: str) -> str:
+        """คำค้นสำหรับ MATCH: ข้อความ term ต่อเนื่องในคอลัมน์ใดคอลัมน์หนึ่งของ columns (คั่นด้วยช่องว่าง)"""
+        return '{%s} : "%s"' % (columns, term.replace('"', '""'))
+    
+    def _create_fee_rate_triggers(self, cursor):
+        """สร้าง trigger ที่เพิ่มค่า settings.fee_rates_version ทุกครั้งที่ตาราง fee_rates เปลี่ยน"""
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_fee_rates_version_{event.lower()}
+                AFTER {event} ON fee_rates
+                BEGIN
+                    UPDATE settings SET value = CAST(value AS INTEGER) + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE key = 'fee_rates_version';
+                    INSERT INTO settings (key, value)
+                    SELECT 'fee_rates_version', 1
+                    WHERE NOT EXISTS (SELECT 1 FROM settings WHERE key = 'fee_rates_version');
+                END
+            ''')
+    
+    def _create_customer_aggregate_triggers(self, cursor):
+        """สร้าง trigger ที่ปรับยอดสะสมของลูกค้าทันทีเมื่อสัญญา/การต่อดอก/การไถ่คืนเปลี่ยน
+        
+        สัญญาที่ยังไม่ไถ่ (active/forfeited) นับเป็นสัญญาค้างและเงินต้นคงค้าง
+        """
+        open_status = "IN ('active', 'forfeited')"
+        
+        def touch_visit(date_expr, customer_expr):
+            return f'''
+                UPDATE customers SET last_visit = {date_expr}
+                WHERE id = {customer_expr}
+                AND (last_visit IS NULL OR last_visit < {date_expr});
+            '''
+        
+        def contract_delta(row, sign):
+            return f'''
+                UPDATE customers SET
+                    active_contract_count = COALESCE(active_contract_count, 0) {sign} 1,
+                    outstanding_principal = COALESCE(outstanding_principal, 0) {sign} {row}.pawn_amount
+                WHERE id = {row}.customer_id AND {row}.status {open_status};
+            '''
+        
+        def redemption_delta(row, sign):
+            return f'''
+                UPDATE customers SET
+                    lifetime_redeemed = COALESCE(lifetime_redeemed, 0) {sign} COALESCE({row}.redemption_amount, 0)
+                WHERE id = (SELECT customer_id FROM contracts WHERE id = {row}.contract_id);
+            '''
+        
+        triggers = {
+            'trg_customer_agg_contract_insert': f'''
+                AFTER INSERT ON contracts BEGIN
+                    {contract_delta('NEW', '+')}
+                    {touch_visit('NEW.start_date', 'NEW.customer_id')}
+                END
+            ''',
+            'trg_customer_agg_contract_update': f'''
+                AFTER UPDATE OF customer_id, pawn_amount, status ON contracts BEGIN
+                    {contract_delta('OLD', '-')}
+                    {contract_delta('NEW', '+')}
+                END
+            ''',
+            'trg_customer_agg_contract_delete': f'''
+                AFTER DELETE ON contracts BEGIN
+                    {contract_delta('OLD', '-')}
+                END
+            ''',
+            'trg_customer_agg_renewal_insert': f'''
+                AFTER INSERT ON renewals BEGIN
+                    {touch_visit('NEW.renewal_date', '(SELECT customer_id FROM contracts WHERE id = NEW.contract_id)')}
+                END
+            ''',
+            'trg_customer_agg_redemption_insert': f'''
+                AFTER INSERT ON redemptions BEGIN
+                    {redemption_delta('NEW', '+')}
+                    {touch_visit('NEW.redemption_date', '(SELECT customer_id FROM contracts WHERE id = NEW.contract_id)')}
+                END
+            ''',
+            'trg_customer_agg_redemption_update': f'''
+                AFTER UPDATE OF redemption_amount, contract_id ON redemptions BEGIN
+                    {redemption_delta('OLD', '-')}
+                    {redemption_delta('NEW', '+')}
+                END
+            ''',
+            'trg_customer_agg_redemption_delete': f'''
+                AFTER DELETE ON redemptions BEGIN
+                    {redemption_delta('OLD', '-')}
+                END
+            ''',
+        }
+        
+        for name, body in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+    
+    def _rebuild_customer_aggregates(self, cursor, customer_ids: Optional[List[int]] = None) -> int:
+        """คำนวณยอดสะสมของลูกค้าใหม่จากข้อมูลจริง (ทั้งหมด หรือเฉพาะ customer_ids)"""
+        where, params = '', []
+        if customer_ids is not None:
+            if not customer_ids:
+                return 0
+            where = f"WHERE id IN ({', '.join('?' for _ in customer_ids)})"
+            params = list(customer_ids)
+        
+        cursor.execute(f'''
+            UPDATE customers SET
+                active_contract_count = (
+                    SELECT COUNT(*) FROM contracts
+                    WHERE customer_id = customers.id AND status IN ('active', 'forfeited')
+                ),
+                outstanding_principal = (
+                    SELECT COALESCE(SUM(pawn_amount), 0) FROM contracts
+                    WHERE customer_id = customers.id AND status IN ('active', 'forfeited')
+                ),
+                lifetime_redeemed = (
+                    SELECT COALESCE(SUM(r.redemption_amount), 0) FROM redemptions r
+                    JOIN contracts c ON r.contract_id = c.id
+                    WHERE c.customer_id = customers.id
+                ),
+                last_visit = (
+                    SELECT MAX(visit) FROM (
+                        SELECT MAX(start_date) AS visit FROM contracts WHERE customer_id = customers.id
+                        UNION ALL
+                        SELECT MAX(r.renewal_date) FROM renewals r
+                        JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = customers.id
+                        UNION ALL
+                        SELECT MAX(r.redemption_date) FROM redemptions r
+                        JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = customers.id
+                    )
+                )
+            {where}
+        ''', params)
+        return cursor.rowcount
+    
+    def rebuild_customer_aggregates(self) -> int:
+        """คำนวณยอดสะสมของลูกค้าทุกคนใหม่ (ใช้เมื่อสงสัยว่ายอดไม่ตรง) คืนจำนวนลูกค้าที่ปรับ"""
+        with self.write_transaction() as conn:
+            updated = self._rebuild_customer_aggregates(conn.cursor())
+        print(f"Rebuilt aggregates for {updated} customers")
+        return updated
+    
     def _insert_default_settings(self, cursor):
         """เพิ่มการตั้งค่าเริ่มต้น"""
         default_settings = [
@@ -314,6 +908,7 @@ class PawnShopDatabase:
             ('company_phone', ''),
             ('contract_prefix', '53-10-4-'),
             ('customer_prefix', 'C'),
+            ('penalty_per_day', '10'),
         ]
         
         for key, value in default_settings:
@@ -321,10 +916,93 @@ class PawnShopDatabase:
                 INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
             ''', (key, value))
     
+    def run_maintenance(self, time_budget: float = 5.0) -> Dict:
+        """บำรุงรักษาฐานข้อมูล: PRAGMA optimize, ANALYZE, WAL checkpoint และ incremental vacuum
+        
+        แต่ละขั้นตอนจะรันเฉพาะเมื่อยังเหลือเวลาใน time_budget (วินาที)
+        คืน dict สรุปสิ่งที่ทำและพื้นที่ที่ได้คืน
+        """
+        started = time.monotonic()
+        wal_path = self.db_path + "-wal"
+        
+        def remaining():
+            return time_budget - (time.monotonic() - started)
+        
+        def file_size(path):
+            return os.path.getsize(path) if os.path.exists(path) else 0
+        
+        report = {
+            'db_size_before': file_size(self.db_path),
+            'wal_size_before': file_size(wal_path),
+            'steps': [],
+        }
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA page_size")
+            page_size = cursor.fetchone()[0]
+            cursor.execute("PRAGMA freelist_count")
+            report['freelist_before'] = cursor.fetchone()[0]
+            
+            # สถิติสำหรับ query planner (จำกัดจำนวนแถวที่สุ่มเพื่อคุมเวลา)
+            if remaining() > 0:
+                cursor.execute("PRAGMA analysis_limit=1000")
+                cursor.execute("ANALYZE")
+                report['steps'].append('analyze')
+            
+            if remaining() > 0:
+                cursor.execute("PRAGMA optimize")
+                report['steps'].append('optimize')
+            
+            conn.commit()
+            
+            # คืนพื้นที่ทีละชุด จนกว่า freelist จะหมดหรือหมดเวลา
+            # (ไฟล์เดิมที่ยังไม่เปิด incremental vacuum ต้องแปลงด้วย enable_incremental_vacuum ก่อน)
+            cursor.execute("PRAGMA auto_vacuum")
+            incremental = cursor.fetchone()[0] == 2
+            while incremental and remaining() > 0:
+                cursor.execute("PRAGMA freelist_count")
+                if cursor.fetchone()[0] == 0:
+                    break
+                cursor.execute("PRAGMA incremental_vacuum(256)")
+                cursor.fetchall()
+                if 'incremental_vacuum' not in report['steps']:
+                    report['steps'].append('incremental_vacuum')
+            
+            cursor.execute("PRAGMA freelist_count")
+            report['freelist_after'] = cursor.fetchone()[0]
+            
+            if remaining() > 0:
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                busy, log_frames, checkpointed = cursor.fetchone()
+                report['checkpoint'] = {'busy': busy, 'log_frames': log_frames, 'checkpointed': checkpointed}
+                report['steps'].append('wal_checkpoint')
+            
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.execute('''
+                INSERT OR REPLACE INTO settings (key, value, updated_at)
+                VALUES ('last_maintenance_at', ?, CURRENT_TIMESTAMP)
+            ''', (now,))
+            conn.commit()
+        
+        report['db_size_after'] = file_size(self.db_path)
+        report['wal_size_after'] = file_size(wal_path)
+        report['reclaimed_bytes'] = (
+            (report['freelist_before'] - report['freelist_after']) * page_size
+            + max(report['wal_size_before'] - report['wal_size_after'], 0)
+        )
+        report['elapsed'] = round(time.monotonic() - started, 3)
+        
+        print("Database maintenance: {} in {}s, reclaimed {:,} bytes (db {:,} -> {:,}, wal {:,} -> {:,})".format(
+            ", ".join(report['steps']) or "nothing", report['elapsed'], report['reclaimed_bytes'],
+            report['db_size_before'], report['db_size_after'],
+            report['wal_size_before'], report['wal_size_after']
+        ))
+        return report
     
     def add_customer(self, customer_data: Dict) -> int:
         """เพิ่มลูกค้าใหม่"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             # ตรวจสอบความซ้ำซ้อนก่อนเพิ่มข้อมูล
@@ -360,12 +1038,11 @@ class PawnShopDatabase:
             ))
             
             customer_id = cursor.lastrowid
-            conn.commit()
             return customer_id
     
     def add_product(self, product_data: Dict) -> int:
         """เพิ่มสินค้าใหม่"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -389,12 +1066,14 @@ class PawnShopDatabase:
             ))
             
             product_id = cursor.lastrowid
-            conn.commit()
             return product_id
     
     def create_contract(self, contract_data: Dict) -> int:
         """สร้างสัญญาใหม่"""
-        with self.get_connection() as conn:
+        self._validate_date(contract_data['start_date'], 'start_date')
+        self._validate_date(contract_data['end_date'], 'end_date')
+        
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -416,12 +1095,14 @@ class PawnShopDatabase:
             ))
             
             contract_id = cursor.lastrowid
-            conn.commit()
             return contract_id
     
     def update_contract(self, contract_data: Dict) -> int:
         """อัพเดทสัญญา"""
-        with self.get_connection() as conn:
+        self._validate_date(contract_data['start_date'], 'start_date')
+        self._validate_date(contract_data['end_date'], 'end_date')
+        
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -443,7 +1124,6 @@ class PawnShopDatabase:
                 contract_data['id']
             ))
             
-            conn.commit()
             return contract_data['id']
     
     def get_customer_by_id(self, customer_id: int) -> Optional[Dict]:
@@ -459,8 +1139,75 @@ class PawnShopDatabase:
                 return dict(zip(columns, row))
             return None
     
-    def search_customers(self, search_term: str) -> List[Dict]:
-        """ค้นหาลูกค้า - ค้นหาจากชื่อก่อน แล้วตามด้วยนามสกุล, เลขบัตร, และรหัสลูกค้า"""
+    def _fuzzy_customer_matches(self, name: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """[(id ลูกค้า, คะแนน)] ที่ชื่อ/นามสกุลใกล้เคียงกับ name เรียงจากใกล้เคียงที่สุด
+
+        ดัชนีอยู่ในหน่วยความจำ: สร้างจากตาราง customers ครั้งแรก
+        ครั้งต่อไปโหลดใหม่เฉพาะลูกค้าที่มีใน change_log หลังการอัปเดตครั้งก่อน
+        """
+        with self._fuzzy_names_lock:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN')
+                cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+                to_seq = cursor.fetchone()[0]
+
+                if self._fuzzy_names is None:
+                    index = FuzzyNameIndex()
+                    cursor.execute('SELECT id, first_name, last_name FROM customers')
+                    for customer_id, first_name, last_name in cursor.fetchall():
+                        index.add(customer_id, (first_name, last_name))
+                    self._fuzzy_names = index
+                elif to_seq > self._fuzzy_names_seq:
+                    cursor.execute('''
+                        SELECT DISTINCT row_id FROM change_log
+                        WHERE table_name = 'customers' AND seq > ? AND seq <= ?
+                    ''', (self._fuzzy_names_seq, to_seq))
+                    for (customer_id,) in cursor.fetchall():
+                        cursor.execute('SELECT first_name, last_name FROM customers WHERE id = ?', (customer_id,))
+                        row = cursor.fetchone()
+                        if row is None:
+                            self._fuzzy_names.remove(customer_id)
+                        else:
+                            self._fuzzy_names.add(customer_id, row)
+                self._fuzzy_names_seq = to_seq
+
+            return self._fuzzy_names.search(name, limit=limit)
+
+    def search_customers(self, search_term: str, limit: Optional[int] = None, offset: int = 0,
+                         fuzzy: bool = False) -> List[Dict]:
+        """ค้นหาลูกค้า - ค้นหาจากชื่อก่อน แล้วตามด้วยนามสกุล, เลขบัตร, และรหัสลูกค้า
+
+        คำค้นตั้งแต่ 3 ตัวอักษรใช้ดัชนีค้นหาข้อความ (customers_fts) คำที่สั้นกว่าใช้ LIKE
+        fuzzy=True ค้นเฉพาะชื่อ/นามสกุลแบบใกล้เคียง (ทนวรรณยุกต์/สระ/พิมพ์ผิดเล็กน้อย) เรียงจากใกล้เคียงที่สุด
+        limit/offset ใช้ดึงทีละหน้า (ไม่ระบุ limit = ทั้งหมด)
+        """
+        search_term = (search_term or '').strip()
+        if fuzzy and search_term:
+            matches = self._fuzzy_customer_matches(search_term)
+            ids = [customer_id for customer_id, _ in
+                   (matches[offset:offset + limit] if limit is not None else matches[offset:])]
+            if not ids:
+                return []
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM customers WHERE id IN (SELECT value FROM json_each(?))',
+                               (json.dumps(ids),))
+                columns = [description[0] for description in cursor.description]
+                customers = {customer['id']: customer
+                             for customer in (dict(zip(columns, row)) for row in cursor.fetchall())}
+            return [customers[customer_id] for customer_id in ids if customer_id in customers]
+
+        like = f'%{search_term}%'
+        if not search_term:
+            where, where_params = '', []
+        elif self._use_search_index(search_term):
+            where = 'WHERE id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)'
+            where_params = [self._search_index_match('customer_code first_name last_name id_card', search_term)]
+        else:
+            where = 'WHERE first_name LIKE ? OR last_name LIKE ? OR id_card LIKE ? OR customer_code LIKE ?'
+            where_params = [like] * 4
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -475,10 +1222,11 @@ class PawnShopDatabase:
                     ELSE 5
                 END as search_priority
                 FROM customers 
-                WHERE first_name LIKE ? OR last_name LIKE ? OR id_card LIKE ? OR customer_code LIKE ?
-                ORDER BY search_priority, first_name, last_name
-            ''', (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%', f'%{search_term}%',
-                  f'%{search_term}%', f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+                {}
+                ORDER BY search_priority, first_name, last_name, id
+                {}
+            '''.format(where, 'LIMIT ? OFFSET ?' if limit is not None else ''),
+                [like] * 4 + where_params + ([limit, offset] if limit is not None else []))
             
             rows = cursor.fetchall()
             
@@ -488,15 +1236,29 @@ class PawnShopDatabase:
                 return [dict(zip(columns[:-1], row[:-1])) for row in rows]
             return []
     
-    def search_products(self, search_term: str) -> List[Dict]:
-        """ค้นหาสินค้า"""
+    def search_products(self, search_term: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """ค้นหาสินค้าจากชื่อ ยี่ห้อ ซีเรียล หรือ IMEI (ใหม่สุดก่อน) limit/offset ใช้ดึงทีละหน้า"""
+        search_term = (search_term or '').strip()
+        if not search_term:
+            where, params = '', []
+        elif self._use_search_index(search_term):
+            where = 'WHERE id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)'
+            params = [self._search_index_match('name brand serial_number imei1 imei2', search_term)]
+        else:
+            where = 'WHERE name LIKE ? OR brand LIKE ? OR serial_number LIKE ? OR imei1 LIKE ? OR imei2 LIKE ?'
+            params = [f'%{search_term}%'] * 5
+        if limit is not None:
+            params += [limit, offset]
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 SELECT * FROM products 
-                WHERE name LIKE ? OR brand LIKE ? OR serial_number LIKE ?
-            ''', (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+                {}
+                ORDER BY created_at DESC, id DESC
+                {}
+            '''.format(where, 'LIMIT ? OFFSET ?' if limit is not None else ''), params)
             
             rows = cursor.fetchall()
             
@@ -505,6 +1267,49 @@ class PawnShopDatabase:
                 return [dict(zip(columns, row)) for row in rows]
             return []
     
+    def find_products_by_code(self, code: str) -> Dict:
+        """ค้นสินค้าจากรหัสที่สแกน (ซีเรียล, IMEI1 หรือ IMEI2 ตรงตัว) ผ่านดัชนีของแต่ละคอลัมน์
+
+        คืน {'products': สินค้าที่ตรง (ใหม่สุดก่อน), 'contract': สัญญาที่ยังไม่ปิดของสินค้าเหล่านั้น หรือ None}
+        """
+        code = (code or '').strip()
+        if not code:
+            return {'products': [], 'contract': None}
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT * FROM products
+                WHERE id IN (
+                    SELECT id FROM products WHERE serial_number = ? COLLATE NOCASE
+                    UNION SELECT id FROM products WHERE imei1 = ?
+                    UNION SELECT id FROM products WHERE imei2 = ?
+                )
+                ORDER BY created_at DESC, id DESC
+            ''', (code, code, code))
+            columns = [description[0] for description in cursor.description]
+            products = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+            contract = None
+            if products:
+                product_ids = [product['id'] for product in products]
+                cursor.execute('''
+                    SELECT c.*, cu.first_name, cu.last_name, cu.id_card, p.name AS product_name
+                    FROM contracts c
+                    JOIN customers cu ON c.customer_id = cu.id
+                    JOIN products p ON c.product_id = p.id
+                    WHERE c.product_id IN ({}) AND c.status IN ('active', 'forfeited')
+                    ORDER BY c.created_at DESC, c.id DESC
+                    LIMIT 1
+                '''.format(','.join('?' * len(product_ids))), product_ids)
+                row = cursor.fetchone()
+                if row:
+                    columns = [description[0] for description in cursor.description]
+                    contract = dict(zip(columns, row))
+
+        return {'products': products, 'contract': contract}
+
     def get_contract_by_number(self, contract_number: str) -> Optional[Dict]:
         """ดึงข้อมูลสัญญาตามเลขที่สัญญา"""
         with self.get_connection() as conn:
@@ -526,71 +1331,178 @@ class PawnShopDatabase:
             return None
     
     def search_contracts(self, search_term: str, status: str = 'all') -> List[Dict]:
-        """ค้นหาสัญญา (legacy function - ใช้ฟังก์ชันใหม่แทน)"""
-        # เรียกใช้ฟังก์ชันใหม่ตามประเภทการค้นหา
-        return self.search_contracts_by_number(search_term, status)
-
-    def search_contracts_by_number(self, contract_number: str, status: str = 'all') -> List[Dict]:
-        """ค้นหาสัญญาตามเลขที่สัญญา"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # สร้าง query ตามสถานะ
-            if status == 'all':
-                status_condition = ""
+        """ค้นหาสัญญาด้วยคำค้นอิสระ (ดู filter_contracts)"""
+        return self.filter_contracts({'text': search_term, 'status': status})
+    
+    # เงื่อนไขของตัวกรองสัญญา: ชื่อ criteria -> (SQL, จำนวนพารามิเตอร์, รูปแบบค่า)
+    # รูปแบบค่า: 'like' = %ค่า%, 'exact' = ค่าตรงตัว
+    CONTRACT_FILTERS = {
+        'contract_number': ('c.contract_number LIKE ?', 1, 'like'),
+        'contract_number_exact': ('c.contract_number = ?', 1, 'exact'),
+        'id_card': ('cu.id_card LIKE ?', 1, 'like'),
+        'id_card_exact': ('cu.id_card = ?', 1, 'exact'),
+        'first_name': ('cu.first_name LIKE ?', 1, 'like'),
+        'last_name': ('cu.last_name LIKE ?', 1, 'like'),
+        'phone': ('cu.phone LIKE ?', 1, 'like'),
+        'phone_exact': ("REPLACE(REPLACE(cu.phone, '-', ''), ' ', '') = ?", 1, 'exact'),
+        'imei': ('(p.imei1 LIKE ? OR p.imei2 LIKE ?)', 2, 'like'),
+        'imei_exact': ('(p.imei1 = ? OR p.imei2 = ?)', 2, 'exact'),
+        'start_date_from': ('c.start_date >= ?', 1, 'exact'),
+        'start_date_to': ('c.start_date <= ?', 1, 'exact'),
+        'end_date_from': ('c.end_date >= ?', 1, 'exact'),
+        'end_date_to': ('c.end_date <= ?', 1, 'exact'),
+        'min_amount': ('c.pawn_amount >= ?', 1, 'exact'),
+        'max_amount': ('c.pawn_amount <= ?', 1, 'exact'),
+    }
+    
+    # คำค้นอิสระ: ตรงกับเลขที่สัญญา ชื่อ นามสกุล เลขบัตร โทรศัพท์ ชื่อสินค้า ยี่ห้อ หรือ IMEI
+    CONTRACT_TEXT_FILTER = (
+        '(c.contract_number LIKE ? OR cu.first_name LIKE ? OR cu.last_name LIKE ? OR cu.id_card LIKE ?'
+        ' OR cu.phone LIKE ? OR p.name LIKE ? OR p.brand LIKE ? OR p.imei1 LIKE ? OR p.imei2 LIKE ?)', 9
+    )
+    # คำค้นอิสระแบบใช้ดัชนีค้นหาข้อความ (คอลัมน์เดียวกับ CONTRACT_TEXT_FILTER)
+    CONTRACT_TEXT_INDEX_FILTER = '''(
+        c.id IN (SELECT rowid FROM contracts_fts WHERE contracts_fts MATCH ?)
+        OR c.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)
+        OR c.product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)
+    )'''
+    CONTRACT_TEXT_INDEX_COLUMNS = ('contract_number', 'first_name last_name id_card phone', 'name brand imei1 imei2')
+    CONTRACT_NAME_INDEX_FILTER = 'c.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)'
+    # ชื่อแบบใกล้เคียง: id ลูกค้าจากดัชนีในหน่วยความจำ ส่งเป็น JSON array พารามิเตอร์เดียว
+    CONTRACT_FUZZY_NAME_FILTER = 'c.customer_id IN (SELECT value FROM json_each(?))'
+    
+    # ลำดับผลลัพธ์ของ filter_contracts
+    CONTRACT_ORDERS = {
+        'created': 'c.created_at DESC, c.id DESC',
+        'end_date': 'c.end_date DESC, c.id DESC',
+    }
+    
+    # SQL ที่สร้างแล้วตามรูปแบบตัวกรอง (ชื่อ criteria ที่ใช้ + จำนวนคำ/สถานะ)
+    _contract_filter_sql_cache: Dict[Tuple, str] = {}
+    
+    def _normalize_contract_criteria(self, criteria: Dict) -> Dict:
+        """ตัดค่าว่างออกและเลือกการเทียบแบบตรงตัวเมื่อใช้ดัชนีได้"""
+        normalized = {}
+        for key, value in criteria.items():
+            if value is None or value == '' or value == [] or (key == 'status' and value == 'all'):
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    continue
+            normalized[key] = value
+        
+        # เลขบัตร 13 หลัก / IMEI 15 หลักครบ -> เทียบตรงตัวเพื่อใช้ดัชนี
+        id_card = normalized.get('id_card')
+        if isinstance(id_card, str) and len(id_card) == 13 and id_card.isdigit():
+            normalized['id_card_exact'] = normalized.pop('id_card')
+        imei = normalized.get('imei')
+        if isinstance(imei, str) and len(imei) == 15 and imei.isdigit():
+            normalized['imei_exact'] = normalized.pop('imei')
+        
+        for key in ('start_date_from', 'start_date_to', 'end_date_from', 'end_date_to'):
+            if key in normalized:
+                self._validate_date(normalized[key], key)
+        
+        unknown = set(normalized) - set(self.CONTRACT_FILTERS) - {'text', 'name', 'name_fuzzy', 'status'}
+        if unknown:
+            raise ValueError(f"ไม่รู้จักเงื่อนไขการค้นหา: {', '.join(sorted(unknown))}")
+        return normalized
+    
+    def _build_contract_filter_sql(self, shape: Tuple) -> str:
+        """สร้าง SQL สำหรับรูปแบบตัวกรอง (เรียกครั้งเดียวต่อรูปแบบ)"""
+        keys, text_indexed, name_indexed, name_fuzzy, status_count, order, limited = shape
+        conditions = [self.CONTRACT_FILTERS[key][0] for key in keys]
+        conditions += [self.CONTRACT_TEXT_INDEX_FILTER if indexed else self.CONTRACT_TEXT_FILTER[0]
+                       for indexed in text_indexed]
+        conditions += [self.CONTRACT_NAME_INDEX_FILTER if indexed else '(cu.first_name LIKE ? OR cu.last_name LIKE ?)'
+                       for indexed in name_indexed]
+        if name_fuzzy:
+            conditions.append(self.CONTRACT_FUZZY_NAME_FILTER)
+        if status_count == 1:
+            conditions.append('c.status = ?')
+        elif status_count > 1:
+            conditions.append(f"c.status IN ({', '.join('?' for _ in range(status_count))})")
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return f'''
+            SELECT c.*, cu.first_name, cu.last_name, cu.id_card, cu.phone,
+                   p.name as product_name, p.brand, p.imei1, p.imei2
+            FROM contracts c
+            JOIN customers cu ON c.customer_id = cu.id
+            JOIN products p ON c.product_id = p.id
+            {where}
+            ORDER BY {self.CONTRACT_ORDERS[order]}
+            {'LIMIT ? OFFSET ?' if limited else ''}
+        '''
+    
+    def filter_contracts(self, criteria: Dict, limit: Optional[int] = None, offset: int = 0,
+                         order: str = 'created') -> List[Dict]:
+        """ค้นหาสัญญาตามเงื่อนไขหลายอย่างพร้อมกัน (ทุกเงื่อนไขต้องตรง)
+        
+        criteria (ใส่เฉพาะที่ต้องการ):
+            text             คำค้นอิสระ แยกคำด้วยช่องว่าง (เลขที่สัญญา/ชื่อ/นามสกุล/เลขบัตร/โทรศัพท์/IMEI)
+            contract_number, id_card, first_name, last_name, phone, imei  ค้นหาบางส่วน
+            contract_number_exact, id_card_exact, imei_exact             ตรงตัว
+            phone_exact      เบอร์โทรตัวเลขล้วนตรงตัว (ไม่สนขีด/ช่องว่างที่บันทึกไว้)
+            name             ชื่อและ/หรือนามสกุล แยกคำด้วยช่องว่าง
+            name_fuzzy       ชื่อและ/หรือนามสกุลแบบใกล้เคียง (ทนวรรณยุกต์/สระ/พิมพ์ผิดเล็กน้อย)
+            status           'all', สถานะเดียว หรือ list ของสถานะ
+            start_date_from, start_date_to, end_date_from, end_date_to   YYYY-MM-DD
+            min_amount, max_amount                                        เงินต้น
+        
+        คำค้นใน text/name ที่ยาวตั้งแต่ 3 ตัวอักษรใช้ดัชนีค้นหาข้อความ ช่วงวันที่ใช้ดัชนีของคอลัมน์วันที่
+        order: 'created' (สร้างล่าสุดก่อน) หรือ 'end_date' (ครบกำหนดล่าสุดก่อน)
+        """
+        if order not in self.CONTRACT_ORDERS:
+            raise ValueError(f"ไม่รู้จักการเรียงลำดับ: {order}")
+        criteria = self._normalize_contract_criteria(criteria)
+        
+        keys = tuple(key for key in self.CONTRACT_FILTERS if key in criteria)
+        text_words = criteria.get('text', '').split() if 'text' in criteria else []
+        name_words = criteria.get('name', '').split() if 'name' in criteria else []
+        statuses = criteria.get('status', [])
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        
+        params = []
+        for key in keys:
+            _, count, style = self.CONTRACT_FILTERS[key]
+            value = f"%{criteria[key]}%" if style == 'like' else criteria[key]
+            params.extend([value] * count)
+        text_indexed = tuple(self._use_search_index(word) for word in text_words)
+        for word, indexed in zip(text_words, text_indexed):
+            if indexed:
+                params.extend(self._search_index_match(columns, word)
+                              for columns in self.CONTRACT_TEXT_INDEX_COLUMNS)
             else:
-                status_condition = "AND c.status = ?"
-            
-            query = f'''
-                SELECT c.*, cu.first_name, cu.last_name, cu.id_card, p.name as product_name
-                FROM contracts c
-                JOIN customers cu ON c.customer_id = cu.id
-                JOIN products p ON c.product_id = p.id
-                WHERE c.contract_number LIKE ?
-                {status_condition}
-                ORDER BY c.created_at DESC
-            '''
-            
-            search_pattern = f"%{contract_number}%"
-            if status == 'all':
-                cursor.execute(query, (search_pattern,))
+                params.extend([f"%{word}%"] * self.CONTRACT_TEXT_FILTER[1])
+        name_indexed = tuple(self._use_search_index(word) for word in name_words)
+        for word, indexed in zip(name_words, name_indexed):
+            if indexed:
+                params.append(self._search_index_match('first_name last_name', word))
             else:
-                cursor.execute(query, (search_pattern, status))
-            
-            rows = cursor.fetchall()
-            
-            if rows:
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
-            return []
-
-    def search_contracts_by_id_card(self, id_card: str, status: str = 'all') -> List[Dict]:
-        """ค้นหาสัญญาตามเลขบัตรประชาชน"""
+                params.extend([f"%{word}%"] * 2)
+        name_fuzzy = 'name_fuzzy' in criteria
+        if name_fuzzy:
+            customer_ids = [customer_id for customer_id, _ in
+                            self._fuzzy_customer_matches(criteria['name_fuzzy'], limit=FUZZY_NAME_CUSTOMER_LIMIT)]
+            if not customer_ids:
+                return []
+            params.append(json.dumps(customer_ids))
+        params.extend(statuses)
+        if limit is not None:
+            params.extend([limit, offset])
+        
+        shape = (keys, text_indexed, name_indexed, name_fuzzy, len(statuses), order, limit is not None)
+        query = self._contract_filter_sql_cache.get(shape)
+        if query is None:
+            query = self._build_contract_filter_sql(shape)
+            self._contract_filter_sql_cache[shape] = query
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # สร้าง query ตามสถานะ
-            if status == 'all':
-                status_condition = ""
-            else:
-                status_condition = "AND c.status = ?"
-            
-            query = f'''
-                SELECT c.*, cu.first_name, cu.last_name, cu.id_card, p.name as product_name
-                FROM contracts c
-                JOIN customers cu ON c.customer_id = cu.id
-                JOIN products p ON c.product_id = p.id
-                WHERE cu.id_card LIKE ?
-                {status_condition}
-                ORDER BY c.created_at DESC
-            '''
-            
-            search_pattern = f"%{id_card}%"
-            if status == 'all':
-                cursor.execute(query, (search_pattern,))
-            else:
-                cursor.execute(query, (search_pattern, status))
-            
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
             if rows:
@@ -598,62 +1510,79 @@ class PawnShopDatabase:
                 return [dict(zip(columns, row)) for row in rows]
             return []
 
-    def search_contracts_by_name(self, first_name: str = "", last_name: str = "", status: str = 'all') -> List[Dict]:
-        """ค้นหาสัญญาตามชื่อและนามสกุล"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # สร้าง query ตามสถานะ
-            if status == 'all':
-                status_condition = ""
-            else:
-                status_condition = "AND c.status = ?"
-            
-            # สร้างเงื่อนไขการค้นหาตามชื่อ
-            name_conditions = []
-            params = []
-            
-            if first_name:
-                name_conditions.append("cu.first_name LIKE ?")
-                params.append(f"%{first_name}%")
-            
-            if last_name:
-                name_conditions.append("cu.last_name LIKE ?")
-                params.append(f"%{last_name}%")
-            
-            if not name_conditions:
-                # ถ้าไม่มีการกรอกชื่อใดๆ ให้ค้นหาทั้งหมด
-                name_conditions.append("1=1")
-            
-            name_condition = " AND ".join(name_conditions)
-            
-            query = f'''
-                SELECT c.*, cu.first_name, cu.last_name, cu.id_card, p.name as product_name
-                FROM contracts c
-                JOIN customers cu ON c.customer_id = cu.id
-                JOIN products p ON c.product_id = p.id
-                WHERE {name_condition}
-                {status_condition}
-                ORDER BY c.created_at DESC
-            '''
-            
-            if status == 'all':
-                cursor.execute(query, params)
-            else:
-                params.append(status)
-                cursor.execute(query, params)
-            
-            rows = cursor.fetchall()
-            
-            if rows:
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+    # การตีความคำค้นของ quick_search -> ชื่อ criteria ของ filter_contracts
+    QUICK_SEARCH_CRITERIA = {
+        QUERY_CONTRACT: 'contract_number_exact',
+        QUERY_ID_CARD: 'id_card_exact',
+        QUERY_IMEI: 'imei_exact',
+        QUERY_PHONE: 'phone_exact',
+        QUERY_TEXT: 'text',
+    }
+    # คอลัมน์ที่ส่งกลับในรายการผลลัพธ์ (รายละเอียดเต็มโหลดเมื่อเลือก)
+    QUICK_SEARCH_COLUMNS = ('id', 'contract_number', 'status', 'start_date', 'end_date', 'pawn_amount',
+                            'first_name', 'last_name', 'id_card', 'phone', 'product_name', 'brand', 'imei1')
+
+    def quick_search(self, query: str, status='all', limit: int = QUICK_SEARCH_LIMIT) -> List[Dict]:
+        """ค้นสัญญาจากช่องค้นหาด่วน: แยกประเภทคำค้น (omnibox.classify_query) แล้วค้นทุกแบบพร้อมกัน
+
+        คืนรายการย่อของสัญญา เรียงตามความตรง (rank) แล้วตามวันที่สร้างล่าสุด
+        แต่ละแถวมี match_kind และ match_rank บอกว่าตรงด้วยการตีความแบบใด
+        """
+        parts = classify_query(query)
+        if not parts:
             return []
-    
-    
+
+        def run(part):
+            criteria = {self.QUICK_SEARCH_CRITERIA[part.kind]: part.value, 'status': status}
+            return part, self.filter_contracts(criteria, limit=limit)
+
+        # แต่ละแบบใช้ connection ของตัวเอง (WAL อ่านพร้อมกันได้)
+        if len(parts) == 1:
+            results = [run(parts[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+                results = list(executor.map(run, parts))
+
+        best = {}
+        for part, contracts in results:
+            for contract in contracts:
+                current = best.get(contract['id'])
+                if current is None or part.rank < current['match_rank']:
+                    row = {column: contract.get(column) for column in self.QUICK_SEARCH_COLUMNS}
+                    row['match_kind'] = part.kind
+                    row['match_rank'] = part.rank
+                    row['created_at'] = contract.get('created_at') or ''
+                    best[contract['id']] = row
+
+        rows = sorted(best.values(), key=lambda row: (row['created_at'], row['id']), reverse=True)
+        rows.sort(key=lambda row: row['match_rank'])
+        return rows[:limit]
+
+    def search_contracts_by_name(self, name: str, status='all', fuzzy: bool = False,
+                                 limit: Optional[int] = None) -> List[Dict]:
+        """ค้นหาสัญญาจากชื่อและ/หรือนามสกุลของลูกค้า (สร้างล่าสุดก่อน)
+
+        fuzzy=True ค้นแบบใกล้เคียง เรียงตามความใกล้เคียงของชื่อลูกค้า แล้วตามวันที่สร้างล่าสุด
+        """
+        if not fuzzy:
+            return self.filter_contracts({'name': name, 'status': status}, limit=limit)
+
+        matches = self._fuzzy_customer_matches(name, limit=FUZZY_NAME_CUSTOMER_LIMIT)
+        if not matches:
+            return []
+        rank = {customer_id: position for position, (customer_id, _) in enumerate(matches)}
+        contracts = self.filter_contracts({'name_fuzzy': name, 'status': status})
+        contracts.sort(key=lambda contract: rank.get(contract['customer_id'], len(rank)))
+        return contracts[:limit] if limit is not None else contracts
+
     def add_renewal(self, renewal_data: Dict) -> int:
         """เพิ่มการต่อดอก"""
-        with self.get_connection() as conn:
+        renewal_date = self._validate_date(
+            renewal_data.get('renewal_date', datetime.now().strftime("%Y-%m-%d")), 'renewal_date'
+        )
+        self._validate_date(renewal_data.get('new_due_date'), 'new_due_date')
+        
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             # ค้นหา contract_id จาก contract_number
@@ -695,34 +1624,41 @@ class PawnShopDatabase:
                 renewal_data.get('penalty_amount', 0),
                 renewal_data.get('discount_amount', 0),
                 renewal_data.get('total_amount', 0),
-                renewal_data.get('renewal_date', datetime.now().strftime("%Y-%m-%d")),
+                renewal_date,
                 current_due_date,
                 renewal_data.get('new_due_date'),
                 renewal_data.get('extension_days', 0)
             ))
             
             renewal_id = cursor.lastrowid
-            conn.commit()
             return renewal_id
     
     def update_contract_due_date(self, contract_id: int, new_due_date: str) -> bool:
         """อัปเดตวันที่ครบกำหนดใหม่ในสัญญา"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            try:
+        self._validate_date(new_due_date, 'new_due_date')
+        today = datetime.now().strftime("%Y-%m-%d")
+        try:
+            with self.write_transaction() as conn:
+                cursor = conn.cursor()
+                # ถ้าต่อดอกสัญญาที่หลุดแล้วและวันครบกำหนดใหม่ยังไม่ผ่าน ให้กลับเป็น active
                 cursor.execute('''
-                    UPDATE contracts SET end_date = ? WHERE id = ?
-                ''', (new_due_date, contract_id))
+                    UPDATE contracts SET
+                        end_date = ?,
+                        status = CASE WHEN status = 'forfeited' AND ? >= ? THEN 'active' ELSE status END,
+                        forfeited_at = CASE WHEN status = 'forfeited' AND ? >= ? THEN NULL ELSE forfeited_at END
+                    WHERE id = ?
+                ''', (new_due_date, new_due_date, today, new_due_date, today, contract_id))
                 
-                conn.commit()
                 return True
-            except Exception as e:
-                print(f"Error updating contract due date: {e}")
-                return False
+        except sqlite3.OperationalError:
+            # ฐานข้อมูลถูกล็อก/ลองใหม่ครบแล้ว: ส่งต่อให้หน้าจอแจ้งผู้ใช้ ไม่ตอบ False เงียบ ๆ
+            raise
+        except Exception as e:
+            print(f"Error updating contract due date: {e}")
+            return False
     
-    def get_renewals_by_contract(self, contract_id: int) -> List[Dict]:
-        """ดึงข้อมูลการต่อดอกตามสัญญา"""
+    def get_renewals_by_contract_id(self, contract_id: int) -> List[Dict]:
+        """ดึงข้อมูลการต่อดอกตาม ID สัญญา"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -766,7 +1702,11 @@ class PawnShopDatabase:
     
     def redeem_contract(self, redemption_data: Dict) -> int:
         """ไถ่คืนสัญญา"""
-        with self.get_connection() as conn:
+        self._validate_date(redemption_data['redemption_date'], 'redemption_date')
+        self._validate_date(redemption_data.get('deposit_date'), 'deposit_date', required=False)
+        self._validate_date(redemption_data.get('due_date'), 'due_date', required=False)
+        
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             # เพิ่มข้อมูลการไถ่คืน
@@ -795,9 +1735,24 @@ class PawnShopDatabase:
             ''', (redemption_data['contract_id'],))
             
             redemption_id = cursor.lastrowid
-            conn.commit()
             return redemption_id
     
+    def get_data_summary(self) -> Dict:
+        """จำนวนลูกค้า สินค้า สัญญา (แยกสถานะ) และยอดรวม สำหรับหน้ารายงานสรุป"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT (SELECT COUNT(*) FROM customers), (SELECT COUNT(*) FROM products),
+                       COUNT(*), COALESCE(SUM(status IN ('active', 'forfeited')), 0),
+                       COALESCE(SUM(status = 'forfeited'), 0), COALESCE(SUM(status = 'redeemed'), 0),
+                       COALESCE(SUM(pawn_amount), 0), COALESCE(SUM(total_redemption), 0)
+                FROM contracts
+            ''')
+            # active_count = สัญญาที่ยังเปิด (รวมที่หลุดจำนำ) forfeited_count = เฉพาะที่หลุดจำนำ
+            keys = ('customer_count', 'product_count', 'contract_count', 'active_count', 'forfeited_count',
+                    'redeemed_count', 'total_pawn', 'total_redemption')
+            return dict(zip(keys, cursor.fetchone()))
+    
     def get_daily_summary(self, date: str) -> Dict:
         """สรุปรายวัน"""
         with self.get_connection() as conn:
@@ -806,28 +1761,28 @@ class PawnShopDatabase:
             # สัญญาใหม่
             cursor.execute('''
                 SELECT COUNT(*), SUM(pawn_amount) FROM contracts 
-                WHERE DATE(start_date) = ?
+                WHERE start_date = ?
             ''', (date,))
             new_contracts = cursor.fetchone()
             
             # การไถ่คืน
             cursor.execute('''
                 SELECT COUNT(*), SUM(redemption_amount) FROM redemptions 
-                WHERE DATE(redemption_date) = ?
+                WHERE redemption_date = ?
             ''', (date,))
             redemptions = cursor.fetchone()
             
             # การชำระดอกเบี้ย
             cursor.execute('''
                 SELECT COUNT(*), SUM(total_amount) FROM interest_payments 
-                WHERE DATE(payment_date) = ?
+                WHERE payment_date = ?
             ''', (date,))
             interest_payments = cursor.fetchone()
             
             # การต่อดอก
             cursor.execute('''
                 SELECT COUNT(*), SUM(total_amount) FROM renewals 
-                WHERE DATE(renewal_date) = ?
+                WHERE renewal_date = ?
             ''', (date,))
             renewals = cursor.fetchone()
             
@@ -842,6 +1797,70 @@ class PawnShopDatabase:
                 'renewals_count': renewals[0] or 0,
                 'renewals_amount': renewals[1] or 0
             }
+
+    def get_outstanding_summary(self, as_of: str) -> Dict:
+        """ยอดเงินต้นคงค้างของสัญญาที่ยังไม่ไถ่ (active/forfeited) และอายุหนี้เกินกำหนด ณ วันที่ as_of
+
+        ช่วงอายุเกินกำหนด: 1-30, 31-60, 61-90 และมากกว่า 90 วัน
+        """
+        self._validate_date(as_of, 'as_of')
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT
+                    COUNT(*),
+                    SUM(pawn_amount),
+                    SUM(CASE WHEN overdue_days BETWEEN 1 AND 30 THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN overdue_days BETWEEN 1 AND 30 THEN pawn_amount ELSE 0 END),
+                    SUM(CASE WHEN overdue_days BETWEEN 31 AND 60 THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN overdue_days BETWEEN 31 AND 60 THEN pawn_amount ELSE 0 END),
+                    SUM(CASE WHEN overdue_days BETWEEN 61 AND 90 THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN overdue_days BETWEEN 61 AND 90 THEN pawn_amount ELSE 0 END),
+                    SUM(CASE WHEN overdue_days > 90 THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN overdue_days > 90 THEN pawn_amount ELSE 0 END)
+                FROM (
+                    SELECT pawn_amount,
+                           CAST(julianday(?) - julianday(end_date) AS INTEGER) AS overdue_days
+                    FROM contracts
+                    WHERE status IN ('active', 'forfeited') AND start_date <= ?
+                )
+            ''', (as_of, as_of))
+            row = cursor.fetchone()
+
+            buckets = ['1_30', '31_60', '61_90', 'over_90']
+            aging = {}
+            for i, bucket in enumerate(buckets):
+                aging[bucket] = {
+                    'count': row[2 + i * 2] or 0,
+                    'amount': row[3 + i * 2] or 0,
+                }
+
+            return {
+                'as_of': as_of,
+                'outstanding_count': row[0] or 0,
+                'outstanding_principal': row[1] or 0,
+                'overdue_aging': aging,
+            }
+
+    def get_contract_columns(self, statuses: Tuple[str, ...] = ('active', 'forfeited')) -> Dict[str, list]:
+        """ดึงสัญญาตามสถานะแบบคอลัมน์ (dict ของ list) สำหรับคำนวณทั้งพอร์ตพร้อมกัน"""
+        placeholders = ', '.join('?' for _ in statuses)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, contract_number, customer_id, status, pawn_amount,
+                       total_redemption, start_date, end_date
+                FROM contracts
+                WHERE status IN ({placeholders})
+                ORDER BY id
+            ''', statuses)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+            
+            values = list(zip(*rows)) if rows else [()] * len(columns)
+            return {column: list(value) for column, value in zip(columns, values)}
     
     def get_expiring_contracts(self, days: int = 7) -> List[Dict]:
         """ดึงสัญญาที่ใกล้ครบกำหนด"""
@@ -853,7 +1872,7 @@ class PawnShopDatabase:
                 FROM contracts c
                 JOIN customers cu ON c.customer_id = cu.id
                 JOIN products p ON c.product_id = p.id
-                WHERE c.status = 'active' 
+                WHERE c.status IN ('active', 'forfeited')
                 AND c.end_date BETWEEN DATE('now') AND DATE('now', '+' || ? || ' days')
                 ORDER BY c.end_date
             ''', (days,))
@@ -865,8 +1884,51 @@ class PawnShopDatabase:
                 return [dict(zip(columns, row)) for row in rows]
             return []
     
+    def sweep_forfeited_contracts(self) -> List[Dict]:
+        """ทำเครื่องหมายสัญญาที่เลยกำหนดเป็น 'forfeited' และคืนรายการที่หลุดใหม่
+        
+        ตรวจสัญญา active ทุกสัญญาที่ครบกำหนดก่อนวันนี้ผ่านดัชนี (status, end_date)
+        จึงรวมสัญญาที่กลับมาเป็น active ด้วยวันครบกำหนดเก่า (บันทึกย้อนหลัง นำเข้าจากสาขา หรือแก้สถานะเอง)
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id FROM contracts
+                WHERE status = 'active' AND end_date < ?
+            ''', (today,))
+            
+            contract_ids = [r[0] for r in cursor.fetchall()]
+            if not contract_ids:
+                return []
+            
+            cursor.executemany('''
+                UPDATE contracts SET status = 'forfeited', forfeited_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'active'
+            ''', [(contract_id,) for contract_id in contract_ids])
+            
+            placeholders = ','.join('?' * len(contract_ids))
+            cursor.execute(f'''
+                SELECT c.*, cu.first_name, cu.last_name, cu.phone, cu.id_card,
+                       p.name as product_name, p.brand as product_brand
+                FROM contracts c
+                JOIN customers cu ON c.customer_id = cu.id
+                JOIN products p ON c.product_id = p.id
+                WHERE c.id IN ({placeholders})
+                ORDER BY c.end_date DESC
+            ''', contract_ids)
+            
+            rows = cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in rows]
+    
     def get_forfeited_contracts(self) -> List[Dict]:
-        """ดึงสัญญาที่หลุดจำนำ (ครบกำหนดแล้วแต่ยังไม่ได้ไถ่คืน)"""
+        """ดึงสัญญาที่หลุดจำนำ (ครบกำหนดแล้วแต่ยังไม่ได้ไถ่คืน)
+        
+        อ่านอย่างเดียว: สถานะ forfeited ถูกตั้งโดย sweep_forfeited_contracts ตอนเปิดโปรแกรมและใน Data Viewer
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -876,8 +1938,7 @@ class PawnShopDatabase:
                 FROM contracts c
                 JOIN customers cu ON c.customer_id = cu.id
                 JOIN products p ON c.product_id = p.id
-                WHERE c.status = 'active' 
-                AND DATE(c.end_date) < DATE('now')
+                WHERE c.status = 'forfeited'
                 ORDER BY c.end_date DESC
             ''')
             
@@ -888,6 +1949,131 @@ class PawnShopDatabase:
                 return [dict(zip(columns, row)) for row in rows]
             return []
     
+    def get_fee_rates(self, active_only: bool = True) -> List[Dict]:
+        """ดึงตารางอัตราค่าธรรมเนียม เรียงตามจำนวนวัน"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            query = 'SELECT id, days_count, fee_rate, description, is_active FROM fee_rates'
+            if active_only:
+                query += ' WHERE is_active = 1'
+            cursor.execute(query + ' ORDER BY days_count')
+            
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def set_fee_rate(self, days_count: int, fee_rate: float, description: str = '', is_active: bool = True):
+        """เพิ่มหรือแก้ไขอัตราค่าธรรมเนียม (ดอกเบี้ย % ต่อเดือน) สำหรับสัญญาตั้งแต่ days_count วันขึ้นไป"""
+        if days_count < 0:
+            raise ValueError("จำนวนวันต้องไม่ติดลบ")
+        if fee_rate < 0:
+            raise ValueError("อัตราค่าธรรมเนียมต้องไม่ติดลบ")
+        
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO fee_rates (days_count, fee_rate, description, is_active)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(days_count) DO UPDATE SET
+                    fee_rate = excluded.fee_rate,
+                    description = excluded.description,
+                    is_active = excluded.is_active,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (days_count, fee_rate, description, 1 if is_active else 0))
+        self._invalidate_fee_schedule()
+    
+    def delete_fee_rate(self, days_count: int) -> bool:
+        """ลบอัตราค่าธรรมเนียมของ days_count"""
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM fee_rates WHERE days_count = ?', (days_count,))
+            deleted = cursor.rowcount > 0
+        self._invalidate_fee_schedule()
+        return deleted
+    
+    def replace_fee_rates(self, rows: Dict[int, tuple], penalty_per_day: float) -> bool:
+        """แทนตารางอัตราทั้งตาราง ({days_count: (fee_rate, description)}) และค่าปรับต่อวันในธุรกรรมเดียว
+        
+        เขียนเฉพาะแถวที่เปลี่ยน ถ้าตารางเปลี่ยน fee_rates_version เพิ่มขึ้นเพียง 1
+        คืน True ถ้ามีการเปลี่ยนแปลง
+        """
+        # ผ่าน RPC (JSON) คีย์จะกลายเป็นสตริงและ tuple เป็น list
+        rows = {int(days_count): (float(fee_rate), description or '')
+                for days_count, (fee_rate, description) in rows.items()}
+        penalty_per_day = float(penalty_per_day)
+        for days_count, (fee_rate, _description) in rows.items():
+            if days_count < 0:
+                raise ValueError("จำนวนวันต้องไม่ติดลบ")
+            if fee_rate < 0:
+                raise ValueError("อัตราค่าธรรมเนียมต้องไม่ติดลบ")
+        if penalty_per_day < 0:
+            raise ValueError("ค่าปรับต่อวันต้องไม่ติดลบ")
+        
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM settings WHERE key = 'fee_rates_version'")
+            row = cursor.fetchone()
+            version = int(row[0]) if row else 0
+            
+            cursor.execute('SELECT days_count, fee_rate, description, is_active FROM fee_rates')
+            existing = {days_count: (fee_rate, description or '', is_active)
+                        for days_count, fee_rate, description, is_active in cursor.fetchall()}
+            
+            stale = [(days_count,) for days_count in existing.keys() - rows.keys()]
+            changed = [
+                (days_count, fee_rate, description)
+                for days_count, (fee_rate, description) in rows.items()
+                if existing.get(days_count) != (fee_rate, description, 1)
+            ]
+            cursor.executemany('DELETE FROM fee_rates WHERE days_count = ?', stale)
+            cursor.executemany('''
+                INSERT INTO fee_rates (days_count, fee_rate, description, is_active)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT(days_count) DO UPDATE SET
+                    fee_rate = excluded.fee_rate,
+                    description = excluded.description,
+                    is_active = 1,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', changed)
+            if stale or changed:
+                # trigger เพิ่มเวอร์ชันทีละแถว: ตั้งใหม่ให้การบันทึกครั้งนี้นับเป็นการเปลี่ยนครั้งเดียว
+                cursor.execute('''
+                    INSERT OR REPLACE INTO settings (key, value, updated_at)
+                    VALUES ('fee_rates_version', ?, CURRENT_TIMESTAMP)
+                ''', (str(version + 1),))
+            
+            cursor.execute("SELECT value FROM settings WHERE key = 'penalty_per_day'")
+            row = cursor.fetchone()
+            penalty_changed = not row or float(row[0] or 0) != penalty_per_day
+            if penalty_changed:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO settings (key, value, updated_at)
+                    VALUES ('penalty_per_day', ?, CURRENT_TIMESTAMP)
+                ''', (str(penalty_per_day),))
+        
+        modified = bool(stale or changed or penalty_changed)
+        if modified:
+            self._invalidate_fee_schedule()
+        return modified
+    
+    def _invalidate_fee_schedule(self):
+        """ให้ FeeSchedule ที่ผูกกับ db นี้โหลดอัตราใหม่ทันที (ไม่ต้องรอรอบตรวจเวอร์ชัน)"""
+        schedule = getattr(self, '_fee_schedule', None)
+        if schedule is not None:
+            schedule.invalidate()
+    
+    def get_fee_schedule_version(self) -> str:
+        """เวอร์ชันของตารางอัตรา + ค่าปรับต่อวัน (เปลี่ยนเมื่อมีการแก้ไขอย่างใดอย่างหนึ่ง)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT key, value FROM settings
+                WHERE key IN ('fee_rates_version', 'penalty_per_day')
+                ORDER BY key
+            ''')
+            return '|'.join(f"{key}={value}" for key, value in cursor.fetchall())
+    
     def get_setting(self, key: str) -> str:
         """ดึงการตั้งค่า"""
         with self.get_connection() as conn:
@@ -900,19 +2086,20 @@ class PawnShopDatabase:
     
     def update_setting(self, key: str, value: str):
         """อัปเดตการตั้งค่า"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 INSERT OR REPLACE INTO settings (key, value, updated_at) 
                 VALUES (?, ?, CURRENT_TIMESTAMP)
             ''', (key, value))
-            
-            conn.commit()
+        
+        if key == 'penalty_per_day':
+            self._invalidate_fee_schedule()
     
     def update_customer(self, customer_id: int, customer_data: Dict) -> bool:
         """อัปเดตข้อมูลลูกค้า"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -937,12 +2124,11 @@ class PawnShopDatabase:
                 customer_id
             ))
             
-            conn.commit()
             return cursor.rowcount > 0
     
     def update_product(self, product_id: int, product_data: Dict) -> bool:
         """อัปเดตข้อมูลสินค้า"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -967,7 +2153,6 @@ class PawnShopDatabase:
                 product_id
             ))
             
-            conn.commit()
             return cursor.rowcount > 0
     
     def check_customer_exists(self, id_card: str = None, customer_code: str = None) -> bool:
@@ -1072,7 +2257,7 @@ class PawnShopDatabase:
     def delete_customer(self, customer_id: int) -> bool:
         """ลบข้อมูลลูกค้า"""
         try:
-            with self.get_connection() as conn:
+            with self.write_transaction() as conn:
                 cursor = conn.cursor()
                 
                 # ตรวจสอบว่าลูกค้ามีสัญญาที่เกี่ยวข้องหรือไม่
@@ -1084,9 +2269,10 @@ class PawnShopDatabase:
                 
                 # ลบข้อมูลลูกค้า
                 cursor.execute('DELETE FROM customers WHERE id = ?', (customer_id,))
-                conn.commit()
                 return cursor.rowcount > 0
                 
+        except sqlite3.OperationalError:
+            raise
         except Exception as e:
             print(f"Error deleting customer: {e}")
             return False
@@ -1094,7 +2280,7 @@ class PawnShopDatabase:
     def delete_product(self, product_id: int) -> bool:
         """ลบข้อมูลสินค้า"""
         try:
-            with self.get_connection() as conn:
+            with self.write_transaction() as conn:
                 cursor = conn.cursor()
                 
                 # ตรวจสอบว่าสินค้ามีสัญญาที่เกี่ยวข้องหรือไม่
@@ -1106,9 +2292,10 @@ class PawnShopDatabase:
                 
                 # ลบข้อมูลสินค้า
                 cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
-                conn.commit()
                 return cursor.rowcount > 0
                 
+        except sqlite3.OperationalError:
+            raise
         except Exception as e:
             print(f"Error deleting product: {e}")
             return False
@@ -1116,14 +2303,15 @@ class PawnShopDatabase:
     def delete_contract(self, contract_id: int) -> bool:
         """ลบข้อมูลสัญญา"""
         try:
-            with self.get_connection() as conn:
+            with self.write_transaction() as conn:
                 cursor = conn.cursor()
                 
                 # ลบข้อมูลสัญญา
                 cursor.execute('DELETE FROM contracts WHERE id = ?', (contract_id,))
-                conn.commit()
                 return cursor.rowcount > 0
                 
+        except sqlite3.OperationalError:
+            raise
         except Exception as e:
             print(f"Error deleting contract: {e}")
             return False
@@ -1149,6 +2337,21 @@ class PawnShopDatabase:
                 return dict(zip(columns, row))
             return None
     
+    def get_customer_by_id_card(self, id_card: str) -> Optional[Dict]:
+        """ดึงข้อมูลลูกค้าตามเลขบัตรประชาชน (รวมยอดสะสม)"""
+        if not id_card:
+            return None
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM customers WHERE id_card = ?
+            ''', (id_card,))
+            row = cursor.fetchone()
+            if row:
+                columns = [description[0] for description in cursor.description]
+                return dict(zip(columns, row))
+            return None
+    
     def get_product_id_by_serial(self, serial_number: str) -> Optional[int]:
         """ดึง ID ของสินค้าตามหมายเลขซีเรียล"""
         with self.get_connection() as conn:
@@ -1189,9 +2392,76 @@ class PawnShopDatabase:
                 return [dict(zip(columns, row)) for row in rows]
             return []
 
+    def get_customer_history(self, customer_id: int) -> Optional[Dict]:
+        """ดึงข้อมูลลูกค้าพร้อมสัญญา การต่อดอก การไถ่คืน และยอดคงค้าง ในการเชื่อมต่อเดียว"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            columns = [description[0] for description in cursor.description]
+            customer = dict(zip(columns, row))
+            
+            # สัญญาทั้งหมดของลูกค้า
+            cursor.execute('''
+                SELECT c.*, p.name as product_name, p.brand as product_brand
+                FROM contracts c
+                JOIN products p ON c.product_id = p.id
+                WHERE c.customer_id = ?
+                ORDER BY c.created_at DESC
+            ''', (customer_id,))
+            columns = [description[0] for description in cursor.description]
+            contracts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            
+            contracts_by_id = {}
+            for contract in contracts:
+                contract['renewals'] = []
+                contract['redemptions'] = []
+                contracts_by_id[contract['id']] = contract
+            
+            # การต่อดอกของทุกสัญญาในคิวรีเดียว
+            cursor.execute('''
+                SELECT r.* FROM renewals r
+                JOIN contracts c ON r.contract_id = c.id
+                WHERE c.customer_id = ?
+                ORDER BY r.renewal_count ASC, r.created_at ASC
+            ''', (customer_id,))
+            columns = [description[0] for description in cursor.description]
+            for row in cursor.fetchall():
+                renewal = dict(zip(columns, row))
+                contracts_by_id[renewal['contract_id']]['renewals'].append(renewal)
+            
+            # การไถ่คืนของทุกสัญญาในคิวรีเดียว
+            cursor.execute('''
+                SELECT r.* FROM redemptions r
+                JOIN contracts c ON r.contract_id = c.id
+                WHERE c.customer_id = ?
+                ORDER BY r.redemption_date DESC
+            ''', (customer_id,))
+            columns = [description[0] for description in cursor.description]
+            for row in cursor.fetchall():
+                redemption = dict(zip(columns, row))
+                contracts_by_id[redemption['contract_id']]['redemptions'].append(redemption)
+        
+        # สรุปยอดคงค้าง (สัญญาที่ยังไม่ไถ่คืน)
+        open_contracts = [c for c in contracts if c.get('status') in ('active', 'forfeited')]
+        customer['contracts'] = contracts
+        customer['totals'] = {
+            'contract_count': len(contracts),
+            'open_contract_count': len(open_contracts),
+            'outstanding_principal': sum(c.get('pawn_amount') or 0 for c in open_contracts),
+            'outstanding_redemption': sum(c.get('total_redemption') or 0 for c in open_contracts),
+            'renewal_count': sum(len(c['renewals']) for c in contracts),
+            'renewal_amount': sum(r.get('total_amount') or 0 for c in contracts for r in c['renewals']),
+            'redeemed_amount': sum(r.get('redemption_amount') or 0 for c in contracts for r in c['redemptions']),
+        }
+        return customer
+
     def fix_duplicate_customer_codes(self):
         """แก้ไขปัญหารหัสลูกค้าซ้ำซ้อน"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             # ค้นหารหัสลูกค้าที่ซ้ำซ้อน
@@ -1231,12 +2501,11 @@ class PawnShopDatabase:
                         
                         fixed_count += 1
             
-            conn.commit()
             return fixed_count
 
     def fix_duplicate_id_cards(self):
         """แก้ไขปัญหาเลขบัตรประชาชนซ้ำซ้อน"""
-        with self.get_connection() as conn:
+        with self.write_transaction() as conn:
             cursor = conn.cursor()
             
             # ค้นหาเลขบัตรประชาชนที่ซ้ำซ้อน
@@ -1274,7 +2543,6 @@ class PawnShopDatabase:
                         
                         fixed_count += 1
             
-            conn.commit()
             return fixed_count
 
     def get_contract_by_id(self, contract_id: int) -> Optional[Dict]:
@@ -1319,18 +2587,23 @@ class PawnShopDatabase:
 
     def update_contract_end_date(self, contract_number: str, new_end_date: str) -> bool:
         """อัปเดตวันที่ครบกำหนดใหม่ในสัญญา"""
+        self._validate_date(new_end_date, 'new_end_date')
+        today = datetime.now().strftime("%Y-%m-%d")
         try:
-            with self.get_connection() as conn:
+            with self.write_transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE contracts 
                     SET end_date = ?, 
-                        days_count = (julianday(?) - julianday(start_date))
+                        days_count = (julianday(?) - julianday(start_date)),
+                        status = CASE WHEN status = 'forfeited' AND ? >= ? THEN 'active' ELSE status END,
+                        forfeited_at = CASE WHEN status = 'forfeited' AND ? >= ? THEN NULL ELSE forfeited_at END
                     WHERE contract_number = ?
-                ''', (new_end_date, new_end_date, contract_number))
+                ''', (new_end_date, new_end_date, new_end_date, today, new_end_date, today, contract_number))
                 
-                conn.commit()
                 return cursor.rowcount > 0
+        except sqlite3.OperationalError:
+            raise
         except Exception as e:
             print(f"Error updating contract end date: {e}")
             return False
@@ -1381,14 +2654,15 @@ class PawnShopDatabase:
     def update_contract_status(self, contract_id: int, status: str) -> bool:
         """อัปเดตสถานะสัญญา"""
         try:
-            with self.get_connection() as conn:
+            with self.write_transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE contracts SET status = ? WHERE id = ?
                 ''', (status, contract_id))
                 
-                conn.commit()
                 return cursor.rowcount > 0
+        except sqlite3.OperationalError:
+            raise
         except Exception as e:
             print(f"Error updating contract status: {e}")
             return False
@@ -1415,7 +2689,7 @@ class PawnShopDatabase:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM renewals 
-                WHERE DATE(renewal_date) = ?
+                WHERE renewal_date = ?
                 ORDER BY renewal_date DESC
             ''', (date,))
             
@@ -1431,7 +2705,7 @@ class PawnShopDatabase:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM redemptions 
-                WHERE DATE(redemption_date) = ?
+                WHERE redemption_date = ?
                 ORDER BY redemption_date DESC
             ''', (date,))
             
@@ -1473,3 +2747,392 @@ class PawnShopDatabase:
                 columns = [description[0] for description in cursor.description]
                 return [dict(zip(columns, row)) for row in rows]
             return []
+
+    def get_last_change_seq(self) -> int:
+        """เลขลำดับล่าสุดใน change_log"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+            return cursor.fetchone()[0]
+    
+    def get_changed_tables(self, since_seq: int) -> Dict:
+        """ชื่อตารางที่มีการเปลี่ยนแปลงหลัง since_seq คืน {'to_seq', 'tables'}"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+            to_seq = cursor.fetchone()[0]
+            cursor.execute('''
+                SELECT DISTINCT table_name FROM change_log WHERE seq > ? AND seq <= ?
+            ''', (since_seq, to_seq))
+            return {'to_seq': to_seq, 'tables': [row[0] for row in cursor.fetchall()]}
+
+    def get_changes_since(self, since_seq: int = 0) -> Dict:
+        """ดึงการเปลี่ยนแปลงหลัง since_seq แบบย่อ (หนึ่งรายการต่อแถว ใช้สถานะล่าสุดของแถว)
+        
+        คืน {'from_seq', 'to_seq', 'changes': [{'seq', 'table', 'operation', 'id', 'row'}]}
+        row เป็นข้อมูลปัจจุบันของแถว (None สำหรับการลบ)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # อ่านใน transaction เดียวเพื่อให้ change_log และข้อมูลแถวตรงกัน
+            cursor.execute('BEGIN')
+            cursor.execute('''
+                SELECT seq, table_name, row_id, operation FROM change_log
+                WHERE seq > ? ORDER BY seq
+            ''', (since_seq,))
+            
+            # เก็บเฉพาะการเปลี่ยนแปลงล่าสุดของแต่ละแถว
+            latest = {}
+            to_seq = since_seq
+            for seq, table_name, row_id, operation in cursor.fetchall():
+                latest.pop((table_name, row_id), None)
+                latest[(table_name, row_id)] = (seq, operation)
+                to_seq = seq
+            
+            changes = []
+            for (table_name, row_id), (seq, operation) in latest.items():
+                row = None
+                if operation != 'D':
+                    cursor.execute(f'SELECT * FROM {table_name} WHERE id = ?', (row_id,))
+                    values = cursor.fetchone()
+                    if values is None:
+                        operation = 'D'
+                    else:
+                        columns = [description[0] for description in cursor.description]
+                        row = dict(zip(columns, values))
+                changes.append({
+                    'seq': seq, 'table': table_name, 'operation': operation,
+                    'id': row_id, 'row': row,
+                })
+            conn.rollback()
+            
+            return {'from_seq': since_seq, 'to_seq': to_seq, 'changes': changes}
+    
+    def apply_changes(self, changes: List[Dict]) -> int:
+        """นำการเปลี่ยนแปลงจาก get_changes_since มาใช้กับฐานข้อมูลนี้ (ฝั่งสำนักงานใหญ่)
+        
+        ใช้ INSERT OR REPLACE / DELETE ตาม id จึงรันซ้ำได้ผลเหมือนเดิม
+        การเปลี่ยนแปลงที่นำเข้าจะถูกบันทึกใน change_log ของฐานข้อมูลนี้ด้วย
+        เพื่อให้ตารางสรุปที่อัปเดตแบบเพิ่มหน่วย (เช่น contract_cube) เห็นข้อมูลที่นำเข้า
+        """
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            
+            table_columns = {}
+            for table in CHANGE_LOG_TABLES:
+                cursor.execute(f'PRAGMA table_info({table})')
+                table_columns[table] = {column[1] for column in cursor.fetchall()}
+            
+            applied = 0
+            for change in sorted(changes, key=lambda c: c['seq']):
+                table = change['table']
+                if table not in table_columns:
+                    raise ValueError(f"ไม่รู้จักตาราง {table}")
+                
+                if change['operation'] == 'D' or not change.get('row'):
+                    cursor.execute(f'DELETE FROM {table} WHERE id = ?', (change['id'],))
+                else:
+                    # ใช้เฉพาะคอลัมน์ที่มีในฐานข้อมูลนี้ (รองรับเวอร์ชันโปรแกรมต่างกัน)
+                    row = {k: v for k, v in change['row'].items() if k in table_columns[table]}
+                    self._search_index_delete(cursor, table, change['id'])
+                    columns = ', '.join(row)
+                    placeholders = ', '.join('?' for _ in row)
+                    cursor.execute(
+                        f'INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})',
+                        list(row.values())
+                    )
+                applied += 1
+            
+            # trigger ยอดสะสมทำงานซ้ำกับยอดที่มากับแถวลูกค้า ให้คำนวณใหม่จากข้อมูลจริง
+            customer_ids = set()
+            rebuild_all = False
+            for change in changes:
+                row = change.get('row') or {}
+                if change['operation'] == 'D' and change['table'] != 'customers':
+                    rebuild_all = True
+                elif change['table'] == 'customers':
+                    customer_ids.add(change['id'])
+                elif change['table'] == 'contracts':
+                    customer_ids.add(row.get('customer_id'))
+                else:
+                    cursor.execute('SELECT customer_id FROM contracts WHERE id = ?', (row.get('contract_id'),))
+                    found = cursor.fetchone()
+                    if found:
+                        customer_ids.add(found[0])
+            customer_ids.discard(None)
+            self._rebuild_customer_aggregates(cursor, None if rebuild_all else sorted(customer_ids))
+
+            # แถวลูกค้าที่มากับ delta มียอดสะสมของสาขาอยู่แล้ว ใช้ค่านั้นแทนค่าที่คำนวณใหม่
+            # (trigger ของสาขาไม่ย้อน last_visit เมื่อลบสัญญา แต่การคำนวณใหม่ย้อน)
+            aggregate_columns = [c for c in CUSTOMER_AGGREGATE_COLUMNS if c in table_columns['customers']]
+            for change in changes:
+                row = change.get('row')
+                if change['table'] != 'customers' or change['operation'] == 'D' or not row:
+                    continue
+                values = {c: row[c] for c in aggregate_columns if c in row}
+                if values:
+                    cursor.execute(
+                        f"UPDATE customers SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+                        list(values.values()) + [change['id']]
+                    )
+            return applied
+
+    def _select_cube_facts_sql(self, where: str = '') -> str:
+        """SQL ดึงค่าที่สัญญาแต่ละฉบับนับเข้า cube
+        
+        days_held นับเฉพาะสัญญาที่ปิดแล้ว: ไถ่คืน = ถึงวันไถ่ล่าสุด, หลุด = ถึงวันครบกำหนด
+        """
+        return f'''
+            SELECT
+                c.id,
+                substr(c.start_date, 1, 7),
+                COALESCE(c.status, 'active'),
+                COALESCE(NULLIF(TRIM(p.brand), ''), 'ไม่ระบุ'),
+                {PRODUCT_TYPE_SQL},
+                c.pawn_amount,
+                COALESCE((SELECT SUM(redemption_amount) FROM redemptions WHERE contract_id = c.id), 0),
+                CASE WHEN c.status = 'redeemed' THEN 1 ELSE 0 END,
+                CASE
+                    WHEN c.status = 'redeemed' THEN CAST(julianday(
+                        COALESCE((SELECT MAX(redemption_date) FROM redemptions WHERE contract_id = c.id), c.end_date)
+                    ) - julianday(c.start_date) AS INTEGER)
+                    WHEN c.status = 'forfeited' THEN CAST(julianday(c.end_date) - julianday(c.start_date) AS INTEGER)
+                END
+            FROM contracts c
+            JOIN products p ON c.product_id = p.id
+            {where}
+        '''
+    
+    def _changed_cube_contract_ids(self, cursor, since_seq: int, to_seq: int) -> Optional[set]:
+        """สัญญาที่ต้องคำนวณใน cube ใหม่จาก change_log (None = ต้องสร้างใหม่ทั้งหมด)"""
+        cursor.execute('''
+            SELECT DISTINCT table_name, row_id, operation FROM change_log
+            WHERE seq > ? AND seq <= ? AND table_name IN ('contracts', 'products', 'redemptions')
+        ''', (since_seq, to_seq))
+        
+        contract_ids, product_ids, redemption_ids = set(), set(), set()
+        for table_name, row_id, operation in cursor.fetchall():
+            if table_name == 'contracts':
+                contract_ids.add(row_id)
+            elif table_name == 'products':
+                product_ids.add(row_id)
+            elif operation == 'D':
+                # ไม่รู้ว่าการไถ่คืนที่ถูกลบเป็นของสัญญาใด
+                return None
+            else:
+                redemption_ids.add(row_id)
+        
+        for table, column, ids in (('contracts', 'product_id', product_ids), ('redemptions', 'id', redemption_ids)):
+            ids = list(ids)
+            select_column = 'id' if table == 'contracts' else 'contract_id'
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                cursor.execute(
+                    f"SELECT {select_column} FROM {table} WHERE {column} IN ({', '.join('?' for _ in chunk)})",
+                    chunk
+                )
+                contract_ids.update(row[0] for row in cursor.fetchall())
+        return contract_ids
+    
+    def refresh_contract_cube(self, full: bool = False) -> Dict:
+        """อัปเดต contract_cube จากการเปลี่ยนแปลงใน change_log ตั้งแต่การอัปเดตครั้งก่อน
+        
+        full=True หรือยังไม่เคยสร้าง cube จะคำนวณใหม่ทั้งหมด
+        """
+        started = time.monotonic()
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+            to_seq = cursor.fetchone()[0]
+            cursor.execute("SELECT value FROM settings WHERE key = 'cube_refreshed_seq'")
+            row = cursor.fetchone()
+            
+            contract_ids = None
+            if row and not full:
+                contract_ids = self._changed_cube_contract_ids(cursor, int(row[0]), to_seq)
+            
+            if contract_ids is None:
+                cursor.execute('DELETE FROM contract_cube_facts')
+                cursor.execute('DELETE FROM contract_cube')
+                cursor.execute(f'INSERT INTO contract_cube_facts {self._select_cube_facts_sql()}')
+                cursor.execute('''
+                    INSERT INTO contract_cube
+                    SELECT month, status, brand, product_type, COUNT(*), SUM(pawn_amount),
+                           SUM(redemption_amount), SUM(redeemed), COALESCE(SUM(days_held), 0), COUNT(days_held)
+                    FROM contract_cube_facts
+                    GROUP BY month, status, brand, product_type
+                ''')
+                mode, refreshed = 'full', cursor.rowcount
+            else:
+                mode, refreshed = 'incremental', len(contract_ids)
+                ids = list(contract_ids)
+                for start in range(0, len(ids), 500):
+                    self._apply_cube_delta(cursor, ids[start:start + 500])
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO settings (key, value, updated_at)
+                VALUES ('cube_refreshed_seq', ?, CURRENT_TIMESTAMP)
+            ''', (str(to_seq),))
+        
+        report = {'mode': mode, 'refreshed': refreshed, 'seq': to_seq,
+                  'elapsed': round(time.monotonic() - started, 3)}
+        print(f"Contract cube refresh ({mode}): {refreshed} rows in {report['elapsed']}s")
+        return report
+    
+    def _apply_cube_delta(self, cursor, contract_ids: List[int]):
+        """ลบค่าเดิมของสัญญาออกจาก cube แล้วเพิ่มค่าใหม่"""
+        placeholders = ', '.join('?' for _ in contract_ids)
+        deltas: Dict[Tuple, List[float]] = {}
+        
+        def add(fact, sign):
+            key = tuple(fact[1:5])
+            delta = deltas.setdefault(key, [0, 0.0, 0.0, 0, 0.0, 0])
+            delta[0] += sign
+            delta[1] += sign * fact[5]
+            delta[2] += sign * fact[6]
+            delta[3] += sign * fact[7]
+            if fact[8] is not None:
+                delta[4] += sign * fact[8]
+                delta[5] += sign
+        
+        cursor.execute(f'SELECT * FROM contract_cube_facts WHERE contract_id IN ({placeholders})', contract_ids)
+        for fact in cursor.fetchall():
+            add(fact, -1)
+        
+        cursor.execute(self._select_cube_facts_sql(f'WHERE c.id IN ({placeholders})'), contract_ids)
+        new_facts = cursor.fetchall()
+        for fact in new_facts:
+            add(fact, 1)
+        
+        cursor.execute(f'DELETE FROM contract_cube_facts WHERE contract_id IN ({placeholders})', contract_ids)
+        cursor.executemany(
+            'INSERT INTO contract_cube_facts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', new_facts
+        )
+        
+        cursor.executemany('''
+            INSERT INTO contract_cube VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (month, status, brand, product_type) DO UPDATE SET
+                contract_count = contract_count + excluded.contract_count,
+                pawn_sum = pawn_sum + excluded.pawn_sum,
+                redemption_sum = redemption_sum + excluded.redemption_sum,
+                redeemed_count = redeemed_count + excluded.redeemed_count,
+                days_held_sum = days_held_sum + excluded.days_held_sum,
+                days_held_count = days_held_count + excluded.days_held_count
+        ''', [key + tuple(delta) for key, delta in deltas.items() if any(delta)])
+        cursor.execute('DELETE FROM contract_cube WHERE contract_count <= 0')
+    
+    def get_contract_cube(self, group_by: List[str], filters: Optional[Dict] = None) -> List[Dict]:
+        """ตัดมุมมอง contract_cube ตามมิติที่เลือก
+        
+        group_by: มิติใน CUBE_DIMENSIONS (month, status, brand, product_type)
+        filters: month_from, month_to (YYYY-MM), status, brand, product_type
+        คืนยอดรวมพร้อม avg_pawn, redemption_rate (%) และ avg_days_held
+        """
+        unknown = set(group_by) - set(CUBE_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"ไม่รู้จักมิติ: {', '.join(sorted(unknown))}")
+        
+        conditions, params = [], []
+        for key, value in (filters or {}).items():
+            if value in (None, '', 'all'):
+                continue
+            if key == 'month_from':
+                conditions.append('month >= ?')
+            elif key == 'month_to':
+                conditions.append('month <= ?')
+            elif key in ('status', 'brand', 'product_type'):
+                conditions.append(f'{key} = ?')
+            else:
+                raise ValueError(f"ไม่รู้จักเงื่อนไข: {key}")
+            params.append(value)
+        
+        dimensions = ', '.join(group_by)
+        query = f'''
+            SELECT {dimensions + ',' if group_by else ''}
+                SUM(contract_count) AS contract_count,
+                SUM(pawn_sum) AS pawn_sum,
+                SUM(redemption_sum) AS redemption_sum,
+                SUM(redeemed_count) AS redeemed_count,
+                SUM(days_held_sum) AS days_held_sum,
+                SUM(days_held_count) AS days_held_count
+            FROM contract_cube
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            {'GROUP BY ' + dimensions + ' ORDER BY ' + dimensions if group_by else ''}
+        '''
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            results = []
+            for row in cursor.fetchall():
+                item = dict(zip(columns, row))
+                if not item['contract_count']:
+                    continue
+                item['avg_pawn'] = item['pawn_sum'] / item['contract_count']
+                item['redemption_rate'] = item['redeemed_count'] * 100.0 / item['contract_count']
+                item['avg_days_held'] = (
+                    item['days_held_sum'] / item['days_held_count'] if item['days_held_count'] else None
+                )
+                results.append(item)
+            return results
+
+    # คอลัมน์ของ snapshot สัญญา (contract_snapshot.py)
+    SNAPSHOT_COLUMNS_SQL = '''
+        SELECT c.id, c.customer_id, c.contract_number,
+               cu.first_name, cu.last_name, cu.id_card, cu.phone,
+               p.name AS product_name, p.brand, p.imei1, p.imei2,
+               c.status, c.pawn_amount, c.total_redemption,
+               c.start_date, c.end_date, c.forfeited_at, c.created_at
+        FROM contracts c
+        JOIN customers cu ON c.customer_id = cu.id
+        JOIN products p ON c.product_id = p.id
+    '''
+    
+    def get_contract_snapshot_rows(self, contract_ids: Optional[List[int]] = None) -> Dict[str, list]:
+        """ดึงสัญญาพร้อมข้อมูลลูกค้า/สินค้าแบบคอลัมน์ (ทั้งหมด หรือเฉพาะ contract_ids)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            rows = []
+            if contract_ids is None:
+                cursor.execute(self.SNAPSHOT_COLUMNS_SQL + ' ORDER BY c.id')
+                rows = cursor.fetchall()
+            else:
+                ids = list(contract_ids)
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    cursor.execute(
+                        self.SNAPSHOT_COLUMNS_SQL + f" WHERE c.id IN ({', '.join('?' for _ in chunk)}) ORDER BY c.id",
+                        chunk
+                    )
+                    rows.extend(cursor.fetchall())
+            cursor.execute(self.SNAPSHOT_COLUMNS_SQL + ' LIMIT 0')
+            columns = [description[0] for description in cursor.description]
+            
+            values = list(zip(*rows)) if rows else [()] * len(columns)
+            return {column: list(value) for column, value in zip(columns, values)}
+    
+    def get_changed_contract_ids(self, since_seq: int) -> Dict:
+        """สัญญาที่ข้อมูลใน snapshot เปลี่ยนหลัง since_seq (สัญญา ลูกค้า หรือสินค้าที่เกี่ยวข้อง)
+        
+        คืน {'to_seq', 'contract_ids'}
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+            to_seq = cursor.fetchone()[0]
+            
+            cursor.execute('''
+                SELECT row_id FROM change_log
+                WHERE seq > ? AND seq <= ? AND table_name = 'contracts'
+                UNION
+                SELECT c.id FROM contracts c JOIN change_log l
+                    ON l.table_name = 'customers' AND l.row_id = c.customer_id
+                WHERE l.seq > ? AND l.seq <= ?
+                UNION
+                SELECT c.id FROM contracts c JOIN change_log l
+                    ON l.table_name = 'products' AND l.row_id = c.product_id
+                WHERE l.seq > ? AND l.seq <= ?
+            ''', (since_seq, to_seq) * 3)
+            return {'to_seq': to_seq, 'contract_ids': [row[0] for row in cursor.fetchall()]}
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+บำรุงรักษาฐานข้อมูลจาก command line (สำหรับผู้ดูแลระบบ)
+
+enable-incremental-vacuum: แปลงไฟล์ที่สร้างก่อนรองรับ incremental vacuum ด้วย VACUUM เต็มหนึ่งครั้ง
+ใช้เวลาตามขนาดไฟล์และล็อกฐานข้อมูลตลอด ให้ปิดโปรแกรมทุกเครื่อง (และ db_server) ก่อนรัน
+
+วิธีรัน:
+    python db_maintenance.py enable-incremental-vacuum --db pawnshop.db
+    python db_maintenance.py run --db pawnshop.db --budget 30
+"""
+import argparse
+
+from database import PawnShopDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop database maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    vacuum_parser = subparsers.add_parser('enable-incremental-vacuum',
+                                          help="one-time VACUUM that enables auto_vacuum=INCREMENTAL")
+    vacuum_parser.add_argument('--db', default='pawnshop.db')
+
+    run_parser = subparsers.add_parser('run', help="ANALYZE, optimize, incremental vacuum and WAL checkpoint")
+    run_parser.add_argument('--db', default='pawnshop.db')
+    run_parser.add_argument('--budget', type=float, default=30.0, help="time budget in seconds")
+
+    args = parser.parse_args()
+    db = PawnShopDatabase(args.db)
+    if args.command == 'enable-incremental-vacuum':
+        if not db.enable_incremental_vacuum():
+            print("auto_vacuum=INCREMENTAL is already enabled")
+    else:
+        db.run_maintenance(args.budget)
+
+
+if __name__ == "__main__":
+    main()
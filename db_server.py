@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+เซิร์ฟเวอร์ฐานข้อมูลสำหรับหลายเครื่อง (server mode)
+
+เครื่องหลักหนึ่งเครื่องเป็นเจ้าของ pawnshop.db และเปิดบริการ HTTP ในวงแลน
+เครื่องเคาน์เตอร์อื่นใช้ RemotePawnShopDatabase (remote_database.py) เรียกเมธอดของ
+PawnShopDatabase ผ่าน POST /rpc แทนการเปิดไฟล์ฐานข้อมูลผ่าน network share
+
+รูปแบบคำขอ (รองรับการส่งหลายคำสั่งในคำขอเดียว):
+    [{"method": "get_customer_by_id", "args": [1], "kwargs": {}}, ...]
+รูปแบบผลลัพธ์ (ลำดับเดียวกับคำขอ):
+    [{"result": {...}} | {"error": {"type": "ValueError", "message": "..."}}, ...]
+
+เปิดให้เรียกเฉพาะเมธอดใน RPC_METHODS (เมธอดที่หน้าจอของเครื่องเคาน์เตอร์ใช้)
+ค่าเริ่มต้นฟังเฉพาะเครื่องตัวเอง (127.0.0.1) การเปิดให้เครื่องอื่นในวงแลนเรียกต้องกำหนด --token
+
+วิธีรัน:
+    python db_server.py --host 0.0.0.0 --port 8765 --db pawnshop.db --token <รหัสลับ>
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database import PawnShopDatabase
+
+# เมธอดของ PawnShopDatabase ที่เครื่องลูกเรียกได้ (เมธอดอื่น เช่น apply_changes, get_connection ไม่เปิด)
+RPC_METHODS = frozenset({
+    # ลูกค้า
+    'add_customer', 'update_customer', 'delete_customer', 'check_customer_exists', 'get_next_customer_code',
+    'get_customer_by_id', 'get_customer_by_id_card', 'get_customer_by_code', 'get_customer_id_by_code',
+    'get_customer_history', 'search_customers', 'fix_duplicate_customer_codes', 'fix_duplicate_id_cards',
+    'rebuild_customer_aggregates',
+    # สินค้า
+    'add_product', 'update_product', 'delete_product', 'check_product_exists', 'get_product_by_id',
+    'get_product_id_by_serial', 'search_products', 'find_products_by_code',
+    # สัญญา
+    'create_contract', 'update_contract', 'update_contract_status', 'update_contract_due_date', 'delete_contract',
+    'get_next_contract_sequence', 'get_contract_by_id', 'get_contract_by_number', 'get_contracts_by_customer',
+    'get_contracts_by_date', 'get_forfeited_contracts', 'get_expiring_contracts', 'search_contracts',
+    'search_contracts_by_name', 'filter_contracts', 'quick_search', 'sweep_forfeited_contracts',
+    # ต่อดอก / ไถ่ถอน
+    'add_renewal', 'get_all_renewals', 'get_renewals_by_contract', 'get_renewals_by_contract_id',
+    'get_renewals_by_date', 'redeem_contract', 'is_contract_redeemed', 'get_all_redemptions',
+    'get_redemptions_by_contract', 'get_redemptions_by_date', 'get_contract_redemption_history',
+    # รายงาน
+    'get_daily_summary', 'get_data_summary', 'get_outstanding_summary', 'get_contract_cube',
+    'refresh_contract_cube', 'get_contract_columns', 'get_contract_snapshot_rows', 'get_changed_contract_ids',
+    'get_last_change_seq', 'get_changed_tables',
+    # ตั้งค่า / ค่าธรรมเนียม / บำรุงรักษา
+    'get_setting', 'update_setting', 'get_fee_rates', 'set_fee_rate', 'delete_fee_rate', 'replace_fee_rates',
+    'get_fee_schedule_version', 'get_lock_metrics', 'run_maintenance',
+})
+
+
+def get_exposed_methods(db: PawnShopDatabase) -> dict:
+    """เมธอดใน RPC_METHODS ที่มีอยู่ใน PawnShopDatabase"""
+    return {name: getattr(db, name) for name in RPC_METHODS if callable(getattr(db, name, None))}
+
+
+def is_loopback(host: str) -> bool:
+    """host เป็นที่อยู่ของเครื่องตัวเองหรือไม่"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def dispatch_calls(methods: dict, calls: list) -> list:
+    """เรียกเมธอดตามลำดับและคืนผลลัพธ์ทีละรายการ (ข้อผิดพลาดของรายการหนึ่งไม่กระทบรายการอื่น)"""
+    results = []
+    for call in calls:
+        name = call.get('method')
+        func = methods.get(name)
+        if func is None:
+            results.append({'error': {'type': 'AttributeError', 'message': f"unknown method: {name}"}})
+            continue
+        try:
+            result = func(*call.get('args', []), **call.get('kwargs', {}))
+            results.append({'result': result})
+        except Exception as e:
+            results.append({'error': {'type': type(e).__name__, 'message': str(e)}})
+    return results
+
+
+class PawnShopRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler สำหรับ POST /rpc"""
+    server_version = "PawnShopDB/1.0"
+
+    def do_POST(self):
+        if self.path != '/rpc':
+            self.send_error(404)
+            return
+
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get('X-PawnShop-Token', '').encode('utf-8'),
+                                             token.encode('utf-8')):
+            self.send_error(403)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            calls = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(calls, list):
+                calls = [calls]
+        except (ValueError, UnicodeDecodeError):
+            self.send_error(400)
+            return
+
+        results = dispatch_calls(self.server.methods, calls)
+        body = json.dumps(results, ensure_ascii=False, default=str).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # ไม่พิมพ์ log ทุกคำขอ
+        pass
+
+
+class PawnShopServer(ThreadingHTTPServer):
+    """เซิร์ฟเวอร์ที่ถือ PawnShopDatabase ตัวเดียวให้ทุกเครื่องใช้ร่วมกัน"""
+    daemon_threads = True
+
+    def __init__(self, address, db_path="pawnshop.db", token=""):
+        if not token and not is_loopback(address[0]):
+            raise ValueError(f"ต้องกำหนด token เมื่อเปิดให้เครื่องอื่นเชื่อมต่อ ({address[0]})")
+        super().__init__(address, PawnShopRequestHandler)
+        self.db = PawnShopDatabase(db_path)
+        self.methods = get_exposed_methods(self.db)
+        self.token = token
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop database server")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='0.0.0.0 = เปิดให้เครื่องในวงแลนเชื่อมต่อ (ต้องใช้ --token)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default='pawnshop.db')
+    parser.add_argument('--token', default='')
+    args = parser.parse_args()
+
+    try:
+        server = PawnShopServer((args.host, args.port), args.db, args.token)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"PawnShop database server listening on {args.host}:{args.port} ({args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
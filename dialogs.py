@@ -19,6 +19,11 @@ from language_manager import language_manager
 from typing import Dict, Optional, List
 from database import PawnShopDatabase
 from utils import PawnShopUtils
+from fee_schedule import get_fee_schedule
+from imei_blocklist import get_blocklist
+from thai_address import parse_thai_address
+from address_completer import AddressCompleter
+from quotation import quote
 from app_services import copy_product_image as svc_copy_product_image, send_line_message
 from shop_config_loader import load_shop_config
 from line_config import ENABLE_LINE_NOTIFICATION, SEND_RENEWAL_NOTIFICATION, SEND_REDEMPTION_NOTIFICATION, MESSAGE_TEMPLATE
@@ -424,6 +429,7 @@ class CustomerDialog(QDialog):
         self.subdistrict_edit = QLineEdit()
         self.district_edit = QLineEdit()
         self.province_edit = QLineEdit()
+        self.address_completer = AddressCompleter(self.subdistrict_edit, self.district_edit, self.province_edit, self)
         self.other_details_edit = QTextEdit()
         self.other_details_edit.setMaximumHeight(60)
         
@@ -442,6 +448,26 @@ class CustomerDialog(QDialog):
         
         layout.addWidget(address_group)
         
+        # ประวัติการทำรายการ (เฉพาะลูกค้าที่มีอยู่แล้ว)
+        if self.customer_data and self.customer_data.get('id'):
+            history_group = QGroupBox("ประวัติการทำรายการ")
+            history_layout = QVBoxLayout(history_group)
+            
+            self.history_summary_label = QLabel()
+            history_layout.addWidget(self.history_summary_label)
+            
+            self.history_table = QTableWidget()
+            self.history_table.setColumnCount(7)
+            self.history_table.setHorizontalHeaderLabels([
+                "เลขที่สัญญา", "สินค้า", "ยอดฝาก", "วันที่เริ่มต้น",
+                "วันที่ครบกำหนด", "สถานะ", "ต่อดอก (ครั้ง)"
+            ])
+            self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+            history_layout.addWidget(self.history_table)
+            
+            layout.addWidget(history_group)
+        
         # ปุ่ม
         button_layout = QHBoxLayout()
         save_button = QPushButton("บันทึก")
@@ -628,7 +654,10 @@ class CustomerDialog(QDialog):
                     self.province_edit.setText(address_parts["province"])
                 
                 # เก็บที่อยู่ที่แยกไม่ได้ในรายละเอียดอื่นๆ
-                remaining_address = address_parts.get("remaining", "")
+                remaining_address = " ".join(filter(None, [
+                    address_parts.get("remaining", ""),
+                    f"รหัสไปรษณีย์ {address_parts['postcode']}" if address_parts.get("postcode") else "",
+                ]))
                 if remaining_address:
                     self.other_details_edit.setPlainText(f"ที่อยู่เพิ่มเติม: {remaining_address}")
             
@@ -636,77 +665,14 @@ class CustomerDialog(QDialog):
             print(f"Error filling form: {e}")
     
     def parse_thai_address(self, address):
-        """แยกที่อยู่ไทยเป็นส่วนๆ"""
-        address_parts = {}
-        
+        """แยกที่อยู่ไทยเป็นส่วนๆ (ตรวจชื่อตำบล/อำเภอ/จังหวัดกับ gazetteer ดู thai_address)"""
         try:
-            # ลบช่องว่างที่ไม่จำเป็น
-            address = " ".join(address.split())
-            
-            # แยกบ้านเลขที่ (มักอยู่ต้นข้อความ)
-            house_match = re.match(r'^(\d+)\s*', address)
-            if house_match:
-                address_parts["house_number"] = house_match.group(1)
-                address = address[house_match.end():].strip()
-            
-            # แยกจังหวัด (มักอยู่ท้ายข้อความ)
-            provinces = [
-                "กรุงเทพมหานคร", "กระบี่", "กาญจนบุรี", "กาฬสินธุ์", "กำแพงเพชร", "ขอนแก่น", "จันทบุรี", "ฉะเชิงเทรา",
-                "ชลบุรี", "ชัยนาท", "ชัยภูมิ", "ชุมพร", "เชียงราย", "เชียงใหม่", "ตรัง", "ตราด", "ตาก", "นครนายก",
-                "นครปฐม", "นครพนม", "นครราชสีมา", "นครศรีธรรมราช", "นครสวรรค์", "นนทบุรี", "นราธิวาส", "น่าน",
-                "บึงกาฬ", "บุรีรัมย์", "ปทุมธานี", "ประจวบคีรีขันธ์", "ปราจีนบุรี", "ปัตตานี", "พระนครศรีอยุธยา",
-                "พังงา", "พัทลุง", "พิจิตร", "พิษณุโลก", "เพชรบุรี", "เพชรบูรณ์", "แพร่", "พะเยา", "ภูเก็ต",
-                "มหาสารคาม", "มุกดาหาร", "แม่ฮ่องสอน", "ยะลา", "ยโสธร", "ร้อยเอ็ด", "ระนอง", "ระยอง", "ราชบุรี",
-                "ลพบุรี", "ลำปาง", "ลำพูน", "เลย", "ศรีสะเกษ", "สกลนคร", "สงขลา", "สตูล", "สมุทรปราการ",
-                "สมุทรสงคราม", "สมุทรสาคร", "สระแก้ว", "สระบุรี", "สิงห์บุรี", "สุโขทัย", "สุพรรณบุรี", "สุราษฎร์ธานี",
-                "สุรินทร์", "หนองคาย", "หนองบัวลำภู", "อ่างทอง", "อุดรธานี", "อุทัยธานี", "อุตรดิตถ์", "อุบลราชธานี",
-                "อำนาจเจริญ"
-            ]
-            
-            for province in provinces:
-                if province in address:
-                    address_parts["province"] = province
-                    # ตัดจังหวัดออกจากที่อยู่
-                    address = address.replace(province, "").strip()
-                    break
-            
-            # แยกเขต/อำเภอ (มักมีคำว่า "เขต" หรือ "อำเภอ")
-            district_match = re.search(r'(เขต|อำเภอ)\s*([^\s]+)', address)
-            if district_match:
-                district_type = district_match.group(1)
-                district_name = district_match.group(2)
-                address_parts["district"] = f"{district_type}{district_name}"
-                # ตัดเขต/อำเภอออกจากที่อยู่
-                address = address.replace(district_match.group(0), "").strip()
-            
-            # แยกแขวง/ตำบล (มักมีคำว่า "แขวง" หรือ "ตำบล")
-            subdistrict_match = re.search(r'(แขวง|ตำบล)\s*([^\s]+)', address)
-            if subdistrict_match:
-                subdistrict_type = subdistrict_match.group(1)
-                subdistrict_name = subdistrict_match.group(2)
-                address_parts["subdistrict"] = f"{subdistrict_type}{subdistrict_name}"
-                # ตัดแขวง/ตำบลออกจากที่อยู่
-                address = address.replace(subdistrict_match.group(0), "").strip()
-            
-            # แยกถนน/ซอย
-            street_match = re.search(r'(ถนน|ซอย)\s*([^\s]+)', address)
-            if street_match:
-                street_type = street_match.group(1)
-                street_name = street_match.group(2)
-                address_parts["street"] = f"{street_type}{street_name}"
-                # ตัดถนน/ซอยออกจากที่อยู่
-                address = address.replace(street_match.group(0), "").strip()
-            
-            # ที่เหลือเก็บใน remaining
-            if address.strip():
-                address_parts["remaining"] = address.strip()
-            
+            address_parts = parse_thai_address(address)
             print(f"แยกที่อยู่: {address_parts}")
-            
         except Exception as e:
             print(f"Error parsing address: {e}")
             # หากแยกไม่ได้ ให้เก็บทั้งหมดใน remaining
-            address_parts["remaining"] = address
+            address_parts = {"remaining": " ".join(address.split())}
         
         return address_parts
     
@@ -738,6 +704,42 @@ class CustomerDialog(QDialog):
         self.district_edit.setText(self.customer_data.get('district', ''))
         self.province_edit.setText(self.customer_data.get('province', ''))
         self.other_details_edit.setPlainText(self.customer_data.get('other_details', ''))
+        
+        if hasattr(self, 'history_table'):
+            self.load_customer_history()
+    
+    def load_customer_history(self):
+        """โหลดประวัติสัญญา การต่อดอก และการไถ่คืนของลูกค้า"""
+        try:
+            history = self.db.get_customer_history(self.customer_data['id'])
+            if not history:
+                return
+            
+            totals = history['totals']
+            self.history_summary_label.setText(
+                f"สัญญาทั้งหมด {totals['contract_count']} | ยังไม่ไถ่คืน {totals['open_contract_count']} | "
+                f"เงินต้นคงค้าง {totals['outstanding_principal']:,.2f} บาท | "
+                f"ยอดไถ่คืนคงค้าง {totals['outstanding_redemption']:,.2f} บาท"
+            )
+            
+            status_texts = {'active': "เปิด", 'redeemed': "ไถ่คืน", 'forfeited': "หลุด", 'lost': "หาย"}
+            contracts = history['contracts']
+            self.history_table.setRowCount(len(contracts))
+            for row, contract in enumerate(contracts):
+                status = contract.get('status', '')
+                values = [
+                    contract.get('contract_number', ''),
+                    contract.get('product_name', '') or '',
+                    f"{contract.get('pawn_amount', 0):,.2f}",
+                    contract.get('start_date', '') or '',
+                    contract.get('end_date', '') or '',
+                    status_texts.get(status, status),
+                    str(len(contract['renewals'])),
+                ]
+                for col, value in enumerate(values):
+                    self.history_table.setItem(row, col, QTableWidgetItem(value))
+        except Exception as e:
+            print(f"Error loading customer history: {e}")
     
     def generate_customer_code(self):
         """สร้างรหัสลูกค้าอัตโนมัติ"""
@@ -1013,6 +1015,14 @@ class ProductDialog(QDialog):
             'condition': self.condition_edit.toPlainText().strip(),
             'accessories': self.accessories_edit.toPlainText().strip()
         }
+        
+        # ตรวจ IMEI กับรายการเครื่องแจ้งหาย/ถูกขโมย
+        blocked = get_blocklist().find_blocked(product_data)
+        if blocked:
+            QMessageBox.critical(self, "ไม่สามารถรับจำนำได้",
+                "IMEI {} อยู่ในรายการเครื่องแจ้งหาย/ถูกขโมย".format(", ".join(blocked)))
+            return
+        
         # จัดการคัดลอกรูปภาพไปยังโฟลเดอร์ของโปรแกรม
         try:
             source_path = getattr(self, '_image_source_path', '') or self.image_path_edit.text().strip()
@@ -1541,17 +1551,19 @@ class RedemptionDialog(QDialog):
             # ใช้ยอดไถ่คืนที่ตั้งไว้ในสัญญาเดิมแทนที่จะใช้แค่ยอดเงินต้น
             principal = self.contract_data.get('total_redemption', self.contract_data.get('pawn_amount', 0))
             
-            # คำนวณค่าปรับ (ถ้าเกินกำหนด)
-            penalty = 0
-            if self.redemption_date_edit.date() > self.due_date_edit.date():
-                overdue_days = self.due_date_edit.date().daysTo(self.redemption_date_edit.date())
-                penalty = overdue_days * 10  # ค่าปรับวันละ 10 บาท
-            
-            # คำนวณส่วนลด (ถ้ามี)
-            discount = 0
-            
-            # คำนวณยอดรวม
-            total = principal + penalty - discount
+            # ค่าปรับ (ถ้าเกินกำหนด) คิดจากวันครบกำหนดถึงวันไถ่คืน ตามค่าปรับต่อวันในการตั้งค่า
+            deposit_date = self.deposit_date_edit.date()
+            result = quote(
+                self.contract_data.get('pawn_amount', 0),
+                deposit_date.daysTo(self.due_date_edit.date()),
+                start_date=deposit_date.toString("yyyy-MM-dd"),
+                as_of=self.redemption_date_edit.date().toString("yyyy-MM-dd"),
+                terms=get_fee_schedule(self.db).terms(),
+                total_redemption=principal,
+            )
+            penalty = result['penalty']
+            discount = result['discount']
+            total = result['total_due']
             
             # แสดงผลลัพธ์
             self.principal_amount_label.setText(f"{principal:,.2f} บาท")
@@ -2053,47 +2065,57 @@ class RenewalDialog(QDialog):
         renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_count")), 1, 0)
         renewal_layout.addWidget(self.renewal_count_spin, 1, 1)
         
+        # ค่าธรรมเนียมต่อดอก (ดอกเบี้ยรอบสัญญา)
+        self.fee_amount_spin = QDoubleSpinBox()
+        self.fee_amount_spin.setRange(0, 999999)
+        self.fee_amount_spin.setSuffix(" บาท")
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_fee")), 2, 0)
+        renewal_layout.addWidget(self.fee_amount_spin, 2, 1)
         
-        # ค่าปรับ
+        # ค่าปรับ (วันที่เกินกำหนด)
         self.penalty_amount_spin = QDoubleSpinBox()
         self.penalty_amount_spin.setRange(0, 999999)
         self.penalty_amount_spin.setSuffix(" บาท")
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_penalty")), 2, 0)
-        renewal_layout.addWidget(self.penalty_amount_spin, 2, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_penalty")), 3, 0)
+        renewal_layout.addWidget(self.penalty_amount_spin, 3, 1)
         
         # ส่วนลด
         self.discount_amount_spin = QDoubleSpinBox()
         self.discount_amount_spin.setRange(0, 999999)
         self.discount_amount_spin.setSuffix(" บาท")
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_discount")), 3, 0)
-        renewal_layout.addWidget(self.discount_amount_spin, 3, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_discount")), 4, 0)
+        renewal_layout.addWidget(self.discount_amount_spin, 4, 1)
         
         # รวม
         self.total_amount_label = QLabel("0.00 บาท")
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_total")), 4, 0)
-        renewal_layout.addWidget(self.total_amount_label, 4, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_total")), 5, 0)
+        renewal_layout.addWidget(self.total_amount_label, 5, 1)
         
         # วันที่ต่อดอก
         self.renewal_date_edit = QDateEdit()
         self.renewal_date_edit.setDate(QDate.currentDate())
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_date")), 5, 0)
-        renewal_layout.addWidget(self.renewal_date_edit, 5, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_date")), 6, 0)
+        renewal_layout.addWidget(self.renewal_date_edit, 6, 1)
         
         # วันครบกำหนดปัจจุบัน
         self.current_due_date_edit = QDateEdit()
         self.current_due_date_edit.setDate(QDate.currentDate())
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_current_due")), 6, 0)
-        renewal_layout.addWidget(self.current_due_date_edit, 6, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_current_due")), 7, 0)
+        renewal_layout.addWidget(self.current_due_date_edit, 7, 1)
         
         # วันครบกำหนดใหม่
         self.new_due_date_edit = QDateEdit()
         self.new_due_date_edit.setDate(QDate.currentDate())
-        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_new_due")), 7, 0)
-        renewal_layout.addWidget(self.new_due_date_edit, 7, 1)
+        renewal_layout.addWidget(QLabel(language_manager.get_text("renewal_new_due")), 8, 0)
+        renewal_layout.addWidget(self.new_due_date_edit, 8, 1)
         
         # เชื่อมต่อสัญญาณ
+        self.fee_amount_spin.valueChanged.connect(self.calculate_total)
         self.penalty_amount_spin.valueChanged.connect(self.calculate_total)
         self.discount_amount_spin.valueChanged.connect(self.calculate_total)
+        # ยอดที่เสนอขึ้นกับวันต่อดอกและวันครบกำหนด: คำนวณใหม่เมื่อวันที่เปลี่ยน
+        self.renewal_date_edit.dateChanged.connect(self.suggest_renewal_fee)
+        self.current_due_date_edit.dateChanged.connect(self.suggest_renewal_fee)
         
         layout.addWidget(renewal_group)
         
@@ -2168,6 +2190,40 @@ class RenewalDialog(QDialog):
                         self.current_due_date_edit.setDate(start_date.addDays(self.contract_data.get('days_count', 30)))
                 except:
                     pass
+            
+            # เสนอยอดต่อดอกจากตารางค่าธรรมเนียม (แก้ไขเองได้)
+            self.suggest_renewal_fee()
+    
+    def suggest_renewal_fee(self):
+        """เสนอค่าธรรมเนียม (ดอกเบี้ยรอบสัญญาตามตารางอัตรา) และค่าปรับวันที่เกินกำหนดแยกช่องกัน
+        
+        ช่องที่ผู้ใช้แก้ตัวเลขเองแล้วจะไม่ถูกเขียนทับ
+        """
+        if not self.contract_data:
+            return
+        try:
+            days = self.contract_data.get('days_count', 30) or 30
+            due_date = self.current_due_date_edit.date()
+            result = quote(
+                self.contract_data.get('pawn_amount', 0) or 0,
+                days,
+                rate=float(load_shop_config().get('interest_rate', 10.0)),
+                start_date=due_date.addDays(-days).toString("yyyy-MM-dd"),
+                as_of=self.renewal_date_edit.date().toString("yyyy-MM-dd"),
+                terms=get_fee_schedule(self.db).terms(),
+            )
+            self._set_suggested(self.fee_amount_spin, result['interest'])
+            self._set_suggested(self.penalty_amount_spin, result['penalty'])
+        except Exception as e:
+            print(f"Error suggesting renewal fee: {e}")
+    
+    def _set_suggested(self, spin: QDoubleSpinBox, value: float):
+        """ตั้งค่าที่เสนอ เฉพาะเมื่อยังไม่เคยเสนอ หรือช่องยังเป็นค่าที่เสนอครั้งก่อน"""
+        suggested = spin.property("suggested_value")
+        if suggested is not None and spin.value() != suggested:
+            return
+        spin.setValue(round(value, 2))
+        spin.setProperty("suggested_value", spin.value())
     
     def calculate_deposit_days(self):
         """คำนวณจำนวนวันฝากนับถึงปัจจุบัน"""
@@ -2176,15 +2232,16 @@ class RenewalDialog(QDialog):
                 start_date = datetime.strptime(self.contract_data['start_date'], "%Y-%m-%d")
                 current_date = datetime.now()
                 days_diff = (current_date - start_date).days
-                self.days_deposit_label.setText("{days_diff} วัน")
+                self.days_deposit_label.setText(f"{days_diff} วัน")
             except:
                 self.days_deposit_label.setText("0 วัน")
     
     def calculate_total(self):
         """คำนวณยอดรวม"""
+        fee = self.fee_amount_spin.value()
         penalty = self.penalty_amount_spin.value()
         discount = self.discount_amount_spin.value()
-        total = penalty - discount
+        total = fee + penalty - discount
         self.total_amount_label.setText(f"{total:,.2f} บาท")
     
     def save_renewal(self):
@@ -2194,13 +2251,15 @@ class RenewalDialog(QDialog):
             return
         
         # ตรวจสอบข้อมูลที่จำเป็น
-        if self.penalty_amount_spin.value() == 0 and self.discount_amount_spin.value() == 0:
-            QMessageBox.warning(self, "แจ้งเตือน", "กรุณากรอกค่าปรับหรือส่วนลดอย่างน้อยหนึ่งรายการ")
+        if (self.fee_amount_spin.value() == 0 and self.penalty_amount_spin.value() == 0
+                and self.discount_amount_spin.value() == 0):
+            QMessageBox.warning(self, "แจ้งเตือน", "กรุณากรอกค่าธรรมเนียม ค่าปรับ หรือส่วนลดอย่างน้อยหนึ่งรายการ")
             return
         
         renewal_data = {
             'contract_id': self.contract_data['id'],
             'renewal_count': self.renewal_count_spin.value(),
+            'fee_amount': self.fee_amount_spin.value(),
             'penalty_amount': self.penalty_amount_spin.value(),
             'discount_amount': self.discount_amount_spin.value(),
             'total_amount': float(self.total_amount_label.text().replace(' บาท', '').replace(',', '')),
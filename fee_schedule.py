@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+ตารางอัตราค่าธรรมเนียม (ดอกเบี้ย) และค่าปรับ จากตาราง fee_rates ในฐานข้อมูล
+
+fee_rates แต่ละแถวคือขั้นอัตรา: สัญญาที่ฝากตั้งแต่ days_count วันขึ้นไปใช้ fee_rate (% ต่อเดือน)
+จนกว่าจะถึงขั้นถัดไป เช่น
+    days_count=0   fee_rate=10   -> 0-89 วัน 10%
+    days_count=90  fee_rate=8    -> 90 วันขึ้นไป 8%
+ค่าปรับเกินกำหนดคิดเป็นบาทต่อวันจาก settings.penalty_per_day
+
+ตารางถูกโหลดเข้าหน่วยความจำครั้งเดียวเป็น quotation.FeeTerms แล้วค้นด้วย bisect
+การคำนวณทุกครั้งที่พิมพ์จึงไม่แตะฐานข้อมูล
+เวอร์ชันของตารางจะถูกตรวจซ้ำไม่เกินทุก CHECK_INTERVAL วินาที (trigger ในฐานข้อมูลเพิ่มเวอร์ชันเมื่อมีการแก้ไข)
+"""
+import time
+from typing import Dict, List, Optional
+
+from quotation import DEFAULT_PENALTY_PER_DAY, FeeTerms
+
+# ระยะเวลาขั้นต่ำระหว่างการตรวจเวอร์ชันตารางในฐานข้อมูล (วินาที)
+CHECK_INTERVAL = 30.0
+
+
+class FeeSchedule:
+    """อัตราค่าธรรมเนียมแบบขั้นบันไดตามจำนวนวันฝาก + ค่าปรับต่อวัน"""
+
+    def __init__(self, db, check_interval: float = CHECK_INTERVAL):
+        self.db = db
+        self.check_interval = check_interval
+        self._terms = FeeTerms()
+        self._version = None
+        self._checked_at = None
+
+    def invalidate(self):
+        """บังคับให้โหลดตารางใหม่ในการคำนวณครั้งถัดไป"""
+        self._version = None
+        self._checked_at = None
+
+    def _load(self, version: str):
+        tiers = self.db.get_fee_rates()
+        try:
+            penalty_per_day = float(self.db.get_setting('penalty_per_day') or DEFAULT_PENALTY_PER_DAY)
+        except ValueError:
+            penalty_per_day = DEFAULT_PENALTY_PER_DAY
+        self._terms = FeeTerms(
+            days=tuple(int(tier['days_count']) for tier in tiers),
+            rates=tuple(float(tier['fee_rate']) for tier in tiers),
+            penalty_per_day=penalty_per_day,
+        )
+        self._version = version
+
+    def ensure_loaded(self):
+        """โหลดตารางถ้ายังไม่เคยโหลด หรือเวอร์ชันในฐานข้อมูลเปลี่ยน (ตรวจไม่เกินทุก check_interval วินาที)"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        version = self.db.get_fee_schedule_version()
+        if version != self._version:
+            self._load(version)
+
+    def terms(self) -> FeeTerms:
+        """อัตราปัจจุบันสำหรับส่งให้ quotation.quote()"""
+        self.ensure_loaded()
+        return self._terms
+
+    @property
+    def has_tiers(self) -> bool:
+        return bool(self.terms().days)
+
+    def interest_rate(self, days: int, default: Optional[float] = None) -> Optional[float]:
+        """อัตราดอกเบี้ย (% ต่อเดือน) สำหรับสัญญา days วัน
+
+        ถ้าตารางว่างหรือ days น้อยกว่าขั้นแรก คืน default
+        """
+        return self.terms().rate_for(days, default)
+
+    def penalty(self, overdue_days: int) -> float:
+        """ค่าปรับเกินกำหนด"""
+        return max(overdue_days, 0) * self.terms().penalty_per_day
+
+    def tiers(self) -> List[Dict]:
+        """ขั้นอัตราทั้งหมด [{'from_days', 'to_days', 'rate'}] (to_days=None คือไม่จำกัด)"""
+        terms = self.terms()
+        result = []
+        for i, (days, rate) in enumerate(zip(terms.days, terms.rates)):
+            to_days = terms.days[i + 1] - 1 if i + 1 < len(terms.days) else None
+            result.append({'from_days': days, 'to_days': to_days, 'rate': rate})
+        return result
+
+
+def get_fee_schedule(db) -> FeeSchedule:
+    """FeeSchedule ที่ผูกกับ db (สร้างครั้งเดียวต่อ db object แล้วใช้ร่วมกันทุกหน้าจอ)"""
+    schedule = getattr(db, '_fee_schedule', None)
+    if schedule is None:
+        schedule = FeeSchedule(db)
+        db._fee_schedule = schedule
+    return schedule
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+รายการ IMEI เครื่องแจ้งหาย/ถูกขโมย สำหรับตรวจก่อนรับจำนำ (ทำงานในเครื่อง ไม่ใช้เครือข่าย)
+
+เก็บในโฟลเดอร์ imei_blocklist/ ข้างโปรแกรม:
+- base-<version>.npy     IMEI ทั้งหมดเรียงลำดับ (uint64 ละ 8 ไบต์) เปิดแบบ memory-map
+                         ไม่ต้องอ่านทั้งไฟล์เข้าหน่วยความจำ ค้นด้วย binary search (ไม่กี่ไมโครวินาทีแม้มีหลายล้านรายการ)
+- added/removed-<version>.npy  รายการที่เพิ่ม/ลบจากไฟล์อัปเดตย่อย (delta) ซึ่งยังไม่ได้รวมเข้า base
+- meta.json              ไฟล์ปัจจุบันของแต่ละส่วน
+
+IMEI เก็บเป็นตัวเลข 14 หลักแรก (TAC + หมายเลขเครื่อง) หลักที่ 15 คือ check digit ซึ่งคำนวณได้
+รายการที่ได้มาเป็น 14, 15 หลัก หรือ IMEISV 16 หลักจึงตรงกันได้ทั้งหมด
+ไฟล์ใหม่ใช้ชื่อตาม version แล้วค่อยสลับ meta.json (ไฟล์ที่โปรแกรมอื่นเปิด memory-map อยู่จึงไม่ถูกเขียนทับ)
+
+วิธีใช้:
+    python imei_blocklist.py import stolen_list.csv       แทนที่รายการทั้งหมด
+    python imei_blocklist.py add new_reports.txt          เพิ่มรายการ (delta)
+    python imei_blocklist.py remove recovered.txt         ลบรายการที่ได้คืนแล้ว (delta)
+    python imei_blocklist.py check 490154203237518
+    python imei_blocklist.py info
+    python imei_blocklist.py --benchmark 5000000
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# โฟลเดอร์เริ่มต้นของรายการ (อ้างอิงโฟลเดอร์โปรแกรม)
+BLOCKLIST_DIR = 'imei_blocklist'
+
+# รวม delta เข้า base เมื่อจำนวนรายการใน delta เกินค่านี้ หรือเกิน 1/COMPACT_RATIO ของ base
+COMPACT_THRESHOLD = 100000
+COMPACT_RATIO = 20
+
+# ระยะเวลาขั้นต่ำระหว่างการตรวจว่ารายการถูกอัปเดตโดยโปรแกรมอื่น (วินาที)
+CHECK_INTERVAL = 30.0
+
+# ตัวเลข 14-16 หลักที่ไม่ติดกับตัวเลขอื่น (ยอมให้มีขีดคั่น เช่น 35-209900-176148-1)
+_IMEI_PATTERN = re.compile(r'(?<![\d-])\d[\d-]{12,20}\d(?![\d-])')
+
+_EMPTY = np.empty(0, dtype=np.uint64)
+
+
+def imei_key(text) -> Optional[int]:
+    """ตัวเลข 14 หลักแรกของ IMEI (14-16 หลัก) หรือ None ถ้าไม่ใช่ IMEI"""
+    digits = re.sub(r'[\s-]', '', str(text or ''))
+    if not digits.isdigit() or not 14 <= len(digits) <= 16:
+        return None
+    return int(digits[:14])
+
+
+def read_imei_file(path: str, chunk_size: int = 1000000) -> np.ndarray:
+    """อ่าน IMEI จากไฟล์ข้อความ/CSV (ทีละบรรทัด ทุกคอลัมน์) คืน array ที่เรียงและไม่ซ้ำ"""
+    chunks = []
+    keys: List[int] = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            for match in _IMEI_PATTERN.findall(line):
+                key = imei_key(match)
+                if key is not None:
+                    keys.append(key)
+            if len(keys) >= chunk_size:
+                chunks.append(np.array(keys, dtype=np.uint64))
+                keys = []
+    chunks.append(np.array(keys, dtype=np.uint64))
+    return np.unique(np.concatenate(chunks))
+
+
+def _sorted_contains(array: np.ndarray, key: int) -> bool:
+    if not len(array):
+        return False
+    index = int(np.searchsorted(array, np.uint64(key)))
+    return index < len(array) and int(array[index]) == key
+
+
+class IMEIBlocklist:
+    """รายการ IMEI ต้องห้ามบนดิสก์ (base แบบ memory-map + delta ในหน่วยความจำ)"""
+
+    def __init__(self, directory: str, check_interval: float = CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._meta: Dict = {}
+        self._stamp = None
+        self._checked_at = None
+        self._base = _EMPTY
+        self._added = _EMPTY
+        self._removed = _EMPTY
+        self._lock = threading.RLock()
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, 'meta.json')
+
+    # ---------- อ่าน ----------
+
+    def _meta_stamp(self):
+        try:
+            stat = os.stat(self.meta_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load_array(self, name: Optional[str], mmap: bool) -> np.ndarray:
+        if not name:
+            return _EMPTY
+        path = os.path.join(self.directory, name)
+        array = np.load(path, mmap_mode='r' if mmap else None)
+        return array if len(array) else _EMPTY
+
+    def _reload(self):
+        stamp = self._meta_stamp()
+        if stamp == self._stamp:
+            return
+        meta = {}
+        if stamp is not None:
+            try:
+                with open(self.meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                base = self._load_array(meta.get('base'), mmap=True)
+                added = self._load_array(meta.get('added'), mmap=False)
+                removed = self._load_array(meta.get('removed'), mmap=False)
+            except Exception as e:
+                print("Error loading IMEI blocklist {}: {}".format(self.directory, e))
+                return
+        else:
+            base = added = removed = _EMPTY
+        self._meta, self._stamp = meta, stamp
+        self._base, self._added, self._removed = base, added, removed
+
+    def ensure_loaded(self):
+        """โหลดรายการใหม่ถ้าไฟล์ถูกอัปเดต (ตรวจไม่เกินทุก check_interval วินาที)"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            self._reload()
+
+    def invalidate(self):
+        """บังคับให้ตรวจไฟล์ในการค้นครั้งถัดไป"""
+        self._checked_at = None
+
+    def contains(self, imei) -> bool:
+        """IMEI นี้อยู่ในรายการหรือไม่ (ข้อความที่ไม่ใช่ IMEI คืน False)"""
+        key = imei_key(imei)
+        if key is None:
+            return False
+        self.ensure_loaded()
+        if _sorted_contains(self._removed, key):
+            return False
+        return _sorted_contains(self._added, key) or _sorted_contains(self._base, key)
+
+    def find_blocked(self, product_data: Dict, fields: Iterable[str] = ('imei1', 'imei2', 'serial_number')) -> List[str]:
+        """ค่าในช่อง IMEI (และซีเรียลที่เป็นเลข IMEI) ของสินค้าที่อยู่ในรายการ"""
+        blocked = []
+        for field in fields:
+            value = (product_data.get(field) or '').strip()
+            if value and value not in blocked and self.contains(value):
+                blocked.append(value)
+        return blocked
+
+    def info(self) -> Dict:
+        self.invalidate()
+        self.ensure_loaded()
+        return {
+            'version': self._meta.get('version', 0),
+            'count': self._meta.get('count', 0),
+            'base_count': len(self._base),
+            'added_count': len(self._added),
+            'removed_count': len(self._removed),
+            'updated_at': self._meta.get('updated_at'),
+            'source': self._meta.get('source'),
+        }
+
+    # ---------- เขียน ----------
+
+    def _write_array(self, prefix: str, version: int, array: np.ndarray) -> Optional[str]:
+        if not len(array):
+            return None
+        name = '{}-{}.npy'.format(prefix, version)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.uint64))
+        os.replace(temp_path, os.path.join(self.directory, name))
+        return name
+
+    def _commit(self, base: np.ndarray, added: np.ndarray, removed: np.ndarray, source: str, base_name=None):
+        """เขียนไฟล์ของ version ใหม่แล้วสลับ meta.json ไฟล์ของ version เก่าลบทีหลัง"""
+        os.makedirs(self.directory, exist_ok=True)
+        version = int(self._meta.get('version', 0)) + 1
+        if base_name is None:
+            base_name = self._write_array('base', version, base)
+        meta = {
+            'version': version,
+            'base': base_name,
+            'added': self._write_array('added', version, added),
+            'removed': self._write_array('removed', version, removed),
+            'count': int(len(base) + len(added) - np.isin(removed, base, assume_unique=True).sum()),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.meta_path)
+
+        self._stamp = None
+        self._reload()
+        self._remove_unused_files()
+
+    def _remove_unused_files(self):
+        # Windows ไม่ยอมลบไฟล์ที่โปรแกรมอื่นเปิด memory-map อยู่ จะลบได้ในการอัปเดตครั้งถัดไป
+        in_use = {self._meta.get('base'), self._meta.get('added'), self._meta.get('removed'), 'meta.json'}
+        for name in os.listdir(self.directory):
+            if name not in in_use and (name.endswith('.npy') or name.endswith('.tmp')):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def replace(self, imeis: np.ndarray, source: str = ''):
+        """แทนที่รายการทั้งหมด (imeis: array ของ imei_key ที่เรียงและไม่ซ้ำ เช่นจาก read_imei_file)"""
+        with self._lock:
+            self.invalidate()
+            self._reload()
+            self._commit(np.asarray(imeis, dtype=np.uint64), _EMPTY, _EMPTY, source)
+
+    def apply_delta(self, add: np.ndarray = _EMPTY, remove: np.ndarray = _EMPTY, source: str = ''):
+        """เพิ่ม/ลบรายการ ถ้า delta สะสมมากเกินไปจะรวมเข้า base"""
+        add = np.unique(np.asarray(add, dtype=np.uint64))
+        remove = np.setdiff1d(np.asarray(remove, dtype=np.uint64), add)
+        with self._lock:
+            self.invalidate()
+            self._reload()
+            base = np.asarray(self._base)
+            added = np.setdiff1d(np.union1d(self._added, add), remove)
+            removed = np.setdiff1d(np.union1d(self._removed, remove), add)
+            # ลบเฉพาะที่อยู่ใน base / เพิ่มเฉพาะที่ยังไม่มีใน base
+            removed = removed[np.isin(removed, base, assume_unique=True)]
+            added = added[~np.isin(added, base, assume_unique=True)]
+
+            if len(added) + len(removed) > max(COMPACT_THRESHOLD, len(base) // COMPACT_RATIO):
+                merged = np.setdiff1d(np.union1d(base, added), removed, assume_unique=True)
+                self._commit(merged, _EMPTY, _EMPTY, source)
+            else:
+                self._commit(base, added, removed, source, base_name=self._meta.get('base'))
+
+    def compact(self):
+        """รวม delta เข้า base"""
+        with self._lock:
+            self.invalidate()
+            self._reload()
+            if len(self._added) or len(self._removed):
+                merged = np.setdiff1d(np.union1d(self._base, self._added), self._removed, assume_unique=True)
+                self._commit(merged, _EMPTY, _EMPTY, self._meta.get('source', ''))
+
+
+_blocklists: Dict[str, IMEIBlocklist] = {}
+_blocklists_lock = threading.Lock()
+
+
+def get_blocklist(directory: str = BLOCKLIST_DIR) -> IMEIBlocklist:
+    """IMEIBlocklist ของโฟลเดอร์นี้ (หนึ่ง object ต่อโฟลเดอร์ต่อโปรเซส) path แบบ relative อ้างอิงโฟลเดอร์โปรแกรม"""
+    if not os.path.isabs(directory):
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+    with _blocklists_lock:
+        blocklist = _blocklists.get(directory)
+        if blocklist is None:
+            blocklist = IMEIBlocklist(directory)
+            _blocklists[directory] = blocklist
+        return blocklist
+
+
+def benchmark(count: int = 5000000):
+    """สร้างรายการสุ่ม count รายการในโฟลเดอร์ชั่วคราว แล้ววัดเวลาค้น"""
+    rng = np.random.default_rng(0)
+    keys = np.unique(rng.integers(10 ** 13, 10 ** 14, count, dtype=np.uint64))
+    with tempfile.TemporaryDirectory() as directory:
+        blocklist = IMEIBlocklist(directory)
+        started = time.perf_counter()
+        blocklist.replace(keys, 'benchmark')
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        blocklist.apply_delta(add=rng.integers(10 ** 13, 10 ** 14, 1000, dtype=np.uint64), source='benchmark')
+        delta = time.perf_counter() - started
+
+        probes = [str(int(key)) + '0' for key in keys[:5000]] + [str(10 ** 14 + i) for i in range(5000)]
+        started = time.perf_counter()
+        hits = sum(blocklist.contains(imei) for imei in probes)
+        lookup = time.perf_counter() - started
+
+        print(f"entries:      {len(keys):,}")
+        print(f"replace:      {build * 1000:.1f} ms")
+        print(f"apply_delta:  {delta * 1000:.1f} ms (1,000 entries)")
+        print(f"contains:     {lookup / len(probes) * 1e6:.2f} us/lookup ({hits:,} hits)")
+        del blocklist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop IMEI blocklist")
+    parser.add_argument('--dir', default=BLOCKLIST_DIR)
+    parser.add_argument('--benchmark', type=int, default=None, metavar='N')
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser('import', help="replace the whole list from a file")
+    import_parser.add_argument('file')
+    add_parser = subparsers.add_parser('add', help="add IMEIs from a file (delta)")
+    add_parser.add_argument('file')
+    remove_parser = subparsers.add_parser('remove', help="remove IMEIs listed in a file (delta)")
+    remove_parser.add_argument('file')
+    check_parser = subparsers.add_parser('check', help="check IMEIs")
+    check_parser.add_argument('imeis', nargs='+')
+    subparsers.add_parser('compact', help="merge delta files into the base list")
+    subparsers.add_parser('info', help="show list statistics")
+
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.command:
+        parser.error("a command is required")
+
+    blocklist = get_blocklist(args.dir)
+    if args.command in ('import', 'add', 'remove'):
+        imeis = read_imei_file(args.file)
+        source = os.path.basename(args.file)
+        if args.command == 'import':
+            blocklist.replace(imeis, source)
+        elif args.command == 'add':
+            blocklist.apply_delta(add=imeis, source=source)
+        else:
+            blocklist.apply_delta(remove=imeis, source=source)
+        print(f"{args.command}: {len(imeis):,} IMEIs from {args.file}")
+    elif args.command == 'check':
+        for imei in args.imeis:
+            print("{}: {}".format(imei, 'BLOCKED' if blocklist.contains(imei) else 'ok'))
+        return
+    elif args.command == 'compact':
+        blocklist.compact()
+
+    for key, value in blocklist.info().items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
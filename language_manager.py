@@ -1,6 +1,6 @@
-import json
 import os
 from PySide6.QtCore import QObject, Signal
+from shop_config_loader import get_config_file
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.json")
 
@@ -48,6 +48,7 @@ _TRANSLATIONS = {
         "province": "จังหวัด:",
         "phone": "โทรศัพท์:",
         "other_details": "รายละเอียดอื่นๆ:",
+        "customer_exposure": "ยอดค้างลูกค้า:",
         "customer_add_group": "เพิ่มลูกค้าใหม่",
         "first_name": "ชื่อ:",
         "last_name": "นามสกุล:",
@@ -96,6 +97,7 @@ _TRANSLATIONS = {
         "status_active": "สัญญาเปิด",
         "status_redeemed": "ไถ่คืนแล้ว",
         "status_lost": "สูญหาย",
+        "status_forfeited": "หลุดจำนำ",
         "update_status": "อัปเดตสถานะ",
 
         # Right Panel: Results
@@ -115,6 +117,8 @@ _TRANSLATIONS = {
         # Search Group
         "search_group": "ค้นหาสัญญา",
         "search_by": "ค้นหาตาม:",
+        "quick_search": "ค้นหาด่วน:",
+        "enter_quick_search": "เลขที่สัญญา, เลขบัตร, เบอร์โทร, IMEI หรือชื่อ...",
         "search_type_contract": "เลขที่สัญญา",
         "search_type_idcard": "เลขบัตรประชาชน",
         "search_type_name": "ชื่อนามสกุล",
@@ -245,6 +249,7 @@ _TRANSLATIONS = {
         "province": "Province:",
         "phone": "Phone:",
         "other_details": "Other Details:",
+        "customer_exposure": "Customer Exposure:",
         "customer_add_group": "Add New Customer",
         "first_name": "First Name:",
         "last_name": "Last Name:",
@@ -293,6 +298,7 @@ _TRANSLATIONS = {
         "status_active": "Active",
         "status_redeemed": "Redeemed",
         "status_lost": "Lost",
+        "status_forfeited": "Forfeited",
         "update_status": "Update Status",
 
         # Right Panel: Results
@@ -312,6 +318,8 @@ _TRANSLATIONS = {
         # Search Group
         "search_group": "Search Contracts",
         "search_by": "Search by:",
+        "quick_search": "Quick search:",
+        "enter_quick_search": "Contract no, national ID, phone, IMEI or name...",
         "search_type_contract": "Contract No",
         "search_type_idcard": "National ID",
         "search_type_name": "Name",
@@ -441,6 +449,7 @@ _TRANSLATIONS = {
         "province": "ແຂວງ:",
         "phone": "ໂທລະສັບ:",
         "other_details": "ລາຍລະອຽດອື່ນໆ:",
+        "customer_exposure": "ຍອດຄ້າງລູກຄ້າ:",
         "customer_add_group": "ເພີ່ມລູກຄ້າໃໝ່",
         "first_name": "ຊື່:",
         "last_name": "ນາມສະກຸນ:",
@@ -485,6 +494,7 @@ _TRANSLATIONS = {
         "status_active": "ເປີດ",
         "status_redeemed": "ໄຖ່ຖອນແລ້ວ",
         "status_lost": "ສູນຫາຍ",
+        "status_forfeited": "ຫຼຸດຈຳນຳ",
         "update_status": "ອັບເດດສະຖານະ",
 
         # Right Panel: Results
@@ -504,6 +514,8 @@ _TRANSLATIONS = {
         # Search Group
         "search_group": "ຄົ້ນຫາສັນຍາ",
         "search_by": "ຄົ້ນຫາຕາມ:",
+        "quick_search": "ຄົ້ນຫາດ່ວນ:",
+        "enter_quick_search": "ເລກສັນຍາ, ເລກບັດ, ເບີໂທ, IMEI ຫຼື ຊື່...",
         "search_type_contract": "ເລກສັນຍາ",
         "search_type_idcard": "ເລກບັດປະຊາຊົນ",
         "search_type_name": "ຊື່",
@@ -622,6 +634,7 @@ _TRANSLATIONS = {
         "province": "တိုင်း/ပြည်နယ်:",
         "phone": "ဖုန်း:",
         "other_details": "အသေးစိတ် အခြား:",
+        "customer_exposure": "ဖောက်သည် ကျန်ငွေ:",
         "customer_add_group": "ဈေးသည်အသစ်ထည့်",
         "first_name": "နာမည်:",
         "last_name": "အမျိုးအမည်:",
@@ -666,6 +679,7 @@ _TRANSLATIONS = {
         "status_active": "ဖွင့်",
         "status_redeemed": "ပြန်ရယူပြီး",
         "status_lost": "ဆုံးရှုံး",
+        "status_forfeited": "အပေါင်ဆုံး",
         "update_status": "အနေအထား အပ်ဒိတ်",
 
         # Right Panel: Results
@@ -685,6 +699,8 @@ _TRANSLATIONS = {
         # Search Group
         "search_group": "စာချုပ် ရှာဖွေ",
         "search_by": "ရှာဖွေခြင်း:",
+        "quick_search": "အမြန်ရှာဖွေ:",
+        "enter_quick_search": "စာချုပ်နံပါတ်၊ အမျိုးသားကတ်၊ ဖုန်း၊ IMEI သို့မဟုတ် အမည်...",
         "search_type_contract": "စာချုပ်နံပါတ်",
         "search_type_idcard": "အမျိုးသားကတ်",
         "search_type_name": "အမည်",
@@ -775,19 +791,15 @@ class LanguageManager(QObject):
 
     def _load_language_from_config(self):
         try:
-            if os.path.exists(CONFIG_FILE):
-                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    lang = data.get("language")
-                    if lang in _TRANSLATIONS:
-                        self._current_language = lang
+            lang = get_config_file(CONFIG_FILE).get("language")
+            if lang in _TRANSLATIONS:
+                self._current_language = lang
         except Exception:
             pass
 
     def _save_language_to_config(self):
         try:
-            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump({"language": self._current_language}, f, ensure_ascii=False, indent=2)
+            get_config_file(CONFIG_FILE).update({"language": self._current_language})
         except Exception:
             pass
 
@@ -12,7 +12,7 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QRadioButton, QToolBar,
     QMenuBar, QMessageBox, QDateEdit, QDoubleSpinBox, QSpinBox, QTextEdit,
     QScrollArea, QFrame, QFileDialog, QDialog, QProgressDialog, QInputDialog,
-    QSizePolicy, QCheckBox
+    QSizePolicy, QCheckBox, QListWidget, QListWidgetItem
 )
 from resource_path import resource_path, get_font_path, get_icon_path
 from reportlab.lib.pagesizes import A4
@@ -23,14 +23,21 @@ from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from PySide6.QtGui import QIcon, QAction, QPixmap, QPalette, QColor
-from PySide6.QtCore import Qt, QSize, QDate
+from PySide6.QtCore import Qt, QSize, QDate, QEvent
 from datetime import datetime, timedelta
 import requests
 import json
-from database import PawnShopDatabase
+from database import OPEN_STATUSES
+from remote_database import create_database
 from utils import PawnShopUtils
+from fee_schedule import get_fee_schedule
+from imei_blocklist import get_blocklist
+from quotation import quote
 from dialogs import CustomerDialog, ProductDialog, InterestPaymentDialog, RedemptionDialog, RenewalDialog
-from data_viewer import DataViewerDialog
+from data_viewer import DataViewerDialog, status_text
+from address_completer import AddressCompleter
+from background_loader import SearchController, TabLoader
+from omnibox import QUERY_LABELS
 from customer_search import CustomerSearchDialog
 from product_search import ProductSearchDialog
 from settings_dialog import SettingsDialog
@@ -43,6 +50,7 @@ from app_services import (
     copy_product_image as svc_copy_product_image,
 )
 from language_manager import language_manager
+from maintenance_scheduler import MaintenanceScheduler
 import cv2
 import numpy as np
 #hi
@@ -64,11 +72,12 @@ ICON_MAP = {
 class PawnShopUI(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.db = PawnShopDatabase()
+        self.db = create_database()
         self.current_customer = None
         self.current_product = None
         self.current_contract = None
         self.is_loading_existing_contract = False
+        self.auto_calculate_interest = True
         
         self.setWindowTitle("Phoneshop Management System")
         self.setMinimumSize(1024, 700)
@@ -360,6 +369,15 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         
         # ตรวจสอบสัญญาหมดอายุเมื่อเปิดโปรแกรม
         self.check_forfeited_products_on_startup()
+        
+        # บำรุงรักษาฐานข้อมูลอัตโนมัติเมื่อร้านว่างหรือปิดโปรแกรม
+        self.maintenance_scheduler = MaintenanceScheduler(self.db, self)
+
+    def closeEvent(self, event):
+        """บำรุงรักษาฐานข้อมูลก่อนปิดโปรแกรม"""
+        self.quick_search_controller.wait()
+        self.maintenance_scheduler.run_on_close()
+        super().closeEvent(event)
 
     def initialize_ui(self):
         """เริ่มต้น UI"""
@@ -381,17 +399,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             # ใช้ค่าเริ่มต้นถ้าไม่มีการตั้งค่า
             self.days_spin.setValue(30)
         
-        # โหลดการตั้งค่าดอกเบี้ย
-        try:
-            from shop_config_loader import load_shop_config
-            shop_config = load_shop_config()
-            interest_rate = shop_config.get('interest_rate', 10.0)
-            auto_calculate = shop_config.get('auto_calculate_interest', True)
-            
-            self.interest_rate_spin.setValue(interest_rate)
-            self.use_calculated_checkbox.setChecked(auto_calculate)
-        except:
-            pass
+        # โหลดการตั้งค่าดอกเบี้ย (อ่านครั้งเดียว ไม่ต้องอ่านไฟล์ทุกครั้งที่คำนวณ)
+        self.load_interest_settings()
 
     def send_contract_to_line(self, contract_data, customer_data, product_data):
         """ส่งข้อมูลสัญญาเข้า Line"""
@@ -600,6 +609,13 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.other_details_edit.setReadOnly(True)
         self.customer_info_layout.addWidget(self.other_details_edit, 9, 1)
         
+        # ยอดค้างของลูกค้า (สัญญาค้าง, เงินต้นคงค้าง, ยอดไถ่สะสม, มาล่าสุด)
+        self.lbl_customer_exposure = QLabel()
+        self.customer_info_layout.addWidget(self.lbl_customer_exposure, 10, 0)
+        self.customer_exposure_label = QLabel()
+        self.customer_exposure_label.setWordWrap(True)
+        self.customer_info_layout.addWidget(self.customer_exposure_label, 10, 1, 1, 2)
+        
         # ใส่ ScrollArea ให้ส่วนข้อมูลลูกค้า
         customer_scroll = QScrollArea()
         customer_scroll.setWidget(self.customer_info_group)
@@ -658,6 +674,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.customer_add_layout.addWidget(QLabel("จังหวัด:"), 5, 0)
         self.customer_province_edit = QLineEdit()
         self.customer_add_layout.addWidget(self.customer_province_edit, 5, 1, 1, 3)
+        self.customer_address_completer = AddressCompleter(
+            self.customer_subdistrict_edit, self.customer_district_edit, self.customer_province_edit, self)
         
         # โทรศัพท์
         self.customer_add_layout.addWidget(QLabel("โทรศัพท์:"), 6, 0)
@@ -728,6 +746,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.lbl_province.setText(language_manager.get_text("province"))
         self.lbl_phone.setText(language_manager.get_text("phone"))
         self.lbl_other_details.setText(language_manager.get_text("other_details"))
+        self.lbl_customer_exposure.setText(language_manager.get_text("customer_exposure"))
 
         # Add section
         self.lbl_customer_code2.setText(language_manager.get_text("customer_code"))
@@ -1058,6 +1077,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         # เชื่อมต่อสัญญาณ
         self.start_date_edit.dateChanged.connect(self.calculate_end_date)
         self.days_spin.valueChanged.connect(self.calculate_end_date)
+        # อัตราดอกเบี้ยขึ้นกับจำนวนวันตามตารางค่าธรรมเนียม
+        self.days_spin.valueChanged.connect(self.calculate_amounts)
         
         # สถานะสัญญา
         self.lbl_contract_status = QLabel()
@@ -1066,8 +1087,10 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.active_radio = QRadioButton()
         self.redeemed_radio = QRadioButton()
         self.lost_radio = QRadioButton()
+        self.forfeited_radio = QRadioButton()
         self.active_radio.setChecked(True)
         status_layout.addWidget(self.active_radio)
+        status_layout.addWidget(self.forfeited_radio)
         status_layout.addWidget(self.redeemed_radio)
         status_layout.addWidget(self.lost_radio)
         layout.addLayout(status_layout, 4, 1)
@@ -1094,6 +1117,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.lbl_end_date.setText(language_manager.get_text("end_date"))
         self.lbl_contract_status.setText(language_manager.get_text("contract_status"))
         self.active_radio.setText(language_manager.get_text("status_active"))
+        self.forfeited_radio.setText(language_manager.get_text("status_forfeited"))
         self.redeemed_radio.setText(language_manager.get_text("status_redeemed"))
         self.lost_radio.setText(language_manager.get_text("status_lost"))
         self.update_status_btn.setText(language_manager.get_text("update_status"))
@@ -1130,6 +1154,12 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.reset_interest_button.setMaximumWidth(60)
         self.reset_interest_button.clicked.connect(self.reset_interest_rate)
         layout.addWidget(self.reset_interest_button, 1, 2)
+        
+        # อัตราที่ใช้จริงตามขั้นของตารางค่าธรรมเนียม (แสดงเมื่อต่างจากอัตราที่ตั้งไว้)
+        self.applied_rate_label = QLabel("")
+        self.applied_rate_label.setStyleSheet("QLabel { color: #B8860B; }")
+        layout.addWidget(self.applied_rate_label, 1, 3)
+        self.applied_interest_rate = None
 
         # ยอดไถ่คืน (คำนวณ)
         self.lbl_calculated_redemption = QLabel()
@@ -1176,6 +1206,27 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         layout.setSpacing(8)
         layout.setContentsMargins(12, 12, 12, 12)
         
+        # ค้นหาด่วน: ช่องเดียวรู้เองว่าเป็นเลขที่สัญญา/เลขบัตร/เบอร์โทร/IMEI/ชื่อ
+        quick_search_layout = QHBoxLayout()
+        self.lbl_quick_search = QLabel()
+        quick_search_layout.addWidget(self.lbl_quick_search)
+        self.quick_search_edit = QLineEdit()
+        self.quick_search_edit.setClearButtonEnabled(True)
+        self.quick_search_edit.installEventFilter(self)
+        quick_search_layout.addWidget(self.quick_search_edit)
+        layout.addLayout(quick_search_layout)
+        
+        self.quick_search_list = QListWidget()
+        self.quick_search_list.setMaximumHeight(180)
+        self.quick_search_list.itemActivated.connect(self.open_quick_search_result)
+        self.quick_search_list.hide()
+        layout.addWidget(self.quick_search_list)
+        
+        self.quick_search_loader = TabLoader(self.prepare_quick_search, self.show_quick_search_results,
+                                             self.show_quick_search_error, parent=self)
+        self.quick_search_controller = SearchController(self.quick_search_loader, parent=self)
+        self.quick_search_edit.textChanged.connect(self.quick_search_controller.schedule)
+        
         # เลือกประเภทการค้นหา
         search_type_layout = QHBoxLayout()
         self.lbl_search_by = QLabel()
@@ -1270,6 +1321,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         if (w := self.findChild(QGroupBox, "SearchGroup")) is not None:
             w.setTitle(language_manager.get_text("search_group"))
         self.lbl_search_by.setText(language_manager.get_text("search_by"))
+        self.lbl_quick_search.setText(language_manager.get_text("quick_search"))
+        self.quick_search_edit.setPlaceholderText(language_manager.get_text("enter_quick_search"))
         # reset search type items
         current_idx = self.search_type_combo.currentIndex()
         self.search_type_combo.blockSignals(True)
@@ -1483,8 +1536,23 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         except Exception as e:
             QMessageBox.warning(self, "ข้อผิดพลาด", f"ไม่สามารถเปิดหน้าต่างการตั้งค่าได้: {str(e)}")
 
+    def load_interest_settings(self):
+        """โหลดอัตราดอกเบี้ยและการคำนวณอัตโนมัติจาก shop_config"""
+        try:
+            from shop_config_loader import load_shop_config
+            shop_config = load_shop_config()
+            interest_rate = shop_config.get('interest_rate', 10.0)
+            self.auto_calculate_interest = shop_config.get('auto_calculate_interest', True)
+            
+            self.interest_rate_spin.setValue(interest_rate)
+            self.use_calculated_checkbox.setChecked(self.auto_calculate_interest)
+        except:
+            pass
+    
     def update_ui_after_settings_change(self):
         """อัปเดต UI หลังจากมีการเปลี่ยนแปลงการตั้งค่า"""
+        # อัตราดอกเบี้ย/การคำนวณอัตโนมัติอาจเปลี่ยน
+        self.load_interest_settings()
         # อัปเดตข้อความใน toolbar
         self.apply_toolbar_language()
         # อัปเดตข้อความในส่วนอื่น ๆ ตามต้องการ
@@ -1599,6 +1667,32 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             self.district_edit.setText(self.current_customer.get('district', ''))
             self.province_edit.setText(self.current_customer.get('province', ''))
             self.other_details_edit.setText(self.current_customer.get('other_details', ''))
+            self.update_customer_exposure()
+    
+    def update_customer_exposure(self):
+        """แสดงยอดค้างของลูกค้าปัจจุบันจากยอดสะสมในตาราง customers"""
+        customer = self.current_customer
+        if not customer:
+            self.customer_exposure_label.clear()
+            return
+        
+        # ข้อมูลจากหน้าจอเพิ่มลูกค้าอาจยังไม่มียอดสะสม ให้อ่านจากฐานข้อมูล
+        if 'active_contract_count' not in customer and customer.get('id'):
+            customer = self.db.get_customer_by_id(customer['id']) or customer
+        
+        active_count = customer.get('active_contract_count') or 0
+        outstanding = customer.get('outstanding_principal') or 0
+        redeemed = customer.get('lifetime_redeemed') or 0
+        last_visit = customer.get('last_visit')
+        if last_visit:
+            last_visit = QDate.fromString(last_visit, "yyyy-MM-dd").toString("dd/MM/yyyy")
+        
+        self.customer_exposure_label.setText(
+            f"สัญญาค้าง {active_count} ฉบับ | เงินต้นคงค้าง {outstanding:,.2f} บาท | "
+            f"ไถ่คืนสะสม {redeemed:,.2f} บาท | มาล่าสุด {last_visit or '-'}"
+        )
+        # เน้นสีเมื่อลูกค้ามีสัญญาค้างอยู่
+        self.customer_exposure_label.setStyleSheet("color: #C62828; font-weight: bold;" if active_count else "")
             
 
     def add_product(self):
@@ -1774,6 +1868,16 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             QMessageBox.critical(self, "ผิดพลาด", f"เกิดข้อผิดพลาดในการอัปเดตสถานะสัญญา: {str(e)}")
         
 
+    def selected_contract_status(self):
+        """สถานะสัญญาที่เลือกในฟอร์มสัญญา"""
+        if hasattr(self, 'redeemed_radio') and self.redeemed_radio.isChecked():
+            return 'redeemed'
+        if hasattr(self, 'lost_radio') and self.lost_radio.isChecked():
+            return 'lost'
+        if hasattr(self, 'forfeited_radio') and self.forfeited_radio.isChecked():
+            return 'forfeited'
+        return 'active'
+
     def update_contract_status(self):
         """อัปเดตสถานะสัญญาตามที่เลือกในฟอร์ม"""
         if not self.current_contract:
@@ -1782,12 +1886,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         
         try:
             # กำหนดสถานะตามที่เลือก
-            if hasattr(self, 'redeemed_radio') and self.redeemed_radio.isChecked():
-                status = 'redeemed'
-            elif hasattr(self, 'lost_radio') and self.lost_radio.isChecked():
-                status = 'lost'
-            else:
-                status = 'active'
+            status = self.selected_contract_status()
             
             # อัปเดตสถานะในฐานข้อมูล
             contract_id = self.current_contract['id']
@@ -1840,9 +1939,9 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             'total_paid': self.pawn_amount_spin.value(),  # ใช้ยอดฝากเป็นยอดจ่าย
             'total_redemption': self.total_redemption_spin.value(),  # ใช้ยอดที่ผู้ใช้กรอก
             'start_date': self.start_date_edit.date().toString("yyyy-MM-dd"),
-            'end_date': self.end_date_edit.text(),
+            'end_date': self.start_date_edit.date().addDays(self.days_spin.value()).toString("yyyy-MM-dd"),
             'days_count': self.days_spin.value(),
-            'status': 'redeemed' if hasattr(self, 'redeemed_radio') and self.redeemed_radio.isChecked() else 'lost' if hasattr(self, 'lost_radio') and self.lost_radio.isChecked() else 'active'
+            'status': self.selected_contract_status()
         }
         
         try:
@@ -2091,6 +2190,100 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.search_last_name_edit.clear()
         
 
+    def selected_search_status(self):
+        """สถานะสัญญาที่เลือกในตัวเลือกของกลุ่มค้นหา"""
+        if self.search_active_radio.isChecked():
+            return OPEN_STATUSES  # สัญญาเปิดรวมที่หลุดจำนำแล้วแต่ยังไม่ปิด
+        if self.search_closed_radio.isChecked():
+            return 'redeemed'
+        return 'all'
+
+    def eventFilter(self, obj, event):
+        # เลื่อนในรายการผลค้นหาด่วนด้วยลูกศรโดยไม่ต้องออกจากช่องค้นหา
+        if obj is getattr(self, 'quick_search_edit', None) and event.type() == QEvent.KeyPress:
+            key = event.key()
+            rows = self.quick_search_list.count()
+            if key in (Qt.Key_Down, Qt.Key_Up) and rows:
+                self.quick_search_list.show()
+                step = 1 if key == Qt.Key_Down else -1
+                row = self.quick_search_list.currentRow() + step
+                self.quick_search_list.setCurrentRow(max(0, min(row, rows - 1)))
+                return True
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                item = self.quick_search_list.currentItem()
+                if self.quick_search_list.isVisible() and item is not None:
+                    self.open_quick_search_result(item)
+                else:
+                    self.quick_search_controller.search_now()
+                return True
+            if key == Qt.Key_Escape and self.quick_search_list.isVisible():
+                self.quick_search_list.hide()
+                return True
+        return super().eventFilter(obj, event)
+
+    def prepare_quick_search(self):
+        """อ่านคำค้นในเธรดหลัก คืนฟังก์ชันค้นที่จะรันในเธรดแยก"""
+        query = self.quick_search_edit.text().strip()
+        status = self.selected_search_status()
+        db = self.db
+        if not query:
+            return lambda: []
+        return lambda: db.quick_search(query, status)
+
+    def show_quick_search_error(self, message):
+        QMessageBox.critical(self, "ผิดพลาด", f"เกิดข้อผิดพลาดในการค้นหา: {message}")
+
+    def show_quick_search_results(self, rows):
+        """แสดงผลค้นหาด่วน (เฉพาะข้อมูลย่อ รายละเอียดโหลดเมื่อเลือก)"""
+        self.quick_search_list.clear()
+        if not self.quick_search_edit.text().strip():
+            self.quick_search_list.hide()
+            return
+        if not rows:
+            item = QListWidgetItem("ไม่พบสัญญาที่ตรงกับคำค้นหา")
+            item.setFlags(Qt.NoItemFlags)
+            self.quick_search_list.addItem(item)
+        for row in rows:
+            text = "{}  {} {}  |  {}  |  {}  ({})".format(
+                row.get('contract_number', ''), row.get('first_name', ''), row.get('last_name', ''),
+                row.get('product_name') or '', status_text(row), QUERY_LABELS.get(row.get('match_kind'), '')
+            )
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, row['id'])
+            self.quick_search_list.addItem(item)
+        self.quick_search_list.show()
+        if rows:
+            self.quick_search_list.setCurrentRow(0)
+
+    def open_quick_search_result(self, item):
+        """โหลดรายละเอียดของสัญญาที่เลือกจากผลค้นหาด่วน"""
+        contract_id = item.data(Qt.UserRole)
+        if contract_id is None:
+            return
+        try:
+            contract = self.db.get_contract_by_id(contract_id)
+            if not contract:
+                QMessageBox.information(self, "ไม่พบข้อมูล", "ไม่พบสัญญาที่ตรงกับคำค้นหา")
+                return
+            self.quick_search_list.hide()
+            self.open_contract(contract)
+        except Exception as e:
+            QMessageBox.critical(self, "ผิดพลาด", f"เกิดข้อผิดพลาดในการค้นหา: {str(e)}")
+
+    def open_contract(self, contract):
+        """แสดงสัญญาในฟอร์ม พร้อมข้อมูลลูกค้า สินค้า และประวัติการต่อดอก"""
+        self.current_contract = contract
+        
+        # โหลดข้อมูลสัญญาในฟอร์ม
+        self.load_contract_data()
+        
+        # โหลดข้อมูลลูกค้าและสินค้าเพิ่มเติม
+        self.load_additional_contract_data(contract)
+        
+        contract_number = contract.get('contract_number', '')
+        if contract_number:
+            self.load_renewal_history(contract_number)
+
     def search_contracts(self):
         """ค้นหาสัญญาตามประเภทที่เลือก"""
         search_type = self.search_type_combo.currentData()
@@ -2118,40 +2311,37 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             return
         
         # กำหนดสถานะการค้นหา
-        status = 'all'
-        if self.search_active_radio.isChecked():
-            status = 'active'
-        elif self.search_closed_radio.isChecked():
-            status = 'redeemed'
+        status = self.selected_search_status()
         
         try:
             # ค้นหาสัญญาตามประเภทที่เลือก
+            criteria = {'status': status}
             if search_type == "contract":
-                contracts = self.db.search_contracts_by_number(search_term, status)
+                criteria['contract_number'] = search_term
             elif search_type == "idcard":
-                contracts = self.db.search_contracts_by_id_card(search_term, status)
+                criteria['id_card'] = search_term
             elif search_type == "name":
-                contracts = self.db.search_contracts_by_name(first_name, last_name, status)
-            else:
-                contracts = []
+                criteria['first_name'] = first_name
+                criteria['last_name'] = last_name
+            contracts = self.db.filter_contracts(criteria)
+            
+            # ไม่พบชื่อที่ตรง -> ค้นชื่อที่ใกล้เคียง (วรรณยุกต์/สระผิด พิมพ์ผิดเล็กน้อย)
+            fuzzy = False
+            if not contracts and search_type == "name":
+                contracts = self.db.search_contracts_by_name(search_term, status, fuzzy=True)
+                fuzzy = bool(contracts)
             
             if contracts:
                 # เลือกสัญญาแรกเป็นสัญญาปัจจุบัน
-                self.current_contract = contracts[0]
-                
-                # โหลดข้อมูลสัญญาในฟอร์ม
-                self.load_contract_data()
+                self.open_contract(contracts[0])
                 
-                # โหลดข้อมูลลูกค้าและสินค้าเพิ่มเติม
-                self.load_additional_contract_data(contracts[0])
-                
-                contract_number = contracts[0].get('contract_number', '')
-                if contract_number:
-                    self.load_renewal_history(contract_number)
-                
-                # ข้อมูลสัญญาถูกโหลดในฟอร์มแล้ว
-                
-                QMessageBox.information(self, "ผลการค้นหา", f"พบ {len(contracts)} สัญญา\nข้อมูลสัญญาแรกถูกโหลดในฟอร์มแล้ว")
+                if fuzzy:
+                    QMessageBox.information(self, "ผลการค้นหา",
+                                            f"ไม่พบชื่อที่ตรงกัน พบชื่อที่ใกล้เคียง {len(contracts)} สัญญา\n"
+                                            f"โหลดสัญญาของ {contracts[0]['first_name']} {contracts[0]['last_name']} "
+                                            f"(ใกล้เคียงที่สุด) ในฟอร์มแล้ว")
+                else:
+                    QMessageBox.information(self, "ผลการค้นหา", f"พบ {len(contracts)} สัญญา\nข้อมูลสัญญาแรกถูกโหลดในฟอร์มแล้ว")
             else:
                 QMessageBox.information(self, "ไม่พบข้อมูล", "ไม่พบสัญญาที่ตรงกับคำค้นหา")
                 
@@ -2185,6 +2375,9 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         if self.current_contract:
             # ตั้งค่าสถานะการโหลดสัญญาเดิม
             self.is_loading_existing_contract = True
+            # สัญญาเดิมไม่ได้คำนวณใหม่ อัตราตามขั้นของสัญญาก่อนหน้าจึงไม่ใช้
+            self.applied_interest_rate = None
+            self.applied_rate_label.setText("")
             
             # โหลดข้อมูลสัญญา
             self.contract_number_edit.setText(self.current_contract.get('contract_number', ''))
@@ -2223,7 +2416,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                         else:
                             date_obj = QDate.fromString(end_date, "dd/MM/yyyy")
                         if date_obj.isValid():
-                            self.end_date_edit.setDate(date_obj)
+                            self.end_date_edit.setText(date_obj.toString("dd/MM/yyyy"))
                 except:
                     pass
             
@@ -2251,6 +2444,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                     self.redeemed_radio.setChecked(True)
                 elif status == 'lost':
                     self.lost_radio.setChecked(True)
+                elif status == 'forfeited':
+                    self.forfeited_radio.setChecked(True)
                 else:
                     self.active_radio.setChecked(True)
             
@@ -2265,35 +2460,30 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             # ข้ามการคำนวณถ้ากำลังโหลดสัญญาเดิม
             if self.is_loading_existing_contract:
                 return
-                
-            # ใช้อัตราดอกเบี้ยจาก UI แทนการโหลดจาก config
-            interest_rate = self.interest_rate_spin.value()
             
-            # โหลดการตั้งค่าการคำนวณอัตโนมัติ
-            from shop_config_loader import load_shop_config
-            shop_config = load_shop_config()
-            auto_calculate = shop_config.get('auto_calculate_interest', True)
-            
-            # คำนวณยอดไถ่คืน
+            # คำนวณยอดไถ่คืน (อัตราตามตารางค่าธรรมเนียม ถ้าไม่มีขั้นที่ตรงใช้อัตราจาก UI)
             pawn_amount = self.pawn_amount_spin.value()
-            if pawn_amount > 0 and auto_calculate:
-                # คำนวณดอกเบี้ยตามจำนวนวัน
-                days = self.days_spin.value()
-                if days > 0:
-                    # คำนวณดอกเบี้ยต่อเดือน
-                    months = days / 30.0  # แปลงวันเป็นเดือน
-                    interest_amount = pawn_amount * (interest_rate / 100.0) * months
-                    calculated_redemption = pawn_amount + interest_amount
-                    
-                    # แสดงยอดที่คำนวณได้
-                    self.calculated_redemption_label.setText(f"{calculated_redemption:,.2f} บาท")
-                    
-                    # ถ้าใช้ยอดที่คำนวณ ให้อัปเดตยอดไถ่คืน
-                    if self.use_calculated_checkbox.isChecked():
-                        self.total_redemption_spin.setValue(calculated_redemption)
-                else:
-                    self.calculated_redemption_label.setText("0.00 บาท")
+            days = self.days_spin.value()
+            if pawn_amount > 0 and days > 0 and self.auto_calculate_interest:
+                configured_rate = self.interest_rate_spin.value()
+                result = quote(pawn_amount, days, rate=configured_rate,
+                               terms=get_fee_schedule(self.db).terms())
+                
+                # อัตราตามขั้นแสดงแยก ช่องอัตราดอกเบี้ยยังเป็นอัตราที่ตั้งไว้สำหรับสัญญาถัดไป
+                self.applied_interest_rate = result['rate']
+                self.applied_rate_label.setText(
+                    f"ใช้อัตราตามขั้น {result['rate']:.2f} %" if result['rate'] != configured_rate else "")
+                
+                # แสดงยอดที่คำนวณได้
+                calculated_redemption = result['total_redemption']
+                self.calculated_redemption_label.setText(f"{calculated_redemption:,.2f} บาท")
+                
+                # ถ้าใช้ยอดที่คำนวณ ให้อัปเดตยอดไถ่คืน
+                if self.use_calculated_checkbox.isChecked():
+                    self.total_redemption_spin.setValue(calculated_redemption)
             else:
+                self.applied_interest_rate = None
+                self.applied_rate_label.setText("")
                 self.calculated_redemption_label.setText("0.00 บาท")
                 
         except Exception as e:
@@ -2323,8 +2513,12 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         if not self.is_loading_existing_contract:
             self.calculate_amounts()
         
-        # บันทึกการตั้งค่าอัตราดอกเบี้ยใหม่
-        self.save_interest_rate_to_config(value)
+        # บันทึกการตั้งค่าอัตราดอกเบี้ยใหม่ (รวมการเขียนไฟล์เมื่อหมุน spinbox ต่อเนื่อง)
+        try:
+            from shop_config_loader import update_shop_config
+            update_shop_config({'interest_rate': value})
+        except Exception as e:
+            print(f"Error saving interest rate: {e}")
     
     def reset_interest_rate(self):
         """รีเซ็ตอัตราดอกเบี้ยเป็นค่าเริ่มต้น"""
@@ -2336,16 +2530,6 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         except:
             self.interest_rate_spin.setValue(10.0)
     
-    def save_interest_rate_to_config(self, interest_rate):
-        """บันทึกอัตราดอกเบี้ยลงในไฟล์ config"""
-        try:
-            from shop_config_loader import load_shop_config, save_shop_config
-            shop_config = load_shop_config()
-            shop_config['interest_rate'] = interest_rate
-            save_shop_config(shop_config)
-        except Exception as e:
-            print(f"Error saving interest rate: {e}")
-
     def load_renewal_history(self, contract_number):
         """โหลดประวัติการต่อดอกของสัญญา"""
         try:
@@ -2397,6 +2581,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         self.province_edit.clear()
         self.phone_edit.clear()
         self.other_details_edit.clear()
+        self.customer_exposure_label.clear()
         
         # ล้างข้อมูลสินค้า
         self.product_name_edit.clear()
@@ -2600,6 +2785,13 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             QMessageBox.warning(self, "แจ้งเตือน", "กรุณากรอกชื่อสินค้า")
             return
 
+        # ตรวจกับรายการเครื่องแจ้งหาย/ถูกขโมย (ฟอร์มนี้ไม่มีช่อง IMEI จึงตรวจซีเรียลที่เป็นเลข IMEI)
+        blocked = get_blocklist().find_blocked({'serial_number': serial_number})
+        if blocked:
+            QMessageBox.critical(self, "ไม่สามารถรับจำนำได้",
+                "IMEI {} อยู่ในรายการเครื่องแจ้งหาย/ถูกขโมย".format(", ".join(blocked)))
+            return
+
         try:
             # คัดลอกรูปภาพไปยังโฟลเดอร์ของโปรแกรม
             if image_path:
@@ -2754,7 +2946,8 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                 'end_date': self.end_date_edit.text(),
                 'days_count': days_count,
                 'pawn_amount': self.pawn_amount_spin.value(),
-                'interest_rate': getattr(self, 'interest_rate_spin', None) and self.interest_rate_spin.value() or 0,
+                'interest_rate': getattr(self, 'applied_interest_rate', None) or (
+                    getattr(self, 'interest_rate_spin', None) and self.interest_rate_spin.value() or 0),
                 'total_redemption': self.total_redemption_spin.value(),
                 'estimated_value': getattr(self, 'estimated_value_spin', None) and self.estimated_value_spin.value() or 0,
                 'witness_name': getattr(self, 'witness_name_edit', None) and self.witness_name_edit.text() or '',
@@ -2801,7 +2994,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             if hasattr(self, 'current_contract') and self.current_contract:
                 contract_id = self.current_contract.get('id')
                 if contract_id:
-                    renewal_data = self.db.get_renewals_by_contract(contract_id)
+                    renewal_data = self.db.get_renewals_by_contract_id(contract_id)
             
             # เรียกใช้ฟังก์ชันสร้าง PDF จาก pdf.py
             result = generate_pawn_ticket_from_data(
@@ -3005,6 +3198,9 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
             # แก้ไขปัญหาเลขบัตรประชาชนซ้ำซ้อน
             id_cards_fixed = self.db.fix_duplicate_id_cards()
             
+            # คำนวณยอดสะสมของลูกค้าใหม่จากข้อมูลจริง
+            self.db.rebuild_customer_aggregates()
+            
             if customer_codes_fixed > 0 or id_cards_fixed > 0:
                 message = f"แก้ไขข้อมูลซ้ำซ้อนเรียบร้อย:\n"
                 if customer_codes_fixed > 0:
@@ -3050,6 +3246,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                     self.province_edit.setText(customer.get('province', ''))
                     self.phone_edit.setText(customer.get('phone', ''))
                     self.other_details_edit.setText(customer.get('other_details', ''))
+                    self.update_customer_exposure()
             
             # โหลดข้อมูลสินค้าเพิ่มเติม
             product_id = contract.get('product_id')
@@ -3316,6 +3513,18 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                 if key != "photo" and value:  # ไม่แสดงรูปภาพ
                     info_text += f"{key}: {value}\n"
             
+            # ลูกค้าเดิม: โหลดข้อมูลพร้อมยอดค้างทันที แทนการเพิ่มลูกค้าซ้ำ
+            existing_customer = self.db.get_customer_by_id_card(card_data.get("CID", ""))
+            if existing_customer:
+                self.current_customer = existing_customer
+                self.load_customer_data()
+                QMessageBox.information(
+                    self, "ลูกค้าเดิม",
+                    f"พบลูกค้าในระบบ: {existing_customer.get('first_name', '')} {existing_customer.get('last_name', '')}\n"
+                    f"{self.customer_exposure_label.text()}"
+                )
+                return
+            
             # ถามว่าต้องการใช้ข้อมูลนี้หรือไม่
             reply = QMessageBox.question(
                 self, 
@@ -3392,13 +3601,13 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
         try:
             from line_config import ENABLE_LINE_NOTIFICATION, SEND_FORFEITURE_NOTIFICATION
             
+            # ทำเครื่องหมายสัญญาที่เพิ่งหมดอายุ (ได้เฉพาะรายการใหม่ตั้งแต่รอบก่อน)
+            forfeited_contracts = self.db.sweep_forfeited_contracts()
+            
             # ตรวจสอบว่าการแจ้งเตือนเปิดอยู่หรือไม่
             if not ENABLE_LINE_NOTIFICATION or not SEND_FORFEITURE_NOTIFICATION:
                 return
             
-            # ดึงสัญญาที่หมดอายุ
-            forfeited_contracts = self.db.get_forfeited_contracts()
-            
             if forfeited_contracts:
                 # ส่งแจ้งเตือนสำหรับแต่ละสัญญาที่หมดอายุ
                 for contract in forfeited_contracts:
@@ -3420,7 +3629,7 @@ QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal { width: 0; }
                 QMessageBox.warning(
                     self, 
                     "แจ้งเตือนสัญญาหมดอายุ", 
-                    f"พบสัญญาหมดอายุ {len(forfeited_contracts)} รายการ\n\n"
+                    f"พบสัญญาหมดอายุใหม่ {len(forfeited_contracts)} รายการ\n\n"
                     "ระบบได้ส่งแจ้งเตือนเข้าไลน์เรียบร้อยแล้ว\n"
                     "กรุณาตรวจสอบและดำเนินการตามความเหมาะสม"
                 )
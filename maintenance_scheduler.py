@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+ตัวจัดตารางบำรุงรักษาฐานข้อมูล (ANALYZE, PRAGMA optimize, WAL checkpoint, incremental vacuum)
+รันเมื่อร้านว่าง (ไม่มีการใช้งานเมาส์/คีย์บอร์ด) หรือเมื่อปิดโปรแกรม
+"""
+import time
+from datetime import datetime, timedelta
+
+from PySide6.QtCore import QObject, QTimer, QEvent
+from PySide6.QtWidgets import QApplication
+
+
+class MaintenanceScheduler(QObject):
+    """เฝ้าดูการใช้งานของผู้ใช้และสั่ง db.run_maintenance() เมื่อว่างพอ"""
+
+    USER_EVENTS = (
+        QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.Wheel
+    )
+
+    def __init__(self, db, parent=None, idle_minutes=10, interval_hours=24,
+                 idle_budget=5.0, close_budget=2.0):
+        super().__init__(parent)
+        self.db = db
+        self.idle_seconds = idle_minutes * 60
+        self.interval = timedelta(hours=interval_hours)
+        self.idle_budget = idle_budget
+        self.close_budget = close_budget
+        self._last_activity = time.monotonic()
+
+        app = QApplication.instance()
+        if app is not None:
+            app.installEventFilter(self)
+
+        # ตรวจทุกนาทีว่าว่างนานพอและถึงรอบบำรุงรักษาหรือยัง
+        self._timer = QTimer(self)
+        self._timer.setInterval(60 * 1000)
+        self._timer.timeout.connect(self._check_idle)
+        self._timer.start()
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.USER_EVENTS:
+            self._last_activity = time.monotonic()
+        return False
+
+    def is_due(self) -> bool:
+        """ถึงรอบบำรุงรักษาหรือยัง (ดูจาก settings.last_maintenance_at)"""
+        last_run = self.db.get_setting('last_maintenance_at')
+        if not last_run:
+            return True
+        try:
+            return datetime.now() - datetime.strptime(last_run, "%Y-%m-%d %H:%M:%S") >= self.interval
+        except ValueError:
+            return True
+
+    def _check_idle(self):
+        if time.monotonic() - self._last_activity < self.idle_seconds:
+            return
+        try:
+            if self.is_due():
+                self.db.run_maintenance(self.idle_budget)
+        except Exception as e:
+            print(f"Error running database maintenance: {e}")
+
+    def run_on_close(self):
+        """รันบำรุงรักษาแบบจำกัดเวลาเมื่อปิดโปรแกรม (เฉพาะเมื่อถึงรอบ)"""
+        self._timer.stop()
+        try:
+            if self.is_due():
+                self.db.run_maintenance(self.close_budget)
+        except Exception as e:
+            print(f"Error running database maintenance: {e}")
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+แยกประเภทคำค้นของช่องค้นหาด่วน (omnibox) ในหน้าหลัก
+
+พิมพ์อะไรก็ได้ในช่องเดียว แล้วแปลงเป็นการค้นผ่านดัชนีที่ตรงกับรูปแบบ:
+- เลขที่สัญญา (ตัวอักษรนำหน้า + ตัวเลข เช่น CN0012)  -> เลขที่สัญญาตรงตัว
+- ตัวเลข 13 หลัก                                   -> เลขบัตรประชาชนตรงตัว
+- ตัวเลข 15 หลัก                                   -> IMEI ตรงตัว
+- เบอร์โทร (0 หรือ +66 ตามด้วย 8-9 หลัก)              -> เบอร์โทรตรงตัว
+- อื่นๆ                                            -> คำค้นอิสระ (ชื่อ นามสกุล สินค้า ส่วนหนึ่งของเลข)
+
+ฟังก์ชันในโมดูลนี้ไม่ใช้ Qt และไม่แตะฐานข้อมูล
+"""
+import re
+from typing import List, NamedTuple
+
+QUERY_CONTRACT = 'contract'
+QUERY_ID_CARD = 'id_card'
+QUERY_IMEI = 'imei'
+QUERY_PHONE = 'phone'
+QUERY_TEXT = 'text'
+
+# ชื่อประเภทสำหรับแสดงในรายการผลลัพธ์
+QUERY_LABELS = {
+    QUERY_CONTRACT: 'เลขที่สัญญา',
+    QUERY_ID_CARD: 'เลขบัตร',
+    QUERY_IMEI: 'IMEI',
+    QUERY_PHONE: 'เบอร์โทร',
+    QUERY_TEXT: 'คำค้น',
+}
+
+_CONTRACT_PATTERN = re.compile(r'^[A-Za-z]{1,4}-?\d{1,10}$')
+_PHONE_PATTERN = re.compile(r'^(?:\+?66|0)(\d{8,9})$')
+_SEPARATORS = re.compile(r'[\s\-()]')
+
+
+class QueryPart(NamedTuple):
+    """การตีความคำค้นแบบหนึ่ง rank น้อย = ตรงกว่า (ผลลัพธ์เรียงตาม rank)"""
+    kind: str
+    value: str
+    rank: int
+
+
+def classify_query(text: str) -> List[QueryPart]:
+    """การตีความที่เป็นไปได้ของคำค้น (เรียงจากตรงที่สุด) คำค้นว่างคืน list ว่าง"""
+    text = (text or '').strip()
+    if not text:
+        return []
+    compact = _SEPARATORS.sub('', text)
+
+    if _CONTRACT_PATTERN.match(compact):
+        return [QueryPart(QUERY_CONTRACT, compact.upper(), 0), QueryPart(QUERY_TEXT, compact, 3)]
+
+    if compact.lstrip('+').isdigit():
+        parts = []
+        phone = _PHONE_PATTERN.match(compact)
+        if len(compact) == 13 and compact.isdigit():
+            parts.append(QueryPart(QUERY_ID_CARD, compact, 0))
+        elif len(compact) == 15 and compact.isdigit():
+            parts.append(QueryPart(QUERY_IMEI, compact, 0))
+        elif phone:
+            parts.append(QueryPart(QUERY_PHONE, '0' + phone.group(1), 0))
+        # ส่วนหนึ่งของเลขที่สัญญา/เลขบัตร/เบอร์/IMEI
+        parts.append(QueryPart(QUERY_TEXT, compact.lstrip('+'), 2 if not parts else 3))
+        return parts
+
+    return [QueryPart(QUERY_TEXT, text, 1)]
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+ตารางแบบ model/view ที่ดึงข้อมูลจากฐานข้อมูลทีละหน้า
+
+- PagedTableModel เก็บเฉพาะแถวที่ดึงมาแล้ว (dict ตามผลลัพธ์ของฐานข้อมูล) และจัดรูปแบบข้อความตอนวาด
+  QTableView เรียก fetchMore เองเมื่อเลื่อนถึงท้ายตาราง จึงเปิดได้ทันทีไม่ว่าจะมีกี่แถว
+- RowActionDelegate วาดปุ่มในคอลัมน์การดำเนินการ (แก้ไข/ลบ/ดูรายละเอียด) แทนการสร้าง QPushButton ทุกแถว
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from PySide6.QtCore import QAbstractTableModel, QEvent, QModelIndex, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QPainter
+from PySide6.QtWidgets import QStyle, QStyledItemDelegate
+
+# จำนวนแถวที่ดึงต่อครั้ง
+PAGE_SIZE = 200
+
+# fetch_page(offset, limit) -> list ของ dict
+FetchPage = Callable[[int, int], List[Dict]]
+
+# (หัวคอลัมน์, ชื่อคีย์ หรือ ฟังก์ชัน row -> ข้อความ หรือ None = คอลัมน์ปุ่ม)
+Column = Tuple[str, Union[str, Callable[[Dict], str], None]]
+
+
+class PagedTableModel(QAbstractTableModel):
+    """model ของตารางที่ดึงแถวเพิ่มทีละ page_size เมื่อ view ต้องการ"""
+
+    def __init__(self, columns: Sequence[Column], page_size: int = PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.page_size = page_size
+        self._rows: List[Dict] = []
+        self._fetch_page: Optional[FetchPage] = None
+        self._exhausted = True
+
+    def set_source(self, fetch_page: FetchPage, first_page: Optional[List[Dict]] = None):
+        """เปลี่ยนแหล่งข้อมูล (เช่นเมื่อตัวกรองเปลี่ยน)
+
+        first_page: หน้าแรกที่ดึงไว้แล้ว (เช่นจากเธรดแยก) ถ้าไม่ระบุจะดึงทันที
+        """
+        self.beginResetModel()
+        self._rows = list(first_page or [])
+        self._fetch_page = fetch_page
+        self._exhausted = first_page is not None and len(first_page) < self.page_size
+        self.endResetModel()
+        if first_page is None:
+            self._fetch_next_page(raise_errors=True)
+
+    def row_data(self, row: int) -> Dict:
+        """ข้อมูลดิบของแถว (dict จากฐานข้อมูล)"""
+        return self._rows[row]
+
+    def loaded_row_count(self) -> int:
+        return len(self._rows)
+
+    def is_complete(self) -> bool:
+        """ดึงครบทุกแถวแล้วหรือยัง"""
+        return self._exhausted
+
+    def _fetch_next_page(self, raise_errors: bool = False):
+        if self._exhausted or self._fetch_page is None:
+            return
+        try:
+            rows = self._fetch_page(len(self._rows), self.page_size)
+        except Exception as e:
+            self._exhausted = True
+            if raise_errors:
+                raise
+            print("Error fetching rows: {}".format(e))
+            return
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    # ---------- QAbstractTableModel ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            self._fetch_next_page()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.columns[index.column()][1]
+        if value is None:
+            return None
+        row = self._rows[index.row()]
+        if callable(value):
+            return value(row)
+        text = row.get(value)
+        return '' if text is None else str(text)
+
+
+class RowActionDelegate(QStyledItemDelegate):
+    """วาดปุ่มในเซลล์ คลิกแล้วส่งสัญญาณ clicked(แถว)"""
+
+    clicked = Signal(int)
+
+    def __init__(self, text: str, color: str, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.color = QColor(color)
+
+    def paint(self, painter, option, index):
+        rect = option.rect.adjusted(3, 3, -3, -3)
+        color = self.color.darker(115) if option.state & QStyle.State_MouseOver else self.color
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(rect, 3, 3)
+        painter.setPen(QColor('white'))
+        painter.drawText(rect, Qt.AlignCenter, self.text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and option.rect.contains(event.position().toPoint())):
+            # ส่งหลังจบ event นี้ เพราะ handler อาจเปิด dialog และโหลดตารางใหม่
+            row = index.row()
+            QTimer.singleShot(0, lambda: self.clicked.emit(row))
+            return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+ประเมินมูลค่าพอร์ตสัญญาทั้งหมดพร้อมกันด้วย NumPy
+
+ใช้สูตรเดียวกับหน้าจอ (quotation.quote / quotation.quote_batch):
+- ดอกเบี้ยสะสม = เงินต้น * อัตรา/100 * จำนวนวัน/30 โดยอัตราตามขั้นจำนวนวันในตาราง fee_rates
+- ค่าปรับ = จำนวนวันที่เกินกำหนด * ค่าปรับต่อวัน (settings.penalty_per_day)
+- ยอดไถ่คืน = ยอดไถ่คืนตามสัญญา + ค่าปรับ
+
+วิธีรัน:
+    python portfolio_valuation.py --as-of 2026-10-31 --csv valuation.csv
+    python portfolio_valuation.py --benchmark 100000
+"""
+import argparse
+import csv
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from database import PawnShopDatabase
+from fee_schedule import get_fee_schedule
+from quotation import DEFAULT_PENALTY_PER_DAY, FeeTerms, tier_rates
+from shop_config_loader import load_shop_config
+
+PENALTY_PER_DAY = DEFAULT_PENALTY_PER_DAY
+
+# ช่วงวันที่เกินกำหนดสำหรับรายงาน (วัน)
+OVERDUE_BUCKETS = [(1, 30), (31, 60), (61, 90), (91, None)]
+
+
+def to_arrays(columns: Dict[str, list]) -> Dict[str, np.ndarray]:
+    """แปลงผลจาก get_contract_columns เป็น NumPy arrays"""
+    return {
+        'id': np.asarray(columns['id'], dtype=np.int64),
+        'contract_number': np.asarray(columns['contract_number'], dtype=object),
+        'customer_id': np.asarray(columns['customer_id'], dtype=np.int64),
+        'status': np.asarray(columns['status'], dtype=object),
+        'pawn_amount': np.asarray(columns['pawn_amount'], dtype=np.float64),
+        'total_redemption': np.asarray(columns['total_redemption'], dtype=np.float64),
+        'start_date': np.asarray(columns['start_date'], dtype='datetime64[D]'),
+        'end_date': np.asarray(columns['end_date'], dtype='datetime64[D]'),
+    }
+
+
+def value_arrays(arrays: Dict[str, np.ndarray], as_of: str, interest_rate: float,
+                 penalty_per_day: float = PENALTY_PER_DAY,
+                 terms: Optional[FeeTerms] = None) -> Dict[str, np.ndarray]:
+    """คำนวณมูลค่าทุกสัญญาในครั้งเดียว ณ วันที่ as_of (YYYY-MM-DD)
+
+    terms = ขั้นอัตราจากตารางค่าธรรมเนียม ถ้าไม่ระบุใช้ interest_rate กับทุกสัญญา
+    """
+    as_of_day = np.datetime64(as_of, 'D')
+
+    days_held = np.maximum((as_of_day - arrays['start_date']).astype(np.int64), 0)
+    days_overdue = np.maximum((as_of_day - arrays['end_date']).astype(np.int64), 0)
+
+    rates = tier_rates(days_held, terms, interest_rate) if terms else interest_rate
+    accrued_interest = arrays['pawn_amount'] * (rates / 100.0) * (days_held / 30.0)
+    penalty = days_overdue * penalty_per_day
+    redeemable = arrays['total_redemption'] + penalty
+
+    return {
+        'days_held': days_held,
+        'days_overdue': days_overdue,
+        'accrued_interest': accrued_interest,
+        'penalty': penalty,
+        'redeemable_amount': redeemable,
+    }
+
+
+def summarize(arrays: Dict[str, np.ndarray], values: Dict[str, np.ndarray]) -> Dict:
+    """สรุปยอดรวมของพอร์ตและแยกตามช่วงวันที่เกินกำหนด"""
+    days_overdue = values['days_overdue']
+    buckets = {}
+    for low, high in OVERDUE_BUCKETS:
+        mask = days_overdue >= low if high is None else (days_overdue >= low) & (days_overdue <= high)
+        key = f"{low}+" if high is None else f"{low}-{high}"
+        buckets[key] = {
+            'count': int(mask.sum()),
+            'principal': float(arrays['pawn_amount'][mask].sum()),
+            'redeemable_amount': float(values['redeemable_amount'][mask].sum()),
+        }
+
+    return {
+        'contract_count': int(arrays['id'].size),
+        'principal': float(arrays['pawn_amount'].sum()),
+        'accrued_interest': float(values['accrued_interest'].sum()),
+        'penalty': float(values['penalty'].sum()),
+        'redeemable_amount': float(values['redeemable_amount'].sum()),
+        'overdue_count': int((days_overdue > 0).sum()),
+        'overdue_buckets': buckets,
+    }
+
+
+def value_portfolio(db: PawnShopDatabase, as_of: Optional[str] = None,
+                    interest_rate: Optional[float] = None,
+                    penalty_per_day: Optional[float] = None,
+                    statuses=('active', 'forfeited')) -> Dict:
+    """ประเมินมูลค่าสัญญาที่ยังไม่ไถ่ทั้งหมด ณ วันที่ as_of (ค่าเริ่มต้น: วันนี้)
+
+    ถ้าไม่ระบุ interest_rate ใช้อัตราตามขั้นจากตาราง fee_rates (ตารางว่างใช้ shop_config.json)
+    penalty_per_day ค่าเริ่มต้นจาก settings.penalty_per_day
+    คืน {'as_of', 'interest_rate', 'summary', 'contracts', 'values', 'elapsed'}
+    โดย contracts/values เป็น NumPy arrays เรียงตามกัน
+    """
+    as_of = as_of or datetime.now().strftime("%Y-%m-%d")
+    PawnShopDatabase._validate_date(as_of, 'as_of')
+    schedule = get_fee_schedule(db)
+    terms = None
+    if interest_rate is None:
+        interest_rate = float(load_shop_config().get('interest_rate', 10.0))
+        if schedule.has_tiers:
+            terms = schedule.terms()
+    if penalty_per_day is None:
+        penalty_per_day = schedule.terms().penalty_per_day
+
+    started = time.perf_counter()
+    arrays = to_arrays(db.get_contract_columns(tuple(statuses)))
+    loaded = time.perf_counter()
+    values = value_arrays(arrays, as_of, interest_rate, penalty_per_day, terms)
+    summary = summarize(arrays, values)
+    finished = time.perf_counter()
+
+    return {
+        'as_of': as_of,
+        'interest_rate': interest_rate,
+        'fee_tiers': schedule.tiers() if terms else [],
+        'summary': summary,
+        'contracts': arrays,
+        'values': values,
+        'elapsed': {'load': loaded - started, 'compute': finished - loaded},
+    }
+
+
+def write_csv(valuation: Dict, path: str):
+    """บันทึกมูลค่ารายสัญญาเป็น CSV (เปิดด้วย Excel ได้)"""
+    arrays, values = valuation['contracts'], valuation['values']
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            'contract_number', 'status', 'pawn_amount', 'start_date', 'end_date',
+            'days_held', 'days_overdue', 'accrued_interest', 'penalty', 'redeemable_amount',
+        ])
+        for i in range(arrays['id'].size):
+            writer.writerow([
+                arrays['contract_number'][i], arrays['status'][i],
+                f"{arrays['pawn_amount'][i]:.2f}", arrays['start_date'][i], arrays['end_date'][i],
+                values['days_held'][i], values['days_overdue'][i],
+                f"{values['accrued_interest'][i]:.2f}", f"{values['penalty'][i]:.2f}",
+                f"{values['redeemable_amount'][i]:.2f}",
+            ])
+
+
+def print_report(valuation: Dict):
+    """พิมพ์สรุปมูลค่าพอร์ต"""
+    summary = valuation['summary']
+    print(f"Portfolio valuation as of {valuation['as_of']} (interest {valuation['interest_rate']}%/month)")
+    for tier in valuation.get('fee_tiers', []):
+        to_days = tier['to_days'] if tier['to_days'] is not None else '...'
+        print(f"  fee tier {tier['from_days']}-{to_days} days: {tier['rate']}%/month")
+    print(f"  contracts:          {summary['contract_count']:>14,}")
+    print(f"  principal:          {summary['principal']:>14,.2f}")
+    print(f"  accrued interest:   {summary['accrued_interest']:>14,.2f}")
+    print(f"  penalties:          {summary['penalty']:>14,.2f}")
+    print(f"  redeemable amount:  {summary['redeemable_amount']:>14,.2f}")
+    print(f"  overdue contracts:  {summary['overdue_count']:>14,}")
+    for bucket, data in summary['overdue_buckets'].items():
+        print(f"    {bucket:>6} days: {data['count']:>8,} contracts, principal {data['principal']:>14,.2f}")
+    print("  time: load {:.3f}s, compute {:.3f}s".format(
+        valuation['elapsed']['load'], valuation['elapsed']['compute']))
+
+
+def benchmark(count: int = 100000, interest_rate: float = 10.0):
+    """วัดเวลาคำนวณพอร์ตจำลองขนาด count สัญญา (ไม่ใช้ฐานข้อมูล)"""
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2025-01-01') + rng.integers(0, 600, count)
+    arrays = {
+        'id': np.arange(count, dtype=np.int64),
+        'pawn_amount': rng.integers(5, 500, count) * 100.0,
+        'start_date': start,
+        'end_date': start + rng.integers(7, 120, count),
+    }
+    arrays['total_redemption'] = arrays['pawn_amount'] * 1.1
+
+    started = time.perf_counter()
+    values = value_arrays(arrays, '2026-10-31', interest_rate)
+    summary = summarize(arrays, values)
+    elapsed = time.perf_counter() - started
+    print(f"Valued {count:,} contracts in {elapsed * 1000:.1f} ms "
+          f"(redeemable {summary['redeemable_amount']:,.2f})")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop portfolio valuation")
+    parser.add_argument('--db', default='pawnshop.db')
+    parser.add_argument('--as-of', default=None, help="valuation date YYYY-MM-DD (default: today)")
+    parser.add_argument('--rate', type=float, default=None, help="monthly interest rate in percent")
+    parser.add_argument('--csv', default=None, help="write per-contract values to CSV")
+    parser.add_argument('--benchmark', type=int, default=None, metavar='N',
+                        help="time a synthetic portfolio of N contracts instead")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+
+    valuation = value_portfolio(PawnShopDatabase(args.db), args.as_of, args.rate)
+    print_report(valuation)
+    if args.csv:
+        write_csv(valuation, args.csv)
+
+
+if __name__ == "__main__":
+    main()
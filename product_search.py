@@ -1,19 +1,51 @@
 # -*- coding: utf-8 -*-
 """
 หน้าต่างค้นหาสินค้า
+
+- พิมพ์ค้นหาจากชื่อ ยี่ห้อ ซีเรียล หรือ IMEI (ค้นในเธรดแยกเมื่อหยุดพิมพ์)
+- สแกนบาร์โค้ด IMEI/ซีเรียลด้วยเครื่องสแกนแบบ USB: ตัวอักษรที่มาเป็นชุดเร็วแล้วตามด้วย Enter
+  (หรือทุกการกด Enter เมื่อเปิดโหมดสแกน) จะค้นแบบตรงตัวผ่านดัชนี และแสดงสัญญาที่ยังไม่ปิดของสินค้านั้น
 """
 
 # -*- coding:utf-8 -*-
+import time
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QLineEdit,
-    QPushButton, QComboBox, QTextEdit, QMessageBox, QTableWidget,
-    QTableWidgetItem, QHeaderView
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QCheckBox,
+    QPushButton, QMessageBox, QTableView, QHeaderView, QAbstractItemView
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QIcon
+from PySide6.QtCore import Qt, QEvent
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional
+from background_loader import SearchController, TabLoader
+from barcode_scan import CODE_INVALID_IMEI, ScanBurstDetector, classify_code, normalize_scan
 from database import PawnShopDatabase
+from paged_table import PAGE_SIZE, PagedTableModel
+
+
+def created_date(product: Dict) -> str:
+    created_at = product.get('created_at', '')
+    if not created_at:
+        return ''
+    try:
+        date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        return date_obj.strftime('%d/%m/%Y')
+    except ValueError:
+        return created_at
+
+
+SEARCH_COLUMNS = [
+    ("ชื่อสินค้า", 'name'),
+    ("ยี่ห้อ", 'brand'),
+    ("IMEI 1", 'imei1'),
+    ("IMEI 2", 'imei2'),
+    ("Serial Number", 'serial_number'),
+    ("สภาพเครื่อง", 'condition'),
+    ("อุปกรณ์ที่มาพร้อม", 'accessories'),
+    ("วันที่สร้าง", created_date),
+]
+
+STATUS_TEXT = {'active': 'ใช้งาน', 'forfeited': 'หลุดจำนำ'}
+
 
 class ProductSearchDialog(QDialog):
     def __init__(self, parent=None):
@@ -24,126 +56,177 @@ class ProductSearchDialog(QDialog):
         else:
             self.db = PawnShopDatabase()
         self.selected_product = None
+        self.scanned_contract = None
+        self.scan_detector = ScanBurstDetector()
         self.setup_ui()
+        self.finished.connect(self.search_controller.wait)
         self.load_products()
-    
+
     def setup_ui(self):
         self.setWindowTitle("ค้นหาสินค้า")
         self.setModal(True)
         self.resize(800, 600)
-        
+
         layout = QVBoxLayout(self)
-        
+
         # ตัวกรอง
         filter_layout = QHBoxLayout()
         filter_layout.addWidget(QLabel("ค้นหา:"))
         self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("ชื่อสินค้า, ยี่ห้อ, ซีเรียล")
-        self.search_edit.textChanged.connect(self.filter_products)
+        self.search_edit.setPlaceholderText("ชื่อสินค้า, ยี่ห้อ, ซีเรียล, IMEI หรือสแกนบาร์โค้ด")
+        self.search_edit.installEventFilter(self)
         filter_layout.addWidget(self.search_edit)
-        
+
+        self.scan_mode_check = QCheckBox("โหมดสแกน")
+        self.scan_mode_check.setToolTip("กด Enter แล้วค้นรหัสตรงตัว (ซีเรียล/IMEI) ทุกครั้ง")
+        filter_layout.addWidget(self.scan_mode_check)
+
         self.search_button = QPushButton("ค้นหา")
         self.search_button.clicked.connect(self.search_products)
+        self.search_button.setDefault(True)  # Enter ในช่องค้นหา = ค้นหาทันที
         filter_layout.addWidget(self.search_button)
-        
+
         layout.addLayout(filter_layout)
-        
+
+        self.search_loader = TabLoader(self.prepare_search, self.display_products,
+                                       self.show_search_error, parent=self)
+        self.search_controller = SearchController(self.search_loader, parent=self)
+        self.search_edit.textChanged.connect(self.filter_products)
+
+        # ผลการสแกน
+        self.scan_status_label = QLabel("")
+        layout.addWidget(self.scan_status_label)
+
         # ตารางสินค้า
-        self.product_table = QTableWidget()
-        self.product_table.setColumnCount(8)
-        self.product_table.setHorizontalHeaderLabels([
-            "ชื่อสินค้า", "ยี่ห้อ", "IMEI 1", "IMEI 2", "Serial Number", 
-            "สภาพเครื่อง", "อุปกรณ์ที่มาพร้อม", "วันที่สร้าง"
-        ])
+        self.product_model = PagedTableModel(SEARCH_COLUMNS, parent=self)
+        self.product_table = QTableView()
+        self.product_table.setModel(self.product_model)
+        self.product_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.product_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.product_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.product_table.verticalHeader().setVisible(False)
         self.product_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.product_table.itemDoubleClicked.connect(self.select_product)
+        self.product_table.doubleClicked.connect(self.select_product)
         layout.addWidget(self.product_table)
-        
+
         # ปุ่ม
         button_layout = QHBoxLayout()
         self.select_button = QPushButton("เลือกสินค้า")
         self.select_button.clicked.connect(self.select_product)
         self.cancel_button = QPushButton("ยกเลิก")
         self.cancel_button.clicked.connect(self.reject)
-        
+
         button_layout.addWidget(self.select_button)
         button_layout.addWidget(self.cancel_button)
         layout.addLayout(button_layout)
-    
+
+    def eventFilter(self, obj, event):
+        if obj is self.search_edit and event.type() == QEvent.KeyPress:
+            now = time.monotonic()
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                code = self.scan_detector.finish(self.search_edit.text(), now)
+                if code is None and self.scan_mode_check.isChecked():
+                    code = normalize_scan(self.search_edit.text()) or None
+                if code is not None:
+                    self.lookup_code(code)
+                    return True
+            elif event.text() and event.text().isprintable():
+                self.scan_detector.key(now)
+        return super().eventFilter(obj, event)
+
     def load_products(self):
-        """โหลดข้อมูลสินค้าทั้งหมด"""
-        try:
-            products = self.db.search_products("")  # ดึงทั้งหมด
-            self.display_products(products)
-        except Exception as e:
-            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถโหลดข้อมูลสินค้า: {}".format(str(e)))
-    
+        """โหลดข้อมูลสินค้า (ตามคำค้นปัจจุบัน ถ้าว่างคือทั้งหมด)"""
+        self.search_controller.search_now()
+
     def search_products(self):
-        """ค้นหาสินค้า"""
+        """ค้นหาสินค้าทันที (ปุ่มค้นหา / Enter)"""
+        self.scan_status_label.setText("")
+        self.search_controller.search_now()
+
+    def filter_products(self):
+        """กรองข้อมูลสินค้าขณะพิมพ์ (ค้นเมื่อหยุดพิมพ์)"""
+        self.search_controller.schedule()
+
+    def prepare_search(self):
+        """อ่านคำค้นในเธรดหลัก คืนฟังก์ชันดึงหน้าแรกที่จะรันในเธรดแยก"""
         search_term = self.search_edit.text().strip()
-        if not search_term:
-            self.load_products()
-            return
-        
+        db = self.db
+
+        def fetch_page(offset, limit):
+            return db.search_products(search_term, limit=limit, offset=offset)
+
+        return lambda: (fetch_page, fetch_page(0, PAGE_SIZE))
+
+    def show_search_error(self, message: str):
+        QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถค้นหาสินค้า: {}".format(message))
+
+    def display_products(self, result):
+        """แสดงข้อมูลสินค้าในตาราง (หน้าถัดไปดึงเมื่อเลื่อนถึงท้ายตาราง)"""
+        fetch_page, first_page = result
+        self.product_model.set_source(fetch_page, first_page)
+
+    def lookup_code(self, code: str):
+        """ค้นสินค้าจากรหัสที่สแกน (ซีเรียล/IMEI ตรงตัว) แล้วแสดงสัญญาที่ยังไม่ปิด"""
+        # ผลของการค้นขณะพิมพ์ (ตัวอักษรจากเครื่องสแกน) ไม่ต้องแสดงแล้ว
+        self.search_controller.cancel()
+        self.search_edit.blockSignals(True)
+        self.search_edit.setText(code)
+        self.search_edit.blockSignals(False)
+        self.search_edit.selectAll()  # สแกนครั้งถัดไปแทนที่รหัสเดิม
+
         try:
-            products = self.db.search_products(search_term)
-            self.display_products(products)
+            result = self.db.find_products_by_code(code)
         except Exception as e:
             QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถค้นหาสินค้า: {}".format(str(e)))
-    
-    def filter_products(self):
-        """กรองข้อมูลสินค้า"""
-        search_term = self.search_edit.text().strip()
-        if search_term:
-            self.search_products()
-    
-    def display_products(self, products):
-        """แสดงข้อมูลสินค้าในตาราง"""
-        self.product_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            self.product_table.setItem(row, 0, QTableWidgetItem(product.get('name', '')))
-            self.product_table.setItem(row, 1, QTableWidgetItem(product.get('brand', '')))
-            self.product_table.setItem(row, 2, QTableWidgetItem(product.get('imei1', '')))
-            self.product_table.setItem(row, 3, QTableWidgetItem(product.get('imei2', '')))
-            self.product_table.setItem(row, 4, QTableWidgetItem(product.get('serial_number', '')))
-            self.product_table.setItem(row, 5, QTableWidgetItem(product.get('condition', '')))
-            
-            # วันที่สร้าง
-            created_at = product.get('created_at', '')
-            if created_at:
-                try:
-                    date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    date_str = date_obj.strftime('%d/%m/%Y')
-                except:
-                    date_str = created_at
-            else:
-                date_str = ''
-            self.product_table.setItem(row, 6, QTableWidgetItem(product.get('accessories', '')))
-            self.product_table.setItem(row, 7, QTableWidgetItem(date_str))
-    
+            return
+
+        products = result['products']
+        self.scanned_contract = result['contract']
+        self.product_model.set_source(lambda offset, limit: products[offset:offset + limit],
+                                      products[:PAGE_SIZE])
+        if products:
+            self.product_table.selectRow(0)
+
+        messages = []
+        if classify_code(code) == CODE_INVALID_IMEI:
+            messages.append("IMEI {} ไม่ถูกต้อง (เลขตรวจสอบไม่ผ่าน) กรุณาตรวจสอบหรือสแกนใหม่".format(code))
+        if not products:
+            messages.append("ไม่พบสินค้ารหัส {}".format(code))
+        elif self.scanned_contract:
+            contract = self.scanned_contract
+            messages.append("สินค้านี้อยู่ในสัญญา {} ของ {} {} (สถานะ: {})".format(
+                contract['contract_number'], contract.get('first_name', ''), contract.get('last_name', ''),
+                STATUS_TEXT.get(contract.get('status'), contract.get('status'))
+            ))
+        else:
+            messages.append("พบสินค้า {} - ไม่มีสัญญาที่ยังไม่ปิด".format(products[0].get('name', '')))
+
+        warn = not products or self.scanned_contract is not None or len(messages) > 1
+        self.scan_status_label.setText("\n".join(messages))
+        self.scan_status_label.setStyleSheet("color: #C62828; font-weight: bold;" if warn else "color: #2E7D32;")
+
+    def current_product(self) -> Optional[Dict]:
+        """ข้อมูลของแถวที่เลือกอยู่"""
+        index = self.product_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.product_model.row_data(index.row())
+
     def select_product(self):
         """เลือกสินค้า"""
-        current_row = self.product_table.currentRow()
-        if current_row >= 0:
-            # ดึงข้อมูลสินค้าที่เลือก
-            product_name = self.product_table.item(current_row, 0).text()
-            serial_number = self.product_table.item(current_row, 4).text()
-            
-            try:
-                if serial_number:
-                    products = self.db.search_products(serial_number)
-                else:
-                    products = self.db.search_products(product_name)
-                
-                if products:
-                    self.selected_product = products[0]
-                    self.accept()
-                else:
-                    QMessageBox.warning(self, "แจ้งเตือน", "ไม่พบข้อมูลสินค้า")
-                    
-            except Exception as e:
-                QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถเลือกสินค้า: {}".format(str(e)))
-        else:
+        product = self.current_product()
+        if product is None:
             QMessageBox.warning(self, "แจ้งเตือน", "กรุณาเลือกสินค้า")
+            return
 
+        try:
+            product = self.db.get_product_by_id(product['id'])
+        except Exception as e:
+            QMessageBox.warning(self, "แจ้งเตือน", "ไม่สามารถเลือกสินค้า: {}".format(str(e)))
+            return
+        if not product:
+            QMessageBox.warning(self, "แจ้งเตือน", "ไม่พบข้อมูลสินค้า")
+            self.load_products()
+            return
+        self.selected_product = product
+        self.accept()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+คำนวณใบเสนอยอด (ดอกเบี้ย ค่าปรับ ยอดไถ่คืน) แยกจากหน้าจอ
+
+ฟังก์ชันในโมดูลนี้ไม่อ่านไฟล์ ไม่แตะฐานข้อมูล และไม่ใช้ Qt
+ข้อมูลอัตราส่งเข้ามาเป็น FeeTerms (ได้จาก FeeSchedule.terms()) จึงจำผลลัพธ์ของอินพุตซ้ำได้
+
+สูตร:
+- อัตรา = อัตราตามขั้นจำนวนวันใน FeeTerms ถ้าไม่มีขั้นที่ตรงใช้ rate ที่ส่งมา
+- ดอกเบี้ย = เงินต้น * อัตรา/100 * จำนวนวัน/30
+- ยอดไถ่คืน = เงินต้น + ดอกเบี้ย (หรือยอดไถ่คืนตามสัญญาถ้าระบุ)
+- ค่าปรับ = จำนวนวันที่เกินกำหนด * ค่าปรับต่อวัน
+- ยอดชำระ = ยอดไถ่คืน + ค่าปรับ - ส่วนลด
+
+วิธีรัน benchmark:
+    python quotation.py --benchmark 100000
+"""
+import argparse
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_PENALTY_PER_DAY = 10.0
+
+
+class FeeTerms(NamedTuple):
+    """อัตราตามขั้นจำนวนวัน + ค่าปรับต่อวัน (hashable ใช้เป็น key ของ cache ได้)"""
+    days: Tuple[int, ...] = ()
+    rates: Tuple[float, ...] = ()
+    penalty_per_day: float = DEFAULT_PENALTY_PER_DAY
+
+    def rate_for(self, days: int, default: Optional[float] = None) -> Optional[float]:
+        """อัตรา (% ต่อเดือน) ของสัญญา days วัน ถ้าน้อยกว่าขั้นแรกหรือไม่มีขั้นคืน default"""
+        index = bisect_right(self.days, days) - 1
+        return self.rates[index] if index >= 0 else default
+
+
+def _to_date(value) -> Optional[date]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+@lru_cache(maxsize=4096)
+def _quote(pawn_amount: float, days: int, rate: Optional[float], start_date: Optional[date],
+           as_of: Optional[date], terms: FeeTerms, total_redemption: Optional[float],
+           discount: float) -> Tuple:
+    effective_rate = terms.rate_for(days, rate) or 0.0
+    interest = pawn_amount * (effective_rate / 100.0) * (max(days, 0) / 30.0)
+    redemption = pawn_amount + interest if total_redemption is None else total_redemption
+
+    end_date = start_date + timedelta(days=days) if start_date else None
+    overdue_days = max((as_of - end_date).days, 0) if as_of and end_date else 0
+    penalty = overdue_days * terms.penalty_per_day
+
+    return (pawn_amount, days, effective_rate, interest, redemption, end_date,
+            overdue_days, penalty, discount, redemption + penalty - discount)
+
+
+_QUOTE_FIELDS = ('pawn_amount', 'days', 'rate', 'interest', 'total_redemption', 'end_date',
+                 'overdue_days', 'penalty', 'discount', 'total_due')
+
+
+def quote(pawn_amount: float, days: int, rate: Optional[float] = None,
+          start_date=None, as_of=None, terms: FeeTerms = FeeTerms(),
+          total_redemption: Optional[float] = None, discount: float = 0.0) -> Dict:
+    """คำนวณยอดของสัญญาหนึ่งรายการ
+
+    pawn_amount: เงินต้น, days: จำนวนวันของสัญญา
+    rate: อัตรา % ต่อเดือนที่ใช้เมื่อ terms ไม่มีขั้นที่ตรง
+    start_date / as_of: วันเริ่มสัญญา / วันที่คำนวณ (date หรือ YYYY-MM-DD) ใช้คิดวันเกินกำหนด
+    total_redemption: ยอดไถ่คืนตามสัญญาเดิม (ถ้าไม่ระบุ = เงินต้น + ดอกเบี้ย)
+
+    คืน dict: pawn_amount, days, rate, interest, total_redemption, end_date (YYYY-MM-DD หรือ ''),
+    overdue_days, penalty, discount, total_due
+    """
+    values = _quote(float(pawn_amount), int(days), None if rate is None else float(rate),
+                    _to_date(start_date), _to_date(as_of), terms,
+                    None if total_redemption is None else float(total_redemption), float(discount))
+    result = dict(zip(_QUOTE_FIELDS, values))
+    result['end_date'] = result['end_date'].isoformat() if result['end_date'] else ''
+    return result
+
+
+def tier_rates(days: np.ndarray, terms: FeeTerms, default_rate: float) -> np.ndarray:
+    """อัตรารายสัญญาตามขั้นจำนวนวัน (FeeTerms.rate_for แบบทั้ง array)"""
+    days = np.asarray(days)
+    if not terms.days:
+        return np.full(days.shape, default_rate, dtype=np.float64)
+    index = np.searchsorted(np.asarray(terms.days), days, side='right') - 1
+    per_contract = np.asarray(terms.rates, dtype=np.float64)[np.maximum(index, 0)]
+    return np.where(index >= 0, per_contract, default_rate)
+
+
+def quote_batch(pawn_amounts, days, rate: float, start_dates=None, as_of=None,
+                terms: FeeTerms = FeeTerms(), total_redemptions=None, discounts=0.0) -> Dict[str, np.ndarray]:
+    """คำนวณทีละมากด้วย NumPy (ผลเหมือน quote ทีละรายการ) คืน dict ของ arrays
+
+    start_dates เป็น array ของ YYYY-MM-DD/datetime64 (ไม่ระบุ = ไม่คิดค่าปรับ)
+    total_redemptions: ยอดไถ่คืนตามสัญญา (NaN หรือไม่ระบุ = เงินต้น + ดอกเบี้ย), discounts: ส่วนลดรายสัญญา
+    """
+    pawn_amounts = np.asarray(pawn_amounts, dtype=np.float64)
+    days = np.broadcast_to(np.asarray(days, dtype=np.int64), pawn_amounts.shape)
+
+    rates = tier_rates(days, terms, rate)
+    interest = pawn_amounts * (rates / 100.0) * (np.maximum(days, 0) / 30.0)
+    redemption = pawn_amounts + interest
+    if total_redemptions is not None:
+        total_redemptions = np.broadcast_to(np.asarray(total_redemptions, dtype=np.float64), pawn_amounts.shape)
+        redemption = np.where(np.isnan(total_redemptions), redemption, total_redemptions)
+    discounts = np.broadcast_to(np.asarray(discounts, dtype=np.float64), pawn_amounts.shape)
+
+    if start_dates is not None and as_of is not None:
+        end_dates = np.asarray(start_dates, dtype='datetime64[D]') + days
+        overdue_days = np.maximum((np.datetime64(str(as_of)[:10], 'D') - end_dates).astype(np.int64), 0)
+    else:
+        overdue_days = np.zeros(pawn_amounts.shape, dtype=np.int64)
+    penalty = overdue_days * terms.penalty_per_day
+
+    return {
+        'rate': rates,
+        'interest': interest,
+        'total_redemption': redemption,
+        'overdue_days': overdue_days,
+        'penalty': penalty,
+        'discount': discounts,
+        'total_due': redemption + penalty - discounts,
+    }
+
+
+def benchmark(count: int = 100000):
+    """วัดเวลา quote แบบไม่มี cache / มี cache และ quote_batch"""
+    terms = FeeTerms(days=(0, 90), rates=(10.0, 8.0))
+    rng = np.random.default_rng(0)
+    amounts = (rng.integers(5, 500, count) * 100.0).tolist()
+    days = rng.integers(1, 180, count).tolist()
+
+    _quote.cache_clear()
+    started = time.perf_counter()
+    for amount, day in zip(amounts, days):
+        quote(amount, day, 10.0, '2026-01-01', '2026-10-19', terms)
+    cold = time.perf_counter() - started
+
+    # อินพุตซ้ำ (เช่นหน้าจอที่คำนวณใหม่ทุกครั้งที่กดปุ่ม)
+    started = time.perf_counter()
+    for _ in range(count):
+        quote(5000.0, 30, 10.0, '2026-01-01', '2026-10-19', terms)
+    warm = time.perf_counter() - started
+
+    started = time.perf_counter()
+    quote_batch(amounts, days, 10.0, np.full(count, '2026-01-01'), '2026-10-19', terms)
+    batch = time.perf_counter() - started
+
+    print(f"quote (distinct inputs): {cold / count * 1e6:.2f} us/quote")
+    print(f"quote (repeated input):  {warm / count * 1e6:.2f} us/quote")
+    print(f"quote_batch:             {batch * 1000:.1f} ms for {count:,} quotes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop quotation")
+    parser.add_argument('--benchmark', type=int, default=100000, metavar='N')
+    args = parser.parse_args()
+    benchmark(args.benchmark)
+
+
+if __name__ == "__main__":
+    main()
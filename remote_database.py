@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+ตัวแทนฐานข้อมูลฝั่งเครื่องลูก (ใช้แทน PawnShopDatabase ได้ทันที)
+
+ทุกเมธอดของ PawnShopDatabase ถูกส่งไปยัง db_server.py ผ่าน HTTP
+และรวมหลายคำสั่งไว้ในคำขอเดียวได้ด้วย batch()
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List
+
+import requests
+
+from database import PawnShopDatabase
+from shop_config_loader import load_shop_config
+
+# ชนิดข้อผิดพลาดที่ส่งกลับมาจากเซิร์ฟเวอร์ -> exception ฝั่งเครื่องลูก
+ERROR_TYPES = {
+    'ValueError': ValueError,
+    'KeyError': KeyError,
+    'TypeError': TypeError,
+    'AttributeError': AttributeError,
+    'OperationalError': sqlite3.OperationalError,
+    'IntegrityError': sqlite3.IntegrityError,
+}
+
+
+class RemoteCallError(RuntimeError):
+    """ข้อผิดพลาดจากเซิร์ฟเวอร์ที่ไม่มีชนิดตรงกับฝั่งเครื่องลูก"""
+
+
+class PendingResult:
+    """ผลลัพธ์ของคำสั่งใน batch ซึ่งจะได้ค่าหลังส่งคำขอ"""
+
+    def __init__(self):
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def _resolve(self, response: Dict):
+        self._done = True
+        if 'error' in response:
+            self._error = response['error']
+        else:
+            self._value = response.get('result')
+
+    def result(self):
+        if not self._done:
+            raise RuntimeError("batch has not been sent yet")
+        if self._error:
+            raise _make_error(self._error)
+        return self._value
+
+
+def _make_error(error: Dict) -> Exception:
+    exc_type = ERROR_TYPES.get(error.get('type'), RemoteCallError)
+    return exc_type(error.get('message', ''))
+
+
+class _BatchRecorder:
+    """บันทึกคำสั่งใน batch: เรียกเมธอดแล้วได้ PendingResult กลับมา"""
+
+    def __init__(self):
+        self.calls: List[Dict] = []
+        self.pending: List[PendingResult] = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            pending = PendingResult()
+            self.calls.append({'method': name, 'args': list(args), 'kwargs': kwargs})
+            self.pending.append(pending)
+            return pending
+
+        return record
+
+
+class RemotePawnShopDatabase:
+    """เรียกเมธอดของ PawnShopDatabase บนเครื่องเซิร์ฟเวอร์ผ่าน HTTP"""
+
+    def __init__(self, server_url: str, token: str = "", timeout: float = 15.0):
+        self.server_url = server_url.rstrip('/') + '/rpc'
+        self.timeout = timeout
+        # ไม่มีไฟล์ฐานข้อมูลในเครื่องลูก
+        self.db_path = None
+        self._session = requests.Session()
+        if token:
+            self._session.headers['X-PawnShop-Token'] = token
+
+    def _send(self, calls: List[Dict]) -> List[Dict]:
+        response = self._session.post(
+            self.server_url,
+            data=json.dumps(calls, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def call(self, method: str, *args, **kwargs):
+        """เรียกเมธอดเดียวบนเซิร์ฟเวอร์"""
+        response = self._send([{'method': method, 'args': list(args), 'kwargs': kwargs}])[0]
+        if 'error' in response:
+            raise _make_error(response['error'])
+        return response.get('result')
+
+    @contextmanager
+    def batch(self):
+        """รวมหลายคำสั่งไว้ในคำขอเดียว
+
+        with db.batch() as b:
+            customer = b.get_customer_by_id(1)
+            contracts = b.get_contracts_by_customer(1)
+        customer.result(), contracts.result()
+        """
+        recorder = _BatchRecorder()
+        yield recorder
+        if recorder.calls:
+            for pending, response in zip(recorder.pending, self._send(recorder.calls)):
+                pending._resolve(response)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(PawnShopDatabase, name, None)):
+            raise AttributeError(name)
+
+        def remote_method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        remote_method.__name__ = name
+        return remote_method
+
+
+def create_database():
+    """สร้างฐานข้อมูลตามการตั้งค่า: ถ้ามี db_server_url ใช้เซิร์ฟเวอร์ ไม่เช่นนั้นเปิดไฟล์ในเครื่อง"""
+    config = load_shop_config()
+    server_url = config.get('db_server_url', '')
+    if server_url:
+        return RemotePawnShopDatabase(server_url, config.get('db_server_token', ''))
+    return PawnShopDatabase()
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
     QPushButton, QGroupBox, QFormLayout, QTabWidget, QLineEdit, QTextEdit,
-    QDoubleSpinBox, QCheckBox
+    QDoubleSpinBox, QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
 )
 from PySide6.QtCore import Qt
 from language_manager import language_manager
@@ -12,6 +12,8 @@ class SettingsDialog(QDialog):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        # ตารางค่าธรรมเนียมอยู่ในฐานข้อมูล ใช้ connection จาก parent window ถ้ามี
+        self.db = getattr(parent, 'db', None)
         self.setWindowTitle(language_manager.get_text("settings_title"))
         self.setMinimumSize(500, 400)
         self.resize(600, 500)
@@ -140,6 +142,36 @@ class SettingsDialog(QDialog):
         self.auto_calculate_checkbox.setChecked(True)
         interest_layout.addRow("คำนวณอัตโนมัติ", self.auto_calculate_checkbox)
         
+        # ค่าปรับเกินกำหนดต่อวัน (settings.penalty_per_day)
+        self.penalty_per_day_spin = QDoubleSpinBox()
+        self.penalty_per_day_spin.setRange(0.0, 99999.0)
+        self.penalty_per_day_spin.setSuffix(" บาท/วัน")
+        self.penalty_per_day_spin.setValue(10.0)
+        interest_layout.addRow("ค่าปรับเกินกำหนด", self.penalty_per_day_spin)
+        
+        # ตารางอัตราตามจำนวนวัน (fee_rates): ตั้งแต่ N วันขึ้นไปใช้อัตรา X% จนถึงขั้นถัดไป
+        self.fee_rates_table = QTableWidget(0, 3)
+        self.fee_rates_table.setHorizontalHeaderLabels(["ตั้งแต่ (วัน)", "อัตรา (%/เดือน)", "คำอธิบาย"])
+        self.fee_rates_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.fee_rates_table.setMinimumHeight(140)
+        interest_layout.addRow("อัตราตามจำนวนวัน", self.fee_rates_table)
+        
+        fee_button_layout = QHBoxLayout()
+        add_fee_button = QPushButton("เพิ่มขั้น")
+        remove_fee_button = QPushButton("ลบขั้น")
+        add_fee_button.clicked.connect(lambda: self.add_fee_rate_row())
+        remove_fee_button.clicked.connect(self.remove_fee_rate_row)
+        fee_button_layout.addWidget(add_fee_button)
+        fee_button_layout.addWidget(remove_fee_button)
+        fee_button_layout.addStretch()
+        interest_layout.addRow("", fee_button_layout)
+        
+        if self.db is None:
+            self.fee_rates_table.setEnabled(False)
+            self.penalty_per_day_spin.setEnabled(False)
+            add_fee_button.setEnabled(False)
+            remove_fee_button.setEnabled(False)
+        
         # เชื่อมต่อสัญญาณ
         self.interest_rate_spin.valueChanged.connect(self.on_interest_rate_changed)
         self.auto_calculate_checkbox.toggled.connect(self.on_auto_calculate_toggled)
@@ -181,13 +213,58 @@ class SettingsDialog(QDialog):
         shop_config = load_shop_config()
         self.interest_rate_spin.setValue(shop_config.get('interest_rate', 10.0))
         self.auto_calculate_checkbox.setChecked(shop_config.get('auto_calculate_interest', True))
+        
+        # โหลดตารางค่าธรรมเนียมและค่าปรับจากฐานข้อมูล
+        if self.db is not None:
+            try:
+                self.penalty_per_day_spin.setValue(float(self.db.get_setting('penalty_per_day') or 10))
+                for fee_rate in self.db.get_fee_rates():
+                    self.add_fee_rate_row(fee_rate['days_count'], fee_rate['fee_rate'], fee_rate.get('description') or '')
+            except Exception as e:
+                print(f"Error loading fee rates: {e}")
+    
+    def add_fee_rate_row(self, days_count=0, fee_rate=0.0, description=''):
+        """เพิ่มแถวในตารางอัตรา"""
+        row = self.fee_rates_table.rowCount()
+        self.fee_rates_table.insertRow(row)
+        self.fee_rates_table.setItem(row, 0, QTableWidgetItem(str(days_count)))
+        self.fee_rates_table.setItem(row, 1, QTableWidgetItem(str(fee_rate)))
+        self.fee_rates_table.setItem(row, 2, QTableWidgetItem(description))
+    
+    def remove_fee_rate_row(self):
+        """ลบแถวที่เลือกในตารางอัตรา"""
+        row = self.fee_rates_table.currentRow()
+        if row >= 0:
+            self.fee_rates_table.removeRow(row)
+    
+    def get_fee_rate_rows(self):
+        """อ่านตารางอัตราจากหน้าจอ คืน {days_count: (fee_rate, description)}"""
+        rows = {}
+        for row in range(self.fee_rates_table.rowCount()):
+            days_item = self.fee_rates_table.item(row, 0)
+            rate_item = self.fee_rates_table.item(row, 1)
+            description_item = self.fee_rates_table.item(row, 2)
+            days_count = int(days_item.text().strip()) if days_item else 0
+            fee_rate = float(rate_item.text().strip()) if rate_item else 0.0
+            if days_count < 0:
+                raise ValueError(f"จำนวนวันต้องไม่ติดลบ ({days_count})")
+            if fee_rate < 0:
+                raise ValueError(f"อัตราของขั้น {days_count} วันต้องไม่ติดลบ ({fee_rate})")
+            if days_count in rows:
+                raise ValueError(f"มีขั้น {days_count} วันซ้ำกัน")
+            rows[days_count] = (fee_rate, description_item.text() if description_item else '')
+        return rows
     
     def save_settings(self):
         """บันทึกการตั้งค่า"""
-        # บันทึกการตั้งค่าภาษา
-        selected_language = self.language_combo.currentData()
-        if selected_language != language_manager.get_current_language():
-            language_manager.set_language(selected_language)
+        # ตรวจตารางค่าธรรมเนียมก่อนบันทึกส่วนใดๆ
+        fee_rate_rows = None
+        if self.db is not None:
+            try:
+                fee_rate_rows = self.get_fee_rate_rows()
+            except ValueError as e:
+                QMessageBox.warning(self, "แจ้งเตือน", f"ตารางอัตราไม่ถูกต้อง: {e}")
+                return
         
         # บันทึกการตั้งค่า PDF และดอกเบี้ย
         shop_data = {
@@ -203,7 +280,23 @@ class SettingsDialog(QDialog):
             'auto_calculate_interest': self.auto_calculate_checkbox.isChecked(),
             'default_paper_mode': self.paper_mode_combo.currentIndex()
         }
-        save_shop_config(shop_data)
+        
+        try:
+            if fee_rate_rows is not None:
+                # ตารางอัตราและค่าปรับบันทึกในธุรกรรมเดียว (สำเร็จทั้งหมดหรือไม่เปลี่ยนเลย)
+                self.db.replace_fee_rates(fee_rate_rows, self.penalty_per_day_spin.value())
+            saved = save_shop_config(shop_data)
+        except Exception as e:
+            QMessageBox.critical(self, "ผิดพลาด", f"ไม่สามารถบันทึกการตั้งค่าได้: {str(e)}")
+            return
+        if not saved:
+            QMessageBox.critical(self, "ผิดพลาด", "ไม่สามารถเขียนไฟล์ตั้งค่าร้านได้ (shop_config.json)")
+            return
+        
+        # เปลี่ยนภาษาหลังบันทึกสำเร็จ
+        selected_language = self.language_combo.currentData()
+        if selected_language != language_manager.get_current_language():
+            language_manager.set_language(selected_language)
         
         # ปิดหน้าต่างตั้งค่า
         self.accept()
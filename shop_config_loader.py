@@ -1,50 +1,205 @@
 # -*- coding: utf-8 -*-
 """
 Utility module for loading shop configuration from JSON file
+
+ไฟล์ตั้งค่า (shop_config.json, config.json) ถูกอ่านผ่าน ConfigFile ซึ่ง:
+- อ่านและ parse ครั้งเดียว แล้วอ่านใหม่เฉพาะเมื่อ mtime/ขนาดไฟล์เปลี่ยน (แก้ไฟล์ด้วยมือก็เห็นผล)
+- รวมการเขียนที่เกิดถี่ๆ (เช่นหมุน spinbox อัตราดอกเบี้ย) เป็นการเขียนครั้งเดียวหลัง WRITE_DELAY วินาที
+- เขียนไฟล์ชั่วคราวแล้ว os.replace ไฟล์จึงไม่เสียถ้าเครื่องดับระหว่างเขียน
 """
+import atexit
 import json
 import os
+import threading
+from typing import Dict, Optional
+
+# เวลารอรวมการเขียน (วินาที)
+WRITE_DELAY = 0.5
+
+# (คีย์ที่โปรแกรมใช้, คีย์ในไฟล์ shop_config.json, ค่าเริ่มต้น)
+SHOP_CONFIG_KEYS = [
+    ('name', 'shop_name', 'ร้าน ไอโปรโมบาย'),
+    ('branch', 'shop_branch', 'สาขาหล่มสัก'),
+    ('address', 'shop_address', '14-15 ถ.พินิจ ต.หล่มสัก อ.หล่มสัก จ.เพชรบูรณ์ 67110'),
+    ('tax_id', 'tax_id', '0-1234-56789-01-2'),
+    ('phone', 'phone', '02-345-6789'),
+    ('authorized_signer', 'authorized_signer', 'นายประเสริฐ ใจดี'),
+    ('buyer_signer_name', 'buyer_signer_name', 'นายประเสริฐ ใจดี'),
+    ('witness_name', 'witness_name', 'นางสาวมั่นใจ ถูกต้อง'),
+    ('interest_rate', 'interest_rate', 10.0),
+    ('auto_calculate_interest', 'auto_calculate_interest', True),
+    ('default_paper_mode', 'default_paper_mode', 1),  # 0=A4, 1=Half-A4 continuous
+    ('db_server_url', 'db_server_url', ''),  # ว่าง = ใช้ pawnshop.db ในเครื่อง, เช่น http://192.168.1.10:8765
+    ('db_server_token', 'db_server_token', ''),
+]
+
+
+class ConfigFile:
+    """ไฟล์ JSON หนึ่งไฟล์ที่แคชไว้ในหน่วยความจำและเขียนกลับแบบหน่วงเวลา (ใช้ร่วมกันทั้งโปรเซส)"""
+
+    def __init__(self, path: str, write_delay: float = WRITE_DELAY):
+        self.path = path
+        self.write_delay = write_delay
+        self.version = 0
+        self._data: Dict = {}
+        self._stamp = None
+        self._loaded = False
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _reload_if_changed(self):
+        stamp = self._file_stamp()
+        # ระหว่างรอเขียน ค่าในหน่วยความจำเป็นค่าล่าสุด
+        if (self._loaded and stamp == self._stamp) or self._dirty:
+            return
+        data = {}
+        if stamp is not None:
+            try:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except UnicodeDecodeError:
+                    # ไฟล์เก่าที่เขียนด้วย encoding ของเครื่อง (ก่อนเปลี่ยนมาใช้ UTF-8)
+                    with open(self.path, 'r') as f:
+                        data = json.load(f)
+            except Exception as e:
+                print("Error loading config {}: {}".format(self.path, e))
+                if self._loaded:
+                    return
+        self._data = data if isinstance(data, dict) else {}
+        self._stamp = stamp
+        self._loaded = True
+        self.version += 1
+
+    def data(self) -> Dict:
+        """สำเนาของค่าทั้งหมดในไฟล์"""
+        with self._lock:
+            self._reload_if_changed()
+            return dict(self._data)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            self._reload_if_changed()
+            return self._data.get(key, default)
+
+    def update(self, changes: Dict, delay: Optional[float] = None) -> bool:
+        """แก้ไขค่า (มีผลทันทีในหน่วยความจำ) แล้วเขียนไฟล์หลัง delay วินาที การแก้ไขที่ตามมาจะเลื่อนเวลาเขียนออกไป
+
+        delay <= 0 เขียนทันทีและคืนผลของ flush() ถ้ายังไม่เขียนคืน True
+        """
+        with self._lock:
+            self._reload_if_changed()
+            if all(key in self._data and self._data[key] == value for key, value in changes.items()):
+                return self.flush() if delay is not None and delay <= 0 else True
+            self._data.update(changes)
+            self._dirty = True
+            self.version += 1
+
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = self.write_delay if delay is None else delay
+            if delay <= 0:
+                return self.flush()
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+            return True
+
+    def flush(self) -> bool:
+        """เขียนค่าที่ค้างอยู่ลงไฟล์ทันที คืน False ถ้าเขียนไม่สำเร็จ (ค่ายังค้างไว้ให้เขียนรอบถัดไป)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return True
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                temp_path = self.path + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self.path)
+                self._stamp = self._file_stamp()
+                self._dirty = False
+                return True
+            except Exception as e:
+                print("Error saving config {}: {}".format(self.path, e))
+                return False
+
+
+_config_files: Dict[str, ConfigFile] = {}
+_config_files_lock = threading.Lock()
+
+
+def _resolve_path(config_file: str) -> str:
+    if not os.path.isabs(config_file):
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), config_file)
+    return config_file
+
+
+def get_config_file(config_file: str) -> ConfigFile:
+    """ConfigFile ของไฟล์นี้ (หนึ่ง object ต่อไฟล์ต่อโปรเซส) path แบบ relative อ้างอิงโฟลเดอร์โปรแกรม"""
+    path = _resolve_path(config_file)
+    with _config_files_lock:
+        config = _config_files.get(path)
+        if config is None:
+            config = ConfigFile(path)
+            _config_files[path] = config
+        return config
+
+
+@atexit.register
+def flush_all_configs():
+    """เขียนค่าที่ยังค้างทุกไฟล์ (เรียกอัตโนมัติตอนปิดโปรแกรม)"""
+    for config in list(_config_files.values()):
+        config.flush()
+
+
+_shop_config_cache: Dict[str, tuple] = {}
 
 
 def load_shop_config(config_file="shop_config.json"):
     """
     Load shop configuration from JSON file
-    
+
     Args:
         config_file: Path to the JSON configuration file
-        
+
     Returns:
         Dictionary containing shop information with keys:
         - name: Shop name
         - branch: Shop branch
         - address: Shop address
+        (ไฟล์ถูก parse เฉพาะเมื่อเปลี่ยน ผลลัพธ์เป็นสำเนา แก้ไขได้โดยไม่กระทบค่าที่แคชไว้)
     """
+    config = get_config_file(config_file)
     try:
-        # Try to find the config file in the current directory
-        if not os.path.isabs(config_file):
-            config_path = os.path.join(os.path.dirname(__file__), config_file)
-        else:
-            config_path = config_file
-            
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-                return {
-                    'name': config.get('shop_name', 'ร้าน ไอโปรโมบาย'),
-                    'branch': config.get('shop_branch', 'สาขาหล่มสัก'),
-                    'address': config.get('shop_address', '14-15 ถ.พินิจ ต.หล่มสัก อ.หล่มสัก จ.เพชรบูรณ์ 67110'),
-                    'tax_id': config.get('tax_id', '0-1234-56789-01-2'),
-                    'phone': config.get('phone', '02-345-6789'),
-                    'authorized_signer': config.get('authorized_signer', 'นายประเสริฐ ใจดี'),
-                    'buyer_signer_name': config.get('buyer_signer_name', 'นายประเสริฐ ใจดี'),
-                    'witness_name': config.get('witness_name', 'นางสาวมั่นใจ ถูกต้อง'),
-                    'interest_rate': config.get('interest_rate', 10.0),
-                    'auto_calculate_interest': config.get('auto_calculate_interest', True),
-                    'default_paper_mode': config.get('default_paper_mode', 1)
-                }
-        else:
-            print("Warning: Shop config file not found at {}, using defaults".format(config_path))
+        raw = config.data()
+        if not raw and not config.exists:
+            if config.path not in _shop_config_cache:
+                print("Warning: Shop config file not found at {}, using defaults".format(config.path))
+                _shop_config_cache[config.path] = (None, get_default_shop_config())
             return get_default_shop_config()
+
+        version, shop_config = _shop_config_cache.get(config.path, (None, None))
+        if version != config.version:
+            shop_config = {key: raw.get(file_key, default) for key, file_key, default in SHOP_CONFIG_KEYS}
+            _shop_config_cache[config.path] = (config.version, shop_config)
+        return dict(shop_config)
     except Exception as e:
         print("Error loading shop config: {}, using defaults".format(e))
         return get_default_shop_config()
@@ -53,58 +208,51 @@ def load_shop_config(config_file="shop_config.json"):
 def get_default_shop_config():
     """
     Get default shop configuration
-    
+
     Returns:
         Dictionary with default shop information
     """
-    return {
-        'name': 'ร้าน ไอโปรโมบาย',
-        'branch': 'สาขาหล่มสัก',
-        'address': '14-15 ถ.พินิจ ต.หล่มสัก อ.หล่มสัก จ.เพชรบูรณ์ 67110',
-        'tax_id': '0-1234-56789-01-2',
-        'phone': '02-345-6789',
-        'authorized_signer': 'นายประเสริฐ ใจดี',
-        'buyer_signer_name': 'นายประเสริฐ ใจดี',
-        'witness_name': 'นางสาวมั่นใจ ถูกต้อง',
-        'interest_rate': 10.0,
-        'auto_calculate_interest': True,
-        'default_paper_mode': 1  # 0=A4, 1=Half-A4 continuous
-    }
+    return {key: default for key, _file_key, default in SHOP_CONFIG_KEYS}
+
+
+def update_shop_config(changes, config_file="shop_config.json", delay=None):
+    """
+    Update some shop configuration values (write-behind)
+
+    Args:
+        changes: Dictionary with the same keys as load_shop_config(), e.g. {'interest_rate': 8.0}
+        config_file: Path to the JSON configuration file
+        delay: Seconds to wait before writing (default WRITE_DELAY, 0 = write now)
+
+    Returns:
+        False if an immediate write (delay=0) failed, True otherwise
+    """
+    file_keys = {key: file_key for key, file_key, _default in SHOP_CONFIG_KEYS}
+    return get_config_file(config_file).update(
+        {file_keys.get(key, key): value for key, value in changes.items()}, delay
+    )
 
 
 def save_shop_config(shop_data, config_file="shop_config.json"):
     """
     Save shop configuration to JSON file
-    
+
+    Only keys present in shop_data are written; other settings (e.g. db_server_url /
+    db_server_token, which the settings dialog does not edit) keep their current values.
+    The file is written before returning (together with any write still pending).
+
     Args:
         shop_data: Dictionary containing shop information
         config_file: Path to the JSON configuration file
-        
+
     Returns:
-        True if successful, False otherwise
+        True if the file was written, False otherwise
     """
     try:
-        if not os.path.isabs(config_file):
-            config_path = os.path.join(os.path.dirname(__file__), config_file)
-        else:
-            config_path = config_file
-            
-        config = {
-            'shop_name': shop_data.get('name', 'ร้าน ไอโปรโมบาย'),
-            'shop_branch': shop_data.get('branch', 'สาขาหล่มสัก'),
-            'shop_address': shop_data.get('address', '14-15 ถ.พินิจ ต.หล่มสัก อ.หล่มสัก จ.เพชรบูรณ์ 67110'),
-            'tax_id': shop_data.get('tax_id', '0-1234-56789-01-2'),
-            'phone': shop_data.get('phone', '02-345-6789'),
-            'authorized_signer': shop_data.get('authorized_signer', 'นายประเสริฐ ใจดี'),
-            'buyer_signer_name': shop_data.get('buyer_signer_name', 'นายประเสริฐ ใจดี'),
-            'witness_name': shop_data.get('witness_name', 'นางสาวมั่นใจ ถูกต้อง'),
-            'interest_rate': shop_data.get('interest_rate', 10.0),
-            'auto_calculate_interest': shop_data.get('auto_calculate_interest', True)
-        }
-        
-        with open(config_path, 'w') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
-        return True
+        return update_shop_config(
+            {key: shop_data[key] for key, _file_key, _default in SHOP_CONFIG_KEYS if key in shop_data},
+            config_file, delay=0
+        )
     except Exception as e:
         print("Error saving shop config: {}".format(e))
         return False
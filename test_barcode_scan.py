@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify IMEI check digits, scan normalization and scan-vs-typing detection
+"""
+
+import sys
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from barcode_scan import (CODE_IMEI, CODE_INVALID_IMEI, CODE_SERIAL, ScanBurstDetector,
+                          classify_code, is_valid_imei, luhn_valid, normalize_scan)
+
+VALID_IMEI = '352099001761481'
+
+
+def test_luhn_check_digit():
+    """A known-valid IMEI passes; changing its last digit by one fails"""
+    assert luhn_valid(VALID_IMEI) and is_valid_imei(VALID_IMEI)
+    assert not luhn_valid('352099001761482')
+    assert not luhn_valid('352099001761480')
+    assert not luhn_valid('') and not luhn_valid('35209900176148X')
+    assert not is_valid_imei('79927398713')  # Luhn ถูกแต่ไม่ใช่ 15 หลัก
+
+    assert classify_code(VALID_IMEI) == CODE_IMEI
+    assert classify_code('352099001761482') == CODE_INVALID_IMEI
+    assert classify_code('F2LXK0ABHG7F') == CODE_SERIAL
+
+
+def test_normalize_strips_prefix_and_dashes():
+    """Label prefixes, spaces and dashes between digits are removed; serials keep their dashes"""
+    cases = {
+        'IMEI: 35-209900-176148-1': VALID_IMEI,
+        'IMEI1 352099 001761 481': VALID_IMEI,
+        '  imei#352099001761481\n': VALID_IMEI,
+        'S/N: F2LXK0ABHG7F': 'F2LXK0ABHG7F',
+        'Serial No. AB-12-CD': 'AB-12-CD',
+        '': '',
+    }
+    for text, expected in cases.items():
+        assert normalize_scan(text) == expected, (text, normalize_scan(text))
+
+
+def feed(detector, text, start, interval):
+    for i, _ in enumerate(text):
+        detector.key(start + i * interval)
+    return start + (len(text) - 1) * interval
+
+
+def test_burst_detection_vs_typing():
+    """Characters 10 ms apart are a scan; 120 ms apart is typing"""
+    detector = ScanBurstDetector()
+    last = feed(detector, VALID_IMEI, 100.0, 0.010)
+    assert detector.finish(VALID_IMEI, last + 0.010) == VALID_IMEI
+
+    last = feed(detector, VALID_IMEI, 200.0, 0.120)
+    assert detector.finish(VALID_IMEI, last + 0.120) is None
+
+    # พิมพ์ชื่อไว้ก่อน แล้วสแกนต่อท้าย: ใช้เฉพาะส่วนที่สแกน
+    typed = 'iphone '
+    last = feed(detector, typed, 300.0, 0.150)
+    last = feed(detector, VALID_IMEI, last + 1.0, 0.008)
+    assert detector.finish(typed + VALID_IMEI, last + 0.008) == VALID_IMEI
+
+    # สแกนสั้นกว่าความยาวขั้นต่ำ หรือกด Enter หลังสแกนนานเกินไป ไม่นับเป็นการสแกน
+    last = feed(detector, '123', 400.0, 0.005)
+    assert detector.finish('123', last) is None
+    last = feed(detector, VALID_IMEI, 500.0, 0.005)
+    assert detector.finish(VALID_IMEI, last + 2.0) is None
+
+
+if __name__ == "__main__":
+    for test in (test_luhn_check_digit, test_normalize_strips_prefix_and_dashes, test_burst_detection_vs_typing):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All barcode scan checks passed")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify branch -> HQ sync: get_changes_since() / apply_changes() and branch_sync.import_delta()
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import branch_sync
+from database import PawnShopDatabase
+
+SYNCED_TABLES = ('customers', 'products', 'contracts', 'redemptions')
+
+
+def make_branch(db):
+    """ลูกค้า 2 คน สัญญา 3 ฉบับ (ไถ่คืนแล้ว 1 ฉบับ)"""
+    customer_ids = [
+        db.add_customer({'customer_code': f'C{i:03d}', 'first_name': name, 'last_name': 'ใจดี',
+                         'id_card': f'110000000000{i}', 'phone': f'08100000{i:02d}'})
+        for i, name in enumerate(('สมชาย', 'สมหญิง'), start=1)
+    ]
+    contract_ids = []
+    for i, customer_id in enumerate((customer_ids[0], customer_ids[0], customer_ids[1]), start=1):
+        product_id = db.add_product({'name': f'iPhone {i}', 'brand': 'Apple', 'imei1': f'35209900176148{i}'})
+        contract_ids.append(db.create_contract({
+            'contract_number': f'PN{i:06d}', 'customer_id': customer_id, 'product_id': product_id,
+            'pawn_amount': 1000.0 * i, 'fee_amount': 100.0 * i, 'total_paid': 1000.0 * i,
+            'total_redemption': 1100.0 * i, 'start_date': '2026-01-0%d' % i,
+            'end_date': '2026-02-0%d' % i, 'days_count': 30,
+        }))
+    db.redeem_contract({'contract_id': contract_ids[0], 'redemption_date': '2026-01-20',
+                        'redemption_amount': 1100.0})
+    return customer_ids, contract_ids
+
+
+def table_rows(db, table):
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM {table} ORDER BY id')
+        return cursor.fetchall()
+
+
+def assert_same_data(source, replica):
+    for table in SYNCED_TABLES:
+        assert table_rows(source, table) == table_rows(replica, table), table
+
+
+def test_apply_twice_matches_source():
+    """Applying the same delta twice leaves the replica identical to the branch, aggregates included"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = PawnShopDatabase(os.path.join(tmp, 'branch.db'))
+        replica = PawnShopDatabase(os.path.join(tmp, 'hq.db'))
+        customer_ids, _ = make_branch(source)
+
+        delta = source.get_changes_since(0)
+        assert delta['from_seq'] == 0 and delta['to_seq'] == source.get_last_change_seq()
+        assert replica.apply_changes(delta['changes']) == len(delta['changes'])
+        replica.apply_changes(delta['changes'])
+        assert_same_data(source, replica)
+
+        first = replica.get_customer_by_id(customer_ids[0])
+        assert first['active_contract_count'] == 1
+        assert first['outstanding_principal'] == 2000.0
+        assert first['lifetime_redeemed'] == 1100.0
+
+
+def test_delete_propagates():
+    """A contract deleted at the branch is deleted at HQ and the customer's exposure drops"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = PawnShopDatabase(os.path.join(tmp, 'branch.db'))
+        replica = PawnShopDatabase(os.path.join(tmp, 'hq.db'))
+        customer_ids, contract_ids = make_branch(source)
+        replica.apply_changes(source.get_changes_since(0)['changes'])
+
+        since = source.get_last_change_seq()
+        assert source.delete_contract(contract_ids[2])
+        delta = source.get_changes_since(since)
+        assert ('contracts', 'D', contract_ids[2]) in [(c['table'], c['operation'], c['id']) for c in delta['changes']]
+
+        replica.apply_changes(delta['changes'])
+        assert_same_data(source, replica)
+        assert replica.get_customer_by_id(customer_ids[1])['active_contract_count'] == 0
+        assert replica.get_customer_by_id(customer_ids[1])['outstanding_principal'] == 0
+
+
+def test_import_delta_refuses_gap():
+    """HQ skips a file it already has and refuses one that starts after a missing file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox, hq_dir = os.path.join(tmp, 'outbox'), os.path.join(tmp, 'hq')
+        source = PawnShopDatabase(os.path.join(tmp, 'branch.db'))
+        customer_ids, _ = make_branch(source)
+
+        first = branch_sync.export_delta(source, outbox)
+        assert branch_sync.import_delta(first, hq_dir) > 0
+        assert branch_sync.import_delta(first, hq_dir) == 0
+
+        source.update_customer(customer_ids[0], dict(source.get_customer_by_id(customer_ids[0]), phone='0899999999'))
+        branch_sync.export_delta(source, outbox)
+        source.update_customer(customer_ids[1], dict(source.get_customer_by_id(customer_ids[1]), phone='0888888888'))
+        third = branch_sync.export_delta(source, outbox)
+
+        try:
+            branch_sync.import_delta(third, hq_dir)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("import_delta accepted a delta after a missing file")
+
+
+if __name__ == "__main__":
+    for test in (test_apply_twice_matches_source, test_delete_propagates, test_import_delta_refuses_gap):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All branch sync checks passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify the incremental refresh_contract_cube() matches a full recompute after edits
+"""
+
+import os
+import sys
+import tempfile
+from itertools import combinations
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import CUBE_DIMENSIONS, PawnShopDatabase
+
+PRODUCTS = [
+    {'name': 'iPhone 13', 'brand': 'Apple', 'imei1': '352099001761481'},
+    {'name': 'Galaxy S23', 'brand': 'Samsung', 'imei1': '352099001761499'},
+    {'name': 'สร้อยคอทอง', 'brand': '', 'weight': 15.2},
+    {'name': 'กล้อง', 'brand': 'Canon'},
+]
+
+
+def add_contract(db, customer_id, number, amount, start_date, end_date, product=0):
+    product_id = db.add_product(dict(PRODUCTS[product % len(PRODUCTS)]))
+    return db.create_contract({
+        'contract_number': f'PN{number:06d}', 'customer_id': customer_id, 'product_id': product_id,
+        'pawn_amount': amount, 'fee_amount': 0.0, 'total_paid': amount, 'total_redemption': amount,
+        'start_date': start_date, 'end_date': end_date, 'days_count': 30,
+    })
+
+
+def redeem(db, contract_id, date, amount):
+    db.redeem_contract({'contract_id': contract_id, 'redemption_date': date, 'redemption_amount': amount})
+
+
+def cube_slices(db):
+    """ทุกมุมมองของ cube (ทุกชุดมิติ) ปัดทศนิยมเพื่อเทียบผลที่บวกลบคนละลำดับ"""
+    slices = {}
+    for size in range(len(CUBE_DIMENSIONS) + 1):
+        for group_by in combinations(CUBE_DIMENSIONS, size):
+            slices[group_by] = [
+                {key: round(value, 6) if isinstance(value, float) else value for key, value in row.items()}
+                for row in db.get_contract_cube(list(group_by))
+            ]
+    return slices
+
+
+def cube_cells(db):
+    with db.get_connection() as conn:
+        rows = conn.execute('SELECT * FROM contract_cube ORDER BY month, status, brand, product_type').fetchall()
+    return [tuple(round(value, 6) if isinstance(value, float) else value for value in row) for row in rows]
+
+
+def assert_incremental_matches_full(db):
+    report = db.refresh_contract_cube()
+    assert report['mode'] == 'incremental', report
+    incremental = cube_slices(db), cube_cells(db)
+    assert db.refresh_contract_cube(full=True)['mode'] == 'full'
+    full = cube_slices(db), cube_cells(db)
+    assert incremental == full
+
+
+def test_incremental_matches_full_recompute():
+    """Inserts, edits, status changes, redemptions and deletes give the same cube either way"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        customer_id = db.add_customer({'customer_code': 'C001', 'first_name': 'สมชาย', 'last_name': 'ใจดี'})
+        contract_ids = [
+            add_contract(db, customer_id, i, 1000.0 + 300 * i, f'2026-0{1 + i % 4}-05', f'2026-0{2 + i % 4}-04', i)
+            for i in range(12)
+        ]
+        assert db.refresh_contract_cube()['mode'] == 'full'
+
+        # สัญญาใหม่ (เดือนที่ยังไม่มีใน cube ด้วย)
+        contract_ids.append(add_contract(db, customer_id, 100, 4200.0, '2026-07-01', '2026-07-31', 1))
+        contract_ids.append(add_contract(db, customer_id, 101, 800.0, '2026-01-20', '2026-02-19', 2))
+        assert_incremental_matches_full(db)
+
+        # สถานะเปลี่ยน: หลุด / ไถ่คืน (มียอดไถ่และระยะเวลาถือครอง)
+        db.update_contract_status(contract_ids[0], 'forfeited')
+        db.update_contract_status(contract_ids[5], 'forfeited')
+        redeem(db, contract_ids[1], '2026-02-01', 1500.0)
+        redeem(db, contract_ids[2], '2026-03-10', 1800.0)
+        assert_incremental_matches_full(db)
+
+        # แก้สัญญา: เงินต้นและเดือนที่เริ่ม (ย้ายเซลล์) และแก้สินค้า (ยี่ห้อ/ประเภทเปลี่ยน)
+        contract = db.get_contract_by_id(contract_ids[3])
+        db.update_contract(dict(contract, pawn_amount=9999.0, start_date='2026-06-15', end_date='2026-07-15'))
+        product = db.get_product_by_id(db.get_contract_by_id(contract_ids[4])['product_id'])
+        db.update_product(product['id'], dict(product, brand='Huawei', imei1='', weight=3.5))
+        # ไถ่คืนแล้วกลับเป็น active (เซลล์ redeemed ของเดือนนั้นต้องหายไป)
+        db.update_contract_status(contract_ids[1], 'active')
+        assert_incremental_matches_full(db)
+
+        # ลบสัญญา
+        db.delete_contract(contract_ids[6])
+        db.delete_contract(contract_ids[12])
+        assert_incremental_matches_full(db)
+
+        # ไม่มีอะไรเปลี่ยน: อัปเดตแบบเพิ่มทีละส่วนไม่คำนวณสัญญาใดเลย
+        report = db.refresh_contract_cube()
+        assert report['mode'] == 'incremental' and report['refreshed'] == 0
+
+
+if __name__ == "__main__":
+    test_incremental_matches_full_recompute()
+    print("✅ test_incremental_matches_full_recompute")
+    print("All contract cube checks passed")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify filter_contracts() for each criteria shape and that the cached SQL is reused across values
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import OPEN_STATUSES, PawnShopDatabase
+
+TEXT_FIELDS = ('contract_number', 'first_name', 'last_name', 'id_card', 'phone', 'product_name', 'brand',
+               'imei1', 'imei2')
+
+
+def has_text(word):
+    return lambda row: any(word.lower() in (row[field] or '').lower() for field in TEXT_FIELDS)
+
+
+# (ชื่อ, criteria, order, limit, offset, เงื่อนไขที่ผลลัพธ์ต้องตรง)
+# แต่ละคู่ที่อยู่ติดกันมีรูปแบบเดียวกันแต่ค่าต่างกัน จึงต้องใช้ SQL ชุดเดียวกัน
+CASES = [
+    ('text', {'text': 'samsung'}, 'created', None, 0, has_text('samsung')),
+    ('text', {'text': 'สมหญิง'}, 'created', None, 0, has_text('สมหญิง')),
+    ('short text', {'text': '08'}, 'created', None, 0, has_text('08')),
+    ('short text', {'text': 'PN'}, 'created', None, 0, has_text('PN')),
+    ('two words', {'text': 'สมหญิง ใจงาม'}, 'created', None, 0,
+     lambda r: has_text('สมหญิง')(r) and has_text('ใจงาม')(r)),
+    ('two words', {'text': 'apple iphone'}, 'created', None, 0,
+     lambda r: has_text('apple')(r) and has_text('iphone')(r)),
+    ('status', {'status': 'active'}, 'created', None, 0, lambda r: r['status'] == 'active'),
+    ('status', {'status': 'redeemed'}, 'created', None, 0, lambda r: r['status'] == 'redeemed'),
+    ('open statuses', {'status': OPEN_STATUSES}, 'created', None, 0, lambda r: r['status'] in OPEN_STATUSES),
+    ('open statuses', {'status': ['redeemed', 'forfeited']}, 'created', None, 0,
+     lambda r: r['status'] in ('redeemed', 'forfeited')),
+    ('start range', {'start_date_from': '2026-01-05', 'start_date_to': '2026-01-20'}, 'created', None, 0,
+     lambda r: '2026-01-05' <= r['start_date'] <= '2026-01-20'),
+    ('start range', {'start_date_from': '2026-02-01', 'start_date_to': '2026-03-01'}, 'created', None, 0,
+     lambda r: '2026-02-01' <= r['start_date'] <= '2026-03-01'),
+    ('end range by due', {'status': 'forfeited', 'end_date_from': '2026-02-01'}, 'end_date', None, 0,
+     lambda r: r['status'] == 'forfeited' and r['end_date'] >= '2026-02-01'),
+    ('end range by due', {'status': 'active', 'end_date_from': '2026-03-01'}, 'end_date', None, 0,
+     lambda r: r['status'] == 'active' and r['end_date'] >= '2026-03-01'),
+    ('page', {'min_amount': 2000}, 'created', 5, 0, lambda r: r['pawn_amount'] >= 2000),
+    ('page', {'min_amount': 1500}, 'created', 5, 5, lambda r: r['pawn_amount'] >= 1500),
+    ('page by due', {}, 'end_date', 4, 8, lambda r: True),
+    ('page by due', {'status': 'all', 'text': ''}, 'end_date', 4, 0, lambda r: True),
+]
+
+
+def make_contracts(db, count=30):
+    names = [('สมชาย', 'ใจดี'), ('สมหญิง', 'ใจงาม'), ('Anan', 'Smith')]
+    products = [('iPhone 13', 'Apple'), ('Galaxy S23', 'Samsung'), ('Reno 8', 'Oppo')]
+    customer_ids = [
+        db.add_customer({'customer_code': f'C{i:03d}', 'first_name': first, 'last_name': last,
+                         'id_card': f'110000000000{i}', 'phone': f'08{i}-234-5678'})
+        for i, (first, last) in enumerate(names, start=1)
+    ]
+    for i in range(count):
+        name, brand = products[i % len(products)]
+        product_id = db.add_product({'name': name, 'brand': brand, 'imei1': f'35209900176{i:04d}'})
+        contract_id = db.create_contract({
+            'contract_number': f'PN{i:06d}', 'customer_id': customer_ids[i % len(customer_ids)],
+            'product_id': product_id, 'pawn_amount': 1000.0 + 250 * (i % 7), 'fee_amount': 0.0,
+            'total_paid': 1000.0, 'total_redemption': 1000.0,
+            'start_date': f'2026-{1 + i // 12:02d}-{1 + (i * 2) % 28:02d}',
+            'end_date': f'2026-{2 + i // 12:02d}-{1 + (i * 5) % 28:02d}', 'days_count': 30,
+        })
+        if i % 4 == 1:
+            db.update_contract_status(contract_id, 'forfeited')
+        elif i % 4 == 2:
+            db.update_contract_status(contract_id, 'redeemed')
+
+
+def all_contracts(db):
+    """ทุกสัญญาพร้อมคอลัมน์ที่ตัวกรองใช้ (อ่านตรงจากตาราง ไม่ผ่าน filter_contracts)"""
+    with db.get_connection() as conn:
+        cursor = conn.execute('''
+            SELECT c.id, c.contract_number, c.status, c.start_date, c.end_date, c.pawn_amount, c.created_at,
+                   cu.first_name, cu.last_name, cu.id_card, cu.phone,
+                   p.name AS product_name, p.brand, p.imei1, p.imei2
+            FROM contracts c
+            JOIN customers cu ON c.customer_id = cu.id
+            JOIN products p ON c.product_id = p.id
+        ''')
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def expected_ids(rows, order, limit, offset, matches):
+    key = (lambda r: (r['created_at'], r['id'])) if order == 'created' else (lambda r: (r['end_date'], r['id']))
+    ids = [row['id'] for row in sorted(filter(matches, rows), key=key, reverse=True)]
+    return ids[offset:offset + limit] if limit is not None else ids
+
+
+def test_criteria_shapes():
+    """Every criteria shape returns exactly the matching contracts in order, paged by limit/offset"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        make_contracts(db)
+        rows = all_contracts(db)
+        for name, criteria, order, limit, offset, matches in CASES:
+            result = [row['id'] for row in db.filter_contracts(criteria, limit, offset, order)]
+            expected = expected_ids(rows, order, limit, offset, matches)
+            assert result == expected, (name, criteria, result, expected)
+            # ข้อมูลทดสอบต้องมีสัญญาที่ตรงทุกกรณี (ไม่อย่างนั้นการเทียบไม่มีความหมาย)
+            assert result, (name, criteria)
+
+
+def test_sql_reused_across_values():
+    """The SQL is built once per shape; the second case of each pair only fills in new parameters"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        make_contracts(db)
+        PawnShopDatabase._contract_filter_sql_cache.clear()
+
+        build = db._build_contract_filter_sql
+        built = []
+
+        def counting_build(shape):
+            built.append(shape)
+            return build(shape)
+
+        db._build_contract_filter_sql = counting_build
+        for index in range(0, len(CASES), 2):
+            for name, criteria, order, limit, offset, _ in CASES[index:index + 2]:
+                db.filter_contracts(criteria, limit, offset, order)
+            assert len(built) == index // 2 + 1, (name, built[-2:])
+        assert len(PawnShopDatabase._contract_filter_sql_cache) == len(CASES) // 2
+
+        # รูปแบบที่แคชไว้แล้วไม่สร้างใหม่ แม้จะเป็น object ฐานข้อมูลคนละตัว
+        other = PawnShopDatabase(db.db_path)
+        other.filter_contracts({'text': 'oppo'})
+        assert len(PawnShopDatabase._contract_filter_sql_cache) == len(CASES) // 2
+
+
+if __name__ == "__main__":
+    for test in (test_criteria_shapes, test_sql_reused_across_values):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All contract filter checks passed")
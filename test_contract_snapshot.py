@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify ContractSnapshot filters/sorts like filter_contracts() and refreshes only what changed
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from contract_snapshot import ContractSnapshot
+from database import PawnShopDatabase
+
+# ตัวกรองที่หน้า Data Viewer ส่งให้ (แท็บสัญญาและแท็บรายการหลุด)
+CRITERIA = [
+    {},
+    {'status': 'all', 'text': ''},
+    {'status': 'active'},
+    {'status': 'forfeited', 'end_date_from': '2026-02-01', 'end_date_to': '2026-03-31'},
+    {'status': ['active', 'forfeited']},
+    {'text': 'samsung'},
+    {'text': 'สม ใจ'},
+    {'text': '0812'},
+    {'text': 'PN00001'},
+    {'start_date_from': '2026-01-10', 'start_date_to': '2026-02-15', 'min_amount': 3000},
+    {'max_amount': 4000, 'text': 'iphone'},
+]
+
+
+def make_contracts(db, count=24):
+    names = [('สมชาย', 'ใจดี'), ('สมหญิง', 'ใจงาม'), ('Anan', 'Smith'), ('วิชัย', 'ทองมา')]
+    brands = [('iPhone 13', 'Apple'), ('Galaxy S23', 'Samsung'), ('Reno 8', 'Oppo')]
+    customer_ids = [
+        db.add_customer({'customer_code': f'C{i:03d}', 'first_name': first, 'last_name': last,
+                         'id_card': f'110000000000{i}', 'phone': f'08{i}2345678'})
+        for i, (first, last) in enumerate(names, start=1)
+    ]
+    contract_ids = []
+    for i in range(count):
+        name, brand = brands[i % len(brands)]
+        product_id = db.add_product({'name': name, 'brand': brand, 'imei1': f'3520990017614{i:02d}'})
+        day = 1 + (i * 3) % 80
+        start = f'2026-{1 + day // 28:02d}-{1 + day % 28:02d}'
+        contract_ids.append(db.create_contract({
+            'contract_number': f'PN{i:06d}', 'customer_id': customer_ids[i % len(customer_ids)],
+            'product_id': product_id, 'pawn_amount': 1000.0 + 500 * (i % 9), 'fee_amount': 100.0,
+            'total_paid': 1000.0, 'total_redemption': 1100.0, 'start_date': start,
+            'end_date': f'2026-{2 + day // 28:02d}-{1 + day % 28:02d}', 'days_count': 30,
+        }))
+    for contract_id in contract_ids[::5]:
+        db.update_contract_status(contract_id, 'forfeited')
+    for contract_id in contract_ids[1::7]:
+        db.update_contract_status(contract_id, 'redeemed')
+    return customer_ids, contract_ids
+
+
+def snapshot_ids(snapshot, criteria, order='created_at', descending=True):
+    count, fetch_page = snapshot.select(criteria, order, descending)
+    rows = fetch_page(0, 1000)
+    assert len(rows) == count
+    return [row['id'] for row in rows]
+
+
+def sql_ids(db, criteria, order='created'):
+    return [row['id'] for row in db.filter_contracts(criteria, order=order)]
+
+
+def test_filters_match_sql_engine():
+    """Every Data Viewer criteria shape returns the same contracts, in the same default order, as SQL"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        make_contracts(db)
+        snapshot = ContractSnapshot(db)
+        for criteria in CRITERIA:
+            assert snapshot_ids(snapshot, criteria) == sql_ids(db, criteria), criteria
+            assert snapshot_ids(snapshot, criteria, 'end_date') == sql_ids(db, criteria, 'end_date'), criteria
+        assert snapshot_ids(snapshot, {'status': 'sold'}) == []
+        snapshot.close()
+
+
+def test_sort_and_rows():
+    """Sorting is stable in both directions; rows carry the keys the Data Viewer columns read"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        make_contracts(db)
+        snapshot = ContractSnapshot(db)
+
+        count, fetch_page = snapshot.select({}, 'pawn_amount', False)
+        rows = fetch_page(0, count)
+        assert [(r['pawn_amount'], r['id']) for r in rows] == sorted((r['pawn_amount'], r['id']) for r in rows)
+        _, fetch_page = snapshot.select({}, 'pawn_amount', True)
+        assert [(r['pawn_amount'], r['id']) for r in fetch_page(0, count)] == \
+            sorted(((r['pawn_amount'], r['id']) for r in rows), reverse=True)
+
+        _, fetch_page = snapshot.select({}, 'status', False)
+        statuses = [row['status'] for row in fetch_page(0, count)]
+        assert statuses == sorted(statuses)
+
+        _, fetch_page = snapshot.select({'status': 'forfeited'}, 'end_date', True)
+        first, second = fetch_page(0, 1)[0], fetch_page(1, 1)[0]
+        assert first['end_date'] >= second['end_date']
+        for key in ('contract_number', 'first_name', 'last_name', 'phone', 'product_name', 'brand',
+                    'pawn_amount', 'total_redemption', 'start_date', 'end_date', 'forfeited_at', 'created_at'):
+            assert key in first, key
+        snapshot.close()
+
+
+def test_refresh_reloads_only_changed_rows():
+    """No-op refresh when the file is unchanged; edits to contracts, customers and deletes are picked up"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        customer_ids, contract_ids = make_contracts(db)
+        snapshot = ContractSnapshot(db)
+        assert snapshot.refresh() == len(contract_ids)
+        assert snapshot.refresh() == 0
+
+        # trigger ยอดสะสมแก้แถวลูกค้าด้วย สัญญาทุกฉบับของลูกค้าคนนั้นจึงโหลดใหม่ (ไม่ใช่ทั้งตาราง)
+        db.update_contract_status(contract_ids[3], 'forfeited')
+        assert snapshot.refresh() == sum(1 for i in range(len(contract_ids)) if i % 4 == 3)
+        assert contract_ids[3] in snapshot_ids(snapshot, {'status': 'forfeited'})
+
+        # แก้ชื่อลูกค้า: สัญญาทุกฉบับของลูกค้าคนนั้นโหลดใหม่
+        customer = db.get_customer_by_id(customer_ids[2])
+        db.update_customer(customer_ids[2], dict(customer, first_name='Somchai'))
+        assert snapshot.refresh() == sum(1 for i in range(len(contract_ids)) if i % 4 == 2)
+        assert snapshot_ids(snapshot, {'text': 'somchai'}) == sql_ids(db, {'text': 'somchai'})
+
+        db.delete_contract(contract_ids[0])
+        snapshot.refresh()
+        assert len(snapshot) == len(contract_ids) - 1
+        for criteria in CRITERIA:
+            assert snapshot_ids(snapshot, criteria) == sql_ids(db, criteria), criteria
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    for test in (test_filters_match_sql_engine, test_sort_and_rows, test_refresh_reloads_only_changed_rows):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All contract snapshot checks passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify the trigger-maintained customer exposure (open contracts, outstanding principal,
+lifetime redeemed) stays equal to direct SUMs through create, renew, redeem, forfeit, edit, reassign and delete
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import PawnShopDatabase
+
+# ยอดที่ควรเป็น คำนวณตรงจากตาราง (เขียนแยกจาก _rebuild_customer_aggregates)
+# last_visit ไม่อยู่ในนี้: trigger เลื่อนไปข้างหน้าเท่านั้น (ย้าย/ลบสัญญาไม่ลดวันที่มาล่าสุด)
+DIRECT_EXPOSURE_SQL = '''
+    SELECT cu.id,
+           (SELECT COUNT(*) FROM contracts c
+            WHERE c.customer_id = cu.id AND c.status IN ('active', 'forfeited')),
+           (SELECT COALESCE(SUM(c.pawn_amount), 0) FROM contracts c
+            WHERE c.customer_id = cu.id AND c.status IN ('active', 'forfeited')),
+           (SELECT COALESCE(SUM(r.redemption_amount), 0) FROM redemptions r
+            JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = cu.id)
+    FROM customers cu ORDER BY cu.id
+'''
+
+
+def add_contract(db, customer_id, number, amount, start_date):
+    product_id = db.add_product({'name': 'Galaxy S23', 'brand': 'Samsung'})
+    return db.create_contract({
+        'contract_number': f'PN{number:06d}', 'customer_id': customer_id, 'product_id': product_id,
+        'pawn_amount': amount, 'fee_amount': 0.0, 'total_paid': amount, 'total_redemption': amount,
+        'start_date': start_date, 'end_date': '2026-12-31', 'days_count': 30,
+    })
+
+
+def assert_exposure_matches(db, step):
+    with db.get_connection() as conn:
+        stored = conn.execute('''
+            SELECT id, active_contract_count, outstanding_principal, lifetime_redeemed
+            FROM customers ORDER BY id
+        ''').fetchall()
+        expected = conn.execute(DIRECT_EXPOSURE_SQL).fetchall()
+    stored = [(cid, count or 0, principal or 0, redeemed or 0) for cid, count, principal, redeemed in stored]
+    assert stored == expected, (step, stored, expected)
+
+
+def test_exposure_follows_every_write():
+    """Open count, outstanding principal and lifetime redeemed match SQL after each change"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        first = db.add_customer({'customer_code': 'C001', 'first_name': 'สมชาย', 'last_name': 'ใจดี',
+                               'id_card': '1100000000001'})
+        second = db.add_customer({'customer_code': 'C002', 'first_name': 'สมหญิง', 'last_name': 'ใจงาม',
+                                'id_card': '1100000000002'})
+        assert_exposure_matches(db, 'no contracts')
+
+        a = add_contract(db, first, 1, 5000.0, '2026-01-05')
+        b = add_contract(db, first, 2, 3000.0, '2026-01-20')
+        c = add_contract(db, first, 3, 2000.0, '2026-02-01')
+        d = add_contract(db, second, 4, 7000.0, '2026-01-15')
+        assert_exposure_matches(db, 'create')
+        assert db.get_customer_by_id(first)['last_visit'] == '2026-02-01'
+        customer = db.get_customer_by_id(first)
+        assert customer['active_contract_count'] == 3 and customer['outstanding_principal'] == 10000.0
+
+        db.add_renewal({'contract_id': a, 'renewal_date': '2026-02-10', 'new_due_date': '2026-03-12',
+                        'total_amount': 500.0})
+        assert_exposure_matches(db, 'renew')
+        assert db.get_customer_by_id(first)['last_visit'] == '2026-02-10'
+
+        db.redeem_contract({'contract_id': b, 'redemption_date': '2026-02-20', 'redemption_amount': 3300.0})
+        assert_exposure_matches(db, 'redeem')
+        assert db.get_customer_by_id(first)['last_visit'] == '2026-02-20'
+
+        db.update_contract_status(c, 'forfeited')
+        assert_exposure_matches(db, 'forfeit (still open)')
+        db.update_contract_status(c, 'sold')
+        assert_exposure_matches(db, 'sold')
+
+        contract = db.get_contract_by_id(a)
+        db.update_contract(dict(contract, pawn_amount=6500.0))
+        assert_exposure_matches(db, 'edit principal')
+        contract = db.get_contract_by_id(d)
+        db.update_contract(dict(contract, customer_id=first))
+        assert_exposure_matches(db, 'reassign to another customer')
+
+        db.delete_contract(a)
+        assert_exposure_matches(db, 'delete')
+        customer = db.get_customer_by_id(first)
+        assert customer['active_contract_count'] == 1 and customer['outstanding_principal'] == 7000.0
+        assert customer['lifetime_redeemed'] == 3300.0
+
+        # คำนวณใหม่ทั้งหมดต้องได้ค่าเดิม (trigger ไม่คลาดเคลื่อน)
+        db.rebuild_customer_aggregates()
+        assert_exposure_matches(db, 'rebuild')
+
+
+if __name__ == "__main__":
+    test_exposure_follows_every_write()
+    print("✅ test_exposure_follows_every_write")
+    print("All customer aggregate checks passed")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify get_customer_history() returns each contract with its renewals and redemptions
+and totals that match direct SUMs over the tables
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import PawnShopDatabase
+
+
+def add_customer(db, code, first_name):
+    return db.add_customer({'customer_code': code, 'first_name': first_name, 'last_name': 'ใจดี',
+                            'id_card': f'1100000000{code[-3:]}', 'phone': '0812345678'})
+
+
+def add_contract(db, customer_id, number, amount, start_date='2026-01-10', end_date='2026-02-09'):
+    product_id = db.add_product({'name': 'iPhone 13', 'brand': 'Apple'})
+    return db.create_contract({
+        'contract_number': f'PN{number:06d}', 'customer_id': customer_id, 'product_id': product_id,
+        'pawn_amount': amount, 'fee_amount': 0.0, 'total_paid': amount, 'total_redemption': amount + 500,
+        'start_date': start_date, 'end_date': end_date, 'days_count': 30,
+    })
+
+
+def renew(db, contract_id, date, new_due_date, amount):
+    db.add_renewal({'contract_id': contract_id, 'renewal_date': date, 'new_due_date': new_due_date,
+                    'fee_amount': amount, 'total_amount': amount, 'extension_days': 30})
+    db.update_contract_due_date(contract_id, new_due_date)
+
+
+def direct_totals(db, customer_id):
+    """ยอดรวมของลูกค้าคำนวณตรงจากตาราง (ไม่ผ่าน get_customer_history)"""
+    with db.get_connection() as conn:
+        def scalar(sql):
+            return conn.execute(sql, (customer_id,)).fetchone()[0]
+        return {
+            'contract_count': scalar('SELECT COUNT(*) FROM contracts WHERE customer_id = ?'),
+            'open_contract_count': scalar(
+                "SELECT COUNT(*) FROM contracts WHERE customer_id = ? AND status IN ('active', 'forfeited')"),
+            'outstanding_principal': scalar(
+                "SELECT COALESCE(SUM(pawn_amount), 0) FROM contracts"
+                " WHERE customer_id = ? AND status IN ('active', 'forfeited')"),
+            'outstanding_redemption': scalar(
+                "SELECT COALESCE(SUM(total_redemption), 0) FROM contracts"
+                " WHERE customer_id = ? AND status IN ('active', 'forfeited')"),
+            'renewal_count': scalar(
+                'SELECT COUNT(*) FROM renewals r JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = ?'),
+            'renewal_amount': scalar(
+                'SELECT COALESCE(SUM(r.total_amount), 0) FROM renewals r'
+                ' JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = ?'),
+            'redeemed_amount': scalar(
+                'SELECT COALESCE(SUM(r.redemption_amount), 0) FROM redemptions r'
+                ' JOIN contracts c ON r.contract_id = c.id WHERE c.customer_id = ?'),
+        }
+
+
+def test_history_lifecycle():
+    """Create, renew, redeem and forfeit: each contract carries its own rows and the totals match SQL"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        customer_id = add_customer(db, 'C001', 'สมชาย')
+        other_id = add_customer(db, 'C002', 'สมหญิง')
+
+        renewed = add_contract(db, customer_id, 1, 5000.0)
+        redeemed = add_contract(db, customer_id, 2, 3000.0)
+        forfeited = add_contract(db, customer_id, 3, 2000.0)
+        active = add_contract(db, customer_id, 4, 1500.0, '2026-03-01', '2026-03-31')
+        other = add_contract(db, other_id, 5, 9000.0)
+        renew(db, other, '2026-02-01', '2026-03-03', 900.0)
+
+        history = db.get_customer_history(customer_id)
+        assert history['totals'] == direct_totals(db, customer_id)
+        assert history['totals']['open_contract_count'] == 4
+
+        renew(db, renewed, '2026-02-05', '2026-03-07', 500.0)
+        renew(db, renewed, '2026-03-06', '2026-04-05', 450.0)
+        db.redeem_contract({'contract_id': redeemed, 'redemption_date': '2026-02-01',
+                            'redemption_amount': 3300.0, 'principal_amount': 3000.0, 'fee_amount': 300.0})
+        db.update_contract_status(forfeited, 'forfeited')
+
+        history = db.get_customer_history(customer_id)
+        assert history['id'] == customer_id and history['first_name'] == 'สมชาย'
+        contracts = {contract['id']: contract for contract in history['contracts']}
+        assert set(contracts) == {renewed, redeemed, forfeited, active}
+        assert [r['renewal_count'] for r in contracts[renewed]['renewals']] == [1, 2]
+        assert [r['total_amount'] for r in contracts[renewed]['renewals']] == [500.0, 450.0]
+        assert contracts[renewed]['end_date'] == '2026-04-05'
+        assert [r['redemption_amount'] for r in contracts[redeemed]['redemptions']] == [3300.0]
+        assert contracts[redeemed]['status'] == 'redeemed'
+        assert contracts[forfeited]['status'] == 'forfeited'
+        assert all(not c['renewals'] and not c['redemptions'] for c in (contracts[forfeited], contracts[active]))
+        assert contracts[active]['product_name'] == 'iPhone 13'
+
+        totals = history['totals']
+        assert totals == direct_totals(db, customer_id)
+        assert totals['contract_count'] == 4 and totals['open_contract_count'] == 3
+        assert totals['outstanding_principal'] == 5000.0 + 2000.0 + 1500.0
+        assert totals['renewal_count'] == 2 and totals['renewal_amount'] == 950.0
+        assert totals['redeemed_amount'] == 3300.0
+
+        # ลูกค้าอีกคนไม่ปนกัน
+        other_history = db.get_customer_history(other_id)
+        assert [c['id'] for c in other_history['contracts']] == [other]
+        assert other_history['totals'] == direct_totals(db, other_id)
+        assert db.get_customer_history(999999) is None
+
+
+if __name__ == "__main__":
+    test_history_lifecycle()
+    print("✅ test_history_lifecycle")
+    print("All customer history checks passed")
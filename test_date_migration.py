@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify stored dates are rewritten to ISO-8601 and non-ISO dates are rejected on write
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import PawnShopDatabase
+
+
+def make_contract(db, number='PN000001', start_date='2026-01-05', end_date='2026-02-04'):
+    customer_id = db.add_customer({'customer_code': f'C{number}', 'first_name': 'สมชาย', 'last_name': 'ใจดี'})
+    product_id = db.add_product({'name': 'iPhone 13', 'brand': 'Apple'})
+    contract = {
+        'contract_number': number, 'customer_id': customer_id, 'product_id': product_id,
+        'pawn_amount': 5000.0, 'fee_amount': 500.0, 'total_paid': 5000.0, 'total_redemption': 5500.0,
+        'start_date': start_date, 'end_date': end_date, 'days_count': 30,
+    }
+    contract['id'] = db.create_contract(contract)
+    return contract
+
+
+def test_migration_normalizes_legacy_dates():
+    """dd/mm/YYYY (ค.ศ. and พ.ศ.), dd-mm-YYYY and ISO datetimes become YYYY-MM-DD; junk is left alone"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        contract_id = make_contract(PawnShopDatabase(path))['id']
+
+        # จำลองฐานข้อมูลเดิมก่อนการแปลง: วันที่หลายรูปแบบและยังไม่มี iso_dates_migrated
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE contracts SET start_date = '05/01/2026', end_date = '2026-02-04 13:45:00' WHERE id = ?",
+                     (contract_id,))
+        conn.executemany('''
+            INSERT INTO redemptions (contract_id, redemption_date, redemption_amount, deposit_date, due_date)
+            VALUES (?, ?, 5500, ?, ?)
+        ''', [
+            (contract_id, '20/01/2569', '05-01-2026', '2026-02-04T00:00:00'),
+            (contract_id, 'not a date', None, ''),
+        ])
+        conn.execute("DELETE FROM settings WHERE key = 'iso_dates_migrated'")
+        conn.commit()
+        conn.close()
+
+        db = PawnShopDatabase(path)
+        contract = db.get_contract_by_id(contract_id)
+        assert (contract['start_date'], contract['end_date']) == ('2026-01-05', '2026-02-04')
+
+        conn = sqlite3.connect(path)
+        rows = conn.execute('SELECT redemption_date, deposit_date, due_date FROM redemptions ORDER BY id').fetchall()
+        conn.close()
+        assert rows == [('2026-01-20', '2026-01-05', '2026-02-04'), ('not a date', None, '')]
+        assert db.get_setting('iso_dates_migrated') == '1'
+
+
+def expect_value_error(func, *args):
+    try:
+        func(*args)
+    except ValueError:
+        return
+    raise AssertionError(f"{func.__name__} accepted a non-ISO date")
+
+
+def test_writes_reject_non_iso_dates():
+    """create_contract / update_contract refuse dates that are not YYYY-MM-DD"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        contract = make_contract(db)
+
+        for bad in ('05/01/2026', '2026-01-05 00:00:00', '2026-02-30', ''):
+            new_contract = dict(contract, contract_number='PN000002', start_date=bad)
+            new_contract.pop('id')
+            expect_value_error(db.create_contract, new_contract)
+            expect_value_error(db.update_contract, dict(contract, end_date=bad))
+
+        assert db.get_contract_by_id(contract['id'])['end_date'] == '2026-02-04'
+        assert db.update_contract(dict(contract, end_date='2026-03-06')) == contract['id']
+        assert db.get_contract_by_id(contract['id'])['end_date'] == '2026-03-06'
+
+
+if __name__ == "__main__":
+    for test in (test_migration_normalizes_legacy_dates, test_writes_reject_non_iso_dates):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All date migration checks passed")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify replace_fee_rates() saves the fee table and penalty atomically with one version bump
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import PawnShopDatabase
+
+ROWS = {0: (3.0, 'ต่ำกว่า 30 วัน'), 30: (2.5, ''), 90: (2.0, 'ระยะยาว')}
+
+
+def table(db):
+    return {row['days_count']: (row['fee_rate'], row['description'] or '') for row in db.get_fee_rates()}
+
+
+def version(db):
+    return int(db.get_setting('fee_rates_version') or 0)
+
+
+def test_replace_applies_diff_with_one_version_bump():
+    """Inserts, updates and deletes land together; the version moves by exactly one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        assert db.replace_fee_rates(ROWS, 15)
+        assert table(db) == ROWS
+        assert float(db.get_setting('penalty_per_day')) == 15
+
+        before = version(db)
+        rows = {0: (3.0, 'ต่ำกว่า 30 วัน'), 30: (2.25, 'แก้แล้ว'), 60: (2.1, '')}
+        assert db.replace_fee_rates(rows, 15)
+        assert table(db) == rows
+        assert version(db) == before + 1
+
+        # ไม่มีอะไรเปลี่ยน: ไม่เขียนและเวอร์ชันคงเดิม
+        assert not db.replace_fee_rates(rows, 15)
+        assert version(db) == before + 1
+
+        # เปลี่ยนเฉพาะค่าปรับ: เวอร์ชันตารางคงเดิม แต่เวอร์ชันของ FeeSchedule เปลี่ยน
+        schedule_version = db.get_fee_schedule_version()
+        assert db.replace_fee_rates(rows, 20)
+        assert version(db) == before + 1
+        assert db.get_fee_schedule_version() != schedule_version
+
+        # คีย์เป็นสตริงและค่าเป็น list (แบบที่มาทาง RPC)
+        assert db.replace_fee_rates({'45': [1.5, None]}, 20)
+        assert table(db) == {45: (1.5, '')}
+
+
+def test_invalid_rows_change_nothing():
+    """A negative day count, rate or penalty is rejected before anything is written"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        db.replace_fee_rates(ROWS, 15)
+        before = version(db)
+        for rows, penalty in (({0: (3.0, ''), -1: (2.0, '')}, 15),
+                              ({0: (3.0, ''), 30: (-2.0, '')}, 15),
+                              ({0: (1.0, '')}, -5)):
+            try:
+                db.replace_fee_rates(rows, penalty)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"ควรปฏิเสธ {rows} / {penalty}")
+            assert table(db) == ROWS
+            assert float(db.get_setting('penalty_per_day')) == 15
+            assert version(db) == before
+
+
+if __name__ == "__main__":
+    for test in (test_replace_applies_diff_with_one_version_bump, test_invalid_rows_change_nothing):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All fee rate checks passed")
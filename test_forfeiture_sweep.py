@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify sweep_forfeited_contracts() marks overdue contracts once, renewals reopen them,
+and get_forfeited_contracts() only reads
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import PawnShopDatabase
+
+
+def day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def make_contract(db, number, end_offset):
+    customer_id = db.add_customer({'customer_code': f'C{number}', 'first_name': 'สมชาย', 'last_name': 'ใจดี',
+                                   'id_card': f'11000000000{number:02d}', 'phone': '0812345678'})
+    product_id = db.add_product({'name': 'iPhone 13', 'brand': 'Apple'})
+    return db.create_contract({
+        'contract_number': f'PN{number:06d}', 'customer_id': customer_id, 'product_id': product_id,
+        'pawn_amount': 5000.0, 'fee_amount': 0.0, 'total_paid': 5000.0, 'total_redemption': 5000.0,
+        'start_date': day(end_offset - 30), 'end_date': day(end_offset), 'days_count': 30,
+    })
+
+
+def data_version(conn):
+    return conn.execute('PRAGMA data_version').fetchone()[0]
+
+
+def test_sweep_marks_overdue_once():
+    """Only active contracts past their due date are swept, with forfeited_at set; a second run finds nothing"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        overdue = make_contract(db, 1, -3)
+        due_today = make_contract(db, 2, 0)
+        upcoming = make_contract(db, 3, 10)
+        redeemed = make_contract(db, 4, -5)
+        db.update_contract_status(redeemed, 'redeemed')
+
+        swept = db.sweep_forfeited_contracts()
+        assert [row['id'] for row in swept] == [overdue]
+        contract = db.get_contract_by_id(overdue)
+        assert contract['status'] == 'forfeited' and contract['forfeited_at']
+        for contract_id, status in ((due_today, 'active'), (upcoming, 'active'), (redeemed, 'redeemed')):
+            contract = db.get_contract_by_id(contract_id)
+            assert contract['status'] == status and not contract['forfeited_at'], contract_id
+
+        seq = db.get_last_change_seq()
+        assert db.sweep_forfeited_contracts() == []
+        assert db.get_last_change_seq() == seq
+
+
+def test_renewal_past_today_reopens():
+    """Renewing a forfeited contract to a future due date makes it active again; a past date keeps it forfeited"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        contract_id = make_contract(db, 1, -3)
+        db.sweep_forfeited_contracts()
+
+        assert db.update_contract_due_date(contract_id, day(-1))
+        contract = db.get_contract_by_id(contract_id)
+        assert contract['status'] == 'forfeited' and contract['forfeited_at']
+
+        db.add_renewal({'contract_id': contract_id, 'renewal_date': day(0), 'new_due_date': day(30),
+                        'total_amount': 500.0, 'extension_days': 30})
+        assert db.update_contract_due_date(contract_id, day(30))
+        contract = db.get_contract_by_id(contract_id)
+        assert contract['status'] == 'active' and contract['forfeited_at'] is None
+        assert contract['end_date'] == day(30)
+        assert db.sweep_forfeited_contracts() == []
+
+
+def test_get_forfeited_contracts_does_not_write():
+    """Listing forfeited contracts commits nothing, even while overdue active contracts exist"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PawnShopDatabase(os.path.join(tmp, 'pawnshop.db'))
+        forfeited = make_contract(db, 1, -10)
+        db.sweep_forfeited_contracts()
+        overdue = make_contract(db, 2, -2)
+
+        observer = sqlite3.connect(db.db_path)
+        before = data_version(observer)
+        rows = db.get_forfeited_contracts()
+        assert data_version(observer) == before
+        observer.close()
+
+        assert [row['id'] for row in rows] == [forfeited]
+        assert db.get_contract_by_id(overdue)['status'] == 'active'
+
+
+if __name__ == "__main__":
+    for test in (test_sweep_marks_overdue_once, test_renewal_past_today_reopens,
+                 test_get_forfeited_contracts_does_not_write):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All forfeiture sweep checks passed")
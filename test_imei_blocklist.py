@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify IMEIBlocklist import, delta add/remove and compaction
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import imei_blocklist
+from imei_blocklist import IMEIBlocklist, imei_key, read_imei_file
+
+# IMEI 15 หลัก (check digit ถูกต้อง) และรูปแบบ 14 / 16 หลักของเครื่องเดียวกัน
+STOLEN = '352099001761481'
+STOLEN_14 = STOLEN[:14]
+STOLEN_SV = STOLEN[:14] + '07'
+OTHER = '490154203237518'
+RECOVERED = '356938035643809'
+NEW_REPORT = '013171009234565'
+
+
+def keys(*imeis):
+    return np.array(sorted(imei_key(imei) for imei in imeis), dtype=np.uint64)
+
+
+def test_import_matches_14_15_16_digit_forms():
+    """An imported IMEI matches whether written with 14, 15 or 16 digits, dashes included"""
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'stolen.csv')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write("imei,reported\n")
+            f.write(f"35-209900-176148-1,2026-01-02\n{RECOVERED},2026-01-03\n")
+            f.write("order 12345,not an imei\n")
+        imeis = read_imei_file(source)
+        assert list(imeis) == list(keys(STOLEN, RECOVERED))
+
+        blocklist = IMEIBlocklist(os.path.join(directory, 'list'))
+        blocklist.replace(imeis, 'stolen.csv')
+        for form in (STOLEN, STOLEN_14, STOLEN_SV, '35-209900-176148-1'):
+            assert blocklist.contains(form), form
+        assert not blocklist.contains(OTHER)
+        assert not blocklist.contains('35209900176')  # สั้นเกินไป
+        assert blocklist.find_blocked({'imei1': OTHER, 'imei2': STOLEN, 'serial_number': ''}) == [STOLEN]
+        assert blocklist.info()['count'] == 2
+
+
+def test_delta_add_remove_and_compaction():
+    """Deltas add and remove entries without rewriting base; compaction folds them in"""
+    with tempfile.TemporaryDirectory() as directory:
+        blocklist = IMEIBlocklist(directory)
+        blocklist.replace(keys(STOLEN, RECOVERED), 'base')
+        base_name = blocklist._meta['base']
+
+        blocklist.apply_delta(add=keys(NEW_REPORT), remove=keys(RECOVERED), source='delta-1')
+        info = blocklist.info()
+        assert blocklist._meta['base'] == base_name
+        assert (info['base_count'], info['added_count'], info['removed_count'], info['count']) == (2, 1, 1, 2)
+        assert blocklist.contains(NEW_REPORT) and blocklist.contains(STOLEN)
+        assert not blocklist.contains(RECOVERED)
+
+        # เพิ่มกลับรายการที่เคยลบ และลบรายการที่เพิ่งเพิ่ม
+        blocklist.apply_delta(add=keys(RECOVERED), remove=keys(NEW_REPORT), source='delta-2')
+        info = blocklist.info()
+        assert (info['added_count'], info['removed_count'], info['count']) == (0, 0, 2)
+        assert blocklist.contains(RECOVERED) and not blocklist.contains(NEW_REPORT)
+
+        # อีกโปรแกรมที่เปิดโฟลเดอร์เดียวกันเห็นรายการล่าสุด
+        reader = IMEIBlocklist(directory)
+        assert reader.contains(RECOVERED) and not reader.contains(NEW_REPORT)
+
+        blocklist.apply_delta(add=keys(NEW_REPORT, OTHER), remove=keys(STOLEN), source='delta-3')
+        blocklist.compact()
+        info = blocklist.info()
+        assert (info['base_count'], info['added_count'], info['removed_count']) == (3, 0, 0)
+        assert blocklist._meta['base'] != base_name
+        assert sorted(os.listdir(directory)) == ['base-{}.npy'.format(info['version']), 'meta.json']
+        assert not blocklist.contains(STOLEN)
+        assert all(blocklist.contains(imei) for imei in (RECOVERED, NEW_REPORT, OTHER))
+
+
+def test_large_delta_compacts_automatically():
+    """A delta larger than the threshold is merged into base straight away"""
+    threshold = imei_blocklist.COMPACT_THRESHOLD
+    imei_blocklist.COMPACT_THRESHOLD = 1
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            blocklist = IMEIBlocklist(directory)
+            blocklist.replace(keys(STOLEN), 'base')
+            blocklist.apply_delta(add=keys(NEW_REPORT, OTHER), source='big delta')
+            info = blocklist.info()
+            assert (info['base_count'], info['added_count'], info['count']) == (3, 0, 3)
+            assert blocklist.contains(OTHER)
+    finally:
+        imei_blocklist.COMPACT_THRESHOLD = threshold
+
+
+if __name__ == "__main__":
+    for test in (test_import_matches_14_15_16_digit_forms, test_delta_add_remove_and_compaction,
+                 test_large_delta_compacts_automatically):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All IMEI blocklist checks passed")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify omnibox.classify_query() routes each kind of input to the right index
+"""
+
+import sys
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from omnibox import QUERY_CONTRACT, QUERY_ID_CARD, QUERY_IMEI, QUERY_PHONE, QUERY_TEXT, classify_query
+
+# คำค้น -> [(ประเภท, ค่า, rank)] ที่คาดไว้
+CASES = [
+    # เลขที่สัญญา (ตัวอักษรนำหน้า + ตัวเลข) ค้นเป็นคำค้นอิสระด้วย
+    ('CN0012', [(QUERY_CONTRACT, 'CN0012', 0), (QUERY_TEXT, 'CN0012', 3)]),
+    ('cn-12', [(QUERY_CONTRACT, 'CN12', 0), (QUERY_TEXT, 'cn12', 3)]),
+    # เลข 13 หลัก = เลขบัตรประชาชน
+    ('1100700123456', [(QUERY_ID_CARD, '1100700123456', 0), (QUERY_TEXT, '1100700123456', 3)]),
+    ('1-1007-00123-45-6', [(QUERY_ID_CARD, '1100700123456', 0), (QUERY_TEXT, '1100700123456', 3)]),
+    # เลข 15 หลัก = IMEI
+    ('352099001761481', [(QUERY_IMEI, '352099001761481', 0), (QUERY_TEXT, '352099001761481', 3)]),
+    # เบอร์โทร 0 / +66 / 66 แปลงเป็นรูปแบบ 0xxxxxxxxx
+    ('081-234-5678', [(QUERY_PHONE, '0812345678', 0), (QUERY_TEXT, '0812345678', 3)]),
+    ('+66 81 234 5678', [(QUERY_PHONE, '0812345678', 0), (QUERY_TEXT, '66812345678', 3)]),
+    ('66812345678', [(QUERY_PHONE, '0812345678', 0), (QUERY_TEXT, '66812345678', 3)]),
+    ('(02) 123 4567', [(QUERY_PHONE, '021234567', 0), (QUERY_TEXT, '021234567', 3)]),
+    # ตัวเลขที่ไม่ตรงรูปแบบใด = ส่วนหนึ่งของเลข
+    ('12345', [(QUERY_TEXT, '12345', 2)]),
+    ('08123', [(QUERY_TEXT, '08123', 2)]),
+    # ข้อความอิสระ
+    ('สมชาย', [(QUERY_TEXT, 'สมชาย', 1)]),
+    ('iPhone 13', [(QUERY_TEXT, 'iPhone 13', 1)]),
+    ('ABCDE12', [(QUERY_TEXT, 'ABCDE12', 1)]),
+    ('  สมชาย ใจดี  ', [(QUERY_TEXT, 'สมชาย ใจดี', 1)]),
+    # คำค้นว่าง
+    ('', []),
+    ('   ', []),
+    (None, []),
+]
+
+
+def test_classify_query_routing():
+    """Each input is classified into the expected index lookups, most specific first"""
+    for text, expected in CASES:
+        result = [tuple(part) for part in classify_query(text)]
+        assert result == expected, (text, result)
+
+
+def test_parts_sorted_by_rank():
+    """The exact-match interpretation always comes before the free-text fallback"""
+    for text, _ in CASES:
+        ranks = [part.rank for part in classify_query(text)]
+        assert ranks == sorted(ranks), (text, ranks)
+
+
+if __name__ == "__main__":
+    for test in (test_classify_query_routing, test_parts_sorted_by_rank):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All omnibox checks passed")
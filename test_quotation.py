@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify quotation.quote() and quote_batch() agree across fee tier boundaries
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from quotation import FeeTerms, quote, quote_batch
+
+# ขั้นอัตรา: ต่ำกว่า 30 วันใช้อัตราที่ส่งมา, 30-89 วัน 10%, ตั้งแต่ 90 วัน 8%
+TERMS = FeeTerms(days=(30, 90), rates=(10.0, 8.0), penalty_per_day=10.0)
+DEFAULT_RATE = 12.0
+BOUNDARY_DAYS = [1, 29, 30, 31, 89, 90, 91, 180]
+
+
+def test_tier_rates_at_boundaries():
+    """Rate switches exactly at the first day of each tier"""
+    expected = {1: 12.0, 29: 12.0, 30: 10.0, 31: 10.0, 89: 10.0, 90: 8.0, 91: 8.0, 180: 8.0}
+    for days, rate in expected.items():
+        result = quote(5000, days, rate=DEFAULT_RATE, terms=TERMS)
+        assert result['rate'] == rate, (days, result['rate'])
+        assert abs(result['interest'] - 5000 * rate / 100 * days / 30) < 1e-9
+        assert abs(result['total_redemption'] - (5000 + result['interest'])) < 1e-9
+
+
+def test_penalty_and_override():
+    """Overdue penalty counts days after end_date; a stored redemption amount is kept as-is"""
+    result = quote(5000, 30, rate=DEFAULT_RATE, start_date='2026-01-01', as_of='2026-02-05',
+                   terms=TERMS, total_redemption=5400, discount=50)
+    assert result['end_date'] == '2026-01-31'
+    assert result['overdue_days'] == 5
+    assert result['penalty'] == 50.0
+    assert result['total_redemption'] == 5400.0
+    assert result['total_due'] == 5400.0 + 50.0 - 50.0
+
+    on_time = quote(5000, 30, rate=DEFAULT_RATE, start_date='2026-01-01', as_of='2026-01-31', terms=TERMS)
+    assert on_time['overdue_days'] == 0 and on_time['penalty'] == 0.0
+
+
+def test_batch_matches_single_quotes():
+    """quote_batch gives the same numbers as quote() for every boundary case"""
+    amounts = [1000.0 + 250.0 * i for i in range(len(BOUNDARY_DAYS))]
+    start_dates = ['2026-01-01'] * len(BOUNDARY_DAYS)
+    as_of = '2026-05-01'
+    batch = quote_batch(amounts, BOUNDARY_DAYS, DEFAULT_RATE, np.array(start_dates), as_of, TERMS)
+
+    for i, (amount, days) in enumerate(zip(amounts, BOUNDARY_DAYS)):
+        single = quote(amount, days, rate=DEFAULT_RATE, start_date=start_dates[i], as_of=as_of, terms=TERMS)
+        for field in ('rate', 'interest', 'total_redemption', 'overdue_days', 'penalty', 'total_due'):
+            assert abs(float(batch[field][i]) - single[field]) < 1e-6, (days, field, batch[field][i], single[field])
+
+    # ยอดไถ่คืนตามสัญญา (NaN = คำนวณเอง) และส่วนลดรายสัญญา
+    redemptions = [amount if i % 2 else np.nan for i, amount in enumerate(amounts)]
+    discounts = [10.0 * i for i in range(len(amounts))]
+    batch = quote_batch(amounts, BOUNDARY_DAYS, DEFAULT_RATE, np.array(start_dates), as_of, TERMS,
+                        total_redemptions=redemptions, discounts=discounts)
+    for i, (amount, days) in enumerate(zip(amounts, BOUNDARY_DAYS)):
+        single = quote(amount, days, rate=DEFAULT_RATE, start_date=start_dates[i], as_of=as_of, terms=TERMS,
+                       total_redemption=amount if i % 2 else None, discount=discounts[i])
+        for field in ('total_redemption', 'discount', 'total_due'):
+            assert abs(float(batch[field][i]) - single[field]) < 1e-6, (days, field, batch[field][i], single[field])
+
+
+def test_no_tiers_uses_given_rate():
+    """Without a fee schedule every contract uses the rate passed in"""
+    batch = quote_batch([1000.0, 2000.0], [15, 120], DEFAULT_RATE)
+    assert list(batch['rate']) == [DEFAULT_RATE, DEFAULT_RATE]
+    assert quote(1000, 15, rate=DEFAULT_RATE)['rate'] == DEFAULT_RATE
+    assert list(batch['penalty']) == [0.0, 0.0]
+
+
+if __name__ == "__main__":
+    for test in (test_tier_rates_at_boundaries, test_penalty_and_override,
+                 test_batch_matches_single_quotes, test_no_tiers_uses_given_rate):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All quotation checks passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify shop_config_loader write-behind and that explicit saves report write failures
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shop_config_loader import ConfigFile, load_shop_config, save_shop_config, update_shop_config
+
+
+def test_save_writes_before_returning():
+    """save_shop_config() writes the file itself, including a write-behind change still pending"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'shop_config.json')
+        assert update_shop_config({'interest_rate': 8.0}, path, delay=60)
+        assert not os.path.exists(path)
+        assert load_shop_config(path)['interest_rate'] == 8.0
+
+        assert save_shop_config({'name': 'ร้านทดสอบ'}, path)
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        assert saved['shop_name'] == 'ร้านทดสอบ' and saved['interest_rate'] == 8.0
+
+        # บันทึกค่าเดิมซ้ำ: ไม่มีอะไรต้องเขียน ถือว่าสำเร็จ
+        assert save_shop_config({'name': 'ร้านทดสอบ'}, path)
+
+
+def test_failed_write_is_reported_and_kept():
+    """flush() returns False when the file cannot be written and keeps the change for the next flush"""
+    with tempfile.TemporaryDirectory() as tmp:
+        blocker = os.path.join(tmp, 'not_a_directory')
+        with open(blocker, 'w') as f:
+            f.write('')
+        path = os.path.join(blocker, 'shop_config.json')
+        assert not save_shop_config({'name': 'ร้านทดสอบ'}, path)
+
+        config = ConfigFile(path)
+        assert config.update({'shop_name': 'ก'}, delay=60)
+        assert not config.flush()
+        # เขียนไม่สำเร็จ ค่ายังค้างอยู่: ย้ายไปที่เขียนได้แล้ว flush อีกครั้งจะได้ค่าเดิม
+        config.path = os.path.join(tmp, 'config.json')
+        assert config.flush()
+        with open(config.path, encoding='utf-8') as f:
+            assert json.load(f) == {'shop_name': 'ก'}
+
+
+if __name__ == "__main__":
+    for test in (test_save_writes_before_returning, test_failed_write_is_reported_and_kept):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All shop config checks passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify parse_thai_address() against the bundled gazetteer (thai_address.tsv)
+"""
+
+import sys
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from thai_address import parse_thai_address
+
+# ที่อยู่ -> ส่วนที่คาดไว้ (ต้องตรงทุกช่อง ไม่มีช่องเกิน)
+CASES = [
+    # ตำบล/อำเภอ/จังหวัดครบ รหัสไปรษณีย์เติมจากตำบล
+    ('99/1 หมู่ที่ 5 ตำบลบางพูด อำเภอปากเกร็ด จังหวัดนนทบุรี',
+     {'house_number': '99/1 หมู่ที่ 5', 'subdistrict': 'ตำบลบางพูด', 'district': 'อำเภอปากเกร็ด',
+      'province': 'นนทบุรี', 'postcode': '11120'}),
+    # รูปแบบจากบัตรประชาชน (คั่นด้วย #)
+    ('12#หมู่ที่ 4###ตำบลบ้านใหม่#อำเภอปากเกร็ด#จังหวัดนนทบุรี',
+     {'house_number': '12 หมู่ที่ 4', 'subdistrict': 'ตำบลบ้านใหม่', 'district': 'อำเภอปากเกร็ด',
+      'province': 'นนทบุรี', 'postcode': '11120'}),
+    # กรุงเทพฯ: แขวง/เขต และชื่อจังหวัดไม่มีคำนำหน้า
+    ('12 ซอยสีลม 3 ถนนสีลม แขวงสุริยวงศ์ เขตบางรัก กรุงเทพมหานคร',
+     {'house_number': '12', 'street': 'ซอยสีลม 3 ถนนสีลม', 'subdistrict': 'แขวงสุริยวงศ์',
+      'district': 'เขตบางรัก', 'province': 'กรุงเทพมหานคร', 'postcode': '10500'}),
+    # อ.เมือง -> อำเภอเมือง<จังหวัด>
+    ('45 ม.2 ต.ในเมือง อ.เมือง จ.ขอนแก่น',
+     {'house_number': '45 หมู่ที่ 2', 'subdistrict': 'ตำบลในเมือง', 'district': 'อำเภอเมืองขอนแก่น',
+      'province': 'ขอนแก่น', 'postcode': '40000'}),
+    # รหัสไปรษณีย์ท้ายที่อยู่
+    ('7/3 ถนนนิมมานเหมินท์ ตำบลสุเทพ อำเภอเมืองเชียงใหม่ จังหวัดเชียงใหม่ 50200',
+     {'house_number': '7/3', 'street': 'ถนนนิมมานเหมินท์', 'subdistrict': 'ตำบลสุเทพ',
+      'district': 'อำเภอเมืองเชียงใหม่', 'province': 'เชียงใหม่', 'postcode': '50200'}),
+    # ส่วนที่แยกไม่ได้อยู่ใน remaining
+    ('88 อาคารเอ ตำบลบางพูด อำเภอปากเกร็ด จังหวัดนนทบุรี',
+     {'house_number': '88', 'subdistrict': 'ตำบลบางพูด', 'district': 'อำเภอปากเกร็ด',
+      'province': 'นนทบุรี', 'postcode': '11120', 'remaining': 'อาคารเอ'}),
+    ('ข้างวัด ใกล้ตลาด', {'remaining': 'ข้างวัด ใกล้ตลาด'}),
+    ('', {}),
+]
+
+
+def test_parse_thai_address():
+    """Each address splits into the expected fields"""
+    for address, expected in CASES:
+        parsed = parse_thai_address(address)
+        assert parsed == expected, (address, parsed)
+
+
+if __name__ == "__main__":
+    test_parse_thai_address()
+    print("✅ test_parse_thai_address")
+    print("All Thai address checks passed")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script to verify Thai name normalization and FuzzyNameIndex add/remove/compaction and multi-word scoring
+"""
+
+import sys
+from pathlib import Path
+
+# Add current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from thai_fuzzy import FuzzyNameIndex, normalize_thai, similarity
+
+
+def test_normalize_folds_tone_marks_and_vowel_length():
+    """Tone marks, thanthakhat and short/long vowel pairs fold to the same form"""
+    assert normalize_thai('สมศักดิ์') == normalize_thai('สมศักดิ') == normalize_thai('สมศกดิ')
+    assert normalize_thai('ศรี') == normalize_thai('ศริ')
+    assert normalize_thai('สุข') == normalize_thai('สูข')
+    assert normalize_thai('มื่น') == normalize_thai('มึน')
+    assert normalize_thai('น้ำ') == normalize_thai('นํ้า') == normalize_thai('นำ')
+    assert normalize_thai('เเก้ว') == normalize_thai('แก้ว')
+    assert normalize_thai(' Somchai-99 ') == 'somchai'
+    assert normalize_thai(None) == ''
+
+    assert similarity('สมศักดิ์', 'สมสักดิ์') >= 0.5
+    assert similarity('สมศักดิ์', 'ประเสริฐ') < 0.5
+
+
+def make_index():
+    index = FuzzyNameIndex()
+    index.add(1, ('สมศักดิ์', 'ใจดี'))
+    index.add(2, ('วิชัย', 'ใจดี'))
+    index.add(3, ('สมศักดิ์', 'ทองมา'))
+    index.add(4, ('ประเสริฐ', 'มั่นคง'))
+    return index
+
+
+def test_multi_word_query_requires_every_word():
+    """Every query word must match some word of the key; scores average the best match per word"""
+    index = make_index()
+    assert index.search('สมสักดิ ใจดี')[0][0] == 1
+    assert {key for key, _ in index.search('สมศักดิ์')} == {1, 3}
+    assert [key for key, _ in index.search('สมศักดิ์ ทองมา')] == [3]
+    assert index.search('สมศักดิ์ ประเสริฐ') == []
+
+    scores = dict(index.search('สมศักดิ์ ใจดี'))
+    assert abs(scores[1] - 1.0) < 1e-9
+    assert 2 not in scores
+    assert 0.5 <= dict(index.search('วิชาย ใจดี'))[2] < 1.0
+
+    # ลำดับคำในคำค้นไม่มีผล
+    assert index.search('ใจดี สมศักดิ์')[0] == index.search('สมศักดิ์ ใจดี')[0]
+    assert index.search('') == [] and index.search('   ') == []
+    assert len(index.search('ใจดี', limit=1)) == 1
+
+
+def test_add_replace_and_remove():
+    """add() on an existing key replaces its words; remove() hides it from results"""
+    index = make_index()
+    index.add(2, ('วิชัย', 'ทองมา'))
+    assert 2 not in {key for key, _ in index.search('ใจดี')}
+    assert 2 in {key for key, _ in index.search('ทองมา')}
+
+    index.remove(1)
+    assert 1 not in index and len(index) == 3
+    assert [key for key, _ in index.search('สมศักดิ์')] == [3]
+    index.remove(1)  # ลบซ้ำไม่ผิดพลาด
+
+    index.add(1, ('สมศักดิ์', 'ใจดี'))
+    assert index.search('สมศักดิ์ ใจดี')[0][0] == 1
+
+
+def surname(key):
+    # ตัวเลขถูกตัดตอน normalize จึงแทนแต่ละหลักด้วยพยัญชนะ
+    return 'นาม' + ''.join('กขคงจฉชซฌญ'[int(digit)] for digit in str(key))
+
+
+def test_compaction_keeps_results():
+    """Removing enough keys rebuilds the postings without changing search results"""
+    index = FuzzyNameIndex()
+    for key in range(3000):
+        index.add(key, ('สมชาย{}'.format('ก' * (key % 7)), surname(key)))
+    index.add('target', ('ประเสริฐ', 'มั่นคง'))
+    for key in range(0, 3000, 2):
+        index.remove(key)
+
+    assert index._term_count < 2 * 3001, "compaction did not run"
+    assert index._term_count - index._free_terms == 2 * 1501
+    assert len(index) == 1501
+    assert index.search('ประเสิร มั่นคง')[0][0] == 'target'
+    assert index.search('สมชาย ' + surname(1001))[0] == (1001, 1.0)
+    assert all(key % 2 == 1 for key, _ in index.search('สมชาย') if key != 'target')
+
+
+if __name__ == "__main__":
+    for test in (test_normalize_folds_tone_marks_and_vowel_length, test_multi_word_query_requires_every_word,
+                 test_add_replace_and_remove, test_compaction_keeps_results):
+        test()
+        print(f"✅ {test.__name__}")
+    print("All fuzzy name checks passed")
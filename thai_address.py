@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+ข้อมูลจังหวัด/อำเภอ/ตำบล/รหัสไปรษณีย์ (gazetteer) สำหรับแยกที่อยู่จากบัตรประชาชนและเติมคำอัตโนมัติ
+
+- ข้อมูลอยู่ในไฟล์ thai_address.tsv (province, district, subdistrict, postcode) โหลดครั้งเดียวต่อโปรเซส
+  แถวที่มีแต่จังหวัด: postcode คือ 2 หลักแรกของรหัสไปรษณีย์ในจังหวัดนั้น
+  แถวที่มีแต่จังหวัดและอำเภอ: อำเภอที่ยังไม่มีรายชื่อตำบล
+- ไฟล์ที่มากับโปรแกรมมีตำบลทั้งประเทศ (77 จังหวัด 7,427 ตำบล นำเข้าด้วย --import จากข้อมูลของแพ็กเกจ
+  thaiaddress 0.2.1, Apache-2.0) ปรับปรุงข้อมูลได้ด้วย --import (JSON แบบ raw_database ของ jquery.Thailand.js หรือ TSV)
+- ดัชนีชื่อเป็น list ที่เรียงแล้ว ค้นคำขึ้นต้นด้วย bisect (ไม่ต้องไล่ทั้งรายการ)
+- parse_thai_address แยกที่อยู่ในรอบเดียวตามคำนำหน้า (หมู่ที่ ซอย ถนน ตำบล/แขวง อำเภอ/เขต จังหวัด)
+  แล้วตรวจกับ gazetteer: ใช้ชื่อที่ถูกต้อง และเติมอำเภอ/จังหวัดที่ขาดเมื่อชื่อตำบลไม่ซ้ำ
+
+ฟังก์ชันในโมดูลนี้ไม่ใช้ Qt และไม่แตะฐานข้อมูล
+
+วิธีใช้:
+    python thai_address.py --parse "99/1 หมู่ที่ 5 ตำบลบางพูด อำเภอปากเกร็ด จังหวัดนนทบุรี"
+    python thai_address.py --import raw_database.json
+    python thai_address.py --benchmark 100000
+"""
+import argparse
+import bisect
+import csv
+import json
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from resource_path import resource_path
+
+GAZETTEER_FILE = 'thai_address.tsv'
+BANGKOK = 'กรุงเทพมหานคร'
+
+# ชื่อย่อของจังหวัด
+PROVINCE_ALIASES = {'กรุงเทพ': BANGKOK, 'กรุงเทพฯ': BANGKOK, 'กทม': BANGKOK, 'กทม.': BANGKOK}
+
+# คำนำหน้าส่วนของที่อยู่ -> (ส่วน, คำเต็ม) เรียงคำยาวก่อนเพื่อให้ "หมู่ที่" ไม่ถูกอ่านเป็น "หมู่"
+_MARKERS = {
+    'หมู่บ้าน': ('street', 'หมู่บ้าน'),
+    'หมู่ที่': ('moo', 'หมู่ที่'), 'หมู่': ('moo', 'หมู่ที่'), 'ม.': ('moo', 'หมู่ที่'),
+    'ตรอก': ('street', 'ตรอก'), 'ซอย': ('street', 'ซอย'), 'ซ.': ('street', 'ซอย'),
+    'ถนน': ('street', 'ถนน'), 'ถ.': ('street', 'ถนน'),
+    'ตำบล': ('subdistrict', 'ตำบล'), 'ต.': ('subdistrict', 'ตำบล'), 'แขวง': ('subdistrict', 'แขวง'),
+    'อำเภอ': ('district', 'อำเภอ'), 'อ.': ('district', 'อำเภอ'), 'เขต': ('district', 'เขต'),
+    'จังหวัด': ('province', 'จังหวัด'), 'จ.': ('province', 'จังหวัด'),
+}
+# คำนำหน้าต้องอยู่ต้นคำ (หลังช่องว่าง) ชื่อที่มีคำเหล่านี้อยู่กลางคำจึงไม่ถูกตัด
+_MARKER_PATTERN = re.compile(r'(?:^|(?<=\s))({})\s*'.format(
+    '|'.join(re.escape(marker) for marker in sorted(_MARKERS, key=len, reverse=True))))
+_HOUSE_PATTERN = re.compile(r'^(\d+(?:/\d+)?)\s*')
+_POSTCODE_PATTERN = re.compile(r'\s*(?<!\d)(\d{5})\s*$')
+
+
+def _clean(name: Optional[str]) -> str:
+    return ''.join((name or '').split())
+
+
+def _strip_prefix(name: str, kind: str) -> str:
+    """ตัดคำนำหน้า (ตำบล/อำเภอ/จังหวัด หรือคำย่อ) ออกจากชื่อ"""
+    name = _clean(name)
+    for marker, (marker_kind, _) in _MARKERS.items():
+        if marker_kind == kind and name.startswith(marker) and len(name) > len(marker):
+            return name[len(marker):]
+    return name
+
+
+class ThaiGazetteer:
+    """ดัชนีจังหวัด -> อำเภอ -> ตำบล (รหัสไปรษณีย์) พร้อมรายชื่อที่เรียงแล้วสำหรับค้นคำขึ้นต้น"""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, str]]):
+        self._tree: Dict[str, Dict[str, Dict[str, str]]] = {}
+        subdistricts: Dict[str, List[Tuple[str, str, str, str]]] = {}
+        postcode_provinces: Dict[str, set] = {}
+        for province, district, subdistrict, postcode in rows:
+            province, district, subdistrict, postcode = map(_clean, (province, district, subdistrict, postcode))
+            if not province:
+                continue
+            districts = self._tree.setdefault(province, {})
+            if postcode:
+                postcode_provinces.setdefault(postcode, set()).add(province)
+                postcode_provinces.setdefault(postcode[:2], set()).add(province)
+            if not district:
+                continue
+            names = districts.setdefault(district, {})
+            if subdistrict:
+                names[subdistrict] = postcode
+                subdistricts.setdefault(subdistrict, []).append((province, district, subdistrict, postcode))
+
+        self._subdistricts = subdistricts
+        # นับครั้งเดียว: parse_thai_address ตรวจ gazetteer ด้วย truthiness (เรียก __len__) ทุกครั้ง
+        self._count = sum(len(names) for names in subdistricts.values())
+        # รหัสไปรษณีย์ (หรือ 2 หลักแรก) ที่อยู่ในจังหวัดเดียว
+        self._postcode_province = {code: next(iter(provinces))
+                                   for code, provinces in postcode_provinces.items() if len(provinces) == 1}
+        self._district_index: Dict[str, List[Tuple[str, str]]] = {}
+        for province, districts in self._tree.items():
+            for district in districts:
+                self._district_index.setdefault(district, []).append((province, district))
+        self._sorted_provinces = sorted(self._tree)
+        self._sorted_districts = sorted(self._district_index)
+        self._sorted_subdistricts = sorted(self._subdistricts)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ThaiGazetteer':
+        """โหลดจากไฟล์ TSV (ไม่ระบุ = ไฟล์ที่มากับโปรแกรม)"""
+        with open(path or resource_path(GAZETTEER_FILE), encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f, delimiter='\t')
+            return cls([(row['province'], row['district'], row['subdistrict'], row['postcode']) for row in reader])
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _prefixed(names: List[str], prefix: str) -> List[str]:
+        """ชื่อใน names (เรียงแล้ว) ที่ขึ้นต้นด้วย prefix"""
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + '\U0010FFFF')
+        return names[start:end]
+
+    def provinces(self, prefix: str = '') -> List[str]:
+        return self._prefixed(self._sorted_provinces, _clean(prefix))
+
+    def districts(self, province: str = '', prefix: str = '') -> List[str]:
+        """อำเภอ/เขต (ระบุจังหวัดเพื่อจำกัดเฉพาะในจังหวัดนั้น)"""
+        prefix = _clean(prefix)
+        province = self.find_province(province) if province else None
+        if province:
+            return self._prefixed(sorted(self._tree[province]), prefix)
+        return self._prefixed(self._sorted_districts, prefix)
+
+    def subdistricts(self, province: str = '', district: str = '', prefix: str = '') -> List[str]:
+        """ตำบล/แขวง (ระบุอำเภอ/จังหวัดเพื่อจำกัดขอบเขต)"""
+        prefix = _clean(prefix)
+        province = self.find_province(province) if province else None
+        if district:
+            found = self.find_district(district, province)
+            if found:
+                return self._prefixed(sorted(self._tree[found[0]][found[1]]), prefix)
+        if province:
+            return self._prefixed(sorted({name for names in self._tree[province].values() for name in names}), prefix)
+        return self._prefixed(self._sorted_subdistricts, prefix)
+
+    def district_labels(self, province: str = '') -> List[str]:
+        """ชื่ออำเภอพร้อมคำนำหน้า (อำเภอ/เขต) สำหรับเติมคำอัตโนมัติ"""
+        province = self.find_province(province) if province else None
+        if province:
+            pairs = ((province, district) for district in self._tree[province])
+        else:
+            pairs = (pair for pairs in self._district_index.values() for pair in pairs)
+        return sorted({district_label(district, province) for province, district in pairs})
+
+    def subdistrict_labels(self, province: str = '', district: str = '') -> List[str]:
+        """ชื่อตำบลพร้อมคำนำหน้า (ตำบล/แขวง) สำหรับเติมคำอัตโนมัติ"""
+        province = self.find_province(province) if province else None
+        found = self.find_district(district, province) if district else None
+        if found:
+            pairs = ((found[0], name) for name in self._tree[found[0]][found[1]])
+        elif province:
+            pairs = ((province, name) for names in self._tree[province].values() for name in names)
+        else:
+            pairs = ((match[0], match[2]) for matches in self._subdistricts.values() for match in matches)
+        return sorted({subdistrict_label(name, province) for province, name in pairs})
+
+    def find_province(self, name: str) -> Optional[str]:
+        """ชื่อจังหวัดที่ถูกต้อง (รับคำนำหน้า/ชื่อย่อได้) ไม่พบคืน None"""
+        name = _clean(name)
+        name = PROVINCE_ALIASES.get(name, name)
+        if name in self._tree:
+            return name
+        name = _strip_prefix(name, 'province')
+        name = PROVINCE_ALIASES.get(name, name)
+        return name if name in self._tree else None
+
+    def find_district(self, name: str, province: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(จังหวัด, อำเภอ) ของชื่ออำเภอ/เขต ชื่อซ้ำหลายจังหวัดและไม่ระบุจังหวัดคืน None"""
+        name = _strip_prefix(name, 'district')
+        if name == 'เมือง' and province:
+            name += province  # "อำเภอเมือง" บนบัตร = อำเภอเมืองของจังหวัดนั้น
+        matches = self._district_index.get(name, [])
+        if province:
+            matches = [match for match in matches if match[0] == province]
+        return matches[0] if len(matches) == 1 else None
+
+    def find_subdistrict(self, name: str, district: Optional[str] = None,
+                         province: Optional[str] = None) -> List[Tuple[str, str, str, str]]:
+        """[(จังหวัด, อำเภอ, ตำบล, รหัสไปรษณีย์)] ที่ชื่อตำบลตรงกัน (จำกัดด้วยอำเภอ/จังหวัดถ้าระบุ)"""
+        matches = self._subdistricts.get(_strip_prefix(name, 'subdistrict'), [])
+        if province:
+            matches = [match for match in matches if match[0] == province]
+        if district:
+            district = _strip_prefix(district, 'district')
+            matches = [match for match in matches if match[1] == district]
+        return matches
+
+    def province_for_postcode(self, postcode: str) -> Optional[str]:
+        """จังหวัดของรหัสไปรษณีย์ (เฉพาะเมื่อรหัสนั้นอยู่ในจังหวัดเดียว)"""
+        postcode = _clean(postcode)
+        return self._postcode_province.get(postcode) or self._postcode_province.get(postcode[:2])
+
+
+def subdistrict_label(name: str, province: str) -> str:
+    """ชื่อตำบลพร้อมคำนำหน้า (กรุงเทพฯ ใช้ "แขวง")"""
+    return ('แขวง' if province == BANGKOK else 'ตำบล') + name
+
+
+def district_label(name: str, province: str) -> str:
+    """ชื่ออำเภอพร้อมคำนำหน้า (กรุงเทพฯ ใช้ "เขต")"""
+    return ('เขต' if province == BANGKOK else 'อำเภอ') + name
+
+
+def _split_segments(address: str) -> Tuple[str, List[Tuple[str, str, str]]]:
+    """(ข้อความก่อนคำนำหน้าแรก, [(ส่วน, คำนำหน้าเต็ม, ค่า)]) อ่านข้อความรอบเดียว"""
+    matches = list(_MARKER_PATTERN.finditer(address))
+    head = address[:matches[0].start()] if matches else address
+    segments = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        value = address[match.end():following.start() if following else len(address)].strip()
+        kind, word = _MARKERS[match.group(1)]
+        segments.append((kind, word, value))
+    return head.strip(), segments
+
+
+def parse_thai_address(address: str, gazetteer: Optional[ThaiGazetteer] = None) -> Dict[str, str]:
+    """แยกที่อยู่ (เช่นจากบัตรประชาชน ที่แยกส่วนด้วย # หรือช่องว่าง) เป็น
+    house_number, street, subdistrict, district, province, postcode และ remaining (ส่วนที่แยกไม่ได้)
+
+    ตำบล/อำเภอคืนพร้อมคำนำหน้า (ตำบล/อำเภอ หรือ แขวง/เขต ของกรุงเทพฯ) จังหวัดคืนชื่ออย่างเดียว
+    """
+    gazetteer = gazetteer or get_gazetteer()
+    address = ' '.join((address or '').replace('#', ' ').split())
+    parts: Dict[str, str] = {}
+    remaining: List[str] = []
+
+    postcode = _POSTCODE_PATTERN.search(address)
+    if postcode:
+        parts['postcode'] = postcode.group(1)
+        address = address[:postcode.start()]
+
+    head, segments = _split_segments(address)
+    house = _HOUSE_PATTERN.match(head)
+    if house:
+        parts['house_number'] = house.group(1)
+        head = head[house.end():]
+    if head:
+        remaining.append(head)
+
+    values: Dict[str, Tuple[str, str]] = {}
+    street = []
+    for kind, word, value in segments:
+        if not value:
+            continue
+        if kind == 'street':
+            street.append(word + value)
+        elif kind == 'moo':
+            parts['house_number'] = ' '.join(filter(None, [parts.get('house_number'), f"{word} {value}"]))
+        elif kind in values:
+            remaining.append(word + value)
+        else:
+            values[kind] = (word, value)
+    if street:
+        parts['street'] = ' '.join(street)
+
+    # จังหวัดที่ไม่มีคำนำหน้า (เช่น "... เขตบางรัก กรุงเทพมหานคร") ต่อท้ายส่วนสุดท้าย
+    if 'province' not in values:
+        last_kind = segments[-1][0] if segments else None
+        tail = values[last_kind][1] if last_kind in values else (remaining[-1] if remaining else '')
+        words = tail.rsplit(' ', 1)
+        province = gazetteer.find_province(words[-1]) if words[-1] else None
+        if province:
+            values['province'] = ('จังหวัด', province)
+            rest = words[0] if len(words) > 1 else ''
+            if last_kind in values:
+                values[last_kind] = (values[last_kind][0], rest)
+            elif rest:
+                remaining[-1] = rest
+            else:
+                remaining.pop()
+
+    province = None
+    if 'province' in values:
+        province = gazetteer.find_province(values['province'][1])
+        parts['province'] = province or values['province'][1]
+    elif parts.get('postcode'):
+        province = gazetteer.find_province(gazetteer.province_for_postcode(parts['postcode']) or '')
+        if province:
+            parts['province'] = province
+
+    district = None
+    if values.get('district', ('', ''))[1]:
+        value = values['district'][1]
+        found = gazetteer.find_district(value, province)
+        district = found[1] if found else _clean(value)
+        if found and not province:
+            province = parts['province'] = found[0]
+
+    if values.get('subdistrict', ('', ''))[1]:
+        word, value = values['subdistrict']
+        matches = gazetteer.find_subdistrict(value, district, province)
+        if len(matches) == 1:
+            province, district, subdistrict, postcode = matches[0]
+            parts['province'] = province
+            if postcode and not parts.get('postcode'):
+                parts['postcode'] = postcode
+        else:
+            subdistrict = _clean(value)
+        parts['subdistrict'] = subdistrict_label(subdistrict, province) if province else word + subdistrict
+
+    if district:
+        parts['district'] = district_label(district, province) if province else values['district'][0] + district
+
+    remaining = ' '.join(part for part in remaining if part)
+    if remaining:
+        parts['remaining'] = remaining
+    return parts
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> ThaiGazetteer:
+    """ThaiGazetteer จากไฟล์ที่มากับโปรแกรม (โหลดครั้งเดียวต่อโปรเซส)"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = ThaiGazetteer.load()
+        return _gazetteer
+
+
+def read_import_file(path: str) -> List[Tuple[str, str, str, str]]:
+    """อ่านข้อมูลตำบลทั้งประเทศ: JSON (raw_database ของ jquery.Thailand.js ที่ district คือตำบล
+    และ amphoe คืออำเภอ หรือ list ของ province/district/subdistrict/postcode) หรือ TSV แบบ thai_address.tsv"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if not path.lower().endswith('.json'):
+            reader = csv.DictReader(f, delimiter='\t')
+            return [(row['province'], row['district'], row['subdistrict'], row['postcode']) for row in reader]
+        records = json.load(f)
+
+    rows = []
+    for record in records:
+        if 'amphoe' in record:
+            row = (record['province'], record['amphoe'], record['district'], record.get('zipcode', ''))
+        else:
+            row = (record['province'], record['district'], record['subdistrict'],
+                   record.get('postcode', record.get('zipcode', '')))
+        rows.append(tuple(str(value or '') for value in row))
+    return rows
+
+
+def write_gazetteer(rows: Iterable[Tuple[str, str, str, str]], path: str):
+    """บันทึกเป็น TSV (เรียงตามจังหวัด อำเภอ ตำบล ไม่มีแถวซ้ำ)"""
+    rows = sorted(set(tuple(_clean(value) for value in row) for row in rows))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        writer.writerow(['province', 'district', 'subdistrict', 'postcode'])
+        writer.writerows(rows)
+
+
+def benchmark(count: int = 100000):
+    """วัดเวลาโหลด gazetteer และแยกที่อยู่ count รายการ"""
+    started = time.perf_counter()
+    gazetteer = ThaiGazetteer.load()
+    load = time.perf_counter() - started
+
+    provinces = gazetteer.provinces()
+    addresses = []
+    for i in range(count):
+        province = provinces[i % len(provinces)]
+        district = gazetteer.districts(province)[0]
+        addresses.append('{}/{} หมู่ที่ {}   ถนนสุขุมวิท {} {} {}'.format(
+            i, i % 7, i % 12 + 1, subdistrict_label('ทดสอบ', province),
+            district_label(district, province),
+            province if province == BANGKOK else 'จังหวัด' + province))
+
+    started = time.perf_counter()
+    for address in addresses:
+        parse_thai_address(address, gazetteer)
+    parse = time.perf_counter() - started
+
+    print(f"load:  {load * 1000:.1f} ms ({len(provinces)} provinces, {len(gazetteer):,} subdistricts)")
+    print(f"parse: {parse / count * 1e6:.1f} us/address ({count:,} addresses)")
+    print(f"sample: {parse_thai_address(addresses[0], gazetteer)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop Thai address gazetteer")
+    parser.add_argument('--parse', metavar='ADDRESS', help='แยกที่อยู่แล้วพิมพ์ผล')
+    parser.add_argument('--import', dest='import_file', metavar='FILE',
+                        help='แทนที่ข้อมูลด้วยไฟล์ JSON/TSV (เก็บแถวจังหวัดและอำเภอเดิมไว้)')
+    parser.add_argument('--benchmark', type=int, metavar='N')
+    args = parser.parse_args()
+
+    if args.import_file:
+        path = resource_path(GAZETTEER_FILE)
+        with open(path, encoding='utf-8', newline='') as f:
+            existing = [(row['province'], row['district'], '', row['postcode'] if not row['district'] else '')
+                        for row in csv.DictReader(f, delimiter='\t') if not row['subdistrict']]
+        rows = read_import_file(args.import_file)
+        write_gazetteer(existing + rows, path)
+        print(f"import: {len(rows):,} rows from {args.import_file} -> {path}")
+    if args.parse:
+        print(parse_thai_address(args.parse))
+    if args.benchmark or not (args.import_file or args.parse):
+        benchmark(args.benchmark or 100000)
+
+
+if __name__ == "__main__":
+    main()
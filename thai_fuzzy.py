@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+ค้นหาชื่อแบบใกล้เคียง (ทนต่อวรรณยุกต์ที่ขาด/ผิด สระสั้น-ยาวสลับ และพิมพ์ผิดเล็กน้อย)
+
+- normalize_thai ตัดวรรณยุกต์และเครื่องหมายกำกับ รวมสระสั้น/ยาวเป็นรูปเดียว (ี->ิ, ื->ึ, ู->ุ, ตัด ะ ั ็)
+  เช่น "สมศักดิ์" "สมศักดิ" "สมสักดิ์" ต่างกันแค่ตัวอักษรเดียวหลัง normalize
+- FuzzyNameIndex เป็นดัชนี n-gram (bigram) แบบ inverted index ในหน่วยความจำ
+  เพิ่ม/ลบทีละรายการได้ และให้คะแนนความใกล้เคียงด้วย Dice coefficient ของ bigram
+
+ฟังก์ชันในโมดูลนี้ไม่ใช้ Qt และไม่แตะฐานข้อมูล
+
+วิธีรัน benchmark:
+    python thai_fuzzy.py --benchmark 100000
+"""
+import argparse
+import random
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# คะแนนขั้นต่ำ (0-1) ที่ถือว่าใกล้เคียง
+MIN_SIMILARITY = 0.5
+
+# อักขระที่ตัดทิ้ง: วรรณยุกต์ ไม้ไต่คู้ การันต์ นิคหิต ยามักการ ไม้หันอากาศ สระอะ ไม้ยมก ไปยาลน้อย
+_DROP_CHARS = dict.fromkeys(map(ord, '\u0E48\u0E49\u0E4A\u0E4B\u0E47\u0E4C\u0E4D\u0E4E\u0E31\u0E30\u0E46\u0E2F'))
+# สระยาว -> สระสั้น
+_VOWEL_MAP = {ord('\u0E35'): '\u0E34', ord('\u0E37'): '\u0E36', ord('\u0E39'): '\u0E38'}
+_NON_LETTERS = re.compile(r'[\W\d_]+')
+
+
+def normalize_thai(text: str) -> str:
+    """รูปมาตรฐานของคำสำหรับเทียบแบบใกล้เคียง (คำเดียว ไม่มีช่องว่าง)"""
+    text = (text or '').casefold()
+    # สระอำที่พิมพ์เป็น นิคหิต + สระอา (อาจมีวรรณยุกต์คั่น) -> ำ
+    text = re.sub('\u0E4D([\u0E48-\u0E4B]?)\u0E32', '\\1\u0E33', text)
+    text = text.replace('\u0E40\u0E40', '\u0E41')  # เ + เ -> แ
+    text = text.translate(_DROP_CHARS).translate(_VOWEL_MAP)
+    return _NON_LETTERS.sub('', text)
+
+
+def bigrams(word: str) -> Set[str]:
+    """bigram ของคำที่ normalize แล้ว (มีตัวคั่นหัวท้าย คำสั้นจึงเทียบได้)"""
+    padded = ' {} '.format(word)
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def similarity(a: str, b: str) -> float:
+    """ความใกล้เคียงของสองคำ (Dice coefficient ของ bigram หลัง normalize) 0-1"""
+    grams_a, grams_b = bigrams(normalize_thai(a)), bigrams(normalize_thai(b))
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2.0 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class FuzzyNameIndex:
+    """ดัชนีชื่อแบบใกล้เคียง: key (เช่น id ลูกค้า) -> หลายคำ (ชื่อ นามสกุล)
+
+    ค้นด้วย search(คำค้น): ทุกคำในคำค้นต้องใกล้เคียงกับคำใดคำหนึ่งของ key
+    คะแนนของ key = ค่าเฉลี่ยของคะแนนที่ดีที่สุดของแต่ละคำค้น
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, List[int]] = {}
+        self._arrays: Dict[str, np.ndarray] = {}  # posting ที่แปลงเป็น array แล้ว (ล้างเมื่อ posting เปลี่ยน)
+        # ข้อมูลของแต่ละคำ (term id = ตำแหน่ง): เจ้าของ (-1 = ลบแล้ว) และจำนวน bigram
+        self._owners = np.empty(1024, dtype=np.int32)
+        self._sizes = np.empty(1024, dtype=np.int32)
+        self._term_count = 0
+        self._keys: List[object] = []  # owner -> key
+        self._owner_ids: Dict[object, int] = {}
+        self._key_terms: Dict[object, List[int]] = {}
+        self._free_terms = 0
+
+    def __len__(self):
+        return len(self._key_terms)
+
+    def __contains__(self, key):
+        return key in self._key_terms
+
+    def _append_term(self, owner: int, size: int) -> int:
+        term_id = self._term_count
+        if term_id == len(self._owners):
+            self._owners = np.resize(self._owners, term_id * 2)
+            self._sizes = np.resize(self._sizes, term_id * 2)
+        self._owners[term_id] = owner
+        self._sizes[term_id] = size
+        self._term_count += 1
+        return term_id
+
+    def add(self, key, words: Iterable[str]):
+        """เพิ่ม/แทนที่คำของ key"""
+        if key in self._key_terms:
+            self.remove(key)
+        owner = self._owner_ids.get(key)
+        if owner is None:
+            owner = len(self._keys)
+            self._keys.append(key)
+            self._owner_ids[key] = owner
+
+        term_ids = []
+        seen = set()
+        for word in words:
+            for part in (word or '').split():
+                normalized = normalize_thai(part)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                grams = bigrams(normalized)
+                term_id = self._append_term(owner, len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(term_id)
+                    self._arrays.pop(gram, None)
+                term_ids.append(term_id)
+        self._key_terms[key] = term_ids
+
+    def remove(self, key):
+        """ลบ key (posting ของคำที่ลบจะถูกข้ามตอนค้น และถูกล้างเมื่อสะสมมากพอ)"""
+        term_ids = self._key_terms.pop(key, None)
+        if not term_ids:
+            return
+        self._owners[term_ids] = -1
+        self._free_terms += len(term_ids)
+        if self._free_terms > 1000 and self._free_terms > self._term_count // 4:
+            self._compact()
+
+    def _compact(self):
+        """สร้าง posting ใหม่โดยไม่มีคำที่ลบแล้ว"""
+        alive = np.flatnonzero(self._owners[:self._term_count] >= 0)
+        remap = np.full(self._term_count, -1, dtype=np.int64)
+        remap[alive] = np.arange(len(alive))
+        postings = {}
+        for gram, ids in self._postings.items():
+            ids = remap[ids]
+            ids = ids[ids >= 0].tolist()
+            if ids:
+                postings[gram] = ids
+        self._postings = postings
+        self._arrays = {}
+        capacity = max(1024, len(alive) * 2)
+        self._owners = np.resize(self._owners[alive], capacity)
+        self._sizes = np.resize(self._sizes[alive], capacity)
+        self._term_count = len(alive)
+        self._key_terms = {key: remap[ids].tolist() for key, ids in self._key_terms.items()}
+        self._free_terms = 0
+
+    def _match_word(self, word: str, min_similarity: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(owner ที่เรียงแล้ว, คะแนนดีที่สุดของ owner) ของคำค้นหนึ่งคำ"""
+        grams = bigrams(word)
+        arrays = []
+        for gram in grams:
+            array = self._arrays.get(gram)
+            if array is None and gram in self._postings:
+                array = np.array(self._postings[gram], dtype=np.int32)
+                self._arrays[gram] = array
+            if array is not None:
+                arrays.append(array)
+        if not arrays:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        # จำนวน bigram ร่วมของทุกคำในดัชนี
+        counts = np.bincount(np.concatenate(arrays))
+        size = len(grams)
+        # Dice >= min ต้องมี bigram ร่วมอย่างน้อย min * size / 2
+        candidates = np.flatnonzero(counts >= min_similarity * size / 2.0)
+        owners = self._owners[candidates]
+        scores = 2.0 * counts[candidates] / (size + self._sizes[candidates])
+        keep = (owners >= 0) & (scores >= min_similarity)
+        owners, scores = owners[keep], scores[keep]
+
+        # คะแนนดีที่สุดของแต่ละ owner
+        order = np.lexsort((-scores, owners))
+        owners, scores = owners[order], scores[order]
+        first = np.ones(len(owners), dtype=bool)
+        first[1:] = owners[1:] != owners[:-1]
+        return owners[first], scores[first]
+
+    def search(self, query: str, limit: Optional[int] = None,
+               min_similarity: float = MIN_SIMILARITY) -> List[Tuple[object, float]]:
+        """[(key, คะแนน)] เรียงจากใกล้เคียงที่สุด"""
+        words = [normalize_thai(part) for part in (query or '').split()]
+        words = [word for word in words if word]
+        if not words:
+            return []
+
+        owners, total = self._match_word(words[0], min_similarity)
+        for word in words[1:]:
+            if not len(owners):
+                return []
+            word_owners, word_scores = self._match_word(word, min_similarity)
+            owners, index, word_index = np.intersect1d(owners, word_owners, assume_unique=True,
+                                                       return_indices=True)
+            total = total[index] + word_scores[word_index]
+        if not len(owners):
+            return []
+
+        scores = total / len(words)
+        order = np.argsort(-scores, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return [(self._keys[owner], float(score)) for owner, score in zip(owners[order].tolist(), scores[order].tolist())]
+
+
+def benchmark(count: int = 100000):
+    """สร้างชื่อสุ่ม count คน วัดเวลาสร้างดัชนีและค้นหา"""
+    rng = random.Random(0)
+    syllables = ['สม', 'ชาย', 'ศักดิ์', 'ศรี', 'สุ', 'ดา', 'ประ', 'เสริฐ', 'วิ', 'ชัย', 'นิ', 'ภา', 'พร',
+                 'ทอง', 'แก้ว', 'มณี', 'รัตน์', 'กิต', 'ติ', 'พงษ์', 'ใจ', 'ดี', 'มั่น', 'คง', 'เจริญ', 'สุข']
+    names = [(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3))),
+              ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))) for _ in range(count)]
+
+    index = FuzzyNameIndex()
+    started = time.perf_counter()
+    for key, (first, last) in enumerate(names):
+        index.add(key, (first, last))
+    build = time.perf_counter() - started
+
+    queries = [names[rng.randrange(count)] for _ in range(200)]
+    started = time.perf_counter()
+    hits = 0
+    for first, last in queries:
+        # ตัดวรรณยุกต์และเปลี่ยนสระยาวเป็นสั้น (จำลองการพิมพ์ผิด)
+        typo = first.replace('\u0E49', '').replace('\u0E35', '\u0E34')
+        hits += bool(index.search('{} {}'.format(typo, last), limit=20))
+    search = time.perf_counter() - started
+
+    print(f"build:  {build * 1000:.0f} ms for {count:,} names")
+    print(f"search: {search / len(queries) * 1000:.2f} ms/query ({hits}/{len(queries)} found)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PawnShop fuzzy Thai name search")
+    parser.add_argument('--benchmark', type=int, default=100000, metavar='N')
+    args = parser.parse_args()
+    benchmark(args.benchmark)
+
+
+if __name__ == "__main__":
+    main()
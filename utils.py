@@ -113,23 +113,27 @@ class PawnShopUtils:
     @staticmethod
     def calculate_monthly_summary(year: int, month: int, db) -> Dict:
         """คำนวณสรุปรายเดือน"""
+        # ช่วงวันที่ของเดือน (วันที่เก็บเป็น YYYY-MM-DD จึงเทียบช่วงผ่านดัชนีได้)
+        month_start = f"{year:04d}-{month:02d}-01"
+        month_end = f"{year + 1:04d}-01-01" if month == 12 else f"{year:04d}-{month + 1:02d}-01"
+        
         # สัญญาใหม่
         new_contracts = db.execute('''
             SELECT COUNT(*), SUM(pawn_amount) FROM contracts 
-            WHERE strftime('%Y-%m', start_date) = ?
-        ''', (f"{year:04d}-{month:02d}",)).fetchone()
+            WHERE start_date >= ? AND start_date < ?
+        ''', (month_start, month_end)).fetchone()
         
         # การไถ่คืน
         redemptions = db.execute('''
             SELECT COUNT(*), SUM(redemption_amount) FROM redemptions 
-            WHERE strftime('%Y-%m', redemption_date) = ?
-        ''', (f"{year:04d}-{month:02d}",)).fetchone()
+            WHERE redemption_date >= ? AND redemption_date < ?
+        ''', (month_start, month_end)).fetchone()
         
         # การชำระดอกเบี้ย
         interest_payments = db.execute('''
             SELECT COUNT(*), SUM(total_amount) FROM interest_payments 
-            WHERE strftime('%Y-%m', payment_date) = ?
-        ''', (f"{year:04d}-{month:02d}",)).fetchone()
+            WHERE payment_date >= ? AND payment_date < ?
+        ''', (month_start, month_end)).fetchone()
         
         return {
             'year': year,